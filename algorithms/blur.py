@@ -0,0 +1,178 @@
+"""
+Gaussian blur at any radius.
+cv2.GaussianBlur convolves with the whole kernel, so its cost grows with
+the radius. Small blurs still use it, as it is exact; larger ones use
+approximations whose cost per pixel does not depend on the radius:
+
+- box: three box filters (OpenCV's running sums), whose widths are chosen
+  so the combined kernel has the variance of the Gaussian
+- stack: OpenCV's stack blur, a triangular kernel built from running sums;
+  further from a Gaussian than the box method, so only used when asked for
+- pyramid: for very large radii, the image is reduced, blurred with the box
+  method and enlarged again, so most of the work is done on a fraction of
+  the pixels
+
+All methods take uint8, uint16 and float32 images with any number of
+channels. benchmarks/blur.py compares their speed and their error against
+cv2.GaussianBlur.
+"""
+import math
+
+import cv2
+import numpy as np
+
+from algorithms.capabilities import has_function
+
+# Largest kernel blurred exactly (the range the blur slider always had)
+EXACT_KERNEL = 31
+
+# Sigma from which the pyramid method is used
+PYRAMID_SIGMA = 24.0
+
+# Sigma the reduced image of the pyramid method is blurred with
+PYRAMID_TARGET_SIGMA = 6.0
+
+BOX_PASSES = 3
+
+# Largest stack blur kernel; OpenCV's integer sums overflow beyond it
+STACK_KERNEL = 301
+
+# Border handling of cv2.GaussianBlur
+BORDER = cv2.BORDER_REFLECT_101
+
+# OpenCV's filters round the pixels left over after their vector loop at the
+# end of a row differently (16-bit and float images); crops starting on a
+# grid this wide leave the same ones over as the whole frame
+FILTER_ALIGNMENT = 64
+
+METHODS = ('gaussian', 'box', 'stack', 'pyramid')
+
+
+def kernel_sigma(ksize):
+    """Sigma cv2.GaussianBlur derives from a kernel size"""
+    return 0.3 * ((ksize - 1) * 0.5 - 1) + 0.8
+
+
+def box_widths(sigma, passes=BOX_PASSES):
+    """Odd box widths whose repeated filtering has a variance of sigma squared"""
+    ideal = math.sqrt(12 * sigma * sigma / passes + 1)
+    lower = int(ideal)
+    if lower % 2 == 0:
+        lower -= 1
+    lower = max(lower, 1)
+    upper = lower + 2
+    # Use the wider box for enough passes to match the variance
+    count = round((12 * sigma * sigma - passes * lower * lower - 4 * passes * lower - 3 * passes) /
+                  (-4 * lower - 4))
+    count = min(max(count, 0), passes)
+    return [lower] * count + [upper] * (passes - count)
+
+
+def _box(image, sigma, out=None):
+    result = image
+    for width in box_widths(sigma):
+        if width > 1:
+            result = cv2.blur(result, (width, width), borderType=BORDER)
+    if result is image:
+        result = image.copy()
+    return result
+
+
+def _stack(image, sigma, out=None):
+    # The stack blur kernel of radius r is a tent with a variance of r(r+2)/6
+    radius = max(1, int(round(math.sqrt(1 + 6 * sigma * sigma) - 1)))
+    if 2 * radius + 1 > STACK_KERNEL:
+        return _box(image, sigma)
+    return cv2.stackBlur(image, (2 * radius + 1, 2 * radius + 1), dst=out)
+
+
+def _gaussian(image, sigma, out=None):
+    return cv2.GaussianBlur(image, (0, 0), sigma, dst=out, borderType=BORDER)
+
+
+def _pyramid(image, sigma, out=None):
+    h, w = image.shape[:2]
+    factor = max(1, min(int(sigma / PYRAMID_TARGET_SIGMA), h // 4, w // 4))
+    if factor == 1:
+        return _box(image, sigma)
+    # Pad to whole steps so every reduced pixel averages a factor x factor
+    # block; this also keeps crops starting on the grid equal to the frame
+    pad_x, pad_y = -w % factor, -h % factor
+    if pad_x or pad_y:
+        image = cv2.copyMakeBorder(image, 0, pad_y, 0, pad_x, BORDER)
+    small = cv2.resize(image, ((w + pad_x) // factor, (h + pad_y) // factor),
+                       interpolation=cv2.INTER_AREA)
+    # Reducing (a box of the factor) and enlarging (a tent) blur too
+    small_sigma = math.sqrt(max(sigma * sigma - factor * factor / 4, 0.25 * factor * factor)) / factor
+    small = _box(small, small_sigma)
+    if not (pad_x or pad_y):
+        return cv2.resize(small, (w, h), dst=out, interpolation=cv2.INTER_LINEAR)
+    enlarged = cv2.resize(small, (w + pad_x, h + pad_y), interpolation=cv2.INTER_LINEAR)[:h, :w]
+    return np.ascontiguousarray(enlarged) if out is None else enlarged
+
+
+_METHODS = {
+    'gaussian': _gaussian,
+    'box': _box,
+    'stack': _stack,
+    'pyramid': _pyramid,
+}
+
+
+def choose_method(sigma):
+    """Method used for a sigma: exact while cheap, then constant-time approximations"""
+    if sigma <= kernel_sigma(EXACT_KERNEL):
+        return 'gaussian'
+    if sigma >= PYRAMID_SIGMA:
+        return 'pyramid'
+    return 'box'
+
+
+def gaussian_blur(image, sigma, method=None, out=None):
+    """Blur an image with a Gaussian of sigma, approximated for large sigmas"""
+    if sigma <= 0:
+        result = image.copy() if out is None else image
+    else:
+        method = method or choose_method(sigma)
+        if method not in _METHODS:
+            raise ValueError(f"Unknown blur method: {method}")
+        if method == 'stack' and not has_function('stackBlur'):
+            method = 'box'  # Added in OpenCV 4.7
+        result = _METHODS[method](image, sigma, out=out)
+    if out is not None and result is not out:
+        np.copyto(out, result)
+        return out
+    return result
+
+
+def blur_kernel(image, ksize, out=None):
+    """Blur with the Gaussian cv2.GaussianBlur would use for an odd kernel size"""
+    if ksize <= EXACT_KERNEL:
+        return cv2.GaussianBlur(image, (ksize, ksize), 0, dst=out)
+    return gaussian_blur(image, kernel_sigma(ksize), out=out)
+
+
+def blur_footprint(ksize):
+    """
+    (margin, alignment) of blur_kernel for crops: pixels read around each
+    output pixel, and the grid a crop must start on so that blurring it
+    matches blurring the whole frame
+    """
+    if ksize <= EXACT_KERNEL:
+        return ksize // 2, FILTER_ALIGNMENT
+    sigma = kernel_sigma(ksize)
+    if choose_method(sigma) == 'box':
+        return sum(width // 2 for width in box_widths(sigma)), FILTER_ALIGNMENT
+    factor = max(1, int(sigma / PYRAMID_TARGET_SIGMA))
+    small_sigma = math.sqrt(max(sigma * sigma - factor * factor / 4, 0.25 * factor * factor)) / factor
+    # Reduced pixels the box filters reach, plus the reduction and enlargement
+    return (sum(width // 2 for width in box_widths(small_sigma)) + 2) * factor, factor
+
+
+def blur_error(image, sigma, method):
+    """Mean and largest absolute difference to cv2.GaussianBlur, in 0-1 units"""
+    exact = _gaussian(image, sigma).astype(np.float32)
+    approximate = gaussian_blur(image, sigma, method).astype(np.float32)
+    scale = 1.0 if image.dtype == np.float32 else float(np.iinfo(image.dtype).max)
+    difference = np.abs(exact - approximate) / scale
+    return float(difference.mean()), float(difference.max())
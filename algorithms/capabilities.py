@@ -0,0 +1,151 @@
+"""
+Capability registry for optional backends.
+What the installed OpenCV build offers (contrib modules such as xphoto,
+SIMD dispatch, IPP, OpenCL, its thread pool) and whether numba is usable is
+probed once, on first use, instead of every call trying a function and
+catching the failure. Effects pick their implementation from the registry
+once, so the same input always takes the same path; the choice of each
+effect is listed in the diagnostics view. Runtime failures that make an
+effect use its fallback are counted per effect.
+"""
+import os
+import threading
+
+import cv2
+
+# OpenCV CPU feature ids (the cv2.CPU_* constants are missing from some builds)
+CPU_FEATURES = {
+    'SSE4.2': 7,
+    'AVX': 10,
+    'AVX2': 11,
+    'AVX512-SKX': 256,
+    'NEON': 100,
+}
+
+# Optional OpenCV functions effects can use, as attribute paths of cv2
+OPENCV_FUNCTIONS = (
+    'xphoto.oilPainting',
+    'ximgproc.guidedFilter',
+    'ximgproc.edgePreservingFilter',
+    'stackBlur',
+)
+
+# Effect and dtype -> backend chosen for it
+SELECTED = {}
+
+# Effect name -> number of calls that fell back after an error
+FALLBACK_STATS = {}
+
+_lock = threading.Lock()
+_probed = None
+
+
+def usable_cpus():
+    """CPUs this process may run on"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _resolve(path):
+    target = cv2
+    for part in path.split('.'):
+        target = getattr(target, part, None)
+        if target is None:
+            return None
+    return target
+
+
+def _probe():
+    from algorithms import numba_backend
+
+    checker = getattr(cv2, 'checkHardwareSupport', None)
+    simd = [name for name, feature in CPU_FEATURES.items() if checker is not None and checker(feature)]
+    ipp = getattr(cv2, 'ipp', None)
+    ocl = getattr(cv2, 'ocl', None)
+    return {
+        'opencv': cv2.__version__,
+        'functions': {path: _resolve(path) is not None for path in OPENCV_FUNCTIONS},
+        'optimized': cv2.useOptimized(),
+        'simd': simd,
+        'ipp': bool(ipp is not None and ipp.useIPP()),
+        'ipp_version': ipp.getIppVersion() if ipp is not None and ipp.useIPP() else None,
+        'opencl': bool(ocl is not None and ocl.haveOpenCL()),
+        'opencv_threads': cv2.getNumThreads(),
+        'cpus': usable_cpus(),
+        'numba': numba_backend.HAS_NUMBA,
+        'numba_enabled': numba_backend.ENABLED,
+        'numba_threads': numba_backend.num_threads(),
+    }
+
+
+def capabilities():
+    """The probed capabilities (probed on the first call)"""
+    global _probed
+    with _lock:
+        if _probed is None:
+            _probed = _probe()
+        return _probed
+
+
+def has_function(path):
+    """Whether an optional OpenCV function, e.g. 'xphoto.oilPainting', is available"""
+    functions = capabilities()['functions']
+    if path in functions:
+        return functions[path]
+    return _resolve(path) is not None
+
+
+def backend_available(backend):
+    """Whether a backend an effect may ask for can be used in this installation"""
+    if backend == 'numba':
+        return capabilities()['numba_enabled']
+    if backend == 'xphoto':
+        return has_function('xphoto.oilPainting')
+    # OpenCV and NumPy are always there
+    return True
+
+
+def select_backend(key, backends):
+    """
+    The first available backend of a preference-ordered list, e.g.
+    ('numba', 'opencv'). The choice for a key is made once and remembered.
+    """
+    with _lock:
+        if key in SELECTED:
+            return SELECTED[key]
+    chosen = next((backend for backend in backends if backend_available(backend)), backends[-1])
+    with _lock:
+        return SELECTED.setdefault(key, chosen)
+
+
+def record_fallback(effect_name, error):
+    """Count (and report) a call that failed and used the effect's fallback"""
+    with _lock:
+        FALLBACK_STATS[effect_name] = FALLBACK_STATS.get(effect_name, 0) + 1
+    print(f"Error in {effect_name} effect, using its fallback: {error}")
+
+
+def report(backends=None):
+    """Diagnostics text: capabilities, then the backend and fallbacks of each effect"""
+    probed = capabilities()
+    functions = ', '.join(f"{path} {'yes' if ok else 'no'}" for path, ok in probed['functions'].items())
+    numba_state = ('disabled' if probed['numba'] and not probed['numba_enabled'] else
+                   f"{probed['numba_threads']} threads" if probed['numba'] else 'not installed')
+    lines = [
+        f"OpenCV {probed['opencv']} ({'optimized' if probed['optimized'] else 'unoptimized'})",
+        f"  SIMD: {' '.join(probed['simd']) or 'none'}",
+        f"  IPP: {probed['ipp_version'] or 'no'}",
+        f"  OpenCL: {'yes' if probed['opencl'] else 'no'}",
+        f"  Threads: {probed['opencv_threads']} of {probed['cpus']} CPUs",
+        f"  Optional functions: {functions}",
+        f"Numba: {numba_state}",
+    ]
+    if backends:
+        lines.append("Effects:")
+        for name, backend in backends.items():
+            fallbacks = FALLBACK_STATS.get(name, 0)
+            suffix = f" ({fallbacks} fallbacks)" if fallbacks else ""
+            lines.append(f"  {name:<12} {backend}{suffix}")
+    return '\n'.join(lines)
@@ -0,0 +1,236 @@
+"""
+Ordered dithering.
+Every pixel is compared with the entry of a threshold map tiled across the
+frame, so pixels are independent of each other and a frame is quantized in
+one vectorized pass. Maps are Bayer matrices (dispersed dots),
+clustered-dot screens and blue noise made with the void-and-cluster method.
+
+Thresholds are stored as uint8 levels so quantizing needs only integer
+arithmetic. Blue noise takes seconds to generate at 256x256, so generated
+maps are saved in the cache directory and memory-mapped from there.
+"""
+import os
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+from algorithms.palette import apply_palette
+from edit.buffer_pool import scratch
+from utils.app_dirs import cache_dir
+
+# Map kinds and their sizes, in the order the effect offers them
+PATTERNS = (
+    ('bayer', 2), ('bayer', 4), ('bayer', 8), ('bayer', 16),
+    ('clustered', 4), ('clustered', 8),
+    ('blue-noise', 64), ('blue-noise', 256),
+)
+
+# Bump when the generated maps change, so stale cache files are not used
+MAP_VERSION = 1
+
+# Gaussian of the void-and-cluster energy (Ulichney's 1.5)
+VOID_CLUSTER_SIGMA = 1.5
+
+
+def bayer_matrix(size):
+    """Rank of each cell of the size x size Bayer matrix (size a power of two)"""
+    if size < 2 or size & (size - 1):
+        raise ValueError(f"Bayer matrix size must be a power of two: {size}")
+    ranks = np.zeros((1, 1), dtype=np.int64)
+    while len(ranks) < size:
+        ranks = np.block([[4 * ranks, 4 * ranks + 2],
+                          [4 * ranks + 3, 4 * ranks + 1]])
+    return ranks
+
+
+def clustered_dot(size):
+    """Ranks of a 45 degree clustered-dot screen: two dots per cell grow from their centres"""
+    centres = (np.arange(size) + 0.5) * 2 * np.pi / size
+    spot = np.cos(centres)[:, np.newaxis] + np.cos(centres)[np.newaxis, :]
+    # The dot around the cell centre darkens first, the one at the corners last
+    return np.argsort(np.argsort(spot.ravel(), kind='stable'), kind='stable').reshape(size, size)
+
+
+def _energy_window(size, sigma):
+    """Gaussian weights within 4 sigma and their offsets, no wider than a size x size torus"""
+    radius = min(int(np.ceil(4 * sigma)), (size - 1) // 2)
+    offsets = np.arange(-radius, radius + 1)
+    window = np.exp(-(offsets[:, np.newaxis] ** 2 + offsets[np.newaxis, :] ** 2) / (2 * sigma * sigma))
+    return offsets, window
+
+
+def void_and_cluster(size, sigma=VOID_CLUSTER_SIGMA, seed=0):
+    """
+    Ranks of a size x size blue-noise map (Ulichney's void-and-cluster).
+    The energy of a cell is the Gaussian-weighted count of set cells around
+    it on the torus; the tightest cluster is the set cell of highest energy
+    and the largest void the empty cell of lowest energy.
+    """
+    count = size * size
+    offsets, window = _energy_window(size, sigma)
+
+    def toggle(energies, index, sign):
+        # Add or remove one cell's Gaussian, wrapping around the edges
+        y, x = divmod(index, size)
+        cells = np.ix_((y + offsets) % size, (x + offsets) % size)
+        for energy in energies:
+            energy[cells] += sign * window
+
+    def energy_of(pattern):
+        energy = np.zeros((size, size))
+        for index in np.flatnonzero(pattern):
+            toggle((energy,), index, 1)
+        return energy
+
+    # Initial pattern: random cells, then clusters moved into voids until stable
+    rng = np.random.default_rng(seed)
+    pattern = np.zeros((size, size), dtype=bool)
+    pattern.flat[rng.choice(count, max(1, count // 10), replace=False)] = True
+    energy = energy_of(pattern)
+    for _ in range(count):
+        cluster = int(np.where(pattern, energy, -np.inf).argmax())
+        pattern.flat[cluster] = False
+        toggle((energy,), cluster, -1)
+        void = int(np.where(pattern, np.inf, energy).argmin())
+        pattern.flat[void] = True
+        toggle((energy,), void, 1)
+        if void == cluster:
+            break
+    initial = pattern.copy()
+    ones = int(pattern.sum())
+    ranks = np.zeros(count, dtype=np.int64)
+
+    # Phase 1: remove the tightest clusters of the initial pattern
+    clusters = np.where(pattern, energy, -np.inf)
+    for rank in range(ones - 1, -1, -1):
+        cluster = int(clusters.argmax())
+        clusters.flat[cluster] = -np.inf
+        toggle((clusters,), cluster, -1)
+        ranks[cluster] = rank
+
+    # Phases 2 and 3: fill the largest voids. Past half full this is the
+    # tightest cluster of empty cells, as the two energies add up to a
+    # constant. Set cells stay infinite, so one argmin finds the next void
+    voids = np.where(initial, np.inf, energy_of(initial))
+    for rank in range(ones, count):
+        void = int(voids.argmin())
+        toggle((voids,), void, 1)
+        voids.flat[void] = np.inf
+        ranks[void] = rank
+    return ranks.reshape(size, size)
+
+
+_GENERATORS = {
+    'bayer': bayer_matrix,
+    'clustered': clustered_dot,
+    'blue-noise': void_and_cluster,
+}
+
+
+def threshold_levels(ranks):
+    """uint8 thresholds of a rank map, in 1/256 steps centred in each rank"""
+    count = ranks.size
+    return ((2 * ranks + 1) * 256 // (2 * count)).astype(np.uint8)
+
+
+@lru_cache(maxsize=None)
+def threshold_map(kind, size):
+    """
+    (size, size) uint8 threshold map, generated once and memory-mapped from
+    the cache directory afterwards
+    """
+    if kind not in _GENERATORS:
+        raise ValueError(f"Unknown threshold map: {kind}")
+    path = os.path.join(cache_dir('threshold_maps'), f"{kind}-{size}-v{MAP_VERSION}.npy")
+    try:
+        levels = np.load(path, mmap_mode='r')
+        if levels.shape == (size, size) and levels.dtype == np.uint8:
+            return levels
+    except (OSError, ValueError):
+        pass  # Missing or unreadable: generate it again
+
+    levels = threshold_levels(_GENERATORS[kind](size))
+    try:
+        # Written next to the final name and moved, so readers never see half a file
+        temp_path = f"{path[:-4]}.{os.getpid()}.tmp.npy"
+        np.save(temp_path, levels)
+        os.replace(temp_path, path)
+        return np.load(path, mmap_mode='r')
+    except OSError as e:
+        print(f"Could not cache threshold map {kind} {size}: {e}")
+        levels.flags.writeable = False
+        return levels
+
+
+def _threshold_band(levels, offset, width, channels):
+    """
+    Rows of a threshold map tiled across a frame width, for the frame rows
+    from offset (x0, y0) on, repeated for each channel so it adds to a
+    row block of the image as is
+    """
+    size = len(levels)
+    x0, y0 = offset[0] % size, offset[1] % size
+    band = np.tile(levels, (1, -(-(x0 + width) // size)))[:, x0:x0 + width]
+    band = np.roll(band, -y0, axis=0)
+    return np.repeat(band[:, :, np.newaxis], channels, axis=2)
+
+
+def _row_blocks(height, size):
+    for start in range(0, height, size):
+        yield slice(start, min(height, start + size)), min(size, height - start)
+
+
+def dither_levels(image, levels, kind='bayer', size=8, offset=(0, 0), out=None):
+    """
+    Quantize every channel of a uint8 image to levels values with an ordered
+    threshold map. offset is the position of image in the frame the map is
+    tiled across, so crops match the whole frame.
+    """
+    levels = int(np.clip(levels, 2, 256))
+    height, width, channels = image.shape
+    band = _threshold_band(threshold_map(kind, size), offset, width, channels)
+    # In units of 1/256 of a level, so the level is the high byte of value +
+    # threshold; pixels exactly on a level stay there
+    scaled = np.round(np.arange(256) * (levels - 1) * 256 / 255).astype(np.uint16)
+    values = np.minimum(np.arange(256), levels - 1) * 255 // (levels - 1)
+    values = values.astype(np.uint8)
+    if out is None:
+        out = np.empty_like(image)
+    with scratch(image.shape, np.uint16) as total:
+        cv2.LUT(image, scaled, dst=total)
+        for rows, count in _row_blocks(height, size):
+            total[rows] += band[:count]
+        np.right_shift(total, 8, out=out, casting='unsafe')
+    return cv2.LUT(out, values, dst=out)
+
+
+def palette_spread(palette):
+    """Threshold amplitude for a palette: the median distance between neighbouring colors"""
+    colors = np.asarray(palette, dtype=np.float32).reshape(-1, 3)
+    if len(colors) < 2:
+        return 0.0
+    distances = np.sqrt(((colors[:, np.newaxis] - colors[np.newaxis]) ** 2).sum(axis=2))
+    np.fill_diagonal(distances, np.inf)
+    # Spread along the gray axis, where the offset is added
+    return float(np.median(distances.min(axis=1)) / np.sqrt(3))
+
+
+def dither_palette(image, palette, kind='bayer', size=8, offset=(0, 0), space='oklab', out=None):
+    """
+    Map a uint8 RGB image onto a palette with an ordered threshold map: each
+    pixel is offset by its threshold, scaled to the spacing of the palette,
+    before it is matched to the nearest color
+    """
+    height, width, channels = image.shape
+    band = _threshold_band(threshold_map(kind, size), offset, width, channels)
+    # Offsets of the threshold levels, centred on zero, split into the part
+    # added and the part subtracted so uint8 arithmetic saturates
+    shifts = np.round(((np.arange(256) + 0.5) / 256 - 0.5) * palette_spread(palette))
+    raise_band = np.maximum(shifts, 0).astype(np.uint8)[band]
+    lower_band = np.maximum(-shifts, 0).astype(np.uint8)[band]
+    with scratch(image.shape, np.uint8) as shifted:
+        for rows, count in _row_blocks(height, size):
+            cv2.add(image[rows], raise_band[:count], dst=shifted[rows])
+            cv2.subtract(shifted[rows], lower_band[:count], dst=shifted[rows])
+        return apply_palette(shifted, palette, space, out=out)
@@ -0,0 +1,147 @@
+"""
+CMYK halftone screening.
+Every output pixel is evaluated on its own, without drawing dots:
+
+- its position is rotated into the screen of each ink (classic angles: cyan
+  15, magenta 75, yellow 0 and black 45 degrees), giving the screen cell it
+  falls in and its position inside that cell
+- the ink coverage of the cell is looked up at the cell's centre in a plane
+  reduced by the cell size (the average color of the area), converted to CMYK
+- the pixel is inked when the dot-shape function at its position in the cell
+  is below the threshold that covers that fraction of the cell, with a one
+  pixel soft edge
+
+The cost is a fixed amount of arithmetic per pixel, whatever the cell size,
+and rows are independent, so the Numba kernel runs them in parallel and the
+NumPy path works in strips. Positions are taken in frame coordinates, so
+crops aligned to the cell size match the whole frame.
+"""
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+from edit.working_format import max_value
+
+# Screen angle of each ink, in C, M, Y, K order
+SCREEN_ANGLES = (15.0, 75.0, 0.0, 45.0)
+
+# Dot shapes, in the order the effect offers them
+SHAPES = ('round', 'diamond', 'square', 'line')
+
+# Entries of the coverage -> threshold table
+THRESHOLD_STEPS = 1024
+
+# Rows evaluated at once by the NumPy path
+STRIP_ROWS = 128
+
+
+def spot(shape, fu, fv):
+    """Dot-shape function at positions (fu, fv) in a cell, both in [-0.5, 0.5)"""
+    if shape == 0:
+        return np.sqrt(fu * fu + fv * fv)
+    if shape == 1:
+        return np.abs(fu) + np.abs(fv)
+    if shape == 2:
+        return np.maximum(np.abs(fu), np.abs(fv))
+    return np.abs(fv)
+
+
+@lru_cache(maxsize=None)
+def spot_thresholds(shape):
+    """
+    (THRESHOLD_STEPS + 1,) table of the spot value below which a fraction
+    i / THRESHOLD_STEPS of a cell lies, so dots cover their ink exactly
+    """
+    samples = (np.arange(256) + 0.5) / 256 - 0.5
+    values = np.sort(spot(shape, samples[:, np.newaxis], samples[np.newaxis, :]).ravel())
+    positions = np.arange(THRESHOLD_STEPS + 1) * (len(values) - 1) // THRESHOLD_STEPS
+    table = values[positions].astype(np.float64)
+    # No ink stays blank and full ink covers every pixel
+    table[0] = values[0] - 1.0
+    table[-1] = values[-1] + 1.0
+    table.flags.writeable = False
+    return table
+
+
+def screen_vectors(angles=SCREEN_ANGLES):
+    """(4, 2) cosines and sines of the screen angles"""
+    radians = np.radians(np.asarray(angles, dtype=np.float64))
+    return np.ascontiguousarray(np.stack([np.cos(radians), np.sin(radians)], axis=1))
+
+
+def ink_plane(image, cell):
+    """
+    CMYK coverage (0-1, float32) of every cell x cell block of an RGB image,
+    as a (rows, columns, 4) plane; the image is padded to whole blocks so
+    the blocks stay on the frame's grid
+    """
+    h, w = image.shape[:2]
+    pad_h, pad_w = -h % cell, -w % cell
+    if pad_h or pad_w:
+        image = cv2.copyMakeBorder(image, 0, pad_h, 0, pad_w, cv2.BORDER_REPLICATE)
+    small = cv2.resize(image, ((w + pad_w) // cell, (h + pad_h) // cell), interpolation=cv2.INTER_AREA)
+    rgb = small.astype(np.float32) / np.float32(max_value(image.dtype))
+    # Full gray component replacement: black carries what the three inks share
+    black = 1.0 - rgb.max(axis=2)
+    white = np.maximum(1.0 - black, 1e-6)[:, :, np.newaxis]
+    inks = np.empty(rgb.shape[:2] + (4,), dtype=np.float32)
+    inks[:, :, :3] = np.clip((1.0 - rgb - black[:, :, np.newaxis]) / white, 0.0, 1.0)
+    inks[:, :, 3] = black
+    return inks
+
+
+def _sample(plane, sx, sy, block_x, block_y):
+    """Bilinear samples of a plane at absolute block coordinates, edges replicated"""
+    rows, columns = plane.shape
+    ix, iy = np.floor(sx), np.floor(sy)
+    wx, wy = sx - ix, sy - iy
+    x0 = np.clip(ix - block_x, 0, columns - 1).astype(np.intp)
+    x1 = np.clip(ix + 1 - block_x, 0, columns - 1).astype(np.intp)
+    y0 = np.clip(iy - block_y, 0, rows - 1).astype(np.intp)
+    y1 = np.clip(iy + 1 - block_y, 0, rows - 1).astype(np.intp)
+    top = plane[y0, x0] * (1 - wx) + plane[y0, x1] * wx
+    bottom = plane[y1, x0] * (1 - wx) + plane[y1, x1] * wx
+    return top * (1 - wy) + bottom * wy
+
+
+def halftone(image, cell, shape=0, offset=(0, 0), out=None):
+    """
+    CMYK halftone of an RGB image with cells of cell pixels. offset is the
+    position of image in its frame; it must be a multiple of cell.
+    """
+    h, w = image.shape[:2]
+    inks = ink_plane(image, cell)
+    vectors = screen_vectors()
+    thresholds = spot_thresholds(shape)
+    if out is None:
+        out = np.empty_like(image)
+    peak = float(max_value(image.dtype))
+    rounding = 0.0 if image.dtype == np.float32 else 0.5
+    scale = 1.0 / cell
+    block_x, block_y = offset[0] // cell, offset[1] // cell
+    x = np.arange(w, dtype=np.float64)[np.newaxis, :] + offset[0]
+    for start in range(0, h, STRIP_ROWS):
+        y = np.arange(start, min(h, start + STRIP_ROWS), dtype=np.float64)[:, np.newaxis] + offset[1]
+        paper = np.ones((len(y), w, 3))  # Light left by the C, M, Y inks; black darkens all
+        for ink, (cos, sin) in enumerate(vectors):
+            # Position in screen cells, and inside its cell
+            u = (x * cos + y * sin) * scale
+            v = (y * cos - x * sin) * scale
+            cu, cv = np.floor(u) + 0.5, np.floor(v) + 0.5
+            # Cell centre back in the frame, in blocks of the ink plane
+            sx = (cu * cos - cv * sin) - 0.5
+            sy = (cu * sin + cv * cos) - 0.5
+            coverage = _sample(inks[:, :, ink], sx, sy, block_x, block_y)
+            threshold = thresholds[np.clip(coverage * THRESHOLD_STEPS + 0.5, 0,
+                                           THRESHOLD_STEPS).astype(np.intp)]
+            # Spot values grow by about 1 / cell per pixel: a one pixel edge
+            inked = np.clip((threshold - spot(shape, u - cu, v - cv)) * cell + 0.5, 0.0, 1.0)
+            if ink < 3:
+                paper[:, :, ink] -= inked
+            else:
+                paper *= (1.0 - inked)[:, :, np.newaxis]
+        paper *= peak
+        paper += rounding
+        np.copyto(out[start:start + len(y)], paper, casting='unsafe')
+    return out
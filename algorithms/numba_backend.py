@@ -0,0 +1,276 @@
+"""
+Optional Numba backend for pointwise and 3x3 stencil operations.
+Each kernel makes a single parallel pass over the pixels and writes straight
+into the output array in the working dtype, instead of the chain of
+full-frame temporaries the NumPy versions create. Compiled code is cached on
+disk and warmed up in a background thread at startup; until the kernels are
+ready for a dtype (or when numba is not installed) callers use their NumPy
+path.
+"""
+import os
+import threading
+import time
+
+import numpy as np
+
+try:
+    import numba
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+# Set DITHER_GIRL_NUMBA=0 to force the NumPy paths
+ENABLED = HAS_NUMBA and os.environ.get('DITHER_GIRL_NUMBA', '1') != '0'
+
+WARMUP_DTYPES = (np.uint8, np.uint16, np.float32)
+
+_ready = set()           # dtypes whose kernels have been compiled or loaded
+_warmup_thread = None
+# The default workqueue threading layer cannot run parallel kernels from
+# several threads at once, and each kernel already uses every core. Only
+# kernels that are already compiled run under this lock; compilation
+# happens in warmup() without it.
+_kernel_lock = threading.Lock()
+WARMUP_STATS = {'seconds': None}
+
+
+def num_threads():
+    """Threads parallel kernels run on (0 without numba)"""
+    # The configured count; asking numba.get_num_threads() would launch the
+    # threading layer from whichever thread calls this
+    return numba.config.NUMBA_NUM_THREADS if HAS_NUMBA else 0
+
+
+def ready(dtype):
+    """True if the Numba kernels can be used for images of this dtype"""
+    return ENABLED and np.dtype(dtype) in _ready
+
+
+if HAS_NUMBA:
+
+    @njit(parallel=True, cache=True, nogil=True)
+    def _posterize(image, factor, out):
+        height, width, channels = image.shape
+        for y in prange(height):
+            for x in range(width):
+                for c in range(channels):
+                    out[y, x, c] = np.floor(image[y, x, c] / factor + 0.5) * factor
+
+    @njit(parallel=True, cache=True, nogil=True)
+    def _vignette(image, intensity, x0, y0, frame_width, frame_height, out):
+        height, width, channels = image.shape
+        # Same sample positions as np.linspace(-1, 1, n) over the whole frame
+        step_x = 2.0 / (frame_width - 1) if frame_width > 1 else 0.0
+        step_y = 2.0 / (frame_height - 1) if frame_height > 1 else 0.0
+        for y in prange(height):
+            dy = -1.0 + (y + y0) * step_y
+            for x in range(width):
+                dx = -1.0 + (x + x0) * step_x
+                mask = 1.0 - min(max(np.sqrt(dx * dx + dy * dy) * intensity * 1.5, 0.0), 1.0)
+                for c in range(channels):
+                    out[y, x, c] = image[y, x, c] * mask
+
+    @njit(parallel=True, cache=True, nogil=True)
+    def _linear(image, scale, offset, max_val, out):
+        # out = image * scale + offset per channel, clipped
+        height, width, channels = image.shape
+        for y in prange(height):
+            for x in range(width):
+                for c in range(channels):
+                    v = image[y, x, c] * scale[c] + offset[c]
+                    out[y, x, c] = min(max(v, 0.0), max_val)
+
+    @njit(cache=True, inline='always')
+    def _reflect(i, n):
+        # Border handling matches cv2.BORDER_REFLECT_101
+        if i < 0:
+            i = -i
+        elif i >= n:
+            i = 2 * n - i - 2
+        return min(max(i, 0), n - 1)
+
+    @njit(parallel=True, cache=True, nogil=True)
+    def _convolve3x3(image, kernel, offset, max_val, out):
+        height, width, channels = image.shape
+        k00, k01, k02 = kernel[0, 0], kernel[0, 1], kernel[0, 2]
+        k10, k11, k12 = kernel[1, 0], kernel[1, 1], kernel[1, 2]
+        k20, k21, k22 = kernel[2, 0], kernel[2, 1], kernel[2, 2]
+        for y in prange(height):
+            # Neighbour rows are resolved once per row, columns only at the border
+            up = image[_reflect(y - 1, height)]
+            mid = image[y]
+            down = image[_reflect(y + 1, height)]
+            for x in range(width):
+                if 0 < x < width - 1:
+                    left, right = x - 1, x + 1
+                else:
+                    left, right = _reflect(x - 1, width), _reflect(x + 1, width)
+                for c in range(channels):
+                    acc = (offset
+                           + k00 * up[left, c] + k01 * up[x, c] + k02 * up[right, c]
+                           + k10 * mid[left, c] + k11 * mid[x, c] + k12 * mid[right, c]
+                           + k20 * down[left, c] + k21 * down[x, c] + k22 * down[right, c])
+                    out[y, x, c] = min(max(acc, 0.0), max_val)
+
+
+    @njit(cache=True, inline='always')
+    def _spot(shape, fu, fv):
+        # Same dot shapes as algorithms.halftone.spot
+        if shape == 0:
+            return np.sqrt(fu * fu + fv * fv)
+        if shape == 1:
+            return abs(fu) + abs(fv)
+        if shape == 2:
+            return max(abs(fu), abs(fv))
+        return abs(fv)
+
+    @njit(parallel=True, cache=True, nogil=True)
+    def _halftone(inks, vectors, thresholds, cell, shape, x0, y0, max_val, rounding, out):
+        height, width = out.shape[0], out.shape[1]
+        rows, columns = inks.shape[0], inks.shape[1]
+        steps = thresholds.shape[0] - 1
+        scale = 1.0 / cell
+        block_x, block_y = x0 // cell, y0 // cell
+        for y in prange(height):
+            fy = float(y + y0)
+            # Neighbouring pixels mostly share their cell: its threshold is
+            # looked up again only when the cell changes
+            last_u = np.full(4, np.nan)
+            last_v = np.full(4, np.nan)
+            threshold = np.zeros(4)
+            for x in range(width):
+                fx = float(x + x0)
+                paper_r, paper_g, paper_b = 1.0, 1.0, 1.0
+                for ink in range(4):
+                    cos, sin = vectors[ink, 0], vectors[ink, 1]
+                    u = (fx * cos + fy * sin) * scale
+                    v = (fy * cos - fx * sin) * scale
+                    cu, cv = np.floor(u) + 0.5, np.floor(v) + 0.5
+                    if cu != last_u[ink] or cv != last_v[ink]:
+                        last_u[ink], last_v[ink] = cu, cv
+                        sx = (cu * cos - cv * sin) - 0.5
+                        sy = (cu * sin + cv * cos) - 0.5
+                        ix, iy = np.floor(sx), np.floor(sy)
+                        wx, wy = sx - ix, sy - iy
+                        c0 = min(max(int(ix) - block_x, 0), columns - 1)
+                        c1 = min(max(int(ix) + 1 - block_x, 0), columns - 1)
+                        r0 = min(max(int(iy) - block_y, 0), rows - 1)
+                        r1 = min(max(int(iy) + 1 - block_y, 0), rows - 1)
+                        top = inks[r0, c0, ink] * (1 - wx) + inks[r0, c1, ink] * wx
+                        bottom = inks[r1, c0, ink] * (1 - wx) + inks[r1, c1, ink] * wx
+                        coverage = top * (1 - wy) + bottom * wy
+                        index = int(min(max(coverage * steps + 0.5, 0.0), float(steps)))
+                        threshold[ink] = thresholds[index]
+                    edge = (threshold[ink] - _spot(shape, u - cu, v - cv)) * cell + 0.5
+                    inked = min(max(edge, 0.0), 1.0)
+                    if ink == 0:
+                        paper_r -= inked
+                    elif ink == 1:
+                        paper_g -= inked
+                    elif ink == 2:
+                        paper_b -= inked
+                    else:
+                        paper_r *= 1.0 - inked
+                        paper_g *= 1.0 - inked
+                        paper_b *= 1.0 - inked
+                out[y, x, 0] = paper_r * max_val + rounding
+                out[y, x, 1] = paper_g * max_val + rounding
+                out[y, x, 2] = paper_b * max_val + rounding
+
+
+def _max_value(dtype):
+    from edit.working_format import max_value
+    return float(max_value(dtype))
+
+
+def _run(kernel, image, *args, out=None):
+    if out is None:
+        out = np.empty_like(image)
+    with _kernel_lock:
+        kernel(np.ascontiguousarray(image), *args, out)
+    return out
+
+
+def posterize(image, factor, out=None):
+    """Round every value to the nearest multiple of factor"""
+    return _run(_posterize, image, float(factor), out=out)
+
+
+def vignette(image, intensity, x0=0, y0=0, frame_width=None, frame_height=None, out=None):
+    """Darken the image with a radial mask centred on its frame"""
+    frame_width = image.shape[1] if frame_width is None else frame_width
+    frame_height = image.shape[0] if frame_height is None else frame_height
+    return _run(_vignette, image, float(intensity), int(x0), int(y0),
+                int(frame_width), int(frame_height), out=out)
+
+
+def linear(image, scale, offset, out=None):
+    """Per-channel image * scale + offset, clipped to the image dtype's range"""
+    scale = np.broadcast_to(np.asarray(scale, dtype=np.float64), (3,)).copy()
+    offset = np.broadcast_to(np.asarray(offset, dtype=np.float64), (3,)).copy()
+    return _run(_linear, image, scale, offset, _max_value(image.dtype), out=out)
+
+
+def convolve3x3(image, kernel, offset=0.0, out=None):
+    """Correlate every channel with a 3x3 kernel, add an offset and clip"""
+    return _run(_convolve3x3, image, np.ascontiguousarray(kernel, dtype=np.float64),
+                float(offset), _max_value(image.dtype), out=out)
+
+
+def halftone(inks, vectors, thresholds, cell, shape, x0, y0, out):
+    """CMYK halftone of the ink plane of algorithms.halftone.ink_plane into out"""
+    rounding = 0.0 if out.dtype == np.float32 else 0.5
+    with _kernel_lock:
+        # Tables are passed as writeable copies; read-only arrays are another Numba type
+        _halftone(np.ascontiguousarray(inks), np.array(vectors), np.array(thresholds), int(cell),
+                  int(shape), int(x0), int(y0), _max_value(out.dtype), rounding, out)
+    return out
+
+
+def _signatures(dtype):
+    """Argument types each kernel is called with for images of a dtype"""
+    image = numba.typeof(np.zeros((1, 1, 3), dtype=dtype))
+    matrix = numba.typeof(np.zeros((3, 3)))
+    vector = numba.typeof(np.zeros(3))
+    f64 = numba.float64
+    i64 = numba.int64
+    return [
+        (_posterize, (image, f64, image)),
+        (_vignette, (image, f64, i64, i64, i64, i64, image)),
+        (_linear, (image, vector, vector, f64, image)),
+        (_convolve3x3, (image, matrix, f64, f64, image)),
+        (_halftone, (numba.typeof(np.zeros((1, 1, 4), dtype=np.float32)), matrix,
+                     vector, i64, i64, i64, i64, f64, f64, image)),
+    ]
+
+
+def warmup():
+    """Compile (or load from the disk cache) every kernel for each working dtype"""
+    if not ENABLED:
+        return
+    start = time.perf_counter()
+    for dtype in WARMUP_DTYPES:
+        try:
+            # Explicit signatures compile without running anything, so
+            # kernels that are already ready keep running meanwhile
+            for kernel, signature in _signatures(dtype):
+                kernel.compile(signature)
+        except Exception as e:
+            print(f"Numba kernels unavailable for {np.dtype(dtype).name}: {e}")
+            continue
+        _ready.add(np.dtype(dtype))
+    WARMUP_STATS['seconds'] = time.perf_counter() - start
+
+
+def start_warmup():
+    """Warm up the kernels on a daemon thread so startup is not delayed"""
+    global _warmup_thread
+    if not ENABLED or _warmup_thread is not None:
+        return _warmup_thread
+    # Start the threading layer from the main thread; launching it from the
+    # warmup thread makes the interpreter hang on exit
+    numba.get_num_threads()
+    _warmup_thread = threading.Thread(target=warmup, name='numba-warmup', daemon=True)
+    _warmup_thread.start()
+    return _warmup_thread
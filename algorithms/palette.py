@@ -0,0 +1,257 @@
+"""
+Palette quantization.
+Images are mapped onto a fixed or adaptive palette through a quantized 3D
+lookup table: the nearest palette color of every cell of an RGB grid is
+found once (in RGB, CIE Lab or OKLab) and mapping a frame is then a single
+gather. Adaptive palettes come from median cut or k-means on a pixel sample.
+"""
+import json
+import os
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+from edit.buffer_pool import scratch
+from utils.app_dirs import data_dir
+
+# Classic fixed palettes, as hex colors
+BUILTIN_PALETTES = {
+    'gameboy': ['#0f380f', '#306230', '#8bac0f', '#9bbc0f'],
+    'pico-8': ['#000000', '#1d2b53', '#7e2553', '#008751', '#ab5236', '#5f574f',
+               '#c2c3c7', '#fff1e8', '#ff004d', '#ffa300', '#ffec27', '#00e436',
+               '#29adff', '#83769c', '#ff77a8', '#ffccaa'],
+    'cga': ['#000000', '#55ffff', '#ff55ff', '#ffffff'],
+    'cga-warm': ['#000000', '#55ff55', '#ff5555', '#ffff55'],
+    'grayscale-4': ['#000000', '#555555', '#aaaaaa', '#ffffff'],
+    '1-bit': ['#000000', '#ffffff'],
+}
+
+PALETTE_EXTENSIONS = ('.hex', '.gpl', '.json', '.txt')
+
+COLOR_SPACES = ('rgb', 'lab', 'oklab')
+
+# Bits per channel of the lookup grid; 6 bits = 262144 cells
+DEFAULT_LUT_BITS = 6
+
+
+def parse_color(value):
+    """'#rrggbb', 'rrggbb' or [r, g, b] -> (r, g, b)"""
+    if isinstance(value, str):
+        value = value.strip().lstrip('#')
+        if len(value) != 6:
+            raise ValueError(f"Invalid color: {value}")
+        return tuple(int(value[i:i + 2], 16) for i in (0, 2, 4))
+    r, g, b = value[:3]
+    return int(r), int(g), int(b)
+
+
+def palette_array(colors):
+    """Palette as a (k, 3) uint8 RGB array"""
+    return np.array([parse_color(c) for c in colors], dtype=np.uint8).reshape(-1, 3)
+
+
+def load_palette(file_path):
+    """Load a palette from a .hex/.txt (one color per line), GIMP .gpl or JSON file"""
+    ext = os.path.splitext(file_path)[1].lower()
+    with open(file_path, 'r', encoding='utf-8') as f:
+        if ext == '.json':
+            data = json.load(f)
+            colors = data.get('colors', []) if isinstance(data, dict) else data
+            return palette_array(colors)
+        lines = f.read().splitlines()
+
+    colors = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if ext == '.gpl':
+            # Header lines are "GIMP Palette", "Name: ..." and "Columns: ..."
+            parts = line.split()
+            if len(parts) >= 3 and all(p.isdigit() for p in parts[:3]):
+                colors.append([int(p) for p in parts[:3]])
+        elif not line.startswith(';'):
+            colors.append(line.split()[0])
+    if not colors:
+        raise ValueError(f"No colors in palette {file_path}")
+    return palette_array(colors)
+
+
+# Parsed user palette files, by path -> (modification time, colors)
+_loaded = {}
+
+
+def user_palettes():
+    """Palettes saved in the user's palette directory, by file name"""
+    palettes = {}
+    directory = data_dir('palettes')
+    for name in sorted(os.listdir(directory)):
+        root, ext = os.path.splitext(name)
+        if ext.lower() not in PALETTE_EXTENSIONS:
+            continue
+        path = os.path.join(directory, name)
+        try:
+            mtime = os.path.getmtime(path)
+            if path not in _loaded or _loaded[path][0] != mtime:
+                _loaded[path] = (mtime, load_palette(path))
+            palettes[root] = _loaded[path][1]
+        except (OSError, ValueError) as e:
+            print(f"Skipping palette {name}: {e}")
+    return palettes
+
+
+def available_palettes():
+    """Built-in palettes followed by user palettes"""
+    palettes = {name: palette_array(colors) for name, colors in BUILTIN_PALETTES.items()}
+    for name, colors in user_palettes().items():
+        palettes.setdefault(name, colors)
+    return palettes
+
+
+# Color spaces
+
+def _srgb_to_linear(rgb):
+    return np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+
+
+def to_color_space(rgb, space):
+    """Convert (n, 3) uint8 RGB colors to float32 coordinates in a color space"""
+    rgb = np.asarray(rgb, dtype=np.float32).reshape(-1, 3) / 255.0
+    if space == 'rgb':
+        return rgb
+    if space == 'lab':
+        return cv2.cvtColor(rgb.reshape(-1, 1, 3), cv2.COLOR_RGB2Lab).reshape(-1, 3)
+    if space == 'oklab':
+        linear = _srgb_to_linear(rgb)
+        lms = linear @ np.array([[0.4122214708, 0.2119034982, 0.0883024619],
+                                 [0.5363325363, 0.6806995451, 0.2817188376],
+                                 [0.0514459929, 0.1073969566, 0.6299787005]], dtype=np.float32)
+        lms = np.cbrt(lms)
+        return lms @ np.array([[0.2104542553, 1.9779984951, 0.0259040371],
+                               [0.7936177850, -2.4285922050, 0.7827717662],
+                               [-0.0040720468, 0.4505937099, -0.8086757660]], dtype=np.float32)
+    raise ValueError(f"Unknown color space: {space}")
+
+
+def nearest_indices(points, targets, chunk=65536):
+    """Index of the nearest target for each point (squared Euclidean distance)"""
+    indices = np.empty(len(points), dtype=np.int32)
+    target_norms = (targets ** 2).sum(axis=1)
+    for start in range(0, len(points), chunk):
+        block = points[start:start + chunk]
+        # |p - t|^2 = |p|^2 - 2 p.t + |t|^2; |p|^2 does not change the argmin
+        distances = target_norms - 2.0 * block @ targets.T
+        indices[start:start + chunk] = distances.argmin(axis=1)
+    return indices
+
+
+# Lookup tables
+
+@lru_cache(maxsize=16)
+def _index_table(palette_bytes, space, bits):
+    palette = np.frombuffer(palette_bytes, dtype=np.uint8).reshape(-1, 3)
+    size = 1 << bits
+    # Centre of every grid cell, in the same r, g, b order as the index
+    centres = (np.arange(size) * (256 // size) + (256 // size) // 2).astype(np.uint8)
+    grid = np.stack(np.meshgrid(centres, centres, centres, indexing='ij'), axis=-1).reshape(-1, 3)
+    indices = nearest_indices(to_color_space(grid, space), to_color_space(palette, space))
+    table = indices.astype(np.uint8 if len(palette) <= 256 else np.int32)
+    table.flags.writeable = False
+    return table
+
+
+@lru_cache(maxsize=16)
+def _color_table(palette_bytes, space, bits):
+    palette = np.frombuffer(palette_bytes, dtype=np.uint8).reshape(-1, 3)
+    table = palette[_index_table(palette_bytes, space, bits)]
+    table.flags.writeable = False
+    return table
+
+
+def index_table(palette, space='oklab', bits=DEFAULT_LUT_BITS):
+    """(2^(3*bits),) table of the nearest palette index for each grid cell"""
+    palette = np.ascontiguousarray(palette, dtype=np.uint8)
+    return _index_table(palette.tobytes(), space, bits)
+
+
+def color_table(palette, space='oklab', bits=DEFAULT_LUT_BITS):
+    """(2^(3*bits), 3) table of the nearest palette color for each grid cell"""
+    palette = np.ascontiguousarray(palette, dtype=np.uint8)
+    return _color_table(palette.tobytes(), space, bits)
+
+
+def _grid_index(image, bits, out=None):
+    shift = 8 - bits
+    # Flat grid index r << 2*bits | g << bits | b, built in place
+    index = np.right_shift(image[:, :, 0], shift, out=out, dtype=np.int32)
+    index <<= bits
+    index |= image[:, :, 1] >> shift
+    index <<= bits
+    index |= image[:, :, 2] >> shift
+    return index
+
+
+def apply_palette(image, palette, space='oklab', bits=DEFAULT_LUT_BITS, out=None):
+    """Map a uint8 RGB image onto a palette with one table gather, optionally into out"""
+    table = color_table(palette, space, bits)
+    # The index plane is a temporary from the scratch pool
+    with scratch(image.shape[:2], np.int32) as index:
+        # mode='clip' lets take() write straight into out; indices are in range
+        return np.take(table, _grid_index(image, bits, out=index), axis=0, out=out, mode='clip')
+
+
+def palette_indices(image, palette, space='oklab', bits=DEFAULT_LUT_BITS):
+    """Palette index of every pixel, e.g. for paletted GIF frames"""
+    return index_table(palette, space, bits)[_grid_index(image, bits)]
+
+
+# Adaptive palettes
+
+def sample_pixels(image, max_samples=65536):
+    """Evenly strided sample of an image's pixels as (n, 3) uint8"""
+    pixels = image.reshape(-1, 3)
+    step = max(1, len(pixels) // max_samples)
+    return pixels[::step]
+
+
+def median_cut(pixels, count):
+    """Palette of up to count colors by recursively splitting the widest box at its median"""
+    boxes = [np.asarray(pixels, dtype=np.uint8).reshape(-1, 3)]
+    while len(boxes) < count:
+        # Split the box with the widest channel range, weighted by its size
+        scores = [int(np.ptp(box, axis=0).max()) * len(box) if len(box) > 1 else -1 for box in boxes]
+        widest = int(np.argmax(scores))
+        if scores[widest] <= 0:
+            break
+        box = boxes.pop(widest)
+        channel = int(np.ptp(box, axis=0).argmax())
+        box = box[box[:, channel].argsort(kind='stable')]
+        middle = len(box) // 2
+        boxes += [box[:middle], box[middle:]]
+    return np.array([box.mean(axis=0).round() for box in boxes], dtype=np.uint8)
+
+
+def kmeans_palette(pixels, count, space='oklab', iterations=8):
+    """
+    k-means palette seeded with median cut. Pixels are assigned to clusters
+    by distance in the given color space; centres are the RGB mean of their
+    cluster, so no inverse color transform is needed.
+    """
+    pixels = np.asarray(pixels, dtype=np.uint8).reshape(-1, 3)
+    centres = median_cut(pixels, count).astype(np.float32)
+    points = to_color_space(pixels, space)
+    rgb = pixels.astype(np.float32)
+    for _ in range(iterations):
+        labels = nearest_indices(points, to_color_space(centres.round().astype(np.uint8), space))
+        counts = np.bincount(labels, minlength=len(centres))
+        sums = np.stack([np.bincount(labels, weights=rgb[:, c], minlength=len(centres))
+                         for c in range(3)], axis=1).astype(np.float32)
+        moved = counts > 0
+        new_centres = centres.copy()
+        new_centres[moved] = sums[moved] / counts[moved, np.newaxis]
+        if np.abs(new_centres - centres).max() < 0.5:
+            centres = new_centres
+            break
+        centres = new_centres
+    return centres.round().astype(np.uint8)
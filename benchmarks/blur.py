@@ -0,0 +1,66 @@
+"""
+Large-radius blur speed and precision.
+
+Blurs a synthetic photo-like image with every method of algorithms.blur at
+increasing sigmas and prints the time and the mean and largest difference
+to cv2.GaussianBlur (in 8-bit levels). cv2.GaussianBlur itself is timed up
+to a sigma where it still finishes in reasonable time.
+
+    python benchmarks/blur.py [megapixels]
+"""
+import math
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from algorithms.blur import gaussian_blur, kernel_sigma
+
+SIGMAS = (5.0, 15.0, 45.0, 90.0)
+
+# Exact blurs beyond this sigma take too long to wait for on large images
+EXACT_LIMIT = 45.0
+
+
+def timed(func, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    megapixels = float(sys.argv[1]) if len(sys.argv) > 1 else 12
+    width = int(math.sqrt(megapixels * 1e6 * 4 / 3))
+    height = width * 3 // 4
+    rng = np.random.default_rng(0)
+    small = rng.integers(0, 256, (90, 120, 3), dtype=np.uint8)
+    image = cv2.resize(small, (width, height), interpolation=cv2.INTER_CUBIC)
+    print(f"{width}x{height} uint8, kernel 601 of the blur slider = sigma {kernel_sigma(601):.1f}")
+    print(f"{'sigma':>6} {'method':>9} {'ms':>8} {'mean err':>9} {'max err':>8}")
+
+    # The exact reference is computed on a crop when the full frame is too slow
+    crop = image[:height // 3, :width // 3]
+    for sigma in SIGMAS:
+        target = image if sigma <= EXACT_LIMIT else crop
+        seconds, exact = timed(lambda: cv2.GaussianBlur(target, (0, 0), sigma), 1)
+        exact = exact.astype(np.float32)
+        label = '' if target is image else ' (crop)'
+        print(f"{sigma:6.1f} {'gaussian':>9} {seconds * 1000:8.0f}{label}")
+        for method in ('box', 'stack', 'pyramid'):
+            seconds, result = timed(lambda: gaussian_blur(image, sigma, method))
+            if target is not image:
+                result = gaussian_blur(crop, sigma, method)
+            difference = np.abs(result.astype(np.float32) - exact)
+            print(f"{sigma:6.1f} {method:>9} {seconds * 1000:8.0f} {difference.mean():9.2f} "
+                  f"{difference.max():8.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Allocator churn of preview renders.
+
+Simulates a brightness slider drag on a preview graph with a few
+adjustments and effects after it, first with every output and temporary
+freshly allocated, then with the preview buffer pool and the scratch pool.
+Reports the frames taken from the allocator per render, how many came from
+a pool instead, and the traced peak.
+
+    python benchmarks/buffer_pool.py [width] [height] [scale]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from edit import buffer_pool
+from edit.buffer_pool import BUFFER_STATS
+from edit.edit_graph import EditGraph
+
+TICKS = 12
+EFFECTS = (('sepia', {'intensity': 0.6}), ('vignette', {'intensity': 0.5}),
+           ('posterize', {'levels': 6}))
+
+
+def drag(graph, scale, pooled):
+    # Warm-up render: the first tick always allocates
+    preview = graph.proxy(scale)
+    preview.buffers = graph.preview_buffers if pooled else None
+    preview.render()
+    allocated, reused = BUFFER_STATS['allocated'], BUFFER_STATS['reused']
+    evaluated = preview.stats['evaluated']
+    tracemalloc.start()
+    start = time.perf_counter()
+    for tick in range(TICKS):
+        graph.update_params(graph.adjustment('brightness').id, value=tick * 3 - 15)
+        preview = graph.proxy(scale)
+        preview.buffers = graph.preview_buffers if pooled else None
+        preview.render()
+    seconds = (time.perf_counter() - start) / TICKS
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    fresh = BUFFER_STATS['allocated'] - allocated
+    if not pooled:
+        # Every evaluated node allocated its output
+        fresh += preview.stats['evaluated'] - evaluated
+    fresh /= TICKS
+    pooled_frames = (BUFFER_STATS['reused'] - reused) / TICKS
+    return seconds, fresh, pooled_frames, peak
+
+
+def main():
+    width = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    height = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    scale = float(sys.argv[3]) if len(sys.argv) > 3 else 0.5
+    image = np.random.default_rng(0).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    graph = EditGraph()
+    graph.set_source(image)
+    graph.update_params(graph.adjustment('contrast').id, value=10)
+    graph.update_params(graph.adjustment('saturation').id, value=20)
+    for name, params in EFFECTS:
+        graph.add_effect(name, params)
+    print(f"{width}x{height} at {int(scale * 100)}%, {TICKS} brightness ticks, "
+          f"{len(graph.nodes)} nodes")
+
+    for label, pooled in (('fresh buffers', False), ('buffer pools', True)):
+        # Without pooling every borrowed temporary is a fresh allocation too
+        buffer_pool.SCRATCH.budget = buffer_pool.DEFAULT_BUDGET if pooled else 0
+        buffer_pool.SCRATCH.clear()
+        graph.preview_buffers.clear()
+        graph._proxy = None
+        seconds, fresh, reused, peak = drag(graph, scale, pooled)
+        print(f"{label:<14} {seconds * 1000:7.1f} ms/render  {fresh:4.1f} frames allocated, "
+              f"{reused:4.1f} reused per render  peak {peak / 2 ** 20:6.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Ordered dithering speed.
+
+Times generating each threshold map and loading it again from the cache
+(memory-mapped), then dithering a synthetic photo-like image with every
+map to 2 and 4 levels per channel and onto the PICO-8 palette. Times are
+reported per megapixel.
+
+    python benchmarks/dither.py [megapixels]
+"""
+import math
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep the generated maps out of the user's cache
+os.environ['DITHER_GIRL_HOME'] = tempfile.mkdtemp(prefix='dither-bench-')
+
+from algorithms import dither
+from algorithms.palette import BUILTIN_PALETTES, palette_array
+
+
+def timed(func, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    megapixels = float(sys.argv[1]) if len(sys.argv) > 1 else 12
+    width = int(math.sqrt(megapixels * 1e6 * 4 / 3))
+    height = width * 3 // 4
+    rng = np.random.default_rng(0)
+    small = rng.integers(0, 256, (90, 120, 3), dtype=np.uint8)
+    image = cv2.resize(small, (width, height), interpolation=cv2.INTER_CUBIC)
+    pico8 = palette_array(BUILTIN_PALETTES['pico-8'])
+    out = np.empty_like(image)
+    megapixels = width * height / 1e6
+    print(f"{width}x{height} uint8 ({megapixels:.1f} MP)")
+    print(f"{'map':>15} {'generate ms':>12} {'cached ms':>10} "
+          f"{'2 levels ms/MP':>15} {'4 levels ms/MP':>15} {'pico-8 ms/MP':>13}")
+
+    for kind, size in dither.PATTERNS:
+        dither.threshold_map.cache_clear()
+        generate = timed(lambda: dither.threshold_map(kind, size), 1)
+        dither.threshold_map.cache_clear()
+        cached = timed(lambda: dither.threshold_map(kind, size), 1)
+        two = timed(lambda: dither.dither_levels(image, 2, kind, size, out=out))
+        four = timed(lambda: dither.dither_levels(image, 4, kind, size, out=out))
+        palette = timed(lambda: dither.dither_palette(image, pico8, kind, size, out=out))
+        print(f"{f'{kind} {size}':>15} {generate * 1000:12.1f} {cached * 1000:10.2f} "
+              f"{two * 1000 / megapixels:15.1f} {four * 1000 / megapixels:15.1f} "
+              f"{palette * 1000 / megapixels:13.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+CMYK halftone speed.
+
+Halftones synthetic photo-like images of increasing size at several cell
+sizes with the Numba kernel and the NumPy path, and prints the time per
+megapixel; it should stay flat across image sizes and dot counts. For
+comparison, a baseline that draws every dot with cv2.circle is timed at the
+smallest size.
+
+    python benchmarks/halftone.py [megapixels ...]
+"""
+import math
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from algorithms import numba_backend
+from algorithms.halftone import (SCREEN_ANGLES, halftone, ink_plane, screen_vectors,
+                                 spot_thresholds)
+
+CELLS = (4, 8, 32)
+
+
+def timed(func, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def photo(megapixels):
+    width = int(math.sqrt(megapixels * 1e6 * 4 / 3))
+    height = width * 3 // 4
+    small = np.random.default_rng(0).integers(0, 256, (90, 120, 3), dtype=np.uint8)
+    return cv2.resize(small, (width, height), interpolation=cv2.INTER_CUBIC)
+
+
+def draw_dots(image, cell):
+    """Baseline: one filled circle per screen cell and ink"""
+    h, w = image.shape[:2]
+    inks = ink_plane(image, cell)
+    planes = np.ones((4, h, w), dtype=np.float32)
+    reach = int(math.hypot(w, h) / cell) + 1
+    for ink, angle in enumerate(SCREEN_ANGLES):
+        cos, sin = math.cos(math.radians(angle)), math.sin(math.radians(angle))
+        for i in range(-reach, reach):
+            for j in range(-reach, reach):
+                x = ((i + 0.5) * cos - (j + 0.5) * sin) * cell
+                y = ((i + 0.5) * sin + (j + 0.5) * cos) * cell
+                if -cell <= x < w + cell and -cell <= y < h + cell:
+                    bx = min(max(int(x / cell), 0), inks.shape[1] - 1)
+                    by = min(max(int(y / cell), 0), inks.shape[0] - 1)
+                    radius = cell * math.sqrt(inks[by, bx, ink] / math.pi)
+                    cv2.circle(planes[ink], (int(x), int(y)), int(round(radius)), 0.0, -1)
+    return planes
+
+
+def main():
+    sizes = [float(a) for a in sys.argv[1:]] or [2.0, 12.0, 40.0]
+    numba_backend.warmup()
+    kernel = numba_backend.ready(np.uint8)
+    print(f"{'MP':>5} {'cell':>5} {'dots':>9} {'numba ms/MP':>12} {'numpy ms/MP':>12}")
+    for megapixels in sizes:
+        image = photo(megapixels)
+        out = np.empty_like(image)
+        h, w = image.shape[:2]
+        for cell in CELLS:
+            dots = 4 * (w // cell) * (h // cell)
+            if kernel:
+                numba = timed(lambda: numba_backend.halftone(
+                    ink_plane(image, cell), screen_vectors(), spot_thresholds(0), cell, 0, 0, 0, out))
+                numba = f"{numba * 1000 / megapixels:12.1f}"
+            else:
+                numba = f"{'-':>12}"
+            numpy_path = timed(lambda: halftone(image, cell, out=out), 1)
+            print(f"{megapixels:5.0f} {cell:5d} {dots:9d} {numba} {numpy_path * 1000 / megapixels:12.1f}")
+
+    image = photo(sizes[0])
+    for cell in CELLS:
+        seconds = timed(lambda: draw_dots(image, cell), 1)
+        print(f"cv2.circle per dot, {sizes[0]:.0f} MP, cell {cell}: {seconds * 1000 / sizes[0]:.1f} ms/MP")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Work saved by shared image contexts.
+
+Simulates a slider drag (the same input re-rendered with changing
+parameters) on contrast, saturation, watercolor and HDR, then an effect
+gallery pass where every effect sees the same thumbnail, and reports how
+many derived planes were reused and how much computation that saved.
+
+    python benchmarks/image_context.py [width] [height]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from edit import image_context
+from edit.image_context import CONTEXT_STATS
+from edit.image_filters import ImageFilters
+from effects import EFFECTS
+
+TICKS = 10
+
+
+def reset():
+    image_context.CACHE.clear()
+    for key in CONTEXT_STATS:
+        CONTEXT_STATS[key] = 0
+
+
+def run(label, func):
+    reset()
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    print(f"{label:<24} {seconds * 1000:8.1f} ms  {image_context.report()}")
+
+
+def main():
+    width = int(sys.argv[1]) if len(sys.argv) > 1 else 1920
+    height = int(sys.argv[2]) if len(sys.argv) > 2 else 1080
+    image = np.random.default_rng(0).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    filters = ImageFilters()
+    print(f"{width}x{height}, {TICKS} slider ticks per drag")
+
+    run('contrast drag', lambda: [filters.adjust_contrast(image, v) for v in range(TICKS)])
+    run('saturation drag', lambda: [filters.adjust_saturation(image, v) for v in range(TICKS)])
+    run('watercolor saturation', lambda: [EFFECTS['watercolor'].apply(image, saturation=1 + v / 20)
+                                          for v in range(TICKS)])
+    run('hdr saturation', lambda: [EFFECTS['hdr'].apply(image, saturation=v / TICKS)
+                                   for v in range(TICKS)])
+    thumbnail = image[::8, ::8].copy()
+    run('gallery', lambda: [effect.apply(thumbnail) for effect in EFFECTS.values()])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Peak memory of every effect.
+
+Measures each effect once per working format on a synthetic image, records
+the bytes-per-megapixel profile the memory budget uses for its estimates,
+and prints it. With --strips the peak of rendering tileable effects in 8
+strips is shown next to the whole-frame peak.
+
+    python benchmarks/memory_profile.py [width] [height] [--strips]
+"""
+import os
+import sys
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from edit import memory_budget
+from edit.working_format import ALL_DTYPES, convert_image
+from effects import EFFECTS
+
+STRIPS = 8
+
+
+def traced_peak(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    strips = '--strips' in sys.argv
+    width = int(args[0]) if len(args) > 0 else 2000
+    height = int(args[1]) if len(args) > 1 else 1500
+    image = np.random.default_rng(0).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    megapixels = width * height / memory_budget.MEGAPIXEL
+    print(f"{width}x{height} ({megapixels:.1f} MP); MB of peak additional memory per megapixel")
+
+    profile = memory_budget.BUDGET.profile
+    for name, effect in EFFECTS.items():
+        params = {key: spec['default'] for key, spec in effect.params.items()}
+        for dtype in ALL_DTYPES:
+            if dtype not in effect.native_dtypes:
+                continue
+            source = convert_image(image, dtype)
+            peak = traced_peak(lambda: effect.apply(source, **params))
+            profile.record(name, dtype, peak, width * height)
+            line = f"{name:<12} {np.dtype(dtype).name:<8} {peak / megapixels / 2 ** 20:8.1f}"
+            if strips and effect.tileable(**params):
+                tiled = traced_peak(lambda: memory_budget.apply_in_strips(effect, source, params, STRIPS))
+                line += f"  {STRIPS} strips {tiled / megapixels / 2 ** 20:8.1f}"
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
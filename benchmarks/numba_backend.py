@@ -0,0 +1,73 @@
+"""
+Time the Numba kernels against the NumPy paths on a full-size frame.
+Results are also compared with the same tolerance as
+tests/test_numba_backend.py: one level for integer formats, 1e-5 for float32.
+
+    python benchmarks/numba_backend.py [width] [height]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from algorithms import numba_backend
+from edit.image_filters import ImageFilters
+from edit.working_format import WORKING_FORMATS, convert_image
+from effects import EFFECTS
+
+filters = ImageFilters()
+OPERATIONS = {
+    'brightness': lambda image: filters.adjust_brightness(image, 25),
+    'contrast': lambda image: filters.adjust_contrast(image, 40),
+    'posterize': lambda image: EFFECTS['posterize'].apply(image, levels=4),
+    'vignette': lambda image: EFFECTS['vignette'].apply(image, intensity=0.5),
+    'emboss': lambda image: EFFECTS['emboss'].apply(image),
+}
+
+
+def timed(func, image, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(image)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    if not numba_backend.HAS_NUMBA:
+        print("numba is not installed; only the NumPy paths are available")
+        return 0
+    width = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    height = int(sys.argv[2]) if len(sys.argv) > 2 else 1500
+
+    start = time.perf_counter()
+    numba_backend.warmup()
+    print(f"warmup: {time.perf_counter() - start:.2f}s (fast when loaded from the disk cache)")
+
+    rng = np.random.default_rng(0)
+    source = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    failures = 0
+    for name, dtype in WORKING_FORMATS.items():
+        image = convert_image(source, dtype)
+        tolerance = 1e-5 if name == 'float32' else 1
+        for op_name, op in OPERATIONS.items():
+            numba_backend.ENABLED = False
+            expected, numpy_time = timed(op, image)
+            numba_backend.ENABLED = True
+            result, numba_time = timed(op, image)
+            diff = np.abs(result.astype(np.float64) - expected.astype(np.float64)).max()
+            ok = result.dtype == expected.dtype and diff <= tolerance
+            failures += not ok
+            print(f"{name:>8} {op_name:<11} numpy {numpy_time * 1000:7.1f} ms  "
+                  f"numba {numba_time * 1000:7.1f} ms  x{numpy_time / numba_time:5.1f}  "
+                  f"max diff {diff:g} {'ok' if ok else 'MISMATCH'}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""
+Scopes overhead while dragging a slider.
+
+Simulates slider drags on the preview of a 12 MP image, the way the editor
+renders them, and times the render of each step against the scopes work:
+preparing the job on the GUI thread and computing it on the worker. The
+brightness drag takes the remapping path; the saturation drag samples and
+counts every step.
+
+    python benchmarks/scopes.py [steps]
+"""
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from edit.edit_graph import EditGraph
+from edit.render_scheduler import RenderScheduler
+from utils.scopes import ScopeAnalyzer
+
+
+def drag(graph, scale, name, steps):
+    node = graph.adjustment(name)
+    analyzer = ScopeAnalyzer()
+    render_seconds = gui_seconds = worker_seconds = 0.0
+    for step in range(steps):
+        graph.update_params(node.id, value=(step * 7) % 100 - 50)
+        start = time.perf_counter()
+        proxy = graph.proxy(scale)
+        preview = proxy.render()
+        render_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        job = analyzer.prepare(proxy, preview)
+        gui_seconds += time.perf_counter() - start
+        start = time.perf_counter()
+        analyzer.compute(job)
+        worker_seconds += time.perf_counter() - start
+    graph.update_params(node.id, value=0)
+
+    print(f"{name} drag ({preview.shape[1]}x{preview.shape[0]} preview, {steps} steps)")
+    print(f"  render:           {render_seconds / steps * 1000:7.2f} ms per step")
+    print(f"  scopes on GUI:    {gui_seconds / steps * 1000:7.2f} ms "
+          f"({gui_seconds / render_seconds * 100:.1f}% of render)")
+    print(f"  scopes on worker: {worker_seconds / steps * 1000:7.2f} ms "
+          f"({worker_seconds / render_seconds * 100:.1f}% of render)")
+    print(f"  {analyzer.report()}")
+
+
+def main():
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    rng = np.random.default_rng(0)
+    small = rng.integers(0, 256, (300, 400, 3), dtype=np.uint8)
+    image = cv2.resize(small, (4000, 3000), interpolation=cv2.INTER_CUBIC)
+
+    graph = EditGraph()
+    graph.set_source(image)
+    scale = RenderScheduler().choose_scale(image.shape[0] * image.shape[1])
+    graph.proxy(scale).render()  # Warm up the proxy
+    drag(graph, scale, 'brightness', steps)
+    drag(graph, scale, 'saturation', steps)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Throughput of process-pool rendering with and without shared memory.
+
+The pickling path sends every frame to a worker and the result back
+through the pool's pipe; the shared-memory path sends only segment
+handles. A cheap effect is used so the transfer cost dominates.
+
+    python benchmarks/shared_frames.py [megapixels] [frames] [workers]
+"""
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.shared_frames import SharedMemoryExecutor
+
+EFFECT = 'negative'
+
+
+def pickled_task(image):
+    from effects import EFFECTS
+    return EFFECTS[EFFECT].apply(image)
+
+
+def warm(pool):
+    # Start every worker and import the effects before timing
+    list(pool.map(pickled_task, [np.zeros((8, 8, 3), np.uint8)] * pool._max_workers))
+
+
+def main():
+    megapixels = float(sys.argv[1]) if len(sys.argv) > 1 else 24
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else (os.cpu_count() or 2)
+    width = int((megapixels * 1e6 * 1.5) ** 0.5)
+    height = int(megapixels * 1e6 / width)
+    image = np.random.default_rng(0).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    frame_mb = image.nbytes / 1e6
+    print(f"{count} frames of {width}x{height} ({frame_mb:.0f} MB), {workers} workers, effect {EFFECT}")
+
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        warm(pool)
+        start = time.perf_counter()
+        for result in pool.map(pickled_task, [image] * count):
+            pass
+        pickled = time.perf_counter() - start
+
+    with SharedMemoryExecutor(workers) as executor:
+        warm(executor.pool)
+        source = executor.share(image)
+        start = time.perf_counter()
+        for frame in executor.map_effect(EFFECT, [source] * count):
+            frame.close()
+        shared = time.perf_counter() - start
+
+    for label, seconds in (('pickled', pickled), ('shared memory', shared)):
+        print(f"{label:>14}: {seconds:6.2f} s  {count / seconds:6.2f} frames/s  "
+              f"{count * frame_mb / seconds:7.0f} MB/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Folder browser thumbnail speed.
+
+Times thumbnails of every image in a folder three ways: full decode with
+load_image and a resize (what opening each file costs), a cold thumbnail
+cache (EXIF preview or JPEG draft decoding) and a warm cache. Without a
+folder, a few synthetic 12 MP JPEGs are written to a temporary directory.
+
+    python benchmarks/thumbnails.py [folder] [count]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.image_loader import load_image
+from utils.thumbnails import THUMBNAIL_SIZE, ThumbnailCache, fit_size, list_images
+
+
+def synthetic_folder(folder, count):
+    rng = np.random.default_rng(0)
+    # Smooth content compresses like a photo
+    small = rng.integers(0, 256, (30, 40, 3), dtype=np.uint8)
+    image = cv2.resize(small, (4000, 3000), interpolation=cv2.INTER_CUBIC)
+    for i in range(count):
+        Image.fromarray(np.roll(image, i * 97, axis=1)).save(os.path.join(folder, f"{i:03d}.jpg"),
+                                                             quality=90)
+
+
+def timed(label, paths, func):
+    start = time.perf_counter()
+    for path in paths:
+        func(path)
+    seconds = time.perf_counter() - start
+    print(f"{label:<20} {len(paths) / seconds:8.1f} thumbnails/s")
+
+
+def full_decode(path):
+    image = load_image(path)
+    size = fit_size(image.shape[1], image.shape[0], THUMBNAIL_SIZE)
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as scratch:
+        if len(sys.argv) > 1:
+            folder = sys.argv[1]
+        else:
+            folder = os.path.join(scratch, 'images')
+            os.makedirs(folder)
+            synthetic_folder(folder, int(sys.argv[2]) if len(sys.argv) > 2 else 12)
+        paths = list_images(folder)
+        print(f"{len(paths)} images in {folder}")
+
+        cache = ThumbnailCache(directory=os.path.join(scratch, 'cache'))
+        timed('full decode', paths, full_decode)
+        timed('cold cache', paths, cache.get)
+        timed('warm cache', paths, cache.get)
+        print(cache.report())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Viewport-restricted evaluation.
+
+Renders an edit chain on a synthetic photo-like image in full, then as the
+editor does when zoomed in: the tiles of the view first, then one pan step
+after another (half a view to the right each time). Prints the time to the
+first view and the latency of each pan step at several zoom levels.
+
+    python benchmarks/viewport.py [megapixels]
+"""
+import math
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from edit.edit_graph import EditGraph
+from edit.viewport import ViewportRenderer, region_plan
+
+# Screen area of the canvas in pixels
+SCREEN = (1600, 1000)
+
+ZOOMS = (2.0, 4.0, 8.0)
+
+PAN_STEPS = 6
+
+CHAINS = {
+    'oilpaint': ({}, [('oilpaint', {})]),
+    'blur 201 + sharpness': ({'blur': 200, 'sharpness': 50}, []),
+    'contrast + emboss + posterize': ({'contrast': 30}, [('emboss', {}), ('posterize', {'levels': 5})]),
+}
+
+
+def build(image, adjustments, effects):
+    graph = EditGraph()
+    graph.set_source(image)
+    for name, value in adjustments.items():
+        graph.update_params(graph.adjustment(name).id, value=value)
+    for name, params in effects:
+        graph.add_effect(name, params)
+    return graph
+
+
+def main():
+    megapixels = float(sys.argv[1]) if len(sys.argv) > 1 else 12
+    width = int(math.sqrt(megapixels * 1e6 * 4 / 3))
+    height = width * 3 // 4
+    rng = np.random.default_rng(0)
+    small = rng.integers(0, 256, (90, 120, 3), dtype=np.uint8)
+    image = cv2.resize(small, (width, height), interpolation=cv2.INTER_CUBIC)
+    print(f"{width}x{height} uint8, {SCREEN[0]}x{SCREEN[1]} screen")
+
+    for label, (adjustments, effects) in CHAINS.items():
+        start = time.perf_counter()
+        full = build(image, adjustments, effects).render()
+        print(f"\n{label}: full render {(time.perf_counter() - start) * 1000:.0f} ms")
+        for zoom in ZOOMS:
+            graph = build(image, adjustments, effects)
+            start = time.perf_counter()
+            plan = region_plan(graph)
+            renderer = ViewportRenderer(plan, previous=image)
+            view_w, view_h = int(SCREEN[0] / zoom), int(SCREEN[1] / zoom)
+            x, y = (width - view_w) // 2 - view_w * PAN_STEPS // 4, (height - view_h) // 2
+            renderer.render_view((x, y, x + view_w, y + view_h))
+            first = time.perf_counter() - start
+            pans = []
+            for _ in range(PAN_STEPS):
+                x += view_w // 2
+                start = time.perf_counter()
+                renderer.render_view((x, y, x + view_w, y + view_h))
+                pans.append(time.perf_counter() - start)
+            remaining = len(renderer.tiles) - len(renderer.done)
+            start = time.perf_counter()
+            frame = renderer.finish()
+            rest = time.perf_counter() - start
+            print(f"  {zoom * 100:4.0f}%: first view {first * 1000:5.0f} ms, pan steps "
+                  f"{' '.join(f'{p * 1000:.0f}' for p in pans)} ms "
+                  f"(max {max(pans) * 1000:.0f}), remaining {remaining} tiles "
+                  f"{rest * 1000:.0f} ms, equal {np.array_equal(frame, full)}")
+
+
+if __name__ == '__main__':
+    main()
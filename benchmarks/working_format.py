@@ -0,0 +1,100 @@
+"""
+Compare working formats on a smooth gradient.
+
+Per effect, the time and the peak temporary memory (in full frames, measured
+with tracemalloc, which sees NumPy allocations) of the working-format code
+path in each format, next to the original 8-bit ImageFilters.apply_* version
+as a baseline. Then the whole chain: render time, dtype conversions and how
+many distinct levels survive in the 16-bit export (fewer levels = more
+banding). Numba kernels are not warmed up, so the NumPy paths are measured.
+
+    python benchmarks/working_format.py [width] [height]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from edit.edit_graph import EditGraph
+from edit.image_filters import ImageFilters
+from edit.working_format import CONVERSION_STATS, WORKING_FORMATS, convert_image
+from effects import EFFECTS
+
+CHAIN = ['sepia', 'warm', 'vignette']
+
+filters = ImageFilters()
+# Original uint8-only implementations of the same operations
+BASELINES = {
+    'sepia': lambda image: filters.apply_sepia(image, 0.7),
+    'vignette': lambda image: filters.apply_vignette(image, 0.5),
+    'warm': lambda image: filters.apply_warm(image, 30),
+    'cool': lambda image: filters.apply_cool(image, 30),
+    'posterize': lambda image: filters.apply_posterize(image, 4),
+    'emboss': filters.apply_emboss,
+    'negative': filters.apply_negative,
+    'grayscale': filters.apply_grayscale,
+}
+
+
+def gradient(width, height):
+    ramp = np.tile(np.linspace(0, 65535, width).astype(np.uint16), (height, 1))
+    return np.dstack([ramp, ramp, ramp])
+
+
+def measure(func, image):
+    """Seconds and peak temporary memory, in frames of the input's size"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(image)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    # The result itself is not a temporary
+    return seconds, max(0, peak - result.nbytes) / image.nbytes
+
+
+def run_chain(source, working_format):
+    image = convert_image(source, WORKING_FORMATS[working_format])
+    graph = EditGraph(cache_budget=0)
+    graph.set_source(image)
+    graph.update_params(graph.adjustment('brightness').id, value=10)
+    graph.update_params(graph.adjustment('contrast').id, value=20)
+    for name in CHAIN:
+        graph.add_effect(name)
+
+    CONVERSION_STATS['conversions'] = 0
+    start = time.perf_counter()
+    result = graph.render()
+    seconds = time.perf_counter() - start
+    conversions = CONVERSION_STATS['conversions']
+    levels = len(np.unique(convert_image(result, np.uint16)[0, :, 0]))
+    return seconds, conversions, levels
+
+
+def main():
+    width = int(sys.argv[1]) if len(sys.argv) > 1 else 4096
+    height = int(sys.argv[2]) if len(sys.argv) > 2 else 1024
+    source = gradient(width, height)
+    images = {name: convert_image(source, dtype) for name, dtype in WORKING_FORMATS.items()}
+
+    print(f"{width}x{height} gradient; time and peak temporaries per effect")
+    print(f"{'effect':<10} {'baseline u8':>18} " + " ".join(f"{name:>18}" for name in images))
+    for effect_name, baseline in BASELINES.items():
+        effect = EFFECTS[effect_name]
+        cells = [measure(baseline, images['uint8'])]
+        cells += [measure(effect.apply, image) for image in images.values()]
+        print(f"{effect_name:<10} " + " ".join(
+            f"{seconds * 1000:7.1f} ms {frames:4.1f} fr" for seconds, frames in cells))
+
+    print(f"\nchain: brightness, contrast, {', '.join(CHAIN)}")
+    for working_format in WORKING_FORMATS:
+        seconds, conversions, levels = run_chain(source, working_format)
+        print(f"{working_format:>8}: {seconds * 1000:7.1f} ms  {conversions} conversions  {levels} levels")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Reusable frame buffers.
+Rendering a slider drag allocates the same few frame sizes over and over:
+every node output and most temporaries inside effects. A BufferPool keeps
+released arrays by shape and dtype, up to a memory budget, and hands them
+out again instead of asking the allocator for new ones.
+
+Effects borrow temporaries from the shared scratch pool:
+
+    with scratch((height, width), np.float32) as mask:
+        ...
+
+A borrowed buffer must not escape the with block (not returned, not kept
+as a view). Preview graphs give the outputs of invalidated nodes back to
+their own pool and render the next drag tick into them (out=).
+"""
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+
+from edit.image_context import invalidate
+
+# Memory kept in free buffers of one pool (256 MB)
+DEFAULT_BUDGET = 256 * 1024 * 1024
+
+# Buffers handed out: freshly allocated or reused from a pool
+BUFFER_STATS = {'allocated': 0, 'reused': 0}
+
+
+def write_output(result, out=None):
+    """Return result, copied into out when an output buffer was given"""
+    if out is None or result is out:
+        return result
+    np.copyto(out, result, casting='unsafe')
+    return out
+
+
+class BufferPool:
+    """Free arrays kept for reuse, keyed by shape and dtype"""
+
+    def __init__(self, budget=DEFAULT_BUDGET):
+        self.budget = budget
+        self._free = OrderedDict()  # (shape, dtype) -> [arrays], least recently used first
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(shape, dtype):
+        return tuple(shape), np.dtype(dtype).str
+
+    def take(self, shape, dtype):
+        """An uninitialized array, reused when one of that shape and dtype is free"""
+        key = self._key(shape, dtype)
+        with self._lock:
+            buffers = self._free.get(key)
+            if buffers:
+                array = buffers.pop()
+                if not buffers:
+                    del self._free[key]
+                self._bytes -= array.nbytes
+                BUFFER_STATS['reused'] += 1
+                return array
+            BUFFER_STATS['allocated'] += 1
+        return np.empty(shape, dtype=dtype)
+
+    def give(self, array):
+        """Return an array nothing else uses any more; it may be handed out again"""
+        # Views, read-only planes and foreign buffers are never pooled
+        if (not isinstance(array, np.ndarray) or not array.flags.owndata or
+                not array.flags.writeable or not array.flags.c_contiguous):
+            return
+        if array.nbytes > self.budget:
+            return
+        # Its derived planes describe the old contents
+        invalidate(array)
+        key = self._key(array.shape, array.dtype)
+        with self._lock:
+            self._free.setdefault(key, []).append(array)
+            self._free.move_to_end(key)
+            self._bytes += array.nbytes
+            while self._bytes > self.budget:
+                oldest = next(iter(self._free))
+                buffers = self._free[oldest]
+                self._bytes -= buffers.pop(0).nbytes
+                if not buffers:
+                    del self._free[oldest]
+
+    @contextmanager
+    def borrowed(self, shape, dtype):
+        """Borrow a buffer for the duration of a with block"""
+        array = self.take(shape, dtype)
+        try:
+            yield array
+        finally:
+            self.give(array)
+
+    @property
+    def free_bytes(self):
+        return self._bytes
+
+    def clear(self):
+        with self._lock:
+            self._free.clear()
+            self._bytes = 0
+
+
+SCRATCH = BufferPool()
+
+
+def scratch(shape, dtype):
+    """Borrow a temporary from the shared scratch pool (a context manager)"""
+    return SCRATCH.borrowed(shape, dtype)
+
+
+def report():
+    """How many buffers were reused rather than allocated"""
+    total = BUFFER_STATS['allocated'] + BUFFER_STATS['reused']
+    return f"{BUFFER_STATS['reused']} of {total} buffers reused"
@@ -0,0 +1,429 @@
+"""
+Non-destructive edit graph.
+The edit state is an ordered chain of adjustment and effect nodes applied to
+the original image. Every node caches its output, so changing a node only
+re-evaluates that node and the nodes downstream of it.
+"""
+import itertools
+import threading
+
+import cv2
+import numpy as np
+
+from algorithms.blur import blur_footprint
+from edit.buffer_pool import BufferPool
+from edit.image_filters import ImageFilters
+from edit.memory_budget import run_effect
+from edit.selection import selection_from_dict, scale_selection_dict
+from edit.working_format import ALL_DTYPES, convert_image, ensure_dtype
+from effects import get_effect
+
+# Sidebar adjustments in the order they are applied, mapped to ImageFilters methods
+ADJUSTMENTS = {
+    'brightness': 'adjust_brightness',
+    'contrast': 'adjust_contrast',
+    'saturation': 'adjust_saturation',
+    'sharpness': 'adjust_sharpness',
+    'blur': 'apply_blur'
+}
+
+# Image dtypes each adjustment handles without conversion
+ADJUSTMENT_DTYPES = {
+    'brightness': ALL_DTYPES,
+    'contrast': ALL_DTYPES,
+    # OpenCV's HSV conversion has no 16-bit variant
+    'saturation': (np.float32, np.uint8),
+    'sharpness': ALL_DTYPES,
+    'blur': ALL_DTYPES
+}
+
+# Default memory budget for cached intermediates (512 MB)
+DEFAULT_CACHE_BUDGET = 512 * 1024 * 1024
+
+
+class EditNode:
+    """A single adjustment or effect in the edit graph"""
+
+    _next_id = 1
+    _id_lock = threading.Lock()
+
+    def __init__(self, kind, name, params=None, enabled=True, node_id=None, region=None):
+        if kind not in ('adjustment', 'effect'):
+            raise ValueError(f"Unknown node kind: {kind}")
+        with EditNode._id_lock:
+            if node_id is None:
+                node_id = EditNode._next_id
+            # Nodes restored from a saved session keep their ids; new ones
+            # are numbered after them
+            EditNode._next_id = max(EditNode._next_id, node_id + 1)
+        self.id = node_id
+        self.kind = kind
+        self.name = name
+        self.params = dict(params or {})
+        self.enabled = enabled
+        # Optional selection limiting an effect: {'selection': {...}, 'feather': px}
+        self.region = region
+        self.output = None  # Cached output of this node
+        self.last_used = 0
+
+    @property
+    def cache_bytes(self):
+        """Memory held by this node's cached output"""
+        return self.output.nbytes if self.output is not None else 0
+
+    @property
+    def label(self):
+        """Human readable description of the node"""
+        if self.kind == 'adjustment':
+            return f"{self.name.capitalize()} {self.params.get('value', 0)}"
+        effect = get_effect(self.name)
+        title = effect.name if effect else self.name
+        if self.region is not None:
+            title += f" [{self.region['selection']['kind']}]"
+        if not self.params:
+            return title
+        values = ', '.join(f"{k}={v:g}" if isinstance(v, (int, float)) else f"{k}={v}"
+                           for k, v in self.params.items())
+        return f"{title} ({values})"
+
+    def is_active(self):
+        """Whether the node changes the image when evaluated"""
+        if not self.enabled:
+            return False
+        if self.kind == 'adjustment':
+            value = self.params.get('value', 0)
+            # Sharpness and blur only apply for positive values
+            if self.name in ('sharpness', 'blur'):
+                return value > 0
+            return value != 0
+        return True
+
+    def process(self, image, filters, out=None):
+        """
+        Evaluate the node on the given input image. out is an optional
+        buffer shaped like the image that the result is written to when the
+        node works in the image's dtype; the result is always returned.
+        """
+        # Images are only converted when the node cannot handle their dtype,
+        # and converted back afterwards so the rest of the chain keeps the
+        # working format's precision
+        working_dtype = image.dtype
+        if self.kind == 'adjustment':
+            method = getattr(filters, ADJUSTMENTS[self.name])
+            native = ensure_dtype(image, ADJUSTMENT_DTYPES[self.name])
+            out = out if native is image else None
+            return convert_image(method(native, self.params.get('value', 0), out=out), working_dtype)
+        effect = get_effect(self.name)
+        if effect is None:
+            return image
+        native = ensure_dtype(image, effect.native_dtypes)
+        out = out if native is image else None
+        image = native
+        if self.region is not None:
+            selection = selection_from_dict(self.region['selection'])
+            result = effect.apply_region(image, selection,
+                                         feather=self.region.get('feather', 0),
+                                         **self.params)
+        else:
+            # Split into strips, warn or refuse when it would not fit in memory
+            result = run_effect(self.name, effect, image, self.params, out)
+        return convert_image(result, working_dtype)
+
+    def crop_footprint(self):
+        """
+        (margin, alignment) for evaluating the node on a crop of the frame:
+        pixels of context it reads around each output pixel and the grid the
+        crop must start on. None when the node needs the whole frame.
+        """
+        if self.kind == 'adjustment':
+            if self.name == 'blur':
+                return blur_footprint(self.params.get('value', 0) | 1)
+            if self.name == 'saturation':
+                # OpenCV's HSV conversion rounds the pixels left over after
+                # its vector loop differently; crops a multiple of 64 wide
+                # leave the same ones over as the whole frame
+                return 0, 64
+            return (1 if self.name == 'sharpness' else 0), 1
+        effect = get_effect(self.name)
+        if effect is None:
+            return 0, 1
+        if self.region is not None or not effect.tileable(**self.params):
+            return None
+        return effect.context_margin(**self.params), effect.region_alignment(**self.params)
+
+    def process_crop(self, image, filters, box, frame_size):
+        """
+        Evaluate the node on a crop at box (x0, y0, x1, y1) of a frame of
+        frame_size (width, height); only for nodes with a crop_footprint()
+        """
+        if self.kind == 'adjustment':
+            return self.process(image, filters)
+        effect = get_effect(self.name)
+        if effect is None:
+            return image
+        native = ensure_dtype(image, effect.native_dtypes)
+        return convert_image(effect.apply_crop(native, box, frame_size, **self.params), image.dtype)
+
+    def to_dict(self):
+        """Serializable description of the node (without cached data)"""
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'name': self.name,
+            'params': dict(self.params),
+            'enabled': self.enabled,
+            'region': self.region
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Create a node from a description produced by to_dict"""
+        return cls(data['kind'], data['name'], data.get('params'),
+                   data.get('enabled', True), data.get('id'), data.get('region'))
+
+
+def scale_node_dict(data, scale):
+    """Scale the pixel-sized parameters of a node description for a preview"""
+    data = dict(data, params=dict(data['params']))
+    if data['kind'] == 'adjustment':
+        if data['name'] == 'blur' and data['params'].get('value', 0) > 0:
+            data['params']['value'] = max(1, int(round(data['params']['value'] * scale)))
+        return data
+    effect = get_effect(data['name'])
+    if effect is not None:
+        for param in effect.spatial_params:
+            value = data['params'].get(param, effect.params.get(param, {}).get('default'))
+            if value is None:
+                continue
+            # Clamp to the parameter's minimum so the effect stays valid
+            lowest = effect.params.get(param, {}).get('min', 1)
+            scaled = value * scale if isinstance(value, float) else int(round(value * scale))
+            data['params'][param] = max(lowest, scaled)
+    if data.get('region') is not None:
+        data['region'] = {
+            'selection': scale_selection_dict(data['region']['selection'], scale),
+            'feather': data['region'].get('feather', 0) * scale
+        }
+    return data
+
+
+class EditGraph:
+    """Ordered chain of edit nodes with cached intermediate outputs"""
+
+    def __init__(self, cache_budget=DEFAULT_CACHE_BUDGET, buffers=None):
+        self.source = None
+        self.nodes = []
+        self.cache_budget = cache_budget
+        self.filters = ImageFilters()
+        self._clock = itertools.count(1)
+        self.stats = {'evaluated': 0, 'reused': 0, 'evicted': 0}
+        self._proxy = None  # (scale, source, graph) for downscaled previews
+        # Preview graphs render into the outputs of nodes they invalidated;
+        # the final image of such a graph is only valid until its next render
+        self.buffers = buffers
+        self.preview_buffers = BufferPool()
+
+    def set_source(self, image, adjustments=True):
+        """Set a new original image and reset the chain"""
+        self.source = image
+        self.nodes = []
+        if adjustments:
+            for name in ADJUSTMENTS:
+                self.nodes.append(EditNode('adjustment', name, {'value': 0}))
+
+    def replace_source(self, image):
+        """Swap the original image while keeping the chain of nodes"""
+        self.source = image
+        self.invalidate()
+
+    # Node lookup
+
+    def index_of(self, node_id):
+        for i, node in enumerate(self.nodes):
+            if node.id == node_id:
+                return i
+        raise KeyError(f"No node with id {node_id}")
+
+    def find(self, node_id):
+        return self.nodes[self.index_of(node_id)]
+
+    def adjustment(self, name):
+        """Get the adjustment node with the given name"""
+        for node in self.nodes:
+            if node.kind == 'adjustment' and node.name == name:
+                return node
+        return None
+
+    def effect_nodes(self):
+        return [node for node in self.nodes if node.kind == 'effect']
+
+    # Editing operations. These only invalidate caches; nothing is evaluated
+    # until render() is called.
+
+    def add_node(self, node, index=None):
+        """Insert a node (appended by default) and return it"""
+        if index is None:
+            index = len(self.nodes)
+        self.nodes.insert(index, node)
+        self.invalidate_from(index)
+        return node
+
+    def add_effect(self, effect_name, params=None, region=None):
+        return self.add_node(EditNode('effect', effect_name, params, region=region))
+
+    def remove_node(self, node_id):
+        index = self.index_of(node_id)
+        node = self.nodes.pop(index)
+        node.output = None
+        self.invalidate_from(index)
+        return node
+
+    def move_node(self, node_id, new_index):
+        index = self.index_of(node_id)
+        new_index = max(0, min(len(self.nodes) - 1, new_index))
+        if new_index == index:
+            return
+        node = self.nodes.pop(index)
+        self.nodes.insert(new_index, node)
+        self.invalidate_from(min(index, new_index))
+
+    def set_enabled(self, node_id, enabled):
+        index = self.index_of(node_id)
+        node = self.nodes[index]
+        if node.enabled != enabled:
+            node.enabled = enabled
+            self.invalidate_from(index)
+
+    def update_params(self, node_id, **params):
+        """Update node parameters, invalidating only if something changed"""
+        index = self.index_of(node_id)
+        node = self.nodes[index]
+        changed = {k: v for k, v in params.items() if node.params.get(k) != v}
+        if not changed:
+            return False
+        was_active = node.is_active()
+        node.params.update(changed)
+        # An adjustment that stays at its neutral value does not affect the output
+        if was_active or node.is_active():
+            self.invalidate_from(index)
+        return True
+
+    def invalidate_from(self, index):
+        """Drop cached outputs of the node at index and everything downstream"""
+        dropped = [node.output for node in self.nodes[index:]]
+        for node in self.nodes[index:]:
+            node.output = None
+        self._recycle(dropped)
+
+    def _recycle(self, arrays):
+        """Give dropped outputs nothing else refers to back to the buffer pool"""
+        if self.buffers is None:
+            return
+        # An effect can return its input unchanged, so one array can be the
+        # output of several nodes or the source
+        live = {id(node.output) for node in self.nodes if node.output is not None}
+        live.add(id(self.source))
+        for array in {id(array): array for array in arrays if array is not None}.values():
+            if id(array) not in live:
+                self.buffers.give(array)
+
+    def invalidate(self):
+        self.invalidate_from(0)
+
+    # Evaluation
+
+    def render(self):
+        """Evaluate the chain, reusing the most downstream valid cache"""
+        if self.source is None:
+            return None
+
+        active = [node for node in self.nodes if node.is_active()]
+
+        # Resume from the latest active node that still has a cached output
+        image = self.source
+        start = 0
+        for pos in range(len(active) - 1, -1, -1):
+            if active[pos].output is not None:
+                image = active[pos].output
+                active[pos].last_used = next(self._clock)
+                self.stats['reused'] += 1
+                start = pos + 1
+                break
+
+        for node in active[start:]:
+            out = self.buffers.take(image.shape, image.dtype) if self.buffers is not None else None
+            result = node.process(image, self.filters, out)
+            if out is not None and result is not out:
+                self.buffers.give(out)
+            image = result
+            node.output = image
+            node.last_used = next(self._clock)
+            self.stats['evaluated'] += 1
+
+        self._evict(keep=active[-1] if active else None)
+        return image
+
+    @property
+    def cache_bytes(self):
+        return sum(node.cache_bytes for node in self.nodes)
+
+    def _evict(self, keep=None):
+        """Evict least recently used intermediates until within budget"""
+        cached = sorted((node for node in self.nodes
+                         if node.output is not None and node is not keep),
+                        key=lambda node: node.last_used)
+        total = self.cache_bytes
+        evicted = []
+        for node in cached:
+            if total <= self.cache_budget:
+                break
+            total -= node.cache_bytes
+            evicted.append(node.output)
+            node.output = None
+            self.stats['evicted'] += 1
+        self._recycle(evicted)
+
+    def proxy(self, scale):
+        """
+        Graph evaluating the same chain on a downscaled copy of the source.
+        The proxy keeps its own caches, so repeated previews at one scale only
+        re-evaluate the nodes that changed.
+        """
+        if scale >= 1.0 or self.source is None:
+            return self
+        if self._proxy is None or self._proxy[0] != scale or self._proxy[1] is not self.source:
+            h, w = self.source.shape[:2]
+            small = cv2.resize(self.source, (max(1, int(w * scale)), max(1, int(h * scale))),
+                               interpolation=cv2.INTER_AREA)
+            graph = EditGraph(cache_budget=self.cache_budget // 4, buffers=self.preview_buffers)
+            graph.source = small
+            self._proxy = (scale, self.source, graph)
+        graph = self._proxy[2]
+        graph.restore([scale_node_dict(data, scale) for data in self.snapshot()])
+        return graph
+
+    # Snapshots for history
+
+    def snapshot(self):
+        """Describe the current chain without any cached data"""
+        return [node.to_dict() for node in self.nodes]
+
+    def restore(self, snapshot, output=None):
+        """Restore a chain from a snapshot, keeping caches of the unchanged prefix"""
+        old_nodes = self.nodes
+        self.nodes = [EditNode.from_dict(data) for data in snapshot]
+
+        # Cached outputs stay valid as long as the chain up to that node is identical
+        for old, new in zip(old_nodes, self.nodes):
+            if old.to_dict() != new.to_dict():
+                break
+            new.output = old.output
+            new.last_used = old.last_used
+
+        # Seed the final output so restoring does not re-run the whole chain
+        active = [node for node in self.nodes if node.is_active()]
+        if output is not None and active and active[-1].output is None:
+            active[-1].output = output
+            active[-1].last_used = next(self._clock)
+
+        self._recycle([node.output for node in old_nodes])
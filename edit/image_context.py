@@ -0,0 +1,199 @@
+"""
+Derived planes shared between effects.
+Many effects and adjustments start from the same grayscale, blurred or HSV
+version of their input, or from its mean. They ask the image's context for
+these by name instead of computing them again; each plane is computed once
+per image and kept in a memory-budgeted LRU cache.
+
+Contexts follow the identity of the image array, so every new image (a new
+source, or a new output of an edit graph node) starts with an empty context
+and its planes are dropped when the array is garbage collected. Images are
+treated as immutable; code that modifies an image in place must call
+invalidate() on it.
+"""
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+# Memory budget for derived planes of all images (256 MB)
+DEFAULT_BUDGET = 256 * 1024 * 1024
+
+CONTEXT_STATS = {'computed': 0, 'reused': 0, 'evicted': 0,
+                 'compute_seconds': 0.0, 'saved_seconds': 0.0}
+
+
+# Planes that can be requested, by name. Extra arguments become part of the key.
+
+def _gray(context):
+    return cv2.cvtColor(context.image, cv2.COLOR_RGB2GRAY)
+
+
+def _gray_gaussian(context, ksize, sigma):
+    return cv2.GaussianBlur(context.get('gray'), (ksize, ksize), sigma)
+
+
+def _gray_median(context, ksize):
+    return cv2.medianBlur(context.get('gray'), ksize)
+
+
+def _hsv(context):
+    return cv2.cvtColor(context.image, cv2.COLOR_RGB2HSV)
+
+
+def _lab(context):
+    return cv2.cvtColor(context.image, cv2.COLOR_RGB2Lab)
+
+
+def _bilateral(context, diameter, sigma_color, sigma_space):
+    return cv2.bilateralFilter(context.image, diameter, sigma_color, sigma_space)
+
+
+def _detail(context, sigma_s, sigma_r):
+    return cv2.detailEnhance(context.image, sigma_s=sigma_s, sigma_r=sigma_r)
+
+
+def _mean(context):
+    # cv2.mean avoids the float64 copy np.mean makes of the whole frame
+    return np.array(cv2.mean(context.image)[:3])
+
+
+DERIVED = {
+    'gray': _gray,
+    'gray_gaussian': _gray_gaussian,
+    'gray_median': _gray_median,
+    'hsv': _hsv,
+    'lab': _lab,
+    'bilateral': _bilateral,
+    'detail': _detail,
+    'mean': _mean,
+}
+
+
+class ImageContext:
+    """Lazily computed, memoized planes and statistics of one image"""
+
+    def __init__(self, cache, image):
+        self._cache = cache
+        self._image = weakref.ref(image)
+        self.key = id(image)
+
+    @property
+    def image(self):
+        return self._image()
+
+    def get(self, name, *args):
+        """A derived plane by name; the result is read-only"""
+        return self._cache.get(self, name, args)
+
+
+class ContextCache:
+    """Derived planes of every live image, evicted least recently used first"""
+
+    def __init__(self, budget=DEFAULT_BUDGET):
+        self.budget = budget
+        self._planes = OrderedDict()  # (image id, name, args) -> (plane, seconds)
+        self._tracked = set()         # ids of images with a finalizer
+        self._bytes = 0
+        # Re-entrant: dropping planes can run the finalizer of another image
+        self._lock = threading.RLock()
+
+    def context(self, image):
+        """The context of an image"""
+        key = id(image)
+        with self._lock:
+            if key not in self._tracked:
+                self._tracked.add(key)
+                weakref.finalize(image, self._forget, key)
+        return ImageContext(self, image)
+
+    def get(self, context, name, args):
+        key = (context.key, name, args)
+        with self._lock:
+            entry = self._planes.get(key)
+            if entry is not None:
+                self._planes.move_to_end(key)
+                CONTEXT_STATS['reused'] += 1
+                CONTEXT_STATS['saved_seconds'] += entry[1]
+                return entry[0]
+
+        # Computed outside the lock so other planes can be served meanwhile
+        start = time.perf_counter()
+        plane = DERIVED[name](context, *args)
+        seconds = time.perf_counter() - start
+        plane.flags.writeable = False
+
+        with self._lock:
+            CONTEXT_STATS['computed'] += 1
+            CONTEXT_STATS['compute_seconds'] += seconds
+            if context.key in self._tracked and key not in self._planes:
+                self._planes[key] = (plane, seconds)
+                self._bytes += plane.nbytes
+                self._evict()
+        return plane
+
+    def seed(self, context, name, args, plane):
+        """Provide a plane computed elsewhere, e.g. a statistic of the frame a crop is from"""
+        plane = np.array(plane)
+        plane.flags.writeable = False
+        with self._lock:
+            key = (context.key, name, args)
+            if context.key in self._tracked and key not in self._planes:
+                self._planes[key] = (plane, 0.0)
+                self._bytes += plane.nbytes
+                self._evict()
+
+    def invalidate(self, image):
+        """Drop every plane derived from an image"""
+        self._forget(id(image), keep_tracking=True)
+
+    def clear(self):
+        with self._lock:
+            self._planes.clear()
+            self._bytes = 0
+
+    @property
+    def cache_bytes(self):
+        return self._bytes
+
+    def _forget(self, image_id, keep_tracking=False):
+        with self._lock:
+            if not keep_tracking:
+                self._tracked.discard(image_id)
+            for key in [key for key in self._planes if key[0] == image_id]:
+                self._bytes -= self._planes.pop(key)[0].nbytes
+
+    def _evict(self):
+        while self._bytes > self.budget and self._planes:
+            plane = self._planes.popitem(last=False)[1][0]
+            self._bytes -= plane.nbytes
+            CONTEXT_STATS['evicted'] += 1
+
+
+CACHE = ContextCache()
+
+
+def context_for(image):
+    """The shared context of an image"""
+    return CACHE.context(image)
+
+
+def seed(image, name, plane, *args):
+    """Make a plane of an image return a given value instead of being computed"""
+    CACHE.seed(CACHE.context(image), name, args, plane)
+
+
+def invalidate(image):
+    """Forget the planes of an image that was modified in place"""
+    CACHE.invalidate(image)
+
+
+def report():
+    """One-line summary of how much work the contexts saved"""
+    return (f"{CONTEXT_STATS['computed']} planes computed in "
+            f"{CONTEXT_STATS['compute_seconds'] * 1000:.0f} ms, "
+            f"{CONTEXT_STATS['reused']} reused saving "
+            f"{CONTEXT_STATS['saved_seconds'] * 1000:.0f} ms")
@@ -2,56 +2,87 @@ import cv2
 import numpy as np
 import math
 
+from algorithms import numba_backend
+from algorithms.blur import blur_kernel
+from edit.buffer_pool import scratch, write_output
+from edit.image_context import context_for
+from edit.working_format import clip_to_dtype, max_value
+
+
+def contrast_factor(value):
+    """Gain of the contrast slider value, applied around the image mean"""
+    # Convert the -100 to 100 range to a more suitable contrast factor
+    # Use a more gradual approach for better control
+    if value > 0:
+        # For positive values, use a gentler scaling to avoid extreme contrast
+        return 1.0 + (value / 100.0) * 0.8
+    # For negative values, reduce contrast gradually
+    return 1.0 + (value / 100.0)
+
+
 class ImageFilters:
-    def adjust_brightness(self, image, value):
+    # The adjustments used by the edit graph take an optional out array
+    # shaped like the image, in its dtype, to write the result to
+    
+    def adjust_brightness(self, image, value, out=None):
         """Adjust the brightness of an image"""
-        return np.clip(image + (value * 2.55), 0, 255).astype(np.uint8)
+        if numba_backend.ready(image.dtype):
+            return numba_backend.linear(image, 1.0, value * max_value(image.dtype) / 100, out=out)
+        return write_output(clip_to_dtype(image + (value * max_value(image.dtype) / 100), image.dtype), out)
     
-    def adjust_contrast(self, image, value):
+    def adjust_contrast(self, image, value, out=None):
         """Adjust the contrast of an image"""
-        # Convert the -100 to 100 range to a more suitable contrast factor
-        # Use a more gradual approach for better control
-        if value > 0:
-            # For positive values, use a gentler scaling to avoid extreme contrast
-            factor = 1.0 + (value / 100.0) * 0.8
-        else:
-            # For negative values, reduce contrast gradually
-            factor = 1.0 + (value / 100.0)
+        factor = contrast_factor(value)
         
         # Apply contrast adjustment while preserving average brightness
-        mean = np.mean(image, axis=(0, 1))
+        # The mean of the input is kept while the slider moves
+        mean = context_for(image).get('mean')
+        if numba_backend.ready(image.dtype):
+            return numba_backend.linear(image, factor, mean * (1 - factor), out=out)
         adjusted = mean + factor * (image - mean)
         
-        return np.clip(adjusted, 0, 255).astype(np.uint8)
+        return write_output(clip_to_dtype(adjusted, image.dtype), out)
     
-    def adjust_saturation(self, image, value):
+    def adjust_saturation(self, image, value, out=None):
         """Adjust the saturation of an image"""
-        hsv_image = cv2.cvtColor(image, cv2.COLOR_RGB2HSV)
-        h, s, v = cv2.split(hsv_image)
-        
-        # Adjust saturation channel
-        s = np.clip(s * (1 + value/100), 0, 255).astype(np.uint8)
-        
-        # Merge channels back
-        hsv_image = cv2.merge([h, s, v])
-        return cv2.cvtColor(hsv_image, cv2.COLOR_HSV2RGB)
+        hsv = context_for(image).get('hsv')
+        factor = 1 + value / 100
+        
+        # Scale the saturation channel of a scratch copy of the shared HSV
+        # plane, then convert it back straight into the output
+        with scratch(hsv.shape, hsv.dtype) as adjusted:
+            np.copyto(adjusted, hsv)
+            saturation = adjusted[:, :, 1]
+            if hsv.dtype == np.uint8:
+                # One lookup table entry per saturation value
+                lut = clip_to_dtype(np.arange(256) * factor, np.uint8)
+                saturation[...] = lut[hsv[:, :, 1]]
+            else:
+                np.multiply(hsv[:, :, 1], factor, out=saturation)
+                np.clip(saturation, 0, max_value(hsv.dtype), out=saturation)
+            return write_output(cv2.cvtColor(adjusted, cv2.COLOR_HSV2RGB, dst=out), out)
     
-    def adjust_sharpness(self, image, value):
+    def adjust_sharpness(self, image, value, out=None):
         """Apply sharpness filter to an image"""
         kernel = np.array([[-1, -1, -1],
                           [-1, 9 + value/10, -1],
                           [-1, -1, -1]])
-        return cv2.filter2D(image, -1, kernel)
+        # Integer results are saturated by OpenCV, float results clipped in place
+        sharpened = cv2.filter2D(image, -1, kernel, dst=out)
+        if sharpened.dtype == np.float32:
+            np.clip(sharpened, 0, 1, out=sharpened)
+        return write_output(sharpened, out)
     
-    def apply_blur(self, image, value):
+    def apply_blur(self, image, value, out=None):
         """Apply Gaussian blur to an image"""
         if value % 2 == 0:  # Ensure kernel size is odd
             value += 1
-        return cv2.GaussianBlur(image, (value, value), 0)
+        # Kernels beyond 31 px use constant-time approximations
+        return write_output(blur_kernel(image, value, out=out), out)
     
     def apply_grayscale(self, image):
         """Convert image to grayscale"""
-        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        gray = context_for(image).get('gray')
         return cv2.cvtColor(gray, cv2.COLOR_GRAY2RGB)
     
     def apply_negative(self, image):
@@ -124,7 +155,7 @@ class ImageFilters:
     def apply_edge_detection(self, image, threshold1=100, threshold2=200):
         """Apply Canny edge detection to an image with adjustable thresholds"""
         # Convert to grayscale first
-        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        gray = context_for(image).get('gray')
         
         # Apply Canny edge detection with custom thresholds
         edges = cv2.Canny(gray, threshold1, threshold2)
@@ -161,13 +192,11 @@ class ImageFilters:
     def apply_cartoon(self, image):
         """Apply cartoon effect to an image"""
         # Apply bilateral filter to reduce noise and keep edges sharp
-        color = cv2.bilateralFilter(image, 9, 300, 300)
-        
-        # Convert to grayscale
-        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        context = context_for(image)
+        color = context.get('bilateral', 9, 300, 300)
         
-        # Apply median blur
-        gray = cv2.medianBlur(gray, 5)
+        # Median blurred grayscale
+        gray = context.get('gray_median', 5)
         
         # Detect and enhance edges
         edges = cv2.adaptiveThreshold(
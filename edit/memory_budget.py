@@ -0,0 +1,287 @@
+"""
+Peak-memory accounting and budget enforcement for effects.
+The first time an effect runs on a reasonably large image of a given dtype,
+its call is measured with tracemalloc: NumPy reports its data buffers to
+tracemalloc, and OpenCV returns its results as NumPy arrays, so the traced
+peak covers the full-frame temporaries an effect creates. The peak is kept
+as bytes per megapixel in a profile stored in the cache directory.
+
+Before an effect runs, its need is estimated from the profile. When the
+estimate does not fit the budget (DITHER_GIRL_MEMORY_BUDGET in MB, and never
+more than what the system has available), effects that only read a bounded
+neighbourhood are rendered in horizontal strips; other effects are run with
+a warning, or refused with MemoryBudgetError in strict mode
+(DITHER_GIRL_MEMORY_STRICT=1). A MemoryError during the call falls back to
+strips the same way.
+"""
+import json
+import math
+import os
+import threading
+import tracemalloc
+
+import numpy as np
+
+from utils.app_dirs import cache_dir
+
+MEGAPIXEL = 1_000_000
+
+# Smaller images are dominated by fixed costs (lookup tables, kernels)
+MIN_PROFILE_PIXELS = 256 * 1024
+
+# Estimate for effects that have not been measured yet, in multiples of the
+# input size: the output plus two full-frame temporaries
+DEFAULT_FACTOR = 3.0
+
+# Share of the currently available memory an effect may use
+AVAILABLE_FRACTION = 0.8
+
+# Most strips an image is split into
+MAX_STRIPS = 256
+
+MEMORY_STATS = {'measured': 0, 'tiled': 0, 'warned': 0, 'refused': 0}
+
+
+class MemoryBudgetError(MemoryError):
+    """An effect would need more memory than the budget allows"""
+
+
+def available_memory():
+    """Bytes of memory the system can still hand out, or None if unknown"""
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def format_bytes(size):
+    return f"{size / (1024 * 1024):.0f} MB"
+
+
+class MemoryProfile:
+    """Measured peak bytes per megapixel of each effect and dtype"""
+
+    def __init__(self, persistent=False):
+        self.persistent = persistent
+        self.path = None  # Resolved on first use
+        self._profile = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    @staticmethod
+    def key(effect_name, dtype):
+        return f"{effect_name}:{np.dtype(dtype).name}"
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.persistent:
+            return
+        try:
+            self.path = os.path.join(cache_dir(), 'memory_profile.json')
+        except OSError:
+            return
+        try:
+            with open(self.path) as f:
+                self._profile.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+
+    def _save(self):
+        if self.path is None:
+            return
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self._profile, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not save memory profile: {e}")
+
+    def bytes_per_megapixel(self, effect_name, dtype):
+        """Recorded peak per megapixel, or None if the effect was never measured"""
+        with self._lock:
+            self._load()
+            return self._profile.get(self.key(effect_name, dtype))
+
+    def record(self, effect_name, dtype, peak, pixels):
+        """Keep the highest peak per megapixel seen for an effect"""
+        if pixels < MIN_PROFILE_PIXELS:
+            return
+        per_megapixel = peak * MEGAPIXEL / pixels
+        key = self.key(effect_name, dtype)
+        with self._lock:
+            self._load()
+            if per_megapixel > self._profile.get(key, 0):
+                self._profile[key] = per_megapixel
+                self._save()
+
+    def estimate(self, effect_name, image):
+        """Expected peak additional bytes of running an effect on image"""
+        pixels = image.shape[0] * image.shape[1]
+        per_megapixel = self.bytes_per_megapixel(effect_name, image.dtype)
+        if per_megapixel is None:
+            return int(image.nbytes * DEFAULT_FACTOR)
+        return int(per_megapixel * pixels / MEGAPIXEL)
+
+    def items(self):
+        with self._lock:
+            self._load()
+            return sorted(self._profile.items())
+
+    def clear(self):
+        with self._lock:
+            self._profile.clear()
+            self._save()
+
+
+class MemoryBudget:
+    """Runs effects within a memory budget"""
+
+    def __init__(self, limit=None, strict=False, profile=None):
+        self.limit = limit      # Bytes, or None for whatever is available
+        self.strict = strict
+        self.profile = profile if profile is not None else MemoryProfile()
+        # tracemalloc is process wide: one measurement at a time
+        self._measure_lock = threading.Lock()
+
+    def allowed(self):
+        """Bytes an effect may use right now, or None when unlimited"""
+        available = available_memory()
+        if available is not None:
+            available = int(available * AVAILABLE_FRACTION)
+        if self.limit is None:
+            return available
+        return self.limit if available is None else min(self.limit, available)
+
+    def run(self, effect_name, effect, image, params, out=None):
+        """Apply an effect, splitting it into strips or refusing if it would not fit"""
+        estimate = self.profile.estimate(effect_name, image)
+        allowed = self.allowed()
+        if allowed is not None and estimate > allowed:
+            return self._over_budget(effect_name, effect, image, params, estimate, allowed, out)
+        try:
+            return self._measured(effect_name, image, lambda: effect.apply(image, out=out, **params))
+        except MemoryError as e:
+            if isinstance(e, MemoryBudgetError) or not effect.tileable(**params):
+                raise
+            print(f"{effect_name} ran out of memory; retrying in strips")
+            allowed = allowed if allowed is not None else image.nbytes * 2
+            return self._tiled(effect, image, params, estimate, allowed, out)
+
+    def _over_budget(self, effect_name, effect, image, params, estimate, allowed, out=None):
+        message = (f"{effect_name} needs about {format_bytes(estimate)} for a "
+                   f"{image.shape[1]}x{image.shape[0]} image; budget is {format_bytes(allowed)}")
+        if effect.tileable(**params) and strips_needed(image, estimate, allowed) is not None:
+            return self._tiled(effect, image, params, estimate, allowed, out)
+        if self.strict:
+            MEMORY_STATS['refused'] += 1
+            raise MemoryBudgetError(message)
+        MEMORY_STATS['warned'] += 1
+        print(f"Warning: {message}")
+        return effect.apply(image, out=out, **params)
+
+    def _tiled(self, effect, image, params, estimate, allowed, out=None):
+        strips = strips_needed(image, estimate, allowed) or MAX_STRIPS
+        MEMORY_STATS['tiled'] += 1
+        return apply_in_strips(effect, image, params, strips, out)
+
+    def _measured(self, effect_name, image, func):
+        """Run func, recording its traced peak if the effect has no profile yet"""
+        pixels = image.shape[0] * image.shape[1]
+        if (pixels < MIN_PROFILE_PIXELS or
+                self.profile.bytes_per_megapixel(effect_name, image.dtype) is not None or
+                not self._measure_lock.acquire(blocking=False)):
+            return func()
+        tracing = tracemalloc.is_tracing()
+        try:
+            if not tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            result = func()
+            peak = tracemalloc.get_traced_memory()[1] - baseline
+        finally:
+            if not tracing:
+                tracemalloc.stop()
+            self._measure_lock.release()
+        MEMORY_STATS['measured'] += 1
+        self.profile.record(effect_name, image.dtype, peak, pixels)
+        return result
+
+
+def strips_needed(image, estimate, allowed):
+    """
+    Number of strips so the output plus one strip's working memory fits the
+    budget, or None if even the smallest strips would not fit.
+    """
+    # The output of the whole frame is held while the strips are rendered
+    room = allowed - image.nbytes
+    if room <= 0:
+        return None
+    strips = max(2, math.ceil(estimate / room))
+    return strips if strips <= min(MAX_STRIPS, image.shape[0]) else None
+
+
+def apply_in_strips(effect, image, params, strips, out=None):
+    """
+    Apply an effect strip by strip into one output frame (out, if given).
+    Each strip is rendered with the effect's context margin of rows around
+    it, aligned to its grid, so the result matches rendering the whole frame.
+    """
+    height, width = image.shape[:2]
+    margin = effect.context_margin(**params)
+    alignment = effect.region_alignment(**params)
+    step = math.ceil(height / strips)
+    step = max(alignment, math.ceil(step / alignment) * alignment)
+    output = out
+    for y0 in range(0, height, step):
+        y1 = min(height, y0 + step)
+        cy0 = max(0, y0 - margin)
+        cy1 = min(height, y1 + margin)
+        if alignment > 1:
+            cy0 -= cy0 % alignment
+            cy1 = min(height, math.ceil(cy1 / alignment) * alignment)
+        result = effect.apply_crop(image[cy0:cy1], (0, cy0, width, cy1), (width, height), **params)
+        if output is None:
+            output = np.empty((height, width) + result.shape[2:], dtype=result.dtype)
+        output[y0:y1] = result[y0 - cy0:y1 - cy0]
+    return output
+
+
+def _configured_limit():
+    value = os.environ.get('DITHER_GIRL_MEMORY_BUDGET')
+    if not value:
+        return None
+    try:
+        return int(float(value) * 1024 * 1024)
+    except ValueError:
+        print(f"Ignoring invalid DITHER_GIRL_MEMORY_BUDGET: {value}")
+        return None
+
+
+BUDGET = MemoryBudget(limit=_configured_limit(),
+                      strict=os.environ.get('DITHER_GIRL_MEMORY_STRICT', '0') == '1',
+                      profile=MemoryProfile(persistent=True))
+
+
+def run_effect(effect_name, effect, image, params, out=None):
+    """Apply an effect within the shared memory budget, optionally into out"""
+    return BUDGET.run(effect_name, effect, image, params, out)
+
+
+def report():
+    """Measured memory use of every profiled effect, one per line"""
+    lines = [f"{key:<24} {per_megapixel / (1024 * 1024):8.1f} MB per megapixel"
+             for key, per_megapixel in BUDGET.profile.items()]
+    lines.append(f"{MEMORY_STATS['measured']} measured, {MEMORY_STATS['tiled']} tiled, "
+                 f"{MEMORY_STATS['warned']} warned, {MEMORY_STATS['refused']} refused")
+    return '\n'.join(lines)
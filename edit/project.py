@@ -0,0 +1,211 @@
+"""
+Project files.
+A project (.dgproj) is a zip archive holding everything needed to continue
+an edit: project.json with the recipe, the working format and where the
+original image lives; preview.jpg, a small rendering shown while the
+project opens; optionally an embedded copy of the original (lossless PNG,
+or .npy for 32-bit float) and the rendered full-resolution result, which
+lets a project open without re-running its effects.
+
+The original is referenced by its absolute path and by its path relative
+to the project, so projects moved together with their images still open.
+The recipe of a project can be applied to other images like a recipe file.
+"""
+import io
+import json
+import os
+import zipfile
+
+import cv2
+import numpy as np
+
+from edit.recipe import graph_from_recipe, recipe_from_graph, validate_recipe
+from edit.working_format import WORKING_FORMATS, convert_image
+from utils.image_loader import decode_image, encode_image, load_image
+
+PROJECT_VERSION = 1
+PROJECT_EXTENSION = '.dgproj'
+
+# Longest side of the embedded preview
+PREVIEW_SIZE = 512
+PREVIEW_QUALITY = 85
+
+MANIFEST = 'project.json'
+PREVIEW = 'preview.jpg'
+RENDER = 'render.npy'
+
+
+def is_project(file_path):
+    return file_path.lower().endswith(PROJECT_EXTENSION) or (
+        os.path.isfile(file_path) and zipfile.is_zipfile(file_path))
+
+
+def _preview(image):
+    h, w = image.shape[:2]
+    scale = min(1.0, PREVIEW_SIZE / max(h, w))
+    image = convert_image(image, np.uint8)
+    if scale < 1.0:
+        image = cv2.resize(image, (max(1, int(w * scale)), max(1, int(h * scale))),
+                           interpolation=cv2.INTER_AREA)
+    return encode_image(image, '.jpg', {'jpeg_quality': PREVIEW_QUALITY})
+
+
+def _npy_bytes(array):
+    buffer = io.BytesIO()
+    np.save(buffer, np.ascontiguousarray(array))
+    return buffer.getvalue()
+
+
+def save_project(file_path, graph, image=None, source_path=None, working_format='uint8',
+                 embed_original=False, store_render=False):
+    """
+    Save an edit graph as a project. image is its rendered result, used for
+    the preview (and stored in full with store_render). source_path is the
+    file the original was loaded from; without one the original is embedded.
+    """
+    if image is None:
+        image = graph.render()
+    embed_original = embed_original or source_path is None
+    manifest = {
+        'version': PROJECT_VERSION,
+        'recipe': recipe_from_graph(graph),
+        'working_format': working_format,
+        'size': [int(graph.source.shape[1]), int(graph.source.shape[0])],
+        'original': None,
+        'render': store_render
+    }
+    if source_path is not None:
+        source_path = os.path.abspath(source_path)
+        stat = os.stat(source_path)
+        try:
+            relative = os.path.relpath(source_path, os.path.dirname(os.path.abspath(file_path)))
+        except ValueError:
+            relative = None  # On another drive
+        manifest['source'] = {
+            'path': source_path,
+            'relative': relative,
+            # A stored result is only used while the original is unchanged
+            'bytes': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns
+        }
+
+    tmp_path = f"{file_path}.tmp"
+    try:
+        with zipfile.ZipFile(tmp_path, 'w') as archive:
+            archive.writestr(PREVIEW, _preview(image), compress_type=zipfile.ZIP_STORED)
+            if embed_original:
+                if graph.source.dtype == np.float32:
+                    manifest['original'] = 'original.npy'
+                    archive.writestr('original.npy', _npy_bytes(graph.source),
+                                     compress_type=zipfile.ZIP_DEFLATED)
+                else:
+                    # PNG is lossless for 8 and 16 bits and already compressed
+                    manifest['original'] = 'original.png'
+                    archive.writestr('original.png', encode_image(graph.source, '.png'),
+                                     compress_type=zipfile.ZIP_STORED)
+            if store_render:
+                archive.writestr(RENDER, _npy_bytes(image), compress_type=zipfile.ZIP_DEFLATED)
+            archive.writestr(MANIFEST, json.dumps(manifest, indent=2),
+                             compress_type=zipfile.ZIP_DEFLATED)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_manifest(file_path):
+    """The project.json of a project file"""
+    try:
+        with zipfile.ZipFile(file_path) as archive:
+            manifest = json.loads(archive.read(MANIFEST).decode('utf-8'))
+    except (KeyError, zipfile.BadZipFile, ValueError) as e:
+        raise ValueError(f"Not a Dither Girl project: {file_path} ({e})")
+    if manifest.get('version', 0) > PROJECT_VERSION:
+        raise ValueError(f"{file_path} was saved by a newer version of Dither Girl")
+    validate_recipe(manifest.get('recipe'))
+    return manifest
+
+
+def read_preview(file_path):
+    """The embedded preview as RGB uint8; cheap enough to show right away"""
+    with zipfile.ZipFile(file_path) as archive:
+        return decode_image(archive.read(PREVIEW))
+
+
+def load_project_recipe(file_path):
+    """The recipe of a project, e.g. to apply it to other images"""
+    return read_manifest(file_path)['recipe']
+
+
+class Project:
+    """A loaded project: the original image, the recipe and an optional stored result"""
+
+    def __init__(self, file_path, manifest, original, render=None, source_path=None):
+        self.file_path = file_path
+        self.manifest = manifest
+        self.recipe = manifest['recipe']
+        self.working_format = manifest.get('working_format', 'uint8')
+        self.original = original
+        self.render = render
+        self.source_path = source_path
+
+    def graph(self, cache_budget=0):
+        """Edit graph of the project; the stored result seeds its output"""
+        graph = graph_from_recipe(self.recipe, self.original, cache_budget)
+        if self.render is not None:
+            graph.restore(graph.snapshot(), output=self.render)
+        return graph
+
+
+def _find_source(file_path, manifest):
+    source = manifest.get('source')
+    if not source:
+        return None
+    candidates = [source.get('path'),
+                  source.get('relative') and
+                  os.path.join(os.path.dirname(os.path.abspath(file_path)), source['relative'])]
+    for candidate in candidates:
+        if candidate and os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def _unchanged(source_path, source):
+    stat = os.stat(source_path)
+    return stat.st_size == source.get('bytes') and stat.st_mtime_ns == source.get('mtime_ns')
+
+
+def load_project(file_path, working_format=None):
+    """
+    Load a project's original image (embedded or referenced) and stored
+    result. Raises IOError when the original cannot be found.
+    """
+    manifest = read_manifest(file_path)
+    working_format = working_format or manifest.get('working_format', 'uint8')
+    source_path = _find_source(file_path, manifest)
+    render = None
+    with zipfile.ZipFile(file_path) as archive:
+        if manifest.get('original'):
+            data = archive.read(manifest['original'])
+            if manifest['original'].endswith('.npy'):
+                original = convert_image(np.load(io.BytesIO(data)), WORKING_FORMATS[working_format])
+            else:
+                original = decode_image(data, working_format)
+        elif source_path is not None:
+            original = load_image(source_path, working_format)
+        else:
+            raise IOError(f"The original image of {file_path} was not found: "
+                          f"{manifest.get('source', {}).get('path')}")
+        if (manifest.get('render') and working_format == manifest.get('working_format') and
+                (manifest.get('original') or _unchanged(source_path, manifest['source']))):
+            render = np.load(io.BytesIO(archive.read(RENDER)))
+            if render.shape[:2] != original.shape[:2]:
+                render = None
+    manifest = dict(manifest, working_format=working_format)
+    return Project(file_path, manifest, original, render, source_path)
+
+
+def render_project(file_path):
+    """Open a project and render its result (a stored one is used as is)"""
+    return load_project(file_path).graph().render()
@@ -0,0 +1,99 @@
+"""
+Edit recipes.
+A recipe is the portable form of an edit: the sidebar adjustment values plus
+the ordered list of applied effects with their parameters. Recipes are
+stored as JSON and can be re-applied to any image.
+"""
+import json
+
+from edit.edit_graph import ADJUSTMENTS, EditGraph, EditNode
+from effects import get_effect
+
+RECIPE_VERSION = 1
+
+
+def recipe_from_graph(graph):
+    """Build a recipe describing an edit graph"""
+    adjustments = {}
+    effects = []
+    for node in graph.nodes:
+        if node.kind == 'adjustment':
+            adjustments[node.name] = node.params.get('value', 0)
+        else:
+            entry = {'name': node.name, 'params': dict(node.params)}
+            if not node.enabled:
+                entry['enabled'] = False
+            if node.region is not None:
+                entry['region'] = node.region
+            effects.append(entry)
+    return {'version': RECIPE_VERSION, 'adjustments': adjustments, 'effects': effects}
+
+
+def without_regions(recipe):
+    """
+    Copy of a recipe without the effects limited to a selection, whose pixel
+    coordinates only make sense on the image they were drawn on. Returns the
+    recipe and the number of effects removed.
+    """
+    effects = [entry for entry in recipe.get('effects', []) if entry.get('region') is None]
+    removed = len(recipe.get('effects', [])) - len(effects)
+    return dict(recipe, effects=effects), removed
+
+
+def validate_recipe(recipe):
+    """Check a recipe for unknown adjustments and effects"""
+    if not isinstance(recipe, dict):
+        raise ValueError("Recipe must be a JSON object")
+    adjustments = recipe.get('adjustments', {})
+    if not isinstance(adjustments, dict):
+        raise ValueError("Recipe adjustments must be a JSON object")
+    for name, value in adjustments.items():
+        if name not in ADJUSTMENTS:
+            raise ValueError(f"Unknown adjustment in recipe: {name}")
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"Adjustment {name} must be a number")
+    effects = recipe.get('effects', [])
+    if not isinstance(effects, list):
+        raise ValueError("Recipe effects must be a list")
+    for entry in effects:
+        if not isinstance(entry, dict):
+            raise ValueError("Recipe effects must be JSON objects")
+        name = entry.get('name')
+        if not isinstance(name, str) or get_effect(name) is None:
+            raise ValueError(f"Unknown effect in recipe: {name}")
+        if not isinstance(entry.get('params') or {}, dict):
+            raise ValueError(f"Parameters of effect {name} must be a JSON object")
+    return recipe
+
+
+def graph_from_recipe(recipe, image, cache_budget=0):
+    """Build an edit graph for an image from a recipe"""
+    validate_recipe(recipe)
+    graph = EditGraph(cache_budget=cache_budget)
+    graph.set_source(image)
+    for name, value in recipe.get('adjustments', {}).items():
+        graph.adjustment(name).params['value'] = value
+    for entry in recipe.get('effects', []):
+        graph.add_node(EditNode('effect', entry['name'], entry.get('params'),
+                                entry.get('enabled', True), region=entry.get('region')))
+    return graph
+
+
+def apply_recipe(image, recipe):
+    """Render a recipe on an image without keeping intermediates"""
+    return graph_from_recipe(recipe, image).render()
+
+
+def load_recipe(file_path):
+    """Load and validate a recipe from a JSON file or a project file"""
+    from edit.project import is_project, load_project_recipe
+    if is_project(file_path):
+        return load_project_recipe(file_path)
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return validate_recipe(json.load(f))
+
+
+def save_recipe(file_path, recipe):
+    """Save a recipe to a JSON file"""
+    with open(file_path, 'w', encoding='utf-8') as f:
+        json.dump(recipe, f, indent=2)
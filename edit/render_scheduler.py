@@ -0,0 +1,113 @@
+"""
+Adaptive frame-budget scheduling for interactive previews.
+Measures recent render cost and picks the preview resolution and debounce
+interval so slider drags stay within a target frame budget.
+
+The scheduler also decides when a change needs a render: while a slider is
+dragged, changes made before the pending render starts are superseded by
+it (it reads the latest values), and releasing the slider refines to a full
+resolution render.
+"""
+import math
+import time
+from collections import deque
+
+# Preview scales the scheduler can choose from; a fixed set keeps proxy caches stable
+PREVIEW_SCALES = (1.0, 0.75, 0.5, 0.35, 0.25, 0.125)
+
+
+class RenderScheduler:
+    """Choose preview scale and debounce interval from measured render latency"""
+
+    def __init__(self, target_fps=30, smoothing=0.3, max_debounce_ms=100):
+        self.target_fps = target_fps
+        self.smoothing = smoothing
+        self.max_debounce_ms = max_debounce_ms
+        self.seconds_per_pixel = None  # Exponential moving average of render cost
+        self.current_scale = 1.0
+        self.last_latency = 0.0
+        self.dragging = False
+        self.pending = False  # A render is scheduled and has not started yet
+        self._frame_times = deque(maxlen=60)
+
+    @property
+    def frame_budget(self):
+        """Seconds available per preview frame"""
+        return 1.0 / self.target_fps
+
+    def record(self, seconds, pixels):
+        """Record how long rendering the given number of pixels took"""
+        self.last_latency = seconds
+        self._frame_times.append(time.perf_counter())
+        if pixels <= 0:
+            return
+        cost = seconds / pixels
+        if self.seconds_per_pixel is None:
+            self.seconds_per_pixel = cost
+        else:
+            self.seconds_per_pixel += self.smoothing * (cost - self.seconds_per_pixel)
+
+    def expected_latency(self, pixels):
+        if self.seconds_per_pixel is None:
+            return 0.0
+        return self.seconds_per_pixel * pixels
+
+    def choose_scale(self, pixels):
+        """Largest preview scale whose expected render fits the frame budget"""
+        if self.seconds_per_pixel is None or pixels <= 0:
+            # No measurement yet: start at half resolution for big frames
+            self.current_scale = 0.5 if pixels > 4_000_000 else 1.0
+            return self.current_scale
+
+        # Render time scales with the pixel count, i.e. with scale squared
+        ideal = math.sqrt(self.frame_budget * 0.8 / max(self.expected_latency(pixels), 1e-9))
+        self.current_scale = PREVIEW_SCALES[-1]
+        for scale in PREVIEW_SCALES:
+            if scale <= ideal:
+                self.current_scale = scale
+                break
+        return self.current_scale
+
+    def debounce_interval_ms(self, pixels):
+        """Wait time before rendering: whatever is left of the frame budget"""
+        remaining = self.frame_budget - self.expected_latency(pixels)
+        return int(max(0, min(self.max_debounce_ms, remaining * 1000)))
+
+    def request(self, pixels):
+        """
+        A change to render on a frame of pixels: the debounce interval to
+        (re)start the render timer with, or None when the pending render of
+        a drag will pick the change up
+        """
+        if self.dragging:
+            if self.pending:
+                return None
+            # The pending render is a preview at the chosen scale
+            pixels = int(pixels * self.choose_scale(pixels) ** 2)
+        self.pending = True
+        return self.debounce_interval_ms(pixels)
+
+    def begin_drag(self):
+        self.dragging = True
+
+    def end_drag(self):
+        self.dragging = False
+
+    def refine(self):
+        """The interval of the full resolution render that replaces a drag's previews"""
+        self.pending = True
+        return 0
+
+    def start_render(self):
+        """The render timer fired: True to render a preview, False for full resolution"""
+        self.pending = False
+        return self.dragging
+
+    @property
+    def achieved_fps(self):
+        """Preview frames per second over the last second of rendering"""
+        now = time.perf_counter()
+        recent = [t for t in self._frame_times if now - t <= 1.0]
+        if len(recent) < 2:
+            return 0.0
+        return (len(recent) - 1) / (recent[-1] - recent[0]) if recent[-1] > recent[0] else 0.0
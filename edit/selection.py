@@ -0,0 +1,182 @@
+"""
+Selections and region-of-interest effect application.
+Effects are evaluated only on the selection's bounding box plus the border
+context they need, then composited back into the frame through the
+(optionally feathered) selection mask.
+"""
+import cv2
+import numpy as np
+
+from algorithms.blur import gaussian_blur
+
+
+class Selection:
+    """Base class for image selections in image pixel coordinates"""
+
+    kind = None
+
+    def bounds(self):
+        """Unclipped (x0, y0, x1, y1) bounds of the selection"""
+        raise NotImplementedError
+
+    def draw(self, mask, offset_x, offset_y):
+        """Fill the selection into a uint8 mask whose origin is at the offset"""
+        raise NotImplementedError
+
+    def to_dict(self):
+        raise NotImplementedError
+
+    def bounding_box(self, width, height):
+        """Bounding box clipped to the image, or None if the selection is empty"""
+        x0, y0, x1, y1 = self.bounds()
+        x0 = max(0, int(np.floor(x0)))
+        y0 = max(0, int(np.floor(y0)))
+        x1 = min(width, int(np.ceil(x1)))
+        y1 = min(height, int(np.ceil(y1)))
+        if x1 <= x0 or y1 <= y0:
+            return None
+        return x0, y0, x1, y1
+
+    def mask(self, box):
+        """Render the selection mask covering the (x0, y0, x1, y1) box"""
+        x0, y0, x1, y1 = box
+        mask = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+        self.draw(mask, x0, y0)
+        return mask
+
+
+class RectSelection(Selection):
+    """Rectangular selection"""
+
+    kind = 'rect'
+
+    def __init__(self, x, y, width, height):
+        self.x, self.y = x, y
+        self.width, self.height = width, height
+
+    def bounds(self):
+        return self.x, self.y, self.x + self.width, self.y + self.height
+
+    def draw(self, mask, offset_x, offset_y):
+        x0 = int(round(self.x - offset_x))
+        y0 = int(round(self.y - offset_y))
+        x1 = int(round(self.x + self.width - offset_x))
+        y1 = int(round(self.y + self.height - offset_y))
+        mask[max(0, y0):max(0, y1), max(0, x0):max(0, x1)] = 255
+
+    def to_dict(self):
+        return {'kind': self.kind, 'x': self.x, 'y': self.y,
+                'width': self.width, 'height': self.height}
+
+
+class EllipseSelection(RectSelection):
+    """Elliptical selection inscribed in a rectangle"""
+
+    kind = 'ellipse'
+
+    def draw(self, mask, offset_x, offset_y):
+        center = (int(round(self.x + self.width / 2 - offset_x)),
+                  int(round(self.y + self.height / 2 - offset_y)))
+        axes = (max(1, int(round(self.width / 2))), max(1, int(round(self.height / 2))))
+        cv2.ellipse(mask, center, axes, 0, 0, 360, 255, thickness=-1)
+
+
+class LassoSelection(Selection):
+    """Free-form polygon selection"""
+
+    kind = 'lasso'
+
+    def __init__(self, points):
+        self.points = [(float(x), float(y)) for x, y in points]
+
+    def bounds(self):
+        if not self.points:
+            return 0, 0, 0, 0
+        xs = [p[0] for p in self.points]
+        ys = [p[1] for p in self.points]
+        return min(xs), min(ys), max(xs) + 1, max(ys) + 1
+
+    def draw(self, mask, offset_x, offset_y):
+        if len(self.points) < 3:
+            return
+        polygon = np.array([[x - offset_x, y - offset_y] for x, y in self.points])
+        cv2.fillPoly(mask, [np.round(polygon).astype(np.int32)], 255)
+
+    def to_dict(self):
+        return {'kind': self.kind, 'points': [list(p) for p in self.points]}
+
+
+def selection_from_dict(data):
+    """Create a selection from a description produced by to_dict"""
+    if data is None:
+        return None
+    kind = data.get('kind')
+    if kind == 'rect':
+        return RectSelection(data['x'], data['y'], data['width'], data['height'])
+    if kind == 'ellipse':
+        return EllipseSelection(data['x'], data['y'], data['width'], data['height'])
+    if kind == 'lasso':
+        return LassoSelection(data['points'])
+    raise ValueError(f"Unknown selection kind: {kind}")
+
+
+def scale_selection_dict(data, scale):
+    """Scale a selection description, e.g. for a downscaled preview"""
+    if data['kind'] == 'lasso':
+        return {'kind': 'lasso', 'points': [[x * scale, y * scale] for x, y in data['points']]}
+    return {'kind': data['kind'], 'x': data['x'] * scale, 'y': data['y'] * scale,
+            'width': data['width'] * scale, 'height': data['height'] * scale}
+
+
+def apply_to_region(image, func, selection, margin=0, feather=0, alignment=1):
+    """
+    Apply func to the selected region of the image only.
+
+    func(crop, box) is evaluated on the selection's bounding box expanded by
+    margin pixels of context (and the feather radius), optionally snapped
+    outward to a multiple of alignment so block based effects line up with
+    the full frame grid. box is the crop's (x0, y0, x1, y1) in the frame. The
+    result is blended back through the selection mask.
+    """
+    height, width = image.shape[:2]
+    box = selection.bounding_box(width, height)
+    if box is None:
+        return image
+
+    feather = max(0, int(feather))
+    grow = int(margin) + feather * 2
+    x0, y0, x1, y1 = box
+    px0, py0 = max(0, x0 - grow), max(0, y0 - grow)
+    px1, py1 = min(width, x1 + grow), min(height, y1 + grow)
+    if alignment > 1:
+        px0 -= px0 % alignment
+        py0 -= py0 % alignment
+        # Round the far edge up to the grid too, so only the frame border
+        # can cut a block short, exactly as in the full frame
+        px1 = min(width, -(-px1 // alignment) * alignment)
+        py1 = min(height, -(-py1 // alignment) * alignment)
+
+    crop = image[py0:py1, px0:px1]
+    processed = func(crop, (px0, py0, px1, py1))
+    if processed.shape[:2] != crop.shape[:2]:
+        processed = cv2.resize(processed, (crop.shape[1], crop.shape[0]))
+    if processed.dtype != image.dtype:
+        processed = processed.astype(image.dtype)
+
+    mask = selection.mask((px0, py0, px1, py1))
+    if feather > 0:
+        alpha = gaussian_blur(mask.astype(np.float32) / 255.0, feather)
+    else:
+        alpha = mask.astype(np.float32) / 255.0
+
+    result = image.copy()
+    if alpha.min() >= 1.0:
+        result[py0:py1, px0:px1] = processed
+        return result
+
+    alpha = alpha[:, :, np.newaxis]
+    blended = crop * (1.0 - alpha) + processed * alpha
+    if np.issubdtype(image.dtype, np.integer):
+        blended = np.clip(np.round(blended), 0, np.iinfo(image.dtype).max)
+    result[py0:py1, px0:px1] = blended.astype(image.dtype)
+    return result
@@ -0,0 +1,201 @@
+"""
+Viewport-restricted evaluation.
+When the editor is zoomed in, only a small part of the frame is visible.
+Instead of evaluating the edit graph for every pixel, the frame is divided
+into tiles and only the tiles in view (plus a prefetch margin) are
+rendered right away; the rest are filled in by a background worker, nearest
+to the view first. Once every tile is done the assembled frame is the
+graph's full-resolution output, so saving or zooming out costs nothing
+extra; when they come earlier, the remaining tiles are rendered on the spot.
+
+Each tile is evaluated on a crop of the last cached full-frame image (or the
+source) grown by the context margins of the nodes after it, starting on
+their alignment grid, so tiles match rendering the whole frame. Contrast
+keeps the mean of its whole input, which is computed once for all tiles.
+Chains with a node that needs the whole frame (a selection or an effect that
+is not tileable) are rendered in full as before.
+"""
+import math
+import threading
+import time
+
+from edit.image_context import context_for, seed
+from edit.edit_graph import EditNode
+from edit.image_filters import ImageFilters
+
+# Tile edge in image pixels
+TILE_SIZE = 512
+
+# Zoom from which the editor renders the viewport first
+VIEWPORT_ZOOM = 2.0
+
+# Frames smaller than this are rendered in full at any zoom
+MIN_PIXELS = 2_000_000
+
+# Area rendered around the view right away, in view sizes
+PREFETCH = 0.25
+
+
+class RegionPlan:
+    """Frozen copy of the part of a chain that has to be evaluated, renderable by crops"""
+
+    def __init__(self, base, nodes, snapshot, means):
+        self.base = base
+        self.nodes = nodes
+        self.snapshot = snapshot
+        self.means = means  # Node index -> mean of its whole input (contrast)
+        self.frame_size = (base.shape[1], base.shape[0])
+        self.margin = 0
+        self.alignment = 1
+        for node in nodes:
+            margin, alignment = node.crop_footprint()
+            self.margin += margin
+            self.alignment = self.alignment * alignment // math.gcd(self.alignment, alignment)
+        self.filters = ImageFilters()
+
+    def render(self, box):
+        """The graph's output for box (x0, y0, x1, y1); safe to call from worker threads"""
+        x0, y0, x1, y1 = box
+        width, height = self.frame_size
+        cx0, cy0 = max(0, x0 - self.margin), max(0, y0 - self.margin)
+        cx1, cy1 = min(width, x1 + self.margin), min(height, y1 + self.margin)
+        if self.alignment > 1:
+            cx0 -= cx0 % self.alignment
+            cy0 -= cy0 % self.alignment
+            cx1 = min(width, -(-cx1 // self.alignment) * self.alignment)
+            cy1 = min(height, -(-cy1 // self.alignment) * self.alignment)
+        crop_box = (cx0, cy0, cx1, cy1)
+        image = self.base[cy0:cy1, cx0:cx1]
+        for index, node in enumerate(self.nodes):
+            if index in self.means:
+                # A crop's own mean would differ from the frame's
+                seed(image, 'mean', self.means[index])
+            image = node.process_crop(image, self.filters, crop_box, self.frame_size)
+        return image[y0 - cy0:y1 - cy0, x0 - cx0:x1 - cx0]
+
+
+def region_plan(graph):
+    """
+    A RegionPlan for the nodes of a graph that are not cached, or None when
+    the chain must be rendered in full (or nothing needs rendering)
+    """
+    if graph.source is None:
+        return None
+    active = [node for node in graph.nodes if node.is_active()]
+    base = graph.source
+    start = 0
+    for pos in range(len(active) - 1, -1, -1):
+        if active[pos].output is not None:
+            base = active[pos].output
+            start = pos + 1
+            break
+    pending = active[start:]
+    if not pending or base.ndim != 3:
+        return None
+
+    if any(node.crop_footprint() is None for node in pending):
+        return None
+    nodes = [EditNode.from_dict(node.to_dict()) for node in pending]
+    contrast = [index for index, node in enumerate(nodes)
+                if node.kind == 'adjustment' and node.name == 'contrast']
+    if contrast and contrast[0] > 0:
+        # Contrast needs the mean of its whole input: evaluate the nodes
+        # before it (brightness at most) on the whole frame
+        for node in nodes[:contrast[0]]:
+            base = node.process(base, graph.filters)
+        nodes = nodes[contrast[0]:]
+    means = {0: context_for(base).get('mean')} if contrast else {}
+    return RegionPlan(base, nodes, graph.snapshot(), means)
+
+
+def tiles_for(frame_size, tile_size=TILE_SIZE):
+    """Boxes of the tiles covering a frame, row by row"""
+    width, height = frame_size
+    return [(x, y, min(width, x + tile_size), min(height, y + tile_size))
+            for y in range(0, height, tile_size) for x in range(0, width, tile_size)]
+
+
+def intersects(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+class ViewportRenderer:
+    """
+    Assembles the output of a RegionPlan tile by tile into frame, which
+    starts as a copy of the previous output (or of the plan's input) so it
+    can always be displayed.
+    """
+
+    def __init__(self, plan, previous=None, tile_size=TILE_SIZE):
+        self.plan = plan
+        width, height = plan.frame_size
+        shape = (height, width, plan.base.shape[2])
+        if previous is not None and previous.shape == shape and previous.dtype == plan.base.dtype:
+            self.frame = previous.copy()
+        else:
+            self.frame = plan.base.copy()
+        self.tiles = tiles_for(plan.frame_size, tile_size)
+        self.done = set()
+        self._lock = threading.Lock()
+        self.stats = {'visible': 0, 'background': 0, 'latencies': []}
+
+    def render_tile(self, tile):
+        """Render one tile into the frame; returns False when it was already done"""
+        with self._lock:
+            if tile in self.done:
+                return False
+        result = self.plan.render(tile)
+        x0, y0, x1, y1 = tile
+        self.frame[y0:y1, x0:x1] = result
+        with self._lock:
+            self.done.add(tile)
+        return True
+
+    def render_view(self, view, prefetch=PREFETCH):
+        """
+        Render the tiles in view (x0, y0, x1, y1 in image pixels), grown by
+        prefetch view sizes, that are not done yet. Returns the rendered tiles.
+        """
+        start = time.perf_counter()
+        x0, y0, x1, y1 = view
+        grow_x, grow_y = int((x1 - x0) * prefetch), int((y1 - y0) * prefetch)
+        area = (x0 - grow_x, y0 - grow_y, x1 + grow_x, y1 + grow_y)
+        rendered = [tile for tile in self.tiles
+                    if intersects(tile, area) and self.render_tile(tile)]
+        if rendered:
+            self.stats['visible'] += len(rendered)
+            self.stats['latencies'].append(time.perf_counter() - start)
+        return rendered
+
+    def next_tile(self, view):
+        """The tile not done yet nearest to the centre of the view, or None"""
+        cx, cy = (view[0] + view[2]) / 2, (view[1] + view[3]) / 2
+        with self._lock:
+            remaining = [tile for tile in self.tiles if tile not in self.done]
+        if not remaining:
+            return None
+        return min(remaining, key=lambda t: ((t[0] + t[2]) / 2 - cx) ** 2 + ((t[1] + t[3]) / 2 - cy) ** 2)
+
+    def render_background(self, tile):
+        """Render a tile on a worker thread; returns it"""
+        if self.render_tile(tile):
+            with self._lock:
+                self.stats['background'] += 1
+        return tile
+
+    def complete(self):
+        with self._lock:
+            return len(self.done) == len(self.tiles)
+
+    def finish(self):
+        """Render any remaining tiles and return the full frame"""
+        for tile in self.tiles:
+            self.render_tile(tile)
+        return self.frame
+
+    def report(self):
+        latencies = self.stats['latencies']
+        if not latencies:
+            return f"{len(self.done)}/{len(self.tiles)} tiles"
+        return (f"{len(self.done)}/{len(self.tiles)} tiles, view rendered in "
+                f"{latencies[-1] * 1000:.0f} ms (mean {sum(latencies) / len(latencies) * 1000:.0f} ms)")
@@ -0,0 +1,71 @@
+"""
+Working image formats.
+Images can be processed as uint8 (0-255), uint16 (0-65535) or float32
+(0.0-1.0). Effects declare which dtypes they handle natively and images are
+converted only when a node needs a different dtype, plus once for display
+and export.
+"""
+import numpy as np
+
+WORKING_FORMATS = {
+    'uint8': np.uint8,
+    'uint16': np.uint16,
+    'float32': np.float32
+}
+
+# Dtypes supported by effects written against max_value()/clip_to_dtype()
+ALL_DTYPES = (np.uint8, np.uint16, np.float32)
+
+# Number of full-frame dtype conversions performed, for benchmarking
+CONVERSION_STATS = {'conversions': 0, 'pixels': 0}
+
+
+def max_value(dtype):
+    """Value representing full intensity for a dtype"""
+    dtype = np.dtype(dtype)
+    if dtype == np.uint8:
+        return 255
+    if dtype == np.uint16:
+        return 65535
+    return 1.0
+
+
+def clip_to_dtype(image, dtype):
+    """Clip values to the valid range of a dtype and convert to it"""
+    dtype = np.dtype(dtype)
+    if image.dtype == dtype and dtype.kind == 'u':
+        return image
+    return np.clip(image, 0, max_value(dtype)).astype(dtype, copy=False)
+
+
+def convert_image(image, dtype):
+    """Convert an image between working formats, rescaling its value range"""
+    dtype = np.dtype(dtype)
+    if image.dtype == dtype:
+        return image
+    CONVERSION_STATS['conversions'] += 1
+    CONVERSION_STATS['pixels'] += image.shape[0] * image.shape[1]
+
+    if dtype.kind == 'f':
+        return np.multiply(image, 1.0 / max_value(image.dtype), dtype=np.float32)
+    if image.dtype.kind == 'f':
+        scaled = np.multiply(image, max_value(dtype), dtype=np.float32)
+        scaled += 0.5
+        return clip_to_dtype(scaled, dtype)
+    if dtype == np.uint16:
+        # uint8 -> uint16: 255 maps to 65535 exactly
+        return image.astype(np.uint16) * np.uint16(257)
+    # uint16 -> uint8 with rounding
+    return ((image.astype(np.uint32) + 128) // 257).astype(np.uint8)
+
+
+def ensure_dtype(image, accepted):
+    """Return the image unchanged if its dtype is accepted, else convert it"""
+    if image.dtype in accepted:
+        return image
+    return convert_image(image, accepted[0])
+
+
+def to_display(image):
+    """8-bit version of an image for display"""
+    return convert_image(image, np.uint8)
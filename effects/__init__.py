@@ -3,6 +3,8 @@ Effects module for Dither Girl.
 Contains all image effects that can be applied in the application.
 """
 
+import numpy as np
+
 from effects.base import BaseEffect
 from effects.grayscale import GrayscaleEffect
 from effects.negative import NegativeEffect
@@ -19,6 +21,9 @@ from effects.watercolor import WatercolorEffect
 from effects.glitch import GlitchEffect
 from effects.hdr import HDREffect
 from effects.oilpaint import OilPaintEffect
+from effects.palette import PaletteEffect
+from effects.dither import DitherEffect
+from effects.halftone import HalftoneEffect
 
 # Dictionary of all available effects for easy registration
 EFFECTS = {
@@ -36,7 +41,10 @@ EFFECTS = {
     'watercolor': WatercolorEffect(),
     'glitch': GlitchEffect(),
     'hdr': HDREffect(),
-    'oilpaint': OilPaintEffect()
+    'oilpaint': OilPaintEffect(),
+    'palette': PaletteEffect(),
+    'dither': DitherEffect(),
+    'halftone': HalftoneEffect()
 }
 
 def get_effect(effect_name):
@@ -47,6 +55,10 @@ def get_effect_names():
     """Get a list of all available effect names"""
     return list(EFFECTS.keys())
 
+def get_backends(dtype=np.uint8):
+    """Implementation each effect uses for images of a dtype, for diagnostics"""
+    return {name: effect.backend(dtype) for name, effect in EFFECTS.items()}
+
 def apply_effect(effect_name, image, **params):
     """Apply an effect by name with additional parameters"""
     effect = get_effect(effect_name)
@@ -1,6 +1,9 @@
 """Base effect class that all effects should inherit from"""
 import abc
 import numpy as np
+from algorithms.capabilities import select_backend
+from edit.buffer_pool import write_output
+from edit.selection import apply_to_region
 
 class BaseEffect(abc.ABC):
     """Abstract base class for image effects"""
@@ -26,10 +29,75 @@ class BaseEffect(abc.ABC):
         return {}
     
     @abc.abstractmethod
-    def apply(self, image, **kwargs):
-        """Apply the effect to the image with the given parameters"""
+    def apply(self, image, out=None, **kwargs):
+        """
+        Apply the effect to the image with the given parameters. out is an
+        optional array shaped like the image, in its dtype; when given the
+        result is written to it and out is returned.
+        """
         pass
     
+    @property
+    def native_dtypes(self):
+        """Image dtypes apply() handles directly; others are converted first"""
+        return (np.uint8,)
+    
+    def backends(self, dtype):
+        """Implementations apply() has for a dtype, fastest first"""
+        return ('opencv',)
+    
+    def backend(self, dtype):
+        """The implementation used for images of a dtype, chosen once per dtype"""
+        return select_backend(f"{self.__class__.__name__}:{np.dtype(dtype).name}",
+                              self.backends(np.dtype(dtype)))
+    
+    @property
+    def spatial_params(self):
+        """Parameters measured in pixels, scaled when rendering previews"""
+        return ()
+    
+    def context_margin(self, **kwargs):
+        """Pixels of border context the effect reads around each output pixel"""
+        return 0
+    
+    def region_alignment(self, **kwargs):
+        """Grid size a region crop must be aligned to for identical results"""
+        return 1
+    
+    def tileable(self, **kwargs):
+        """
+        Whether the effect can be rendered in strips: each output pixel only
+        depends on input pixels within context_margin(), so strips with that
+        margin match rendering the whole frame
+        """
+        return False
+    
+    def apply_crop(self, crop, box, frame_size, **kwargs):
+        """
+        Apply the effect to a crop at box (x0, y0, x1, y1) of a frame of
+        frame_size (width, height). Effects whose result depends on the
+        position in the frame override this.
+        """
+        return self.apply(crop, **kwargs)
+    
+    def apply_region(self, image, selection, feather=0, **kwargs):
+        """Apply the effect only inside a selection, with optional feathering"""
+        frame_size = (image.shape[1], image.shape[0])
+        return apply_to_region(
+            image, lambda crop, box: self.apply_crop(crop, box, frame_size, **kwargs), selection,
+            margin=self.context_margin(**kwargs),
+            feather=feather,
+            alignment=self.region_alignment(**kwargs)
+        )
+    
+    def output_buffer(self, image, out=None):
+        """out, or a new uninitialized array like image, to build the result in"""
+        return out if out is not None else np.empty_like(image)
+    
+    def write_output(self, result, out=None):
+        """edit.buffer_pool.write_output, for effects"""
+        return write_output(result, out)
+    
     def ensure_valid_image(self, image):
         """Validate and ensure image is in proper format"""
         if image is None:
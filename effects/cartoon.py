@@ -1,7 +1,9 @@
 """Cartoon effect implementation"""
 import cv2
 import numpy as np
+from algorithms.capabilities import record_fallback
 from effects.base import BaseEffect
+from edit.image_context import context_for
 
 class CartoonEffect(BaseEffect):
     """Transforms the image to look like a cartoon or drawing"""
@@ -29,10 +31,29 @@ class CartoonEffect(BaseEffect):
             }
         }
     
-    def apply(self, image, strength=7, style=0, **kwargs):
+    @property
+    def spatial_params(self):
+        return ('strength',)
+    
+    def context_margin(self, strength=7, style=0, **kwargs):
+        strength = int(strength)
+        if int(style) == 1:
+            # Mean shift over two pyramid levels reaches far beyond its window
+            return 64 + strength
+        if int(style) == 2:
+            # detailEnhance and a sigma 3 Gaussian
+            return 32
+        # Bilateral filter, median blur and the adaptive threshold block
+        return 8 + strength
+    
+    def apply(self, image, strength=7, style=0, out=None, **kwargs):
         """Apply cartoon effect with adjustable parameters"""
         image = self.ensure_valid_image(image)
         
+        # Grayscale and filtered planes are shared with other effects and
+        # with earlier renders of the same input
+        context = context_for(image)
+        
         try:
             # Convert parameters to integers
             strength = int(strength)
@@ -45,11 +66,10 @@ class CartoonEffect(BaseEffect):
             # Style 0: Standard cartoon
             if style == 0:
                 # Remove noise while preserving edges
-                color = cv2.bilateralFilter(image, d=9, sigmaColor=strength*10, sigmaSpace=strength)
+                color = context.get('bilateral', 9, strength*10, strength)
                 
                 # Edge detection
-                gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
-                gray = cv2.medianBlur(gray, 5)
+                gray = context.get('gray_median', 5)
                 edges = cv2.adaptiveThreshold(
                     gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, 
                     cv2.THRESH_BINARY, strength, 3
@@ -57,7 +77,7 @@ class CartoonEffect(BaseEffect):
                 
                 # Combine edges with color
                 edges_3ch = cv2.cvtColor(edges, cv2.COLOR_GRAY2RGB)
-                cartoon = cv2.bitwise_and(color, edges_3ch)
+                cartoon = cv2.bitwise_and(color, edges_3ch, dst=out)
                 
             # Style 1: Simplified cartoon with fewer details
             elif style == 1:
@@ -65,8 +85,7 @@ class CartoonEffect(BaseEffect):
                 color = cv2.pyrMeanShiftFiltering(image, 15, strength*10, 2)
                 
                 # Simplified edges
-                gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
-                gray = cv2.medianBlur(gray, strength)
+                gray = context.get('gray_median', strength)
                 edges = cv2.adaptiveThreshold(
                     gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
                     cv2.THRESH_BINARY, strength*2+1, strength
@@ -81,35 +100,36 @@ class CartoonEffect(BaseEffect):
                 h, s, v = cv2.split(hsv)
                 s = np.clip(s * 1.4, 0, 255).astype(np.uint8)  # Boost saturation
                 hsv = cv2.merge([h, s, v])
-                cartoon = cv2.cvtColor(hsv, cv2.COLOR_HSV2RGB)
+                cartoon = cv2.cvtColor(hsv, cv2.COLOR_HSV2RGB, dst=out)
                 
             # Style 2: Sketchy cartoon
             else:
                 # Edge-preserving filter
-                color = cv2.detailEnhance(image, sigma_s=10, sigma_r=0.15)
+                color = context.get('detail', 10, 0.15)
                 
                 # Get strong edges
-                gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
-                blurred = cv2.GaussianBlur(gray, (0, 0), 3)
+                gray = context.get('gray')
+                blurred = context.get('gray_gaussian', 0, 3)
                 edges = cv2.divide(gray, blurred, scale=256)
                 
                 # Combine
                 cartoon = cv2.cvtColor(edges, cv2.COLOR_GRAY2RGB)
                 
                 # Blend with color for a sketchy look
-                cartoon = cv2.addWeighted(color, 0.7, cartoon, 0.3, 0)
+                cartoon = cv2.addWeighted(color, 0.7, cartoon, 0.3, 0, dst=out)
             
-            return cartoon
+            return self.write_output(cartoon, out)
         
         except Exception as e:
-            print(f"Error in cartoon effect: {str(e)}")
+            record_fallback('cartoon', e)
             # Fallback to a simpler cartoon effect
-            return self._simple_cartoon(image)
+            return self.write_output(self._simple_cartoon(image), out)
             
     def _simple_cartoon(self, image):
         # Simple fallback cartoon effect
-        color = cv2.bilateralFilter(image, 9, 250, 250)
-        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        context = context_for(image)
+        color = context.get('bilateral', 9, 250, 250)
+        gray = context.get('gray')
         edges = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY, 9, 9)
         edges = cv2.cvtColor(edges, cv2.COLOR_GRAY2RGB)
         return cv2.bitwise_and(color, edges)
@@ -1,6 +1,8 @@
 """Cool color effect implementation"""
+import cv2
 import numpy as np
 from effects.base import BaseEffect
+from edit.working_format import ALL_DTYPES, max_value
 
 class CoolEffect(BaseEffect):
     """Adds a cool temperature cast by enhancing blues and reducing reds"""
@@ -21,15 +23,23 @@ class CoolEffect(BaseEffect):
             }
         }
     
-    def apply(self, image, intensity=30, **kwargs):
+    @property
+    def native_dtypes(self):
+        return ALL_DTYPES
+    
+    def tileable(self, **kwargs):
+        return True
+    
+    def apply(self, image, intensity=30, out=None, **kwargs):
         """Apply cool temperature effect with adjustable intensity"""
         image = self.ensure_valid_image(image)
         
-        # Copy the image to avoid modifying the original
-        cool_img = image.copy().astype(np.int16)
-        
-        # Increase blue, decrease red
-        cool_img[:, :, 2] = np.clip(cool_img[:, :, 2] + intensity, 0, 255)  # B
-        cool_img[:, :, 0] = np.clip(cool_img[:, :, 0] - intensity, 0, 255)  # R
+        # Intensity is given on the 0-255 scale
+        intensity = intensity * max_value(image.dtype) / 255
         
-        return cool_img.astype(np.uint8)
+        # Increase blue, decrease red in one pass; OpenCV saturates integer
+        # results, float results are clipped in place
+        cool_img = cv2.add(image, (-intensity, 0, intensity, 0), dst=out)
+        if cool_img.dtype == np.float32:
+            np.clip(cool_img, 0, 1, out=cool_img)
+        return self.write_output(cool_img, out)
@@ -0,0 +1,68 @@
+"""Ordered dithering effect implementation"""
+import numpy as np
+from algorithms.dither import PATTERNS, dither_levels, dither_palette
+from algorithms.palette import available_palettes
+from effects.base import BaseEffect
+
+
+def pattern_choices():
+    """Threshold map names selectable with the pattern parameter, in slider order"""
+    return [f"{kind} {size}x{size}" for kind, size in PATTERNS]
+
+
+class DitherEffect(BaseEffect):
+    """Ordered dithering with Bayer, clustered-dot or blue-noise threshold maps"""
+
+    @property
+    def has_params(self):
+        return True
+
+    @property
+    def params(self):
+        return {
+            'pattern': {
+                'default': 2,  # Bayer 8x8
+                'min': 0,
+                'max': len(PATTERNS) - 1,
+                'step': 1,
+                'label': 'Bayer/Clustered/Blue Noise'
+            },
+            'levels': {
+                'default': 2,
+                'min': 2,
+                'max': 16,
+                'step': 1,
+                'label': 'Levels per Channel'
+            },
+            'palette': {
+                'default': 0,
+                'min': 0,
+                'max': len(available_palettes()),
+                'step': 1,
+                'label': 'Palette (0 = levels)'
+            }
+        }
+
+    def tileable(self, **kwargs):
+        return True
+
+    def apply_crop(self, crop, box, frame_size, **kwargs):
+        # Keep the threshold map anchored to the frame
+        return self.apply(crop, offset=(box[0], box[1]), **kwargs)
+
+    def backends(self, dtype):
+        return ('numpy',)
+
+    def apply(self, image, pattern=2, levels=2, palette=0, offset=(0, 0), out=None, **kwargs):
+        """
+        Quantize each channel to levels values, or map onto a fixed palette,
+        comparing every pixel with a tiled threshold map. offset is the
+        position of image in the frame when it is a crop.
+        """
+        image = self.ensure_valid_image(image)
+        kind, size = PATTERNS[int(np.clip(pattern, 0, len(PATTERNS) - 1))]
+        palettes = list(available_palettes().values())
+        palette = int(np.clip(palette, 0, len(palettes)))
+        if palette:
+            return dither_palette(image, palettes[palette - 1], kind, size, offset, out=out)
+        return dither_levels(image, levels, kind, size, offset, out=out)
@@ -1,7 +1,8 @@
 """Edge detection effect implementation"""
 import cv2
-import numpy as np
+from algorithms.capabilities import record_fallback
 from effects.base import BaseEffect
+from edit.image_context import context_for
 
 class EdgeDetectionEffect(BaseEffect):
     """Detects and highlights edges in the image"""
@@ -29,14 +30,17 @@ class EdgeDetectionEffect(BaseEffect):
             }
         }
     
-    def apply(self, image, threshold=40, color=0, **kwargs):
+    def context_margin(self, **kwargs):
+        # 5x5 Gaussian blur plus the Sobel and hysteresis steps of Canny
+        return 4
+    
+    def apply(self, image, threshold=40, color=0, out=None, **kwargs):
         """Apply edge detection with adjustable parameters"""
         image = self.ensure_valid_image(image)
         
         try:
-            # Convert to grayscale and apply Gaussian blur
-            gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
-            blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+            # Grayscale and Gaussian blur are shared with other effects
+            blurred = context_for(image).get('gray_gaussian', 5, 0)
             
             # Apply Canny edge detection
             edges = cv2.Canny(blurred, threshold, threshold * 2)
@@ -44,28 +48,29 @@ class EdgeDetectionEffect(BaseEffect):
             # Different color modes
             color_mode = int(color)
             
+            result = self.output_buffer(image, out)
             if color_mode == 0:  # White edges on black background
-                result = np.zeros_like(image)
+                result.fill(0)
                 result[edges > 0] = [255, 255, 255]
             
             elif color_mode == 1:  # Black edges on white background
-                result = np.ones_like(image) * 255
+                result.fill(255)
                 result[edges > 0] = [0, 0, 0]
             
             elif color_mode == 2:  # Original color edges on black
-                result = np.zeros_like(image)
+                result.fill(0)
                 mask = edges > 0
                 result[mask] = image[mask]
             
             else:  # Colored edges (blue)
-                result = np.zeros_like(image)
+                result.fill(0)
                 result[edges > 0] = [255, 255, 0]  # Yellow edges
             
             return result
             
         except Exception as e:
-            print(f"Error in edge detection: {str(e)}")
+            record_fallback('edge', e)
             # Fallback method
-            gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+            gray = context_for(image).get('gray')
             edges = cv2.Canny(gray, 100, 200)
-            return cv2.cvtColor(edges, cv2.COLOR_GRAY2RGB)
+            return self.write_output(cv2.cvtColor(edges, cv2.COLOR_GRAY2RGB), out)
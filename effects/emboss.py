@@ -1,12 +1,28 @@
 """Emboss effect implementation"""
 import cv2
 import numpy as np
+from algorithms import numba_backend
 from effects.base import BaseEffect
+from edit.working_format import ALL_DTYPES, max_value
 
 class EmbossEffect(BaseEffect):
     """Creates a 3D embossed effect"""
     
-    def apply(self, image, **kwargs):
+    @property
+    def native_dtypes(self):
+        return ALL_DTYPES
+    
+    def tileable(self, **kwargs):
+        return True
+    
+    def context_margin(self, **kwargs):
+        return 1
+    
+    def backends(self, dtype):
+        # filter2D is faster everywhere except on 16-bit images
+        return ('numba', 'opencv') if dtype == np.uint16 else ('opencv',)
+    
+    def apply(self, image, out=None, **kwargs):
         """Apply emboss effect to the image"""
         image = self.ensure_valid_image(image)
         
@@ -17,8 +33,15 @@ class EmbossEffect(BaseEffect):
             [0, 1, 2]
         ])
         
-        # Apply the kernel
-        emboss_img = cv2.filter2D(image, -1, kernel) + 128
+        if self.backend(image.dtype) == 'numba' and numba_backend.ready(image.dtype):
+            # One pass from the input straight to the output dtype
+            return numba_backend.convolve3x3(image, kernel, max_value(image.dtype) * 128 / 255,
+                                             out=out)
         
-        # Clip values and convert to uint8
-        return np.clip(emboss_img, 0, 255).astype(np.uint8)
+        # The mid-gray offset is added by filter2D itself, before integer
+        # results are saturated, so it cannot overflow
+        emboss_img = cv2.filter2D(image, -1, kernel.astype(np.float32), dst=out,
+                                  delta=max_value(image.dtype) * 128 / 255)
+        if emboss_img.dtype == np.float32:
+            np.clip(emboss_img, 0, 1, out=emboss_img)
+        return self.write_output(emboss_img, out)
@@ -1,9 +1,13 @@
 """Glitch effect implementation"""
-import cv2
 import numpy as np
+from algorithms.capabilities import record_fallback
 from effects.base import BaseEffect
+from edit.selection import apply_to_region
 import random
 
+# Rows of noise drawn at a time
+NOISE_BAND_ROWS = 256
+
 class GlitchEffect(BaseEffect):
     """Creates a digital glitch/corruption effect"""
     
@@ -30,17 +34,30 @@ class GlitchEffect(BaseEffect):
             }
         }
     
-    def apply(self, image, intensity=0.5, seed=42, **kwargs):
+    def apply_region(self, image, selection, feather=0, **kwargs):
+        # Glitches are placed relative to the whole frame, so render the full
+        # frame and only composite the selection
+        return apply_to_region(
+            image, lambda crop, box: self.apply(crop, **kwargs), selection,
+            margin=max(image.shape[:2]), feather=feather
+        )
+    
+    def backends(self, dtype):
+        return ('numpy',)
+    
+    def apply(self, image, intensity=0.5, seed=42, out=None, **kwargs):
         """Apply digital glitch effect with adjustable intensity"""
         image = self.ensure_valid_image(image)
         
-        # Set random seed for reproducible results with same parameters
-        random.seed(int(seed))
-        np.random.seed(int(seed))
+        # Private generators seeded per call: reproducible for the same
+        # parameters and safe when several glitches render concurrently
+        rand = random.Random(int(seed))
+        np_rand = np.random.RandomState(int(seed))
         
         # Get image dimensions
         h, w, c = image.shape
-        result = image.copy()
+        result = self.output_buffer(image, out)
+        np.copyto(result, image)
         
         try:
             # Number of glitch operations based on intensity
@@ -49,11 +66,11 @@ class GlitchEffect(BaseEffect):
             # 1. Channel shift
             for i in range(int(num_glitches / 2)):
                 # Select a random channel
-                ch = random.randint(0, 2)
+                ch = rand.randint(0, 2)
                 
                 # Define shift amount based on intensity
-                shift_x = random.randint(int(-w*0.05*intensity), int(w*0.05*intensity))
-                shift_y = random.randint(int(-h*0.05*intensity), int(h*0.05*intensity))
+                shift_x = rand.randint(int(-w*0.05*intensity), int(w*0.05*intensity))
+                shift_y = rand.randint(int(-h*0.05*intensity), int(h*0.05*intensity))
                 
                 # Apply the shift to the selected channel
                 if shift_x > 0:
@@ -69,13 +86,14 @@ class GlitchEffect(BaseEffect):
             # 2. Random block shifts
             for i in range(num_glitches):
                 # Select random position and size
-                x1 = random.randint(0, w - 50)
-                y1 = random.randint(0, h - 20)
-                h_block = random.randint(1, int(h * 0.1 * intensity))
-                w_block = random.randint(int(w * 0.05), int(w * 0.3))
+                # Ranges are clamped so small images still glitch
+                x1 = rand.randint(0, max(0, w - 50))
+                y1 = rand.randint(0, max(0, h - 20))
+                h_block = rand.randint(1, max(1, int(h * 0.1 * intensity)))
+                w_block = rand.randint(max(1, int(w * 0.05)), max(1, int(w * 0.3)))
                 
                 # Set shift amount
-                shift = random.randint(int(5 * intensity), int(40 * intensity))
+                shift = rand.randint(int(5 * intensity), int(40 * intensity))
                 
                 # Ensure we stay within bounds
                 if x1 + w_block < w and y1 + h_block < h and x1 + w_block + shift < w:
@@ -83,25 +101,26 @@ class GlitchEffect(BaseEffect):
                     block = image[y1:y1+h_block, x1:x1+w_block].copy()
                     result[y1:y1+h_block, x1+shift:x1+w_block+shift] = block
             
-            # 3. Add some color noise - fixed to handle masks correctly
-            if random.random() < intensity * 0.8:
-                noise = np.zeros_like(image)
-                # Create a single-channel mask (h,w) instead of (h,w,c)
-                noise_mask = (np.random.random((h, w)) < intensity * 0.1).astype(np.uint8)
-                # Generate random noise
+            # 3. Add some color noise. The noise is drawn a band of rows at a
+            # time and only kept where the mask is set, instead of building
+            # full-size noise planes; the random streams are the same as
+            # drawing whole planes at once.
+            if rand.random() < intensity * 0.8:
+                noise_mask = np.empty((h, w), dtype=bool)
+                for y0 in range(0, h, NOISE_BAND_ROWS):
+                    y1 = min(h, y0 + NOISE_BAND_ROWS)
+                    noise_mask[y0:y1] = np_rand.random_sample((y1 - y0, w)) < intensity * 0.1
                 for ch in range(3):
-                    noise[:, :, ch] = np.random.randint(0, 255, (h, w))
-                
-                # Apply noise only where the mask is 1
-                noise_part = cv2.bitwise_and(noise, noise, mask=noise_mask)
-                # Keep original pixels where the mask is 0
-                inverted_mask = cv2.bitwise_not(noise_mask)
-                original_part = cv2.bitwise_and(result, result, mask=inverted_mask)
-                # Combine both parts
-                result = cv2.add(original_part, noise_part)
+                    for y0 in range(0, h, NOISE_BAND_ROWS):
+                        y1 = min(h, y0 + NOISE_BAND_ROWS)
+                        noise = np_rand.randint(0, 255, (y1 - y0, w))
+                        band_mask = noise_mask[y0:y1]
+                        band = result[y0:y1, :, ch]
+                        # Noise is added to the pixel, saturating at white
+                        band[band_mask] = np.minimum(band[band_mask] + noise[band_mask], 255)
             
             return result
         
         except Exception as e:
-            print(f"Error in glitch effect: {str(e)}")
-            return image  # Return original if the effect fails
+            record_fallback('glitch', e)
+            return self.write_output(image, out)  # Return original if the effect fails
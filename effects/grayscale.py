@@ -1,12 +1,21 @@
 """Grayscale effect implementation"""
 import cv2
 from effects.base import BaseEffect
+from edit.image_context import context_for
+from edit.working_format import ALL_DTYPES
 
 class GrayscaleEffect(BaseEffect):
     """Converts an image to grayscale (black and white)"""
     
-    def apply(self, image, **kwargs):
+    @property
+    def native_dtypes(self):
+        return ALL_DTYPES
+    
+    def tileable(self, **kwargs):
+        return True
+    
+    def apply(self, image, out=None, **kwargs):
         """Apply grayscale effect to the image"""
         image = self.ensure_valid_image(image)
-        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
-        return cv2.cvtColor(gray, cv2.COLOR_GRAY2RGB)
+        gray = context_for(image).get('gray')
+        return self.write_output(cv2.cvtColor(gray, cv2.COLOR_GRAY2RGB, dst=out), out)
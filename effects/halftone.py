@@ -0,0 +1,72 @@
+"""CMYK halftone effect implementation"""
+import numpy as np
+from algorithms import numba_backend
+from algorithms.halftone import SHAPES, halftone, ink_plane, screen_vectors, spot_thresholds
+from effects.base import BaseEffect
+from edit.working_format import ALL_DTYPES
+
+class HalftoneEffect(BaseEffect):
+    """Prints the image as rotated cyan, magenta, yellow and black dot screens"""
+    
+    @property
+    def has_params(self):
+        return True
+    
+    @property
+    def params(self):
+        return {
+            'cell_size': {
+                'default': 8,
+                'min': 3,
+                'max': 40,
+                'step': 1,
+                'label': 'Dot Spacing'
+            },
+            'shape': {
+                'default': 0,
+                'min': 0,
+                'max': len(SHAPES) - 1,
+                'step': 1,
+                'label': 'Round/Diamond/Square/Line'
+            }
+        }
+    
+    @property
+    def native_dtypes(self):
+        return ALL_DTYPES
+    
+    @property
+    def spatial_params(self):
+        return ('cell_size',)
+    
+    def tileable(self, **kwargs):
+        return True
+    
+    def context_margin(self, cell_size=8, **kwargs):
+        # A pixel's cell centre is within a cell, its ink sample within two more
+        return 3 * int(max(3, cell_size))
+    
+    def region_alignment(self, cell_size=8, **kwargs):
+        # Keep the ink plane's blocks on the frame's grid
+        return int(max(3, cell_size))
+    
+    def apply_crop(self, crop, box, frame_size, **kwargs):
+        # Keep the screens anchored to the frame
+        return self.apply(crop, offset=(box[0], box[1]), **kwargs)
+    
+    def backends(self, dtype):
+        return ('numba', 'numpy')
+    
+    def apply(self, image, cell_size=8, shape=0, offset=(0, 0), out=None, **kwargs):
+        """
+        Apply a CMYK halftone with dots every cell_size pixels. offset is the
+        position of image in the frame when it is a crop.
+        """
+        image = self.ensure_valid_image(image)
+        cell = int(max(3, cell_size))
+        shape = int(np.clip(shape, 0, len(SHAPES) - 1))
+        if self.backend(image.dtype) == 'numba' and numba_backend.ready(image.dtype):
+            return numba_backend.halftone(ink_plane(image, cell), screen_vectors(),
+                                          spot_thresholds(shape), cell, shape,
+                                          offset[0], offset[1], self.output_buffer(image, out))
+        return halftone(image, cell, shape, offset, out=out)
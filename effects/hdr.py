@@ -1,7 +1,9 @@
 """HDR effect implementation"""
 import cv2
 import numpy as np
+from algorithms.capabilities import record_fallback
 from effects.base import BaseEffect
+from edit.image_context import context_for
 
 class HDREffect(BaseEffect):
     """Creates an HDR-like tone-mapped effect with enhanced details"""
@@ -29,7 +31,11 @@ class HDREffect(BaseEffect):
             }
         }
     
-    def apply(self, image, strength=0.5, saturation=0.5, **kwargs):
+    def context_margin(self, strength=0.5, **kwargs):
+        # detailEnhance spatial sigma scales with strength
+        return int(48 * min(1.0, max(0.1, strength))) + 8
+    
+    def apply(self, image, strength=0.5, saturation=0.5, out=None, **kwargs):
         """Apply HDR effect with adjustable strength"""
         image = self.ensure_valid_image(image)
         
@@ -38,12 +44,9 @@ class HDREffect(BaseEffect):
             strength = min(1.0, max(0.1, strength))
             saturation = min(1.0, max(0.0, saturation))
             
-            # Create multiple exposures
-            under_exposed = np.clip(image * 0.7, 0, 255).astype(np.uint8)
-            over_exposed = np.clip(image * 1.3, 0, 255).astype(np.uint8)
-            
-            # Apply detail enhancement with bilateral filtering
-            detail = cv2.detailEnhance(image, sigma_s=strength*16, sigma_r=strength*0.2)
+            # Apply detail enhancement with bilateral filtering; shared while
+            # only the saturation changes
+            detail = context_for(image).get('detail', strength*16, strength*0.2)
             
             # Create tone-mapped HDR effect - apply to the whole image at once
             hdr = cv2.createTonemapReinhard(gamma=1.0, intensity=1.0, 
@@ -52,9 +55,12 @@ class HDREffect(BaseEffect):
             # Convert to float32 and apply tonemapping to the whole image
             # OpenCV expects BGR order for tonemapping
             if detail.shape[2] == 3:  # Make sure it's a 3-channel image
-                detail_float = detail.astype(np.float32) / 255.0
+                detail_float = detail.astype(np.float32)
+                detail_float /= 255.0
                 result_mapped = hdr.process(detail_float)
-                result = np.clip(result_mapped * 255, 0, 255).astype(np.uint8)
+                result_mapped *= 255
+                np.clip(result_mapped, 0, 255, out=result_mapped)
+                result = result_mapped.astype(np.uint8)
             else:
                 # Fallback if somehow the image doesn't have 3 channels
                 result = detail
@@ -75,9 +81,9 @@ class HDREffect(BaseEffect):
                 hsv_enhanced = cv2.merge([h, s, v])
                 result = cv2.cvtColor(hsv_enhanced, cv2.COLOR_HSV2BGR)
             
-            return result
+            return self.write_output(result, out)
             
         except Exception as e:
-            print(f"Error in HDR effect: {str(e)}")
+            record_fallback('hdr', e)
             # Fallback to simpler enhancement
-            return cv2.detailEnhance(image, sigma_s=10, sigma_r=0.15)
+            return self.write_output(cv2.detailEnhance(image, sigma_s=10, sigma_r=0.15), out)
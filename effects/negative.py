@@ -1,11 +1,22 @@
 """Negative effect implementation"""
 import numpy as np
 from effects.base import BaseEffect
+from edit.working_format import ALL_DTYPES, max_value
 
 class NegativeEffect(BaseEffect):
     """Inverts all colors in the image"""
     
-    def apply(self, image, **kwargs):
+    @property
+    def native_dtypes(self):
+        return ALL_DTYPES
+    
+    def tileable(self, **kwargs):
+        return True
+    
+    def backends(self, dtype):
+        return ('numpy',)
+    
+    def apply(self, image, out=None, **kwargs):
         """Apply negative effect to the image"""
         image = self.ensure_valid_image(image)
-        return 255 - image
+        return np.subtract(max_value(image.dtype), image, out=out)
@@ -1,7 +1,9 @@
 """Oil painting effect implementation"""
 import cv2
 import numpy as np
+from algorithms.capabilities import record_fallback
 from effects.base import BaseEffect
+from edit.image_context import context_for
 
 class OilPaintEffect(BaseEffect):
     """Creates an oil painting effect"""
@@ -29,7 +31,26 @@ class OilPaintEffect(BaseEffect):
             }
         }
     
-    def apply(self, image, radius=4, intensity=5, **kwargs):
+    @property
+    def spatial_params(self):
+        return ('radius',)
+    
+    def tileable(self, **kwargs):
+        return True
+    
+    def backends(self, dtype):
+        # OpenCV's oil painting filter needs the contrib xphoto module
+        return ('xphoto', 'custom')
+    
+    def context_margin(self, radius=4, **kwargs):
+        return int(radius) * 2 + 2
+    
+    def region_alignment(self, **kwargs):
+        # The custom path goes through HSV, whose conversion rounds the
+        # pixels left over after OpenCV's vector loop differently
+        return 64 if self.backend(np.uint8) == 'custom' else 1
+    
+    def apply(self, image, radius=4, intensity=5, out=None, **kwargs):
         """Apply oil painting effect with adjustable parameters"""
         image = self.ensure_valid_image(image)
         
@@ -38,20 +59,15 @@ class OilPaintEffect(BaseEffect):
         intensity = int(intensity)
         
         try:
-            # Use OpenCV's xphoto module for oil painting
-            # If not available, fall back to a custom implementation
-            try:
-                # Try using xphoto oil painting filter if available
-                oil = cv2.xphoto.oilPainting(image, radius, intensity)
-                return oil
-            except:
-                # Fall back to custom implementation
-                return self._custom_oil_paint(image, radius, intensity)
+            if self.backend(image.dtype) == 'xphoto':
+                oil = cv2.xphoto.oilPainting(image, radius, intensity, dst=out)
+                return self.write_output(oil, out)
+            return self.write_output(self._custom_oil_paint(image, radius, intensity), out)
                 
-        except Exception as e:
-            print(f"Error in oil paint effect: {str(e)}")
+        except cv2.error as e:
+            record_fallback('oilpaint', e)
             # Fall back to bilateral filter for a similar effect
-            return cv2.bilateralFilter(image, 9, 75, 75)
+            return self.write_output(cv2.bilateralFilter(image, 9, 75, 75), out)
     
     def _custom_oil_paint(self, image, radius, intensity):
         """Custom oil paint implementation when cv2.xphoto is not available"""
@@ -59,7 +75,7 @@ class OilPaintEffect(BaseEffect):
         img_float = image.astype(np.float32) / 255.0
         
         # Apply bilateral filter for smoothing while preserving edges
-        smoothed = cv2.bilateralFilter(image, radius*2+1, intensity*10, intensity*5)
+        smoothed = context_for(image).get('bilateral', radius*2+1, intensity*10, intensity*5)
         
         # Add some texture using a median filter
         texture = cv2.medianBlur(smoothed, radius*2+1)
@@ -0,0 +1,71 @@
+"""Palette quantization effect implementation"""
+import numpy as np
+from algorithms.palette import (COLOR_SPACES, apply_palette, available_palettes,
+                                kmeans_palette, median_cut, sample_pixels)
+from effects.base import BaseEffect
+
+# Palette choices before the fixed palettes
+ADAPTIVE_CHOICES = ('adaptive (median cut)', 'adaptive (k-means)')
+
+
+def palette_choices():
+    """Names selectable with the palette parameter, in slider order"""
+    return list(ADAPTIVE_CHOICES) + list(available_palettes())
+
+
+class PaletteEffect(BaseEffect):
+    """Maps the image onto a fixed or adaptive color palette"""
+    
+    @property
+    def has_params(self):
+        return True
+    
+    @property
+    def params(self):
+        return {
+            'palette': {
+                'default': len(ADAPTIVE_CHOICES) + 1,  # PICO-8
+                'min': 0,
+                'max': len(palette_choices()) - 1,
+                'step': 1,
+                'label': 'Palette'
+            },
+            'colors': {
+                'default': 16,
+                'min': 2,
+                'max': 64,
+                'step': 1,
+                'label': 'Adaptive Colors'
+            },
+            'space': {
+                'default': 2,
+                'min': 0,
+                'max': len(COLOR_SPACES) - 1,
+                'step': 1,
+                'label': 'Match RGB/Lab/OKLab'
+            }
+        }
+    
+    def tileable(self, palette=3, **kwargs):
+        # Adaptive palettes are built from the whole frame
+        return int(palette) >= len(ADAPTIVE_CHOICES)
+    
+    def palette_for(self, image, palette=3, colors=16, space=2):
+        """The (k, 3) uint8 palette the parameters select for an image"""
+        choices = palette_choices()
+        choice = choices[int(np.clip(palette, 0, len(choices) - 1))]
+        if choice == ADAPTIVE_CHOICES[0]:
+            return median_cut(sample_pixels(image), int(colors))
+        if choice == ADAPTIVE_CHOICES[1]:
+            return kmeans_palette(sample_pixels(image), int(colors), COLOR_SPACES[int(space)])
+        return available_palettes()[choice]
+    
+    def backends(self, dtype):
+        return ('numpy',)
+    
+    def apply(self, image, palette=3, colors=16, space=2, out=None, **kwargs):
+        """Map every pixel to its nearest palette color"""
+        image = self.ensure_valid_image(image)
+        space = int(np.clip(space, 0, len(COLOR_SPACES) - 1))
+        colors = self.palette_for(image, palette, colors, space)
+        return apply_palette(image, colors, COLOR_SPACES[space], out=out)
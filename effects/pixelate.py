@@ -2,6 +2,7 @@
 import cv2
 import numpy as np
 from effects.base import BaseEffect
+from edit.working_format import ALL_DTYPES
 
 class PixelateEffect(BaseEffect):
     """Creates a pixel art effect by reducing resolution"""
@@ -22,7 +23,25 @@ class PixelateEffect(BaseEffect):
             }
         }
     
-    def apply(self, image, block_size=10, **kwargs):
+    @property
+    def native_dtypes(self):
+        return ALL_DTYPES
+    
+    @property
+    def spatial_params(self):
+        return ('block_size',)
+    
+    def tileable(self, **kwargs):
+        return True
+    
+    def context_margin(self, block_size=10, **kwargs):
+        return int(max(2, block_size))
+    
+    def region_alignment(self, block_size=10, **kwargs):
+        # Keep the pixel grid aligned with the full frame
+        return int(max(2, block_size))
+    
+    def apply(self, image, block_size=10, out=None, **kwargs):
         """Apply pixelation with adjustable block size"""
         image = self.ensure_valid_image(image)
         
@@ -32,10 +51,19 @@ class PixelateEffect(BaseEffect):
         # Get image dimensions
         h, w = image.shape[:2]
         
+        # Pad to whole blocks so every block is exactly block_size pixels and
+        # the grid starts at the origin; crops aligned to it match the frame
+        pad_h, pad_w = -h % block_size, -w % block_size
+        if pad_h or pad_w:
+            image = cv2.copyMakeBorder(image, 0, pad_h, 0, pad_w, cv2.BORDER_REPLICATE)
+        
         # Calculate new dimensions
-        h_new = h // block_size
-        w_new = w // block_size
+        h_new = (h + pad_h) // block_size
+        w_new = (w + pad_w) // block_size
         
         # Resize down and then back up with nearest neighbor interpolation
         small = cv2.resize(image, (w_new, h_new), interpolation=cv2.INTER_LINEAR)
-        return cv2.resize(small, (w, h), interpolation=cv2.INTER_NEAREST)
+        if pad_h or pad_w:
+            pixelated = cv2.resize(small, (w + pad_w, h + pad_h), interpolation=cv2.INTER_NEAREST)
+            return self.write_output(pixelated[:h, :w], out)
+        return self.write_output(cv2.resize(small, (w, h), dst=out, interpolation=cv2.INTER_NEAREST), out)
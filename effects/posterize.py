@@ -1,6 +1,8 @@
 """Posterize effect implementation"""
 import numpy as np
+from algorithms import numba_backend
 from effects.base import BaseEffect
+from edit.working_format import ALL_DTYPES, max_value
 
 class PosterizeEffect(BaseEffect):
     """Reduces the number of colors to create a poster-like effect"""
@@ -21,7 +23,17 @@ class PosterizeEffect(BaseEffect):
             }
         }
     
-    def apply(self, image, levels=4, **kwargs):
+    @property
+    def native_dtypes(self):
+        return ALL_DTYPES
+    
+    def tileable(self, **kwargs):
+        return True
+    
+    def backends(self, dtype):
+        return ('numba', 'numpy')
+    
+    def apply(self, image, levels=4, out=None, **kwargs):
         """Apply posterize effect with adjustable color levels"""
         image = self.ensure_valid_image(image)
         
@@ -30,13 +42,20 @@ class PosterizeEffect(BaseEffect):
         levels = max(2, min(8, levels))
         
         # Calculate the division factor
-        factor = 255 / (levels - 1)
+        factor = max_value(image.dtype) / (levels - 1)
+        
+        if self.backend(image.dtype) == 'numba' and numba_backend.ready(image.dtype):
+            return numba_backend.posterize(image, factor, out=out)
+        
+        if image.dtype == np.float32:
+            # Quantize in place on a single float32 copy
+            result = np.divide(image, np.float32(factor), out=out)
+            result += 0.5
+            np.floor(result, out=result)
+            result *= np.float32(factor)
+            return result
         
-        # Apply to each channel for better control
-        result = np.zeros_like(image)
-        for i in range(3):
-            channel = image[:, :, i]
-            # Quantize the pixel values
-            result[:, :, i] = np.floor(channel / factor + 0.5) * factor
-            
-        return result.astype(np.uint8)
+        # Integer images are quantized through a lookup table of every value
+        values = np.arange(int(max_value(image.dtype)) + 1)
+        lut = (np.floor(values / factor + 0.5) * factor).astype(image.dtype)
+        return np.take(lut, image, out=out, mode='clip')
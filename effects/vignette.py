@@ -1,6 +1,9 @@
 """Vignette effect implementation"""
 import numpy as np
+from algorithms import numba_backend
 from effects.base import BaseEffect
+from edit.buffer_pool import scratch
+from edit.working_format import ALL_DTYPES
 
 class VignetteEffect(BaseEffect):
     """Darkens the corners and edges of the image"""
@@ -21,20 +24,45 @@ class VignetteEffect(BaseEffect):
             }
         }
     
-    def apply(self, image, intensity=0.5, **kwargs):
-        """Apply vignette effect with adjustable intensity"""
+    @property
+    def native_dtypes(self):
+        return ALL_DTYPES
+    
+    def tileable(self, **kwargs):
+        return True
+    
+    def apply_crop(self, crop, box, frame_size, **kwargs):
+        # Keep the falloff centred on the full frame
+        return self.apply(crop, frame=(box[0], box[1]) + tuple(frame_size), **kwargs)
+    
+    def backends(self, dtype):
+        return ('numba', 'numpy')
+    
+    def apply(self, image, intensity=0.5, frame=None, out=None, **kwargs):
+        """
+        Apply vignette effect with adjustable intensity. frame is
+        (x0, y0, width, height) when image is a crop of a larger frame.
+        """
         image = self.ensure_valid_image(image)
         height, width = image.shape[:2]
+        x0, y0, frame_width, frame_height = frame or (0, 0, width, height)
+        if self.backend(image.dtype) == 'numba' and numba_backend.ready(image.dtype):
+            return numba_backend.vignette(image, intensity, x0, y0, frame_width, frame_height,
+                                          out=out)
         
-        # Generate a radial gradient mask
-        X = np.linspace(-1, 1, width)[np.newaxis, :]
-        Y = np.linspace(-1, 1, height)[:, np.newaxis]
-        radius = np.sqrt(X**2 + Y**2)
-        
-        # Normalize radius to [0, 1] and apply intensity
-        mask = 1 - np.clip(radius * intensity * 1.5, 0, 1)
-        mask = np.dstack([mask, mask, mask])
-        
-        # Apply the vignette mask to the image
-        vignetted = image * mask
-        return vignetted.astype(np.uint8)
+        X = np.linspace(-1, 1, frame_width, dtype=np.float32)[np.newaxis, x0:x0 + width]
+        Y = np.linspace(-1, 1, frame_height, dtype=np.float32)[y0:y0 + height, np.newaxis]
+        vignetted = self.output_buffer(image, out)
+        with scratch((height, width), np.float32) as mask:
+            # Single-channel float32 radial gradient mask
+            np.hypot(X, Y, out=mask)
+            
+            # Normalize radius to [0, 1] and apply intensity, in place
+            mask *= np.float32(intensity * 1.5)
+            np.clip(mask, 0, 1, out=mask)
+            np.subtract(1, mask, out=mask)
+            
+            # Broadcast the mask over the channels straight into the output;
+            # NumPy casts in small buffers, so no full-frame float copy is made
+            np.multiply(image, mask[:, :, np.newaxis], out=vignetted, casting='unsafe')
+        return vignetted
@@ -1,6 +1,8 @@
 """Warm color effect implementation"""
+import cv2
 import numpy as np
 from effects.base import BaseEffect
+from edit.working_format import ALL_DTYPES, max_value
 
 class WarmEffect(BaseEffect):
     """Adds a warm temperature cast by enhancing reds and reducing blues"""
@@ -21,15 +23,23 @@ class WarmEffect(BaseEffect):
             }
         }
     
-    def apply(self, image, intensity=30, **kwargs):
+    @property
+    def native_dtypes(self):
+        return ALL_DTYPES
+    
+    def tileable(self, **kwargs):
+        return True
+    
+    def apply(self, image, intensity=30, out=None, **kwargs):
         """Apply warm temperature effect with adjustable intensity"""
         image = self.ensure_valid_image(image)
         
-        # Copy the image to avoid modifying the original
-        warm_img = image.copy().astype(np.int16)
-        
-        # Increase red, decrease blue
-        warm_img[:, :, 0] = np.clip(warm_img[:, :, 0] + intensity, 0, 255)  # R
-        warm_img[:, :, 2] = np.clip(warm_img[:, :, 2] - intensity, 0, 255)  # B
+        # Intensity is given on the 0-255 scale
+        intensity = intensity * max_value(image.dtype) / 255
         
-        return warm_img.astype(np.uint8)
+        # Increase red, decrease blue in one pass; OpenCV saturates integer
+        # results, float results are clipped in place
+        warm_img = cv2.add(image, (intensity, 0, -intensity, 0), dst=out)
+        if warm_img.dtype == np.float32:
+            np.clip(warm_img, 0, 1, out=warm_img)
+        return self.write_output(warm_img, out)
@@ -1,7 +1,9 @@
 """Watercolor effect implementation"""
 import cv2
 import numpy as np
+from algorithms.capabilities import record_fallback
 from effects.base import BaseEffect
+from edit.image_context import context_for
 
 class WatercolorEffect(BaseEffect):
     """Creates a watercolor painting effect"""
@@ -29,7 +31,15 @@ class WatercolorEffect(BaseEffect):
             }
         }
     
-    def apply(self, image, strength=50, saturation=1.2, **kwargs):
+    @property
+    def spatial_params(self):
+        return ('strength',)
+    
+    def context_margin(self, strength=50, **kwargs):
+        # Bilateral filter, median blur, Canny and dilation
+        return 8 + min(int(strength / 10) * 2 + 1, 15)
+    
+    def apply(self, image, strength=50, saturation=1.2, out=None, **kwargs):
         """Apply watercolor effect with adjustable parameters"""
         image = self.ensure_valid_image(image)
         
@@ -40,8 +50,9 @@ class WatercolorEffect(BaseEffect):
             if kernel_size % 2 == 0:
                 kernel_size -= 1
             
-            # Apply bilateral filter for edge preservation and smoothing
-            bilateral = cv2.bilateralFilter(image, 9, 75, 75)
+            # Bilateral filter for edge preservation and smoothing; it does not
+            # depend on the parameters, so slider changes reuse it
+            bilateral = context_for(image).get('bilateral', 9, 75, 75)
             
             # Apply median blur with the capped kernel size
             median = cv2.medianBlur(bilateral, kernel_size)
@@ -60,10 +71,10 @@ class WatercolorEffect(BaseEffect):
             saturated = cv2.cvtColor(hsv.astype("uint8"), cv2.COLOR_HSV2BGR)
             
             # Subtract edges from the saturated image
-            result = cv2.subtract(saturated, edges_3channel)
+            result = cv2.subtract(saturated, edges_3channel, dst=out)
             
-            return result
+            return self.write_output(result, out)
             
         except Exception as e:
-            print(f"Error applying watercolor effect: {str(e)}")
-            return image  # Return original if the effect fails
+            record_fallback('watercolor', e)
+            return self.write_output(image, out)  # Return original if the effect fails
@@ -1,9 +1,115 @@
 import sys
-from PyQt6.QtWidgets import QApplication
-from ui.main_window import ImageEditorWindow
+import argparse
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Dither Girl image editor")
+    parser.add_argument('--watch', nargs='+', metavar='DIR',
+                        help="Run headless and process new images in these directories")
+    parser.add_argument('--recipe', help="Recipe JSON or project file applied in headless mode")
+    parser.add_argument('--output', help="Output directory for --watch, or file for --contact-sheet")
+    parser.add_argument('--workers', type=int, default=2, help="Number of worker threads")
+    parser.add_argument('--format', dest='output_format', help="Output format, e.g. png or jpg")
+    parser.add_argument('--serve', action='store_true',
+                        help="Run the headless render server instead of the GUI")
+    parser.add_argument('--host', default='127.0.0.1', help="Address the render server binds to")
+    parser.add_argument('--port', type=int, default=8765, help="Port of the render server")
+    parser.add_argument('--socket', help="Serve on this Unix socket instead of TCP")
+    parser.add_argument('--serve-root', action='append', default=[], metavar='DIR',
+                        help="Directory whose files may be rendered by path (repeatable)")
+    parser.add_argument('--timeout', type=float, default=60.0, help="Render server timeout per request")
+    parser.add_argument('--contact-sheet', metavar='IMAGE',
+                        help="Render a parameter grid of --effect on IMAGE to --output")
+    parser.add_argument('--effect', help="Effect of the contact sheet")
+    parser.add_argument('--x', dest='x_axis', metavar='PARAM=START:END:COUNT',
+                        help="Column parameter, as a range or a list (param=a,b,c)")
+    parser.add_argument('--y', dest='y_axis', metavar='PARAM=START:END:COUNT', help="Row parameter")
+    parser.add_argument('--diagnostics', action='store_true',
+                        help="Print the available backends and the one each effect uses")
+    parser.add_argument('--cell', type=int, default=256, help="Longest side of a contact sheet cell")
+    return parser.parse_args(argv)
+
+
+def run_watch(args):
+    from edit.recipe import load_recipe
+    from utils.watch_folder import WatchFolder
+
+    if not args.recipe or not args.output:
+        print("--watch requires --recipe and --output")
+        return 2
+    watcher = WatchFolder(args.watch, args.output, load_recipe(args.recipe),
+                          workers=args.workers, output_format=args.output_format)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        watcher.stop()
+    return 0
+
+
+def run_contact_sheet(args):
+    from edit.recipe import apply_recipe, load_recipe
+    from utils.contact_sheet import parse_axis, render_contact_sheet
+    from utils.image_loader import load_image, save_image
+
+    if not args.effect or not args.x_axis or not args.output:
+        print("--contact-sheet requires --effect, --x and --output")
+        return 2
+    try:
+        x_axis = parse_axis(args.effect, args.x_axis)
+        y_axis = parse_axis(args.effect, args.y_axis) if args.y_axis else None
+    except ValueError as e:
+        print(e)
+        return 2
+    image = load_image(args.contact_sheet)
+    if args.recipe:
+        # Edits the sheet starts from, applied once
+        image = apply_recipe(image, load_recipe(args.recipe))
+    sheet, stats = render_contact_sheet(image, args.effect, x_axis, y_axis, cell_size=args.cell,
+                                        workers=args.workers)
+    save_image(args.output, sheet)
+    print(f"{stats['cells']} cells in {stats['seconds']:.2f}s "
+          f"({stats['planes_reused']} shared planes reused) -> {args.output}")
+    return 0
+
+
+def run_server(args):
+    from utils.render_server import RenderServer
+
+    server = RenderServer(args.host, args.port, socket_path=args.socket, workers=args.workers,
+                          timeout=args.timeout, allowed_roots=args.serve_root)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def run_gui():
+    from PyQt6.QtWidgets import QApplication
+    from ui.main_window import ImageEditorWindow
 
-if __name__ == '__main__':
     app = QApplication(sys.argv)
     window = ImageEditorWindow()
     window.show()
-    sys.exit(app.exec())
\ No newline at end of file
+    # Offer to restore a session that crashed
+    window.offer_recovery()
+    return app.exec()
+
+
+if __name__ == '__main__':
+    args = parse_args(sys.argv[1:])
+    # Compile or load the optional Numba kernels while the app starts up
+    from algorithms import numba_backend
+    numba_backend.start_warmup()
+    if args.diagnostics:
+        from algorithms.capabilities import report
+        from effects import get_backends
+        print(report(get_backends()))
+        sys.exit(0)
+    if args.watch:
+        sys.exit(run_watch(args))
+    if args.serve:
+        sys.exit(run_server(args))
+    if args.contact_sheet:
+        sys.exit(run_contact_sheet(args))
+    sys.exit(run_gui())
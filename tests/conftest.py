@@ -0,0 +1,20 @@
+"""Fixtures shared by every test"""
+import os
+import tempfile
+
+import pytest
+
+# Modules and parameters read while tests are collected stay out of the
+# real app directories too
+os.environ['DITHER_GIRL_HOME'] = tempfile.mkdtemp(prefix='dither-girl-tests-')
+
+from edit import memory_budget
+
+
+@pytest.fixture(autouse=True)
+def app_home(tmp_path, monkeypatch):
+    """Keep caches, profiles and user data out of the real app directories"""
+    monkeypatch.setenv('DITHER_GIRL_HOME', str(tmp_path))
+    # The shared budget would save what it measures to the user's profile
+    monkeypatch.setattr(memory_budget.BUDGET, 'profile', memory_budget.MemoryProfile())
+    return tmp_path
@@ -0,0 +1,79 @@
+"""Animated parameter sweep export"""
+import numpy as np
+import pytest
+from PIL import Image, ImageSequence
+
+from utils.animation import export_animation, render_frame, render_frames, sweep_recipe
+
+RECIPE = {'effects': [{'name': 'pixelate', 'params': {'block_size': 2}},
+                      {'name': 'glitch', 'params': {'intensity': 0.4, 'seed': 1}}]}
+SWEEPS = [{'effect': 0, 'param': 'block_size', 'start': 2, 'end': 12},
+          {'effect': 1, 'param': 'intensity', 'start': 0.1, 'end': 0.9}]
+FRAMES = 6
+
+
+@pytest.fixture
+def image():
+    return np.random.default_rng(8).integers(0, 256, (48, 64, 3), dtype=np.uint8)
+
+
+def expected_frames(image):
+    return [render_frame(image, sweep_recipe(RECIPE, SWEEPS, i, FRAMES)) for i in range(FRAMES)]
+
+
+def decoded_frames(path):
+    with Image.open(path) as animation:
+        return [np.array(frame.convert('RGB')) for frame in ImageSequence.Iterator(animation)]
+
+
+def test_sweep_values():
+    recipes = [sweep_recipe(RECIPE, SWEEPS, i, FRAMES) for i in range(FRAMES)]
+    sizes = [r['effects'][0]['params']['block_size'] for r in recipes]
+    intensities = [r['effects'][1]['params']['intensity'] for r in recipes]
+    assert sizes == [2, 4, 6, 8, 10, 12]
+    assert all(isinstance(size, int) for size in sizes)
+    assert intensities[0] == pytest.approx(0.1) and intensities[-1] == pytest.approx(0.9)
+    # The recipe itself is left alone
+    assert RECIPE['effects'][0]['params']['block_size'] == 2
+
+
+def test_frames_come_in_order(image):
+    recipes = [sweep_recipe(RECIPE, SWEEPS, i, FRAMES) for i in range(FRAMES)]
+    frames = list(render_frames(image, recipes, workers=3, rendered={2: np.zeros_like(image)}))
+    expected = expected_frames(image)
+    assert not frames[2].any()
+    assert all(np.array_equal(frames[i], expected[i]) for i in (0, 1, 3, 4, 5))
+
+
+@pytest.mark.parametrize('ext, options', [('png', None), ('webp', {'webp_lossless': True})])
+def test_lossless_formats_keep_every_frame(tmp_path, image, ext, options):
+    path = str(tmp_path / f'sweep.{ext}')
+    stats = export_animation(path, image, RECIPE, SWEEPS, frames=FRAMES, fps=10, options=options)
+    assert stats['frames'] == FRAMES and stats['rendered'] == FRAMES
+    frames = decoded_frames(path)
+    assert len(frames) == FRAMES
+    for frame, expected in zip(frames, expected_frames(image)):
+        assert np.array_equal(frame, expected)
+    with Image.open(path) as animation:
+        assert animation.info.get('loop') == 0
+
+
+def test_gif_uses_one_palette(tmp_path, image):
+    path = str(tmp_path / 'sweep.gif')
+    export_animation(path, image, RECIPE, SWEEPS, frames=FRAMES, fps=10, colors=32)
+    with Image.open(path) as animation:
+        assert animation.n_frames == FRAMES
+        assert animation.info['duration'] == 100
+    frames = decoded_frames(path)
+    colors = np.unique(np.concatenate([f.reshape(-1, 3) for f in frames]), axis=0)
+    assert len(colors) <= 32
+    for frame, expected in zip(frames, expected_frames(image)):
+        assert np.abs(frame.astype(int) - expected).mean() < 40
+
+
+def test_bad_sweeps_and_formats(tmp_path, image):
+    with pytest.raises(ValueError):
+        export_animation(str(tmp_path / 'a.bmp'), image, RECIPE, SWEEPS)
+    with pytest.raises(ValueError):
+        export_animation(str(tmp_path / 'a.gif'), image, RECIPE, [dict(SWEEPS[0], effect=5)])
+    assert not list(tmp_path.iterdir())
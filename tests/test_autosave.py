@@ -0,0 +1,111 @@
+"""Session autosave and crash recovery"""
+import os
+
+import numpy as np
+import pytest
+
+from edit.edit_graph import EditGraph, EditNode
+from utils.autosave import SessionAutosave, find_sessions, load_session
+
+
+def make_state(value, graph=None):
+    image = np.full((20, 30, 3), value, dtype=np.uint8)
+    return {'image': image, 'graph': graph or [], 'brightness': value, 'contrast': 0,
+            'saturation': 0, 'sharpness': 0, 'blur': 0}
+
+
+@pytest.fixture
+def original():
+    return np.random.default_rng(0).integers(0, 256, (20, 30, 3), dtype=np.uint8)
+
+
+def blocks_in(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith('.npy'))
+
+
+def test_incremental_save(tmp_path, original):
+    autosave = SessionAutosave(root=str(tmp_path), session_id='a')
+    history = [make_state(1), make_state(2)]
+    assert autosave.save(autosave.capture(original, history, 1, 'photo.jpg'))
+    assert autosave.stats['blocks'] == 3  # The original and two history images
+
+    history.append(make_state(3))
+    autosave.save(autosave.capture(original, history, 2, 'photo.jpg'))
+    assert autosave.stats['blocks'] == 4
+
+    # Nothing changed: no write at all
+    assert not autosave.save(autosave.capture(original, history, 2, 'photo.jpg'))
+    assert autosave.stats['skipped'] == 1
+    assert 'autosaves' in autosave.report()
+
+
+def test_rotation_drops_old_blocks(tmp_path, original):
+    autosave = SessionAutosave(root=str(tmp_path), session_id='a')
+    history = [make_state(0)]
+    autosave.save(autosave.capture(original, history, 0))
+    first_block = autosave.block_name(history[0]['image'])
+    for value in range(1, 5):
+        # Like the editor's history limit: the oldest entry falls off
+        history = history[1:] + [make_state(value)]
+        autosave.save(autosave.capture(original, history, 0))
+    assert os.path.exists(os.path.join(autosave.directory, 'manifest.2.json'))
+    assert not os.path.exists(os.path.join(autosave.directory, 'manifest.3.json'))
+    assert f"{first_block}.npy" not in blocks_in(autosave.directory)
+    # The original plus the entries of the three kept manifests
+    assert len(blocks_in(autosave.directory)) == 4
+    assert not [name for name in os.listdir(autosave.directory) if name.endswith('.tmp')]
+
+
+def test_recover(tmp_path, original):
+    graph = EditGraph()
+    graph.set_source(original)
+    graph.add_effect('posterize', {'levels': 4})
+    autosave = SessionAutosave(root=str(tmp_path), session_id='crashed')
+    history = [make_state(5), make_state(9, graph.snapshot())]
+    autosave.save(autosave.capture(original, history, 1, 'photo.jpg', 'uint16'))
+
+    assert find_sessions(str(tmp_path)) == [autosave.directory]
+    assert find_sessions(str(tmp_path), exclude='crashed') == []
+    session = load_session(autosave.directory)
+    assert session.file_path == 'photo.jpg'
+    assert session.working_format == 'uint16'
+    assert session.position == 1
+    np.testing.assert_array_equal(session.original, original)
+    np.testing.assert_array_equal(session.history[1]['image'], history[1]['image'])
+    assert session.history[1]['graph'] == graph.snapshot()
+    assert session.history[1]['brightness'] == 9
+
+
+def test_recover_falls_back_to_older_manifest(tmp_path, original):
+    autosave = SessionAutosave(root=str(tmp_path), session_id='a')
+    history = [make_state(1)]
+    autosave.save(autosave.capture(original, history, 0))
+    autosave.save(autosave.capture(original, history + [make_state(2)], 1))
+    with open(os.path.join(autosave.directory, 'manifest.json'), 'w') as f:
+        f.write('{"version": 1, "hist')
+    session = load_session(autosave.directory)
+    assert len(session.history) == 1
+
+
+def test_adopt_and_discard(tmp_path, original):
+    old = SessionAutosave(root=str(tmp_path), session_id='old')
+    old.save(old.capture(original, [make_state(1)], 0))
+    session = load_session(old.directory)
+
+    autosave = SessionAutosave(root=str(tmp_path), session_id='new')
+    autosave.adopt(session)
+    assert not os.path.exists(old.directory)
+    history = session.history + [make_state(2)]
+    autosave.save(autosave.capture(session.original, history, 1))
+    # Only the new history image is written
+    assert autosave.stats['blocks'] == 1
+    assert len(load_session(autosave.directory).history) == 2
+
+    autosave.discard()
+    assert not os.path.exists(autosave.directory)
+    assert not autosave.save(autosave.capture(session.original, history + [make_state(3)], 2))
+
+
+def test_restored_node_ids_are_not_reused():
+    node = EditNode.from_dict({'id': 10 ** 6, 'kind': 'effect', 'name': 'negative', 'params': {}})
+    assert EditNode('effect', 'negative').id > node.id
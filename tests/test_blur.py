@@ -0,0 +1,61 @@
+"""Large-radius Gaussian blur"""
+import cv2
+import numpy as np
+import pytest
+
+from algorithms.blur import (EXACT_KERNEL, METHODS, blur_error, blur_kernel, box_widths,
+                             choose_method, gaussian_blur, kernel_sigma)
+from edit.image_filters import ImageFilters
+from edit.working_format import convert_image
+
+
+@pytest.fixture
+def image():
+    small = np.random.default_rng(4).integers(0, 256, (24, 32, 3), dtype=np.uint8)
+    return cv2.resize(small, (640, 480), interpolation=cv2.INTER_CUBIC)
+
+
+@pytest.mark.parametrize('sigma', [7.5, 20.0, 45.0, 90.0])
+def test_box_widths_match_variance(sigma):
+    widths = box_widths(sigma)
+    assert all(width % 2 == 1 for width in widths)
+    variance = sum((width * width - 1) / 12 for width in widths)
+    assert variance == pytest.approx(sigma * sigma, rel=0.1)
+
+
+@pytest.mark.parametrize('method', ['box', 'pyramid'])
+@pytest.mark.parametrize('sigma', [6.0, 30.0, 60.0])
+def test_close_to_gaussian(image, method, sigma):
+    mean_error, max_error = blur_error(image, sigma, method)
+    assert mean_error < 0.005
+    assert max_error < 0.05
+
+
+def test_stack_blur(image):
+    mean_error, _ = blur_error(image, 10.0, 'stack')
+    assert mean_error < 0.01
+
+
+@pytest.mark.parametrize('dtype', [np.uint8, np.uint16, np.float32])
+def test_dtypes_and_out(image, dtype):
+    converted = convert_image(image, dtype)
+    for method in METHODS:
+        out = np.empty_like(converted)
+        result = gaussian_blur(converted, 40.0, method, out=out)
+        assert result is out and result.dtype == dtype and result.shape == converted.shape
+
+
+def test_method_choice():
+    assert choose_method(kernel_sigma(EXACT_KERNEL)) == 'gaussian'
+    assert choose_method(kernel_sigma(EXACT_KERNEL + 2)) == 'box'
+    assert choose_method(90.0) == 'pyramid'
+
+
+def test_slider_range(image):
+    filters = ImageFilters()
+    # The range the slider always had is blurred exactly as before
+    assert np.array_equal(filters.apply_blur(image, 20), cv2.GaussianBlur(image, (21, 21), 0))
+    wide = filters.apply_blur(image, 600)
+    assert np.array_equal(blur_kernel(image, 601), wide)
+    # A 300 px radius leaves little but the average color
+    assert wide.std(axis=(0, 1)).max() < image.std(axis=(0, 1)).max() / 4
@@ -0,0 +1,115 @@
+"""Buffer pools and out= rendering"""
+import numpy as np
+import pytest
+
+from edit.buffer_pool import BUFFER_STATS, BufferPool
+from edit.edit_graph import EditGraph
+from edit.image_context import context_for
+from edit.image_filters import ImageFilters
+from edit.working_format import convert_image
+from effects import EFFECTS
+
+CASES = [(name, dtype) for name, effect in EFFECTS.items() for dtype in effect.native_dtypes]
+
+
+@pytest.fixture
+def image():
+    return np.random.default_rng(11).integers(0, 256, (45, 70, 3), dtype=np.uint8)
+
+
+def test_pool_reuses_by_shape_and_dtype():
+    pool = BufferPool()
+    first = pool.take((4, 5, 3), np.uint8)
+    pool.give(first)
+    assert pool.take((4, 5, 3), np.uint16) is not first
+    assert pool.take((4, 5, 3), np.uint8) is first
+    assert pool.free_bytes == 0
+
+
+def test_pool_skips_views_and_read_only_arrays():
+    pool = BufferPool()
+    frame = np.zeros((4, 6, 3), dtype=np.uint8)
+    pool.give(frame[:, :3])
+    frozen = np.zeros((4, 6, 3), dtype=np.uint8)
+    frozen.flags.writeable = False
+    pool.give(frozen)
+    assert pool.free_bytes == 0
+
+
+def test_pool_budget():
+    pool = BufferPool(budget=100)
+    pool.give(np.zeros(60, dtype=np.uint8))
+    pool.give(np.zeros(60, dtype=np.uint8))
+    assert pool.free_bytes == 60
+
+
+def test_given_buffers_lose_their_planes(image):
+    pool = BufferPool()
+    frame = image.copy()
+    stale = context_for(frame).get('gray')
+    pool.give(frame)
+    frame[:] = 0
+    assert context_for(frame).get('gray') is not stale
+
+
+@pytest.mark.parametrize('name,dtype', CASES)
+def test_effects_write_into_out(image, name, dtype):
+    effect = EFFECTS[name]
+    source = convert_image(image, dtype)
+    out = np.empty_like(source)
+    result = effect.apply(source, out=out)
+    assert result is out
+    np.testing.assert_array_equal(out, effect.apply(source))
+
+
+@pytest.mark.parametrize('method', ['adjust_brightness', 'adjust_contrast', 'adjust_saturation',
+                                    'adjust_sharpness', 'apply_blur'])
+def test_adjustments_write_into_out(image, method):
+    adjust = getattr(ImageFilters(), method)
+    out = np.empty_like(image)
+    assert adjust(image, 30, out=out) is out
+    np.testing.assert_array_equal(out, adjust(image, 30))
+
+
+def test_saturation_matches_per_channel_formula(image):
+    import cv2
+    h, s, v = cv2.split(cv2.cvtColor(image, cv2.COLOR_RGB2HSV))
+    s = np.clip(s * 1.4, 0, 255).astype(np.uint8)
+    expected = cv2.cvtColor(cv2.merge([h, s, v]), cv2.COLOR_HSV2RGB)
+    np.testing.assert_array_equal(ImageFilters().adjust_saturation(image, 40), expected)
+
+
+def build_graph(image):
+    graph = EditGraph()
+    graph.set_source(image)
+    graph.update_params(graph.adjustment('contrast').id, value=20)
+    graph.add_effect('sepia', {'intensity': 0.5})
+    # Unknown effects pass their input through unchanged
+    graph.add_effect('missing')
+    graph.add_effect('posterize', {'levels': 5})
+    return graph
+
+
+def test_preview_renders_reuse_outputs(image):
+    graph = build_graph(image)
+    reference = build_graph(image)
+    graph.proxy(0.5).render()
+    reused = BUFFER_STATS['reused']
+    for value in (10, -20, 35):
+        for g in (graph, reference):
+            g.update_params(g.adjustment('brightness').id, value=value)
+        preview = graph.proxy(0.5).render()
+        expected = reference.proxy(0.5)
+        expected.buffers = None
+        np.testing.assert_array_equal(preview, expected.render())
+    assert BUFFER_STATS['reused'] > reused
+
+
+def test_full_resolution_graph_keeps_its_outputs(image):
+    graph = build_graph(image)
+    first = graph.render()
+    kept = first.copy()
+    graph.update_params(graph.adjustment('brightness').id, value=25)
+    graph.render()
+    # History holds on to earlier renders of the main graph
+    np.testing.assert_array_equal(first, kept)
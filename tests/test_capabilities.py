@@ -0,0 +1,70 @@
+"""Capability registry and effect backend selection"""
+import numpy as np
+import pytest
+
+from algorithms import capabilities, numba_backend
+from effects import EFFECTS, get_backends
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Fresh selections and fallback counts"""
+    monkeypatch.setattr(capabilities, 'SELECTED', {})
+    monkeypatch.setattr(capabilities, 'FALLBACK_STATS', {})
+    return capabilities
+
+
+def test_probe_runs_once():
+    assert capabilities.capabilities() is capabilities.capabilities()
+    probed = capabilities.capabilities()
+    assert probed['cpus'] >= 1
+    assert 'xphoto.oilPainting' in probed['functions']
+
+
+def test_first_available_backend(registry, monkeypatch):
+    monkeypatch.setitem(registry.capabilities(), 'numba_enabled', False)
+    assert registry.select_backend('a', ('numba', 'numpy')) == 'numpy'
+    monkeypatch.setitem(registry.capabilities(), 'numba_enabled', True)
+    assert registry.select_backend('b', ('numba', 'numpy')) == 'numba'
+    # The choice is remembered
+    monkeypatch.setitem(registry.capabilities(), 'numba_enabled', False)
+    assert registry.select_backend('b', ('numba', 'numpy')) == 'numba'
+
+
+def test_oilpaint_without_xphoto(registry, monkeypatch):
+    monkeypatch.setitem(registry.capabilities()['functions'], 'xphoto.oilPainting', False)
+    effect = EFFECTS['oilpaint']
+    assert effect.backend(np.uint8) == 'custom'
+    image = np.random.default_rng(0).integers(0, 256, (40, 50, 3), dtype=np.uint8)
+    assert effect.apply(image, radius=2, intensity=3).shape == image.shape
+    assert registry.FALLBACK_STATS == {}
+
+
+def test_backends_per_dtype(registry, monkeypatch):
+    monkeypatch.setitem(registry.capabilities(), 'numba_enabled', True)
+    backends = get_backends(np.uint8)
+    assert backends['sepia'] == 'opencv'
+    assert backends['emboss'] == 'opencv'
+    assert backends['posterize'] == 'numba'
+    assert get_backends(np.uint16)['emboss'] == 'numba'
+
+
+def test_fallbacks_counted(registry, capsys):
+    registry.record_fallback('cartoon', ValueError('bad input'))
+    registry.record_fallback('cartoon', ValueError('bad input'))
+    assert registry.FALLBACK_STATS == {'cartoon': 2}
+    assert 'bad input' in capsys.readouterr().out
+    text = registry.report(get_backends())
+    assert 'OpenCV' in text
+    assert 'cartoon' in text and '(2 fallbacks)' in text
+
+
+def test_numba_backend_selected_but_disabled(registry, monkeypatch):
+    # A selected numba backend still needs compiled kernels; until then the
+    # NumPy path runs and gives the same result
+    monkeypatch.setitem(registry.capabilities(), 'numba_enabled', True)
+    monkeypatch.setattr(numba_backend, 'ENABLED', False)
+    image = np.random.default_rng(1).integers(0, 256, (30, 40, 3), dtype=np.uint8)
+    result = EFFECTS['posterize'].apply(image, levels=4)
+    assert EFFECTS['posterize'].backend(np.uint8) == 'numba'
+    assert len(np.unique(result)) <= 4
@@ -0,0 +1,59 @@
+"""Parameter-grid contact sheets"""
+import numpy as np
+import pytest
+
+from edit.edit_graph import EditNode
+from edit.image_filters import ImageFilters
+from utils.contact_sheet import (GAP, HEADER_HEIGHT, LABEL_WIDTH, axis_values, parse_axis,
+                                 render_contact_sheet)
+
+
+@pytest.fixture
+def image():
+    return np.random.default_rng(3).integers(0, 256, (60, 80, 3), dtype=np.uint8)
+
+
+def test_axis_range():
+    assert parse_axis('edge', 'threshold=10:100:4') == ('threshold', [10, 40, 70, 100])
+
+
+def test_axis_list():
+    param, values = parse_axis('glitch', 'intensity=0.1,0.5')
+    assert param == 'intensity'
+    assert values == [0.1, 0.5]
+
+
+def test_integer_axis_deduplicated():
+    assert axis_values('cartoon', 'style', 0, 2, 8) == [0, 1, 2]
+
+
+def test_unknown_param():
+    with pytest.raises(ValueError):
+        parse_axis('edge', 'radius=1:3:3')
+    with pytest.raises(ValueError):
+        parse_axis('edge', 'threshold')
+
+
+def test_sheet_layout(image):
+    sheet, stats = render_contact_sheet(image, 'edge', ('threshold', [10, 50, 90]),
+                                        cell_size=80)
+    assert stats['cells'] == 3
+    assert sheet.dtype == np.uint8
+    assert sheet.shape == (HEADER_HEIGHT * 2 + 60 + 2 * GAP, 3 * (80 + GAP) + GAP, 3)
+
+
+def test_cell_matches_direct_render(image):
+    sheet, _ = render_contact_sheet(image, 'posterize', ('levels', [2, 4]),
+                                    cell_size=80)
+    expected = EditNode('effect', 'posterize', {'levels': 4}).process(image, ImageFilters())
+    top = HEADER_HEIGHT * 2 + GAP
+    left = GAP + 80 + GAP
+    np.testing.assert_array_equal(sheet[top:top + 60, left:left + 80], expected)
+
+
+def test_grid_shares_planes(image):
+    sheet, stats = render_contact_sheet(image, 'cartoon', ('strength', [3, 7, 11]),
+                                        ('style', [1]), cell_size=80, workers=1)
+    assert stats['cells'] == 3
+    assert sheet.shape[1] == LABEL_WIDTH + 3 * (80 + GAP) + GAP
+    assert stats['planes_reused'] >= 2
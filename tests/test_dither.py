@@ -0,0 +1,102 @@
+"""Ordered dithering: threshold maps, their disk cache and quantization"""
+import os
+
+import numpy as np
+import pytest
+
+from algorithms import dither
+from algorithms.palette import BUILTIN_PALETTES, palette_array
+from effects import EFFECTS
+
+
+@pytest.fixture(autouse=True)
+def fresh_maps():
+    # Maps are cached per process; each test has its own cache directory
+    dither.threshold_map.cache_clear()
+    yield
+    dither.threshold_map.cache_clear()
+
+
+@pytest.fixture
+def image():
+    return np.random.default_rng(3).integers(0, 256, (150, 210, 3), dtype=np.uint8)
+
+
+def test_bayer_matrix():
+    assert dither.bayer_matrix(2).tolist() == [[0, 2], [3, 1]]
+    assert dither.bayer_matrix(4).tolist() == [[0, 8, 2, 10], [12, 4, 14, 6],
+                                               [3, 11, 1, 9], [15, 7, 13, 5]]
+    with pytest.raises(ValueError):
+        dither.bayer_matrix(6)
+
+
+@pytest.mark.parametrize('generator, size', [(dither.bayer_matrix, 16), (dither.clustered_dot, 8),
+                                             (dither.void_and_cluster, 32)])
+def test_maps_rank_every_cell_once(generator, size):
+    ranks = generator(size)
+    assert ranks.shape == (size, size)
+    assert np.array_equal(np.sort(ranks.ravel()), np.arange(size * size))
+
+
+def test_blue_noise_has_little_low_frequency_energy():
+    size = 64
+    ranks = dither.void_and_cluster(size)
+    frequencies = np.fft.fftfreq(size)
+    radius = np.hypot(frequencies[:, np.newaxis], frequencies[np.newaxis, :])
+    for fraction in (0.1, 0.5):
+        pattern = (ranks < fraction * size * size).astype(np.float64)
+        power = np.abs(np.fft.fft2(pattern - pattern.mean())) ** 2
+        assert power[(radius > 0) & (radius < 0.1)].mean() < power[radius > 0.3].mean() / 10
+
+
+def test_maps_are_cached_and_memory_mapped(app_home):
+    levels = dither.threshold_map('blue-noise', 64)
+    path = app_home / 'cache' / 'threshold_maps' / f'blue-noise-64-v{dither.MAP_VERSION}.npy'
+    assert path.exists() and isinstance(levels, np.memmap)
+    assert levels.dtype == np.uint8 and levels.shape == (64, 64)
+    expected = np.array(levels)
+    dither.threshold_map.cache_clear()
+    assert np.array_equal(dither.threshold_map('blue-noise', 64), expected)
+    # A damaged file is generated again (replaced, as maps of it may be open)
+    damaged = app_home / 'damaged.npy'
+    damaged.write_bytes(b'not a map')
+    os.replace(damaged, path)
+    dither.threshold_map.cache_clear()
+    assert np.array_equal(dither.threshold_map('blue-noise', 64), expected)
+
+
+@pytest.mark.parametrize('kind, size', dither.PATTERNS[:7])
+def test_flat_gray_keeps_its_average(kind, size):
+    for value in (40, 128, 200):
+        flat = np.full((128, 128, 3), value, dtype=np.uint8)
+        result = dither.dither_levels(flat, 2, kind, size)
+        assert set(np.unique(result)) <= {0, 255}
+        assert (result == 255).mean() == pytest.approx(value / 255, abs=1.5 / size ** 2 + 0.01)
+
+
+def test_levels(image):
+    result = dither.dither_levels(image, 4, 'bayer', 8)
+    assert set(np.unique(result)) <= {0, 85, 170, 255}
+    # Pixels already on a level are kept
+    on_levels = np.tile(np.array([0, 85, 170, 255], dtype=np.uint8), (20, 5, 3)).reshape(20, 20, 3)
+    assert np.array_equal(dither.dither_levels(on_levels, 4, 'blue-noise', 64), on_levels)
+
+
+def test_palette_output(image):
+    colors = palette_array(BUILTIN_PALETTES['gameboy'])
+    result = dither.dither_palette(image, colors, 'clustered', 8)
+    used = np.unique(result.reshape(-1, 3), axis=0)
+    assert all((colors == color).all(axis=1).any() for color in used)
+    assert dither.palette_spread(palette_array(BUILTIN_PALETTES['1-bit'])) == pytest.approx(255)
+
+
+@pytest.mark.parametrize('params', [{'pattern': 0}, {'pattern': 5, 'levels': 3},
+                                    {'pattern': 6, 'palette': 2}])
+def test_crops_match_frame(image, params):
+    effect = EFFECTS['dither']
+    full = effect.apply(image, **params)
+    box = (37, 21, 190, 140)
+    crop = effect.apply_crop(image[21:140, 37:190], box, (210, 150), **params)
+    assert np.array_equal(crop, full[21:140, 37:190])
+    out = np.empty_like(image)
+    assert effect.apply(image, out=out, **params) is out and np.array_equal(out, full)
@@ -0,0 +1,155 @@
+"""EditGraph invalidation, cache reuse and eviction"""
+import numpy as np
+import pytest
+
+from edit.edit_graph import EditGraph
+from effects import EFFECTS
+
+
+@pytest.fixture
+def image():
+    rng = np.random.default_rng(3)
+    return rng.integers(0, 256, (24, 32, 3), dtype=np.uint8)
+
+
+@pytest.fixture
+def graph(image):
+    graph = EditGraph()
+    graph.set_source(image)
+    return graph
+
+
+def evaluated_by(graph, action):
+    """Number of nodes evaluated while running action"""
+    before = graph.stats['evaluated']
+    action()
+    return graph.stats['evaluated'] - before
+
+
+def test_neutral_chain_returns_source(graph, image):
+    assert graph.render() is image
+    assert graph.stats['evaluated'] == 0
+
+
+def test_render_reuses_cached_output(graph):
+    graph.add_effect('negative')
+    graph.add_effect('posterize', {'levels': 3})
+    first = graph.render()
+    assert evaluated_by(graph, graph.render) == 0
+    assert graph.render() is first
+
+
+def test_update_invalidates_node_and_downstream(graph):
+    a = graph.add_effect('posterize', {'levels': 3})
+    b = graph.add_effect('negative')
+    c = graph.add_effect('sepia', {'intensity': 0.5})
+    graph.render()
+
+    graph.update_params(c.id, intensity=0.9)
+    assert a.output is not None and b.output is not None
+    assert evaluated_by(graph, graph.render) == 1
+
+    graph.update_params(a.id, levels=5)
+    assert evaluated_by(graph, graph.render) == 3
+
+
+def test_unchanged_params_keep_cache(graph):
+    node = graph.add_effect('posterize', {'levels': 3})
+    graph.render()
+    assert graph.update_params(node.id, levels=3) is False
+    assert node.output is not None
+
+
+def test_neutral_adjustment_does_not_invalidate(graph):
+    node = graph.add_effect('negative')
+    graph.render()
+    # Blur stays inactive at 0 and at negative values
+    graph.update_params(graph.adjustment('blur').id, value=-3)
+    assert node.output is not None
+
+
+def test_move_enable_and_remove_match_fresh_render(graph, image):
+    posterize = graph.add_effect('posterize', {'levels': 3})
+    sepia = graph.add_effect('sepia', {'intensity': 1.0})
+    graph.render()
+
+    graph.move_node(sepia.id, graph.index_of(posterize.id))
+    assert posterize.output is None and sepia.output is None
+    expected = EFFECTS['posterize'].apply(EFFECTS['sepia'].apply(image, intensity=1.0), levels=3)
+    assert np.array_equal(graph.render(), expected)
+
+    graph.set_enabled(sepia.id, False)
+    assert np.array_equal(graph.render(), EFFECTS['posterize'].apply(image, levels=3))
+
+    graph.set_enabled(sepia.id, True)
+    graph.remove_node(posterize.id)
+    assert np.array_equal(graph.render(), EFFECTS['sepia'].apply(image, intensity=1.0))
+
+
+def test_render_resumes_from_latest_cache(graph):
+    graph.add_effect('negative')
+    graph.add_effect('posterize', {'levels': 3})
+    last = graph.add_effect('sepia')
+    graph.render()
+    last.output = None
+    assert evaluated_by(graph, graph.render) == 1
+
+
+def test_lru_eviction_under_budget(graph, image):
+    nodes = [graph.add_effect('negative') for _ in range(4)]
+    graph.cache_budget = image.nbytes * 2
+    graph.render()
+    assert graph.cache_bytes <= graph.cache_budget
+    assert graph.stats['evicted'] == 2
+    # The final output is always kept, and the oldest outputs go first
+    assert nodes[-1].output is not None
+    assert nodes[0].output is None and nodes[1].output is None
+
+
+def test_restore_reuses_unchanged_prefix(graph):
+    first = graph.add_effect('posterize', {'levels': 3})
+    second = graph.add_effect('negative')
+    graph.render()
+    snapshot = graph.snapshot()
+    cached = first.output
+
+    graph.update_params(second.id, **{'unused': 1})
+    graph.restore(snapshot)
+    assert graph.find(first.id).output is cached
+    assert graph.find(second.id).output is None
+    assert evaluated_by(graph, graph.render) == 1
+
+
+def test_restore_seeds_final_output(graph, image):
+    graph.add_effect('negative')
+    snapshot = graph.snapshot()
+    output = 255 - image
+    graph.set_source(image)
+    graph.restore(snapshot, output=output)
+    assert evaluated_by(graph, graph.render) == 0
+    assert graph.render() is output
+
+
+def test_proxy_scales_spatial_params(graph):
+    graph.add_effect('pixelate', {'block_size': 16})
+    graph.add_effect('oilpaint', {'radius': 8, 'intensity': 5})
+    graph.add_effect('cartoon', {'strength': 15, 'style': 0})
+    proxy = graph.proxy(0.25)
+    params = [node.params for node in proxy.effect_nodes()]
+    assert params[0] == {'block_size': 4}
+    # Non-spatial params are untouched
+    assert params[1] == {'radius': 2, 'intensity': 5}
+    # Scaled values never drop below the parameter's minimum
+    assert params[2] == {'strength': 4, 'style': 0}
+    assert graph.proxy(0.125).effect_nodes()[2].params['strength'] == 3
+
+
+@pytest.mark.parametrize('dtype', [np.uint16, np.float32])
+def test_uint8_only_effect_keeps_working_format(image, dtype):
+    from edit.working_format import convert_image
+    graph = EditGraph()
+    graph.set_source(convert_image(image, dtype))
+    graph.update_params(graph.adjustment('saturation').id, value=30)
+    graph.add_effect('glitch', {'intensity': 0.5, 'seed': 1})
+    graph.add_effect('sepia')
+    assert graph.render().dtype == dtype
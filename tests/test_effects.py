@@ -0,0 +1,17 @@
+"""Behaviour shared by the registered effects"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from effects import EFFECTS
+
+
+def test_glitch_is_reproducible_across_threads():
+    image = np.random.default_rng(9).integers(0, 256, (120, 160, 3), dtype=np.uint8)
+    effect = EFFECTS['glitch']
+    expected = effect.apply(image, intensity=0.9, seed=4)
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(lambda seed: effect.apply(image, intensity=0.9, seed=seed),
+                                [4, 5, 4, 6, 4, 7, 4]))
+    for result in results[::2]:
+        assert np.array_equal(result, expected)
@@ -0,0 +1,32 @@
+"""Parallel batch export"""
+import numpy as np
+
+from utils.exporter import export_batch, output_paths
+from utils.image_loader import load_image, save_image
+
+
+def test_inputs_sharing_a_stem_get_their_own_file(tmp_path):
+    source = tmp_path / 'in'
+    source.mkdir()
+    red = np.zeros((8, 8, 3), dtype=np.uint8)
+    red[:, :, 0] = 255
+    blue = np.zeros((8, 8, 3), dtype=np.uint8)
+    blue[:, :, 2] = 255
+    save_image(str(source / 'a.png'), red)
+    save_image(str(source / 'a.bmp'), blue)
+    inputs = [str(source / 'a.png'), str(source / 'a.bmp')]
+    output = tmp_path / 'out'
+
+    result = export_batch(inputs, str(output), lambda image: image, extension='png', workers=2)
+
+    assert not result['failures']
+    assert sorted(p.name for p in output.iterdir()) == ['a-2.png', 'a.png']
+    assert result['renamed'] == [(inputs[1], str(output / 'a-2.png'))]
+    assert np.array_equal(load_image(str(output / 'a.png')), red)
+    assert np.array_equal(load_image(str(output / 'a-2.png')), blue)
+
+
+def test_output_paths():
+    outputs = output_paths(['x/a.png', 'y/a.png', 'z/A.jpg', 'b.jpg'], 'out', 'png')
+    assert outputs == ['out/a.png', 'out/a-2.png', 'out/A-3.png', 'out/b.png']
+    assert output_paths(['a.png', 'a.jpg'], 'out') == ['out/a.png', 'out/a.jpg']
@@ -0,0 +1,65 @@
+"""CMYK halftone screening"""
+import cv2
+import numpy as np
+import pytest
+
+from algorithms.halftone import SHAPES, THRESHOLD_STEPS, ink_plane, spot, spot_thresholds
+from edit.working_format import convert_image
+from effects import EFFECTS
+
+
+@pytest.fixture
+def image():
+    small = np.random.default_rng(5).integers(0, 256, (12, 16, 3), dtype=np.uint8)
+    return cv2.resize(small, (320, 240), interpolation=cv2.INTER_CUBIC)
+
+
+@pytest.mark.parametrize('shape', range(len(SHAPES)))
+def test_thresholds_cover_their_ink(shape):
+    table = spot_thresholds(shape)
+    assert np.all(np.diff(table) >= 0)
+    samples = (np.arange(250) + 0.5) / 250 - 0.5
+    values = spot(shape, samples[:, np.newaxis], samples[np.newaxis, :])
+    for coverage in (0.0, 0.1, 0.5, 0.9, 1.0):
+        inked = (values < table[int(coverage * THRESHOLD_STEPS)]).mean()
+        assert inked == pytest.approx(coverage, abs=0.01)
+
+
+def test_ink_plane():
+    colors = np.array([[[255, 255, 255], [0, 255, 255], [0, 0, 0], [255, 0, 0]]], dtype=np.uint8)
+    inks = ink_plane(cv2.resize(colors, (16, 4), interpolation=cv2.INTER_NEAREST), 4)
+    # White, cyan, black and red, as C, M, Y, K
+    assert np.allclose(inks[0], [[0, 0, 0, 0], [1, 0, 0, 0], [0, 0, 0, 1], [0, 1, 1, 0]])
+
+
+@pytest.mark.parametrize('shape', range(len(SHAPES)))
+def test_flat_colors_keep_their_tone(shape):
+    effect = EFFECTS['halftone']
+    for color in ([128, 128, 128], [200, 60, 90], [30, 160, 220]):
+        flat = np.full((240, 240, 3), color, dtype=np.uint8)
+        result = effect.apply(flat, cell_size=8, shape=shape)
+        assert np.abs(result.mean(axis=(0, 1)) - color).max() < 12
+
+
+@pytest.mark.parametrize('cell', [5, 8, 13])
+def test_crops_match_frame(image, cell):
+    effect = EFFECTS['halftone']
+    full = effect.apply(image, cell_size=cell)
+    margin = effect.context_margin(cell_size=cell)
+    x0, y0 = 4 * cell, 2 * cell
+    x1, y1 = min(320, x0 + 160), min(240, y0 + 150)
+    crop = effect.apply_crop(image[y0:y1, x0:x1], (x0, y0, x1, y1), (320, 240), cell_size=cell)
+    assert np.array_equal(crop[margin:-margin, margin:-margin],
+                          full[y0 + margin:y1 - margin, x0 + margin:x1 - margin])
+
+
+@pytest.mark.parametrize('dtype', [np.uint16, np.float32])
+def test_working_formats(image, dtype):
+    effect = EFFECTS['halftone']
+    expected = effect.apply(image, cell_size=7).astype(np.float32) / 255
+    converted = convert_image(image, dtype)
+    out = np.empty_like(converted)
+    result = effect.apply(converted, cell_size=7, out=out)
+    assert result is out and result.dtype == dtype
+    scale = 1.0 if dtype == np.float32 else 65535.0
+    assert np.abs(result.astype(np.float32) / scale - expected).mean() < 0.01
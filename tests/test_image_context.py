@@ -0,0 +1,74 @@
+"""Shared derived planes of an image"""
+import gc
+
+import cv2
+import numpy as np
+import pytest
+
+from edit import image_context
+from edit.image_context import CONTEXT_STATS, ContextCache, context_for
+from effects import EFFECTS
+
+
+@pytest.fixture
+def image():
+    return np.random.default_rng(2).integers(0, 256, (90, 120, 3), dtype=np.uint8)
+
+
+def test_planes_are_computed_once(image):
+    computed, reused = CONTEXT_STATS['computed'], CONTEXT_STATS['reused']
+    gray = context_for(image).get('gray')
+    assert np.array_equal(gray, cv2.cvtColor(image, cv2.COLOR_RGB2GRAY))
+    assert context_for(image).get('gray') is gray
+    assert not gray.flags.writeable
+    # A blur of the grayscale plane reuses it
+    blurred = context_for(image).get('gray_gaussian', 5, 0)
+    assert np.array_equal(blurred, cv2.GaussianBlur(gray, (5, 5), 0))
+    assert CONTEXT_STATS['computed'] - computed == 2
+    assert CONTEXT_STATS['reused'] - reused == 2
+
+
+def test_arguments_are_part_of_the_key(image):
+    context = context_for(image)
+    assert not np.array_equal(context.get('gray_median', 3), context.get('gray_median', 7))
+
+
+def test_planes_are_dropped_with_their_image():
+    # Not the fixture, which pytest keeps alive for the whole test
+    image = np.zeros((40, 50, 3), dtype=np.uint8)
+    cache = ContextCache()
+    cache.context(image).get('hsv')
+    assert cache.cache_bytes == image.nbytes
+    del image
+    gc.collect()
+    assert cache.cache_bytes == 0
+
+
+def test_invalidate_after_in_place_change(image):
+    first = context_for(image).get('mean')
+    image[:] = 7
+    image_context.invalidate(image)
+    assert np.allclose(context_for(image).get('mean'), 7)
+    assert not np.allclose(first, 7)
+
+
+def test_budget_evicts_least_recently_used(image):
+    cache = ContextCache(budget=image.nbytes)
+    cache.context(image).get('hsv')
+    cache.context(image).get('lab')
+    assert cache.cache_bytes == image.nbytes
+    computed = CONTEXT_STATS['computed']
+    cache.context(image).get('lab')
+    assert CONTEXT_STATS['computed'] == computed
+
+
+@pytest.mark.parametrize('name, params', [
+    ('edge', {}), ('cartoon', {'style': 0}), ('cartoon', {'style': 1}),
+    ('cartoon', {'style': 2}), ('watercolor', {}), ('grayscale', {}), ('hdr', {}),
+])
+def test_effects_match_uncached_result(image, name, params):
+    effect = EFFECTS[name]
+    first = effect.apply(image, **params)
+    # Second run is served from the context; an identical copy is not
+    assert np.array_equal(effect.apply(image, **params), first)
+    assert np.array_equal(effect.apply(image.copy(), **params), first)
@@ -0,0 +1,55 @@
+"""Loading and saving images at their bit depth"""
+import cv2
+import numpy as np
+import pytest
+
+from edit.working_format import convert_image
+from utils.image_loader import decode_image, encode_image, load_image, save_image
+
+
+@pytest.fixture
+def deep():
+    # Values 8 bits cannot hold, different in each channel
+    rng = np.random.default_rng(3)
+    return rng.integers(0, 65536, (21, 34, 3), dtype=np.uint16)
+
+
+@pytest.mark.parametrize('ext', ['.png', '.tif', '.tiff'])
+def test_16_bit_round_trip(tmp_path, deep, ext):
+    path = str(tmp_path / f"deep{ext}")
+    save_image(path, deep)
+    assert cv2.imread(path, cv2.IMREAD_UNCHANGED).dtype == np.uint16
+
+    loaded = load_image(path, 'uint16')
+    assert loaded.dtype == np.uint16
+    assert np.array_equal(loaded, deep)
+    # In float32 the same values come back as fractions of 65535
+    assert np.array_equal(convert_image(load_image(path, 'float32'), np.uint16), deep)
+    # The 8-bit working format is the top byte, rounded
+    assert np.array_equal(load_image(path, 'uint8'), convert_image(deep, np.uint8))
+
+
+def test_float_images_are_saved_at_16_bits(tmp_path, deep):
+    path = str(tmp_path / 'float.png')
+    save_image(path, convert_image(deep, np.float32))
+    assert np.array_equal(load_image(path, 'uint16'), deep)
+
+
+def test_16_bit_round_trip_in_memory(deep):
+    data = encode_image(deep, '.PNG')
+    assert np.array_equal(decode_image(data, 'uint16'), deep)
+
+
+def test_16_bit_grayscale_file(tmp_path, deep):
+    path = str(tmp_path / 'gray.png')
+    cv2.imwrite(path, deep[:, :, 0])
+    loaded = load_image(path, 'uint16')
+    assert loaded.shape == deep.shape
+    assert np.array_equal(loaded, np.repeat(deep[:, :, :1], 3, axis=2))
+
+
+def test_8_bit_formats_keep_8_bits(tmp_path, deep):
+    path = str(tmp_path / 'flat.bmp')
+    save_image(path, deep)
+    assert cv2.imread(path, cv2.IMREAD_UNCHANGED).dtype == np.uint8
+    assert np.array_equal(load_image(path), convert_image(deep, np.uint8))
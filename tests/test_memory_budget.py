@@ -0,0 +1,114 @@
+"""Peak-memory accounting and the memory budget"""
+import numpy as np
+import pytest
+
+from edit import memory_budget
+from edit.edit_graph import EditNode
+from edit.image_filters import ImageFilters
+from edit.memory_budget import (MEMORY_STATS, MemoryBudget, MemoryBudgetError, MemoryProfile,
+                                apply_in_strips)
+from effects import EFFECTS
+from effects.base import BaseEffect
+
+TILEABLE = [name for name, effect in EFFECTS.items()
+            if effect.tileable(**{key: spec['default'] for key, spec in effect.params.items()})]
+
+
+@pytest.fixture
+def image():
+    return np.random.default_rng(5).integers(0, 256, (97, 131, 3), dtype=np.uint8)
+
+
+@pytest.fixture(autouse=True)
+def unknown_available_memory(monkeypatch):
+    monkeypatch.setattr(memory_budget, 'available_memory', lambda: None)
+
+
+class GreedyEffect(BaseEffect):
+    """Runs out of memory on anything but small strips"""
+
+    def tileable(self, **kwargs):
+        return True
+
+    def apply(self, image, out=None, **kwargs):
+        if image.shape[0] > 40:
+            raise MemoryError()
+        return self.write_output(255 - image, out)
+
+
+@pytest.mark.parametrize('name', TILEABLE)
+def test_strips_match_whole_frame(image, name):
+    effect = EFFECTS[name]
+    params = {key: spec['default'] for key, spec in effect.params.items()}
+    np.testing.assert_array_equal(apply_in_strips(effect, image, params, 5),
+                                  effect.apply(image, **params))
+
+
+def test_non_local_effects_are_not_tileable():
+    assert not EFFECTS['glitch'].tileable()
+    assert not EFFECTS['hdr'].tileable()
+    assert not EFFECTS['palette'].tileable(palette=0)
+
+
+def test_profile_estimates_from_measurements(image):
+    profile = MemoryProfile()
+    assert profile.estimate('sepia', image) == int(image.nbytes * memory_budget.DEFAULT_FACTOR)
+    profile.record('sepia', np.uint8, 4_000_000, 1_000_000)
+    profile.record('sepia', np.uint8, 1_000_000, 1_000_000)
+    assert profile.bytes_per_megapixel('sepia', np.uint8) == 4_000_000
+    assert profile.estimate('sepia', image) == int(4 * 97 * 131)
+    # Small images are not representative
+    profile.record('negative', np.uint8, 10 ** 9, 1000)
+    assert profile.bytes_per_megapixel('negative', np.uint8) is None
+
+
+def test_profile_is_saved():
+    MemoryProfile(persistent=True).record('emboss', np.uint16, 6_000_000, 1_000_000)
+    assert MemoryProfile(persistent=True).bytes_per_megapixel('emboss', np.uint16) == 6_000_000
+
+
+def test_first_large_call_is_measured():
+    budget = MemoryBudget()
+    large = np.zeros((600, 500, 3), dtype=np.uint8)
+    budget.run('negative', EFFECTS['negative'], large, {})
+    # At least the output frame was traced
+    assert budget.profile.bytes_per_megapixel('negative', np.uint8) >= 3_000_000
+
+
+def test_over_budget_renders_in_strips(image):
+    budget = MemoryBudget(limit=image.nbytes * 2)
+    tiled = MEMORY_STATS['tiled']
+    result = budget.run('emboss', EFFECTS['emboss'], image, {})
+    assert MEMORY_STATS['tiled'] == tiled + 1
+    np.testing.assert_array_equal(result, EFFECTS['emboss'].apply(image))
+
+
+def test_strict_budget_refuses(image):
+    budget = MemoryBudget(limit=image.nbytes, strict=True)
+    with pytest.raises(MemoryBudgetError):
+        budget.run('glitch', EFFECTS['glitch'], image, {})
+
+
+def test_lenient_budget_warns(image, capsys):
+    budget = MemoryBudget(limit=image.nbytes)
+    result = budget.run('glitch', EFFECTS['glitch'], image, {'seed': 3})
+    assert 'Warning' in capsys.readouterr().out
+    np.testing.assert_array_equal(result, EFFECTS['glitch'].apply(image, seed=3))
+
+
+def test_memory_error_falls_back_to_strips(image):
+    result = MemoryBudget().run('greedy', GreedyEffect(), image, {})
+    np.testing.assert_array_equal(result, 255 - image)
+
+
+def test_edit_node_uses_budget(image, monkeypatch):
+    monkeypatch.setattr(memory_budget, 'BUDGET', MemoryBudget(limit=image.nbytes, strict=True))
+    with pytest.raises(MemoryBudgetError):
+        EditNode('effect', 'hdr').process(image, ImageFilters())
+
+
+def test_glitch_noise_bands_do_not_change_result(image, monkeypatch):
+    from effects import glitch
+    expected = EFFECTS['glitch'].apply(image, intensity=1.0, seed=7)
+    monkeypatch.setattr(glitch, 'NOISE_BAND_ROWS', 10)
+    np.testing.assert_array_equal(EFFECTS['glitch'].apply(image, intensity=1.0, seed=7), expected)
@@ -0,0 +1,75 @@
+"""Numba kernels must match the NumPy paths they replace"""
+import numpy as np
+import pytest
+
+pytest.importorskip('numba')
+
+from algorithms import capabilities, numba_backend
+from edit.image_filters import ImageFilters
+from edit.working_format import WORKING_FORMATS, convert_image
+from effects import EFFECTS
+
+filters = ImageFilters()
+OPERATIONS = {
+    'brightness': lambda image: filters.adjust_brightness(image, 25),
+    'darken': lambda image: filters.adjust_brightness(image, -40),
+    'contrast': lambda image: filters.adjust_contrast(image, 40),
+    'low_contrast': lambda image: filters.adjust_contrast(image, -60),
+    'posterize': lambda image: EFFECTS['posterize'].apply(image, levels=3),
+    'vignette': lambda image: EFFECTS['vignette'].apply(image, intensity=0.8),
+    'emboss': lambda image: EFFECTS['emboss'].apply(image),
+    'halftone': lambda image: EFFECTS['halftone'].apply(image, cell_size=6, shape=1),
+}
+# Operations that only use a kernel for some working formats
+KERNEL_FORMATS = {'emboss': ('uint16',)}
+CASES = [(operation, working_format) for operation in OPERATIONS for working_format in WORKING_FORMATS
+         if working_format in KERNEL_FORMATS.get(operation, WORKING_FORMATS)]
+
+
+@pytest.fixture(scope='module', autouse=True)
+def warm_kernels():
+    numba_backend.warmup()
+
+
+def backends(position):
+    """Every effect on the backend at a position of its preference list"""
+    return {f"{effect.__class__.__name__}:{np.dtype(dtype).name}": effect.backends(np.dtype(dtype))[position]
+            for effect in EFFECTS.values() for dtype in WORKING_FORMATS.values()}
+
+
+def sample(dtype):
+    rng = np.random.default_rng(7)
+    # Odd sizes exercise the stencil borders and uneven row splits
+    return convert_image(rng.integers(0, 256, (37, 53, 3), dtype=np.uint8), dtype)
+
+
+@pytest.mark.parametrize('operation, working_format', CASES)
+def test_matches_numpy(monkeypatch, working_format, operation):
+    image = sample(WORKING_FORMATS[working_format])
+    assert numba_backend.ready(image.dtype)
+
+    # Backends are chosen once per process, so choose them for each run here
+    monkeypatch.setattr(numba_backend, 'ENABLED', False)
+    monkeypatch.setattr(capabilities, 'SELECTED', backends(-1))
+    expected = OPERATIONS[operation](image)
+    monkeypatch.setattr(numba_backend, 'ENABLED', True)
+    monkeypatch.setattr(capabilities, 'SELECTED', backends(0))
+    result = OPERATIONS[operation](image)
+
+    assert result.dtype == expected.dtype
+    assert result.shape == expected.shape
+    # Float rounding may differ by one level when truncating to integers
+    tolerance = 1e-5 if working_format == 'float32' else 1
+    diff = np.abs(result.astype(np.float64) - expected.astype(np.float64))
+    assert diff.max() <= tolerance
+
+
+def test_non_contiguous_input():
+    image = sample(np.uint8)[:, 5:40]
+    result = EFFECTS['emboss'].apply(image)
+    assert result.shape == image.shape
+
+
+def test_disabled_backend_is_not_ready(monkeypatch):
+    monkeypatch.setattr(numba_backend, 'ENABLED', False)
+    assert not numba_backend.ready(np.uint8)
@@ -0,0 +1,76 @@
+"""Palette quantization: lookup tables, palette files and adaptive palettes"""
+import numpy as np
+import pytest
+
+from algorithms import palette
+from effects import EFFECTS
+
+
+@pytest.mark.parametrize('space', palette.COLOR_SPACES)
+def test_table_matches_brute_force_at_cell_centres(space):
+    colors = palette.palette_array(palette.BUILTIN_PALETTES['pico-8'])
+    bits = 4
+    centres = np.arange(16) * 16 + 8
+    grid = np.stack(np.meshgrid(centres, centres, centres, indexing='ij'), axis=-1)
+    image = grid.reshape(64, 64, 3).astype(np.uint8)
+
+    result = palette.apply_palette(image, colors, space, bits=bits)
+
+    points = palette.to_color_space(image.reshape(-1, 3), space).astype(np.float64)
+    targets = palette.to_color_space(colors, space).astype(np.float64)
+    distances = ((points[:, None, :] - targets[None, :, :]) ** 2).sum(axis=2)
+    chosen = ((result.reshape(-1, 1, 3) == colors[None]).all(axis=2)).argmax(axis=1)
+    # Ties may resolve either way; the chosen color must be as close as the best
+    best = distances.min(axis=1)
+    assert np.allclose(distances[np.arange(len(points)), chosen], best, rtol=1e-4, atol=1e-6)
+
+
+def test_output_only_uses_palette_colors():
+    image = np.random.default_rng(1).integers(0, 256, (50, 70, 3), dtype=np.uint8)
+    colors = palette.palette_array(palette.BUILTIN_PALETTES['gameboy'])
+    result = palette.apply_palette(image, colors)
+    assert result.shape == image.shape and result.dtype == np.uint8
+    used = np.unique(result.reshape(-1, 3), axis=0)
+    assert all((colors == color).all(axis=1).any() for color in used)
+
+
+def test_load_palette_formats(tmp_path):
+    (tmp_path / 'a.hex').write_text('ff0000\n00ff00\n\n0000ff\n')
+    (tmp_path / 'b.gpl').write_text('GIMP Palette\nName: test\nColumns: 2\n#\n255   0   0\tRed\n  0 255   0\tGreen\n')
+    (tmp_path / 'c.json').write_text('{"colors": ["#ff0000", [0, 255, 0]]}')
+    assert palette.load_palette(str(tmp_path / 'a.hex')).tolist() == [[255, 0, 0], [0, 255, 0], [0, 0, 255]]
+    assert palette.load_palette(str(tmp_path / 'b.gpl')).tolist() == [[255, 0, 0], [0, 255, 0]]
+    assert palette.load_palette(str(tmp_path / 'c.json')).tolist() == [[255, 0, 0], [0, 255, 0]]
+
+
+def test_user_palettes_follow_builtins(app_home):
+    directory = app_home / 'data' / 'palettes'
+    directory.mkdir(parents=True)
+    (directory / 'mine.hex').write_text('#123456\n#abcdef\n')
+    (directory / 'broken.hex').write_text('nonsense\n')
+    names = list(palette.available_palettes())
+    assert names[:len(palette.BUILTIN_PALETTES)] == list(palette.BUILTIN_PALETTES)
+    assert 'mine' in names and 'broken' not in names
+
+
+def test_median_cut_and_kmeans():
+    rng = np.random.default_rng(3)
+    clusters = np.array([[20, 30, 200], [220, 40, 40], [30, 200, 60]], dtype=np.uint8)
+    pixels = np.repeat(clusters, 500, axis=0).astype(np.int16) + rng.integers(-5, 6, (1500, 3))
+    pixels = np.clip(pixels, 0, 255).astype(np.uint8)
+
+    assert len(palette.median_cut(pixels, 8)) <= 8
+    assert len(palette.median_cut(np.zeros((10, 3), np.uint8), 8)) == 1
+
+    centres = palette.kmeans_palette(pixels, 3)
+    assert np.array_equal(centres, palette.kmeans_palette(pixels, 3))
+    for cluster in clusters:
+        assert np.abs(centres.astype(int) - cluster).max(axis=1).min() <= 6
+
+
+def test_palette_effect_adaptive_colors():
+    image = np.random.default_rng(5).integers(0, 256, (40, 60, 3), dtype=np.uint8)
+    effect = EFFECTS['palette']
+    result = effect.apply(image, palette=0, colors=6, space=2)
+    assert len(np.unique(result.reshape(-1, 3), axis=0)) <= 6
+    assert effect.params['palette']['max'] == len(palette.available_palettes()) + 1
@@ -0,0 +1,114 @@
+"""Project files"""
+import os
+import zipfile
+
+import numpy as np
+import pytest
+
+from edit.edit_graph import EditGraph
+from edit.project import load_project, read_manifest, read_preview, render_project, save_project
+from edit.recipe import load_recipe
+from utils.image_loader import save_image
+
+
+@pytest.fixture
+def image():
+    return np.random.default_rng(5).integers(0, 256, (90, 120, 3), dtype=np.uint8)
+
+
+@pytest.fixture
+def graph(image):
+    graph = EditGraph()
+    graph.set_source(image)
+    graph.adjustment('contrast').params['value'] = 20
+    graph.add_effect('posterize', {'levels': 4})
+    return graph
+
+
+def test_referenced_original(tmp_path, image, graph):
+    source = str(tmp_path / 'photo.png')
+    save_image(source, image)
+    project_path = str(tmp_path / 'edit.dgproj')
+    save_project(project_path, graph, source_path=source)
+
+    manifest = read_manifest(project_path)
+    assert manifest['original'] is None
+    assert manifest['size'] == [120, 90]
+    assert manifest['recipe']['adjustments']['contrast'] == 20
+    assert read_preview(project_path).shape == (90, 120, 3)
+
+    project = load_project(project_path)
+    assert project.source_path == source
+    np.testing.assert_array_equal(project.graph().render(), graph.render())
+
+
+def test_moved_with_original(tmp_path, image, graph):
+    os.makedirs(tmp_path / 'a')
+    source = str(tmp_path / 'a' / 'photo.png')
+    save_image(source, image)
+    save_project(str(tmp_path / 'a' / 'edit.dgproj'), graph, source_path=source)
+    os.rename(tmp_path / 'a', tmp_path / 'b')
+    project = load_project(str(tmp_path / 'b' / 'edit.dgproj'))
+    assert project.source_path == os.path.join(str(tmp_path / 'b'), 'photo.png')
+
+
+def test_missing_original(tmp_path, image, graph):
+    source = str(tmp_path / 'photo.png')
+    save_image(source, image)
+    save_project(str(tmp_path / 'edit.dgproj'), graph, source_path=source)
+    os.remove(source)
+    with pytest.raises(IOError):
+        load_project(str(tmp_path / 'edit.dgproj'))
+
+
+def test_embedded_original_and_render(tmp_path, image, graph):
+    project_path = str(tmp_path / 'edit.dgproj')
+    result = graph.render()
+    save_project(project_path, graph, result, store_render=True)
+    with zipfile.ZipFile(project_path) as archive:
+        assert {'project.json', 'preview.jpg', 'original.png', 'render.npy'} <= set(archive.namelist())
+
+    project = load_project(project_path)
+    np.testing.assert_array_equal(project.original, image)
+    loaded = project.graph()
+    # The stored result is used as is
+    np.testing.assert_array_equal(loaded.render(), result)
+    assert loaded.stats['evaluated'] == 0
+    np.testing.assert_array_equal(render_project(project_path), result)
+
+
+def test_stale_render_ignored(tmp_path, image, graph):
+    source = str(tmp_path / 'photo.png')
+    save_image(source, image)
+    project_path = str(tmp_path / 'edit.dgproj')
+    save_project(project_path, graph, source_path=source, store_render=True)
+    save_image(source, 255 - image)
+    os.utime(source, ns=(0, 10 ** 9))
+    project = load_project(project_path)
+    assert project.render is None
+    np.testing.assert_array_equal(project.original, 255 - image)
+
+
+def test_float_original(tmp_path):
+    original = np.random.default_rng(1).random((40, 50, 3), dtype=np.float32)
+    graph = EditGraph()
+    graph.set_source(original)
+    save_project(str(tmp_path / 'edit.dgproj'), graph, working_format='float32')
+    project = load_project(str(tmp_path / 'edit.dgproj'))
+    assert project.working_format == 'float32'
+    np.testing.assert_array_equal(project.original, original)
+
+
+def test_recipe_from_project(tmp_path, graph):
+    project_path = str(tmp_path / 'edit.dgproj')
+    save_project(project_path, graph)
+    recipe = load_recipe(project_path)
+    assert recipe['effects'] == [{'name': 'posterize', 'params': {'levels': 4}}]
+
+
+def test_not_a_project(tmp_path):
+    path = str(tmp_path / 'broken.dgproj')
+    with open(path, 'wb') as f:
+        f.write(b'nope')
+    with pytest.raises(ValueError):
+        read_manifest(path)
@@ -0,0 +1,63 @@
+"""Frame-budget scheduling of slider previews"""
+from edit.render_scheduler import PREVIEW_SCALES, RenderScheduler
+
+FRAME = 4000 * 3000
+
+
+def test_changes_during_a_drag_are_superseded():
+    scheduler = RenderScheduler()
+    scheduler.begin_drag()
+    assert scheduler.request(FRAME) is not None
+    # The pending preview reads the latest slider values when it starts
+    assert scheduler.request(FRAME) is None
+    assert scheduler.request(FRAME) is None
+    assert scheduler.start_render() is True
+    # Changes made while it renders get the next preview
+    assert scheduler.request(FRAME) is not None
+    assert scheduler.request(FRAME) is None
+
+
+def test_changes_outside_a_drag_restart_the_timer():
+    scheduler = RenderScheduler()
+    assert scheduler.request(FRAME) is not None
+    assert scheduler.request(FRAME) is not None
+    assert scheduler.start_render() is False
+
+
+def test_drag_ends_with_a_full_render():
+    scheduler = RenderScheduler()
+    scheduler.begin_drag()
+    scheduler.request(FRAME)
+    assert scheduler.start_render() is True
+    scheduler.request(FRAME)
+    scheduler.end_drag()
+    # The refinement replaces the preview still pending and starts at once
+    assert scheduler.refine() == 0
+    assert scheduler.start_render() is False
+    assert not scheduler.pending
+
+
+def test_scale_fits_the_frame_budget():
+    scheduler = RenderScheduler(target_fps=30)
+    assert scheduler.choose_scale(FRAME) == 0.5
+    assert scheduler.choose_scale(640 * 480) == 1.0
+
+    # 10 ns per pixel: 120 ms for the whole frame, so the largest scale
+    # rendering within 80% of the 33 ms budget is 0.35
+    scheduler.record(0.12, FRAME)
+    scale = scheduler.choose_scale(FRAME)
+    assert scale == 0.35
+    assert scheduler.expected_latency(FRAME * scale * scale) <= scheduler.frame_budget * 0.8
+    assert scheduler.expected_latency(FRAME * 0.5 ** 2) > scheduler.frame_budget * 0.8
+    assert scheduler.choose_scale(640 * 480) == 1.0
+    # Slower renders move down the ladder, never below its last step
+    scheduler.record(100.0, FRAME)
+    assert scheduler.choose_scale(FRAME) == PREVIEW_SCALES[-1]
+
+
+def test_debounce_uses_what_is_left_of_the_budget():
+    scheduler = RenderScheduler(target_fps=30, max_debounce_ms=100)
+    assert scheduler.debounce_interval_ms(FRAME) == 33
+    scheduler.record(0.02, 1_000_000)
+    assert scheduler.debounce_interval_ms(1_000_000) == 13
+    assert scheduler.debounce_interval_ms(FRAME) == 0
@@ -0,0 +1,176 @@
+"""Render server, exercised with a local HTTP client"""
+import base64
+import http.client
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+import numpy as np
+import pytest
+
+from edit.recipe import apply_recipe
+from utils import render_server
+from utils.image_loader import decode_image, encode_image
+from utils.render_server import RenderServer, UnixHTTPConnection
+
+RECIPE = {'adjustments': {'brightness': 10}, 'effects': [{'name': 'sepia', 'params': {'intensity': 0.5}}]}
+
+
+@pytest.fixture
+def image():
+    return np.random.default_rng(4).integers(0, 256, (48, 64, 3), dtype=np.uint8)
+
+
+@pytest.fixture
+def threaded_server():
+    """Server on an ephemeral port with a thread pool, so render_job can be patched"""
+    servers = []
+
+    def start(**kwargs):
+        workers = kwargs.pop('workers', 2)
+        server = RenderServer(port=0, workers=workers,
+                              executor=ThreadPoolExecutor(workers), **kwargs).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+        server.executor.shutdown(wait=True)
+
+
+def request(server, method, path, body=None, headers=None):
+    connection = http.client.HTTPConnection(*server.address, timeout=30)
+    connection.request(method, path, body=body, headers=headers or {})
+    response = connection.getresponse()
+    data = response.read()
+    connection.close()
+    return response.status, data
+
+
+def post_json(server, payload):
+    return request(server, 'POST', '/render', json.dumps(payload),
+                   {'Content-Type': 'application/json'})
+
+
+def test_process_pool_render_matches_local(image):
+    server = RenderServer(port=0, workers=1).start()
+    try:
+        payload = {'image': base64.b64encode(encode_image(image, '.png')).decode(),
+                   'recipe': RECIPE, 'format': 'png'}
+        status, data = post_json(server, payload)
+        assert status == 200
+        # Workers may use the Numba kernels, which round within one level
+        difference = decode_image(data).astype(int) - apply_recipe(image, RECIPE)
+        assert np.abs(difference).max() <= 1
+        metrics = json.loads(request(server, 'GET', '/metrics')[1])
+        assert metrics['completed'] == 1 and metrics['latency_ms']['p50'] is not None
+    finally:
+        server.stop()
+
+
+def test_raw_upload_with_query_effects(threaded_server, image):
+    server = threaded_server()
+    query = urlencode({'effects': json.dumps([{'name': 'negative', 'params': {}}]), 'format': 'bmp'})
+    status, data = request(server, 'POST', f'/render?{query}',
+                           encode_image(image, '.png'), {'Content-Type': 'image/png'})
+    assert status == 200 and data[:2] == b'BM'
+    assert np.array_equal(decode_image(data), 255 - image)
+
+
+def test_bad_requests(threaded_server, image, tmp_path):
+    server = threaded_server(allowed_roots=[str(tmp_path)])
+    assert post_json(server, {'effects': []})[0] == 400
+    assert post_json(server, {'path': '/etc/hostname', 'effects': []})[0] == 403
+    assert post_json(server, {'path': str(tmp_path / 'missing.png'), 'effects': []})[0] == 404
+    assert post_json(server, {'image': 'not base64!', 'effects': []})[0] == 400
+    encoded = base64.b64encode(encode_image(image, '.png')).decode()
+    assert post_json(server, {'image': encoded, 'effects': [{'name': 'nope'}]})[0] == 400
+    assert post_json(server, {'image': encoded, 'effects': [], 'format': 'gif'})[0] == 400
+    assert post_json(server, {'image': base64.b64encode(b'junk').decode(), 'effects': []})[0] == 422
+    assert request(server, 'GET', '/nothing')[0] == 404
+
+
+@pytest.mark.parametrize('payload', [
+    {'effects': 'sepia'},
+    {'effects': ['sepia']},
+    {'effects': [{'name': ['sepia']}]},
+    {'effects': [{'name': 'sepia', 'params': [0.5]}]},
+    {'recipe': []},
+    {'recipe': {'adjustments': ['brightness']}},
+    {'recipe': {'adjustments': {'brightness': 'high'}}},
+    {'effects': [], 'timeout': [1]},
+    {'effects': [], 'timeout': 'soon'},
+    {'effects': [], 'timeout': -1},
+    {'effects': [], 'format': ['png']},
+    {'effects': [], 'options': 'fast'},
+])
+def test_malformed_requests(threaded_server, image, payload):
+    server = threaded_server()
+    payload = dict(payload, image=base64.b64encode(encode_image(image, '.png')).decode())
+    status, data = post_json(server, payload)
+    assert status == 400
+    assert json.loads(data)['error']
+
+
+def test_supplied_executor_is_not_replaced(threaded_server):
+    server = threaded_server()
+    executor = server.executor
+    assert server._restart_executor() is False
+    assert server.executor is executor
+
+
+def test_path_input(threaded_server, image, tmp_path):
+    (tmp_path / 'in.png').write_bytes(encode_image(image, '.png'))
+    server = threaded_server(allowed_roots=[str(tmp_path)])
+    status, data = post_json(server, {'path': str(tmp_path / 'in.png'), 'effects': []})
+    assert status == 200 and np.array_equal(decode_image(data), image)
+
+
+def test_backpressure_and_timeouts(threaded_server, image, monkeypatch):
+    release = threading.Event()
+    started = threading.Semaphore(0)
+
+    def slow_job(*args):
+        started.release()
+        release.wait(10)
+        return b'done'
+
+    monkeypatch.setattr(render_server, 'render_job', slow_job)
+    server = threaded_server(workers=1, queue_size=0, timeout=0.2)
+    payload = {'image': base64.b64encode(encode_image(image, '.png')).decode(), 'effects': []}
+
+    # The only slot is taken by a render that outlives its timeout
+    assert post_json(server, payload)[0] == 504
+    assert started.acquire(timeout=5)
+    assert post_json(server, payload)[0] == 503
+    metrics = json.loads(request(server, 'GET', '/metrics')[1])
+    assert metrics['timeouts'] == 1 and metrics['rejected'] == 1 and metrics['running'] == 1
+
+    release.set()
+    server.timeout = 5
+    for _ in range(50):
+        if json.loads(request(server, 'GET', '/metrics')[1])['pending'] == 0:
+            break
+        threading.Event().wait(0.05)
+    assert post_json(server, payload) == (200, b'done')
+
+
+def test_unix_socket(tmp_path, image):
+    socket_path = str(tmp_path / 'render.sock')
+    server = RenderServer(socket_path=socket_path, workers=1,
+                          executor=ThreadPoolExecutor(1)).start()
+    try:
+        connection = UnixHTTPConnection(socket_path, timeout=30)
+        connection.request('GET', '/health')
+        assert connection.getresponse().read() == b'ok'
+        connection.request('POST', '/render?effects=[]', body=encode_image(image, '.png'),
+                           headers={'Content-Type': 'image/png'})
+        response = connection.getresponse()
+        assert response.status == 200
+        assert np.array_equal(decode_image(response.read()), image)
+        connection.close()
+    finally:
+        server.stop()
+        server.executor.shutdown(wait=True)
@@ -0,0 +1,96 @@
+"""Histogram and waveform scopes"""
+import cv2
+import numpy as np
+import pytest
+
+from edit.edit_graph import EditGraph
+from utils.scopes import SAMPLE_PIXELS, ScopeAnalyzer, compute_scopes, pointwise_steps, sample
+
+
+@pytest.fixture
+def image():
+    # Smooth, so brightness and contrast move whole ranges of bins
+    small = np.random.default_rng(2).integers(40, 216, (12, 16, 3), dtype=np.uint8)
+    return cv2.resize(small, (320, 240), interpolation=cv2.INTER_LINEAR)
+
+
+def _graph(image):
+    graph = EditGraph()
+    graph.set_source(image)
+    return graph
+
+
+def test_sample_size():
+    image = np.zeros((3000, 4000, 3), dtype=np.uint16)
+    pixels = sample(image)
+    assert pixels.dtype == np.uint8 and pixels.flags['C_CONTIGUOUS']
+    assert pixels.shape[0] * pixels.shape[1] <= SAMPLE_PIXELS
+
+
+def test_histogram_totals(image):
+    scopes = compute_scopes(image)
+    for name in ('red', 'green', 'blue', 'luma'):
+        assert scopes[name].sum() == image.shape[0] * image.shape[1]
+    assert scopes['waveform'].shape == (256, image.shape[1])
+    assert np.all(scopes['waveform'].sum(axis=0) == image.shape[0])
+
+
+@pytest.mark.parametrize('brightness, contrast', [(25, 0), (0, 40), (-20, 30), (10, -50)])
+def test_remapped_matches_recomputed(image, brightness, contrast):
+    graph = _graph(image)
+    graph.adjustment('brightness').params['value'] = brightness
+    graph.adjustment('contrast').params['value'] = contrast
+    result = graph.render()
+
+    analyzer = ScopeAnalyzer()
+    remapped = analyzer.compute(analyzer.prepare(graph, result))
+    assert analyzer.stats['remapped'] == 0  # The first update computes the base
+    expected = compute_scopes(result)
+    for name in ('red', 'green', 'blue'):
+        # The remapped scopes come from a sample and bins may be off by one
+        # from rounding; compare cumulative fractions
+        remapped_cdf = np.cumsum(remapped[name]) / remapped[name].sum()
+        expected_cdf = np.cumsum(expected[name]) / expected[name].sum()
+        assert np.abs(remapped_cdf - expected_cdf).max() < 0.05
+    mean = (np.arange(256) * remapped['luma']).sum() / remapped['luma'].sum()
+    assert mean == pytest.approx(cv2.cvtColor(result, cv2.COLOR_RGB2GRAY).mean(), abs=3)
+
+
+def test_not_pointwise(image):
+    graph = _graph(image)
+    graph.adjustment('brightness').params['value'] = 10
+    graph.adjustment('saturation').params['value'] = 30
+    graph.render()
+    assert pointwise_steps(graph) is None
+
+    graph = _graph(image)
+    graph.adjustment('brightness').params['value'] = 10
+    graph.add_effect('negative')
+    graph.render()
+    assert pointwise_steps(graph) is None
+
+    assert pointwise_steps(_graph(image)) is None  # Nothing active
+
+
+def test_base_reused(image):
+    graph = _graph(image)
+    graph.adjustment('contrast').params['value'] = 20
+    analyzer = ScopeAnalyzer()
+    for value in (10, 20, 30):
+        graph.update_params(graph.adjustment('brightness').id, value=value)
+        result = graph.render()
+        job = analyzer.prepare(graph, result)
+        # Only the first update samples the image entering the adjustments
+        assert (job['pixels'] is None) == (value != 10)
+        scopes = analyzer.compute(job)
+        assert scopes['waveform_image'].dtype == np.uint8
+    assert analyzer.stats == dict(analyzer.stats, full=1, remapped=2)
+
+    # A new source is sampled again
+    graph.replace_source(image[::-1].copy())
+    graph.update_params(graph.adjustment('brightness').id, value=40)
+    result = graph.render()
+    job = analyzer.prepare(graph, result)
+    assert job['pixels'] is not None
+    analyzer.compute(job)
+    assert analyzer.stats['full'] == 2
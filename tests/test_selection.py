@@ -0,0 +1,50 @@
+"""Effects applied to a selection must match the full-frame result inside it"""
+import numpy as np
+import pytest
+
+from edit.selection import EllipseSelection, RectSelection
+from effects import EFFECTS
+
+
+@pytest.fixture
+def image():
+    rng = np.random.default_rng(5)
+    return rng.integers(0, 256, (300, 400, 3), dtype=np.uint8)
+
+
+def inside(selection, image):
+    mask = selection.mask((0, 0, image.shape[1], image.shape[0]))
+    return mask > 0
+
+
+@pytest.mark.parametrize('name, params', [
+    ('pixelate', {'block_size': 10}),
+    ('pixelate', {'block_size': 7}),
+    ('vignette', {'intensity': 0.8}),
+    ('emboss', {}),
+    ('sepia', {'intensity': 0.6}),
+    ('glitch', {'intensity': 0.7, 'seed': 3}),
+])
+def test_region_matches_full_frame(image, name, params):
+    effect = EFFECTS[name]
+    selection = RectSelection(105, 57, 93, 71)
+    full = effect.apply(image, **params)
+    region = effect.apply_region(image, selection, **params)
+    mask = inside(selection, image)
+    assert np.array_equal(region[mask], full[mask])
+    assert np.array_equal(region[~mask], image[~mask])
+
+
+def test_glitch_small_selection(image):
+    selection = EllipseSelection(10, 10, 30, 12)
+    result = EFFECTS['glitch'].apply_region(image, selection, intensity=1.0, seed=1)
+    mask = inside(selection, image)
+    assert not np.array_equal(result[mask], image[mask])
+
+
+def test_glitch_small_image():
+    image = np.full((12, 30, 3), 128, dtype=np.uint8)
+    image[:, ::2] = 30
+    result = EFFECTS['glitch'].apply(image, intensity=1.0, seed=2)
+    assert result.shape == image.shape
+    assert not np.array_equal(result, image)
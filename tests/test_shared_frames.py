@@ -0,0 +1,84 @@
+"""Shared-memory process pool"""
+import gc
+import os
+
+import numpy as np
+import pytest
+
+from edit.recipe import apply_recipe
+from effects import EFFECTS
+from utils import shared_frames
+from utils.shared_frames import SEGMENT_PREFIX, SharedFrame, SharedMemoryExecutor
+
+
+def own_segments():
+    if not os.path.isdir(shared_frames.SHM_DIR):
+        pytest.skip("no /dev/shm")
+    prefix = f"{SEGMENT_PREFIX}{os.getpid()}_"
+    return [name for name in os.listdir(shared_frames.SHM_DIR) if name.startswith(prefix)]
+
+
+@pytest.fixture(scope='module')
+def executor():
+    with SharedMemoryExecutor(workers=1) as executor:
+        yield executor
+
+
+@pytest.fixture
+def image():
+    return np.random.default_rng(6).integers(0, 256, (60, 80, 3), dtype=np.uint8)
+
+
+def test_effect_matches_local_apply(executor, image):
+    frame = executor.submit_effect('negative', image).result(timeout=60)
+    assert np.array_equal(frame.array, EFFECTS['negative'].apply(image))
+    frame.close()
+
+
+def test_recipe_in_a_preallocated_frame(executor, image):
+    recipe = {'adjustments': {'contrast': 20}, 'effects': [{'name': 'pixelate', 'params': {'pixel_size': 4}}]}
+    source = executor.frame(image.shape, image.dtype)
+    source.array[...] = image
+    frame = executor.submit_recipe(recipe, source).result(timeout=60)
+    # Numba kernels in the worker may round within one level
+    assert np.abs(frame.array.astype(int) - apply_recipe(image, recipe)).max() <= 1
+    frame.close()
+    source.close()
+
+
+def test_working_format_is_kept(executor, image):
+    image16 = image.astype(np.uint16) * 257
+    frame = executor.submit_effect('cartoon', image16).result(timeout=60)
+    assert frame.array.dtype == np.uint16
+    frame.close()
+
+
+def test_segments_are_released(executor, image):
+    before = set(own_segments())
+    results = list(executor.map_effect('sepia', [image, image, image], intensity=0.3))
+    for frame in results:
+        frame.close()
+    # A failing task frees its frames too
+    with pytest.raises(TypeError):
+        executor.submit_effect('sepia', image, intensity=object()).result(timeout=60)
+    assert set(own_segments()) == before
+
+
+def test_frames_are_unlinked_when_collected(image):
+    frame = SharedFrame.from_array(image)
+    name = frame.name
+    assert name in own_segments()
+    del frame
+    gc.collect()
+    assert name not in own_segments()
+
+
+def test_sweep_removes_segments_of_dead_processes():
+    if not os.path.isdir(shared_frames.SHM_DIR):
+        pytest.skip("no /dev/shm")
+    # Process ids never go this high on Linux
+    path = os.path.join(shared_frames.SHM_DIR, f"{SEGMENT_PREFIX}999999999_1")
+    with open(path, 'wb') as f:
+        f.write(b'\0')
+    assert shared_frames.sweep_stale() >= 1
+    assert not os.path.exists(path)
@@ -0,0 +1,116 @@
+"""Folder browser thumbnails and their cache"""
+import io
+import os
+import struct
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from utils.thumbnails import THUMBNAIL_SIZE, ThumbnailCache, decode_thumbnail, list_images
+
+
+def exif_with_thumbnail(thumb_jpeg, orientation=1):
+    """EXIF block with an orientation tag and an embedded JPEG preview"""
+    # Little-endian TIFF: header, IFD0 with the orientation, IFD1 with the preview
+    ifd0 = 8
+    ifd1 = ifd0 + 2 + 12 + 4
+    data = ifd1 + 2 + 2 * 12 + 4
+    tiff = b'II*\x00' + struct.pack('<I', ifd0)
+    tiff += struct.pack('<H', 1) + struct.pack('<HHIHH', 0x0112, 3, 1, orientation, 0)
+    tiff += struct.pack('<I', ifd1)
+    tiff += struct.pack('<H', 2) + struct.pack('<HHII', 0x0201, 4, 1, data)
+    tiff += struct.pack('<HHII', 0x0202, 4, 1, len(thumb_jpeg)) + struct.pack('<I', 0)
+    return b'Exif\x00\x00' + tiff + thumb_jpeg
+
+
+@pytest.fixture
+def picture():
+    # Left half red, so orientation can be checked
+    image = np.zeros((600, 800, 3), dtype=np.uint8)
+    image[:, :400] = (255, 0, 0)
+    return image
+
+
+def save_with_preview(path, image, preview_size, orientation=1):
+    preview = io.BytesIO()
+    Image.fromarray(image).resize(preview_size).save(preview, 'JPEG')
+    Image.fromarray(image).save(path, exif=exif_with_thumbnail(preview.getvalue(), orientation))
+
+
+def test_list_images(tmp_path):
+    for name in ('b.JPG', 'a.png', 'notes.txt', 'c.tif'):
+        (tmp_path / name).write_bytes(b'')
+    (tmp_path / 'sub.jpg').mkdir()
+    names = [os.path.basename(path) for path in list_images(str(tmp_path))]
+    assert names == ['a.png', 'b.JPG', 'c.tif']
+    assert list_images(str(tmp_path / 'missing')) == []
+
+
+def test_draft_decode(tmp_path, picture):
+    path = str(tmp_path / 'photo.jpg')
+    Image.fromarray(picture).save(path)
+    thumb, method = decode_thumbnail(path)
+    assert method == 'draft'
+    assert thumb.shape == (120, 160, 3)
+    assert thumb.dtype == np.uint8
+
+
+def test_exif_preview_oriented(tmp_path, picture):
+    path = str(tmp_path / 'camera.jpg')
+    # Orientation 6: the image is displayed rotated 90 degrees clockwise
+    save_with_preview(path, picture, (160, 120), orientation=6)
+    thumb, method = decode_thumbnail(path)
+    assert method == 'exif'
+    assert thumb.shape == (160, 120, 3)
+    # The red left half ends up on top
+    assert thumb[10, 60, 0] > 200 and thumb[-10, 60, 0] < 50
+
+
+def test_small_exif_preview_ignored(tmp_path, picture):
+    path = str(tmp_path / 'tiny.jpg')
+    save_with_preview(path, picture, (80, 60))
+    thumb, method = decode_thumbnail(path)
+    assert method == 'draft'
+    assert max(thumb.shape[:2]) == THUMBNAIL_SIZE
+
+
+def test_png_full_decode(tmp_path, picture):
+    path = str(tmp_path / 'image.png')
+    Image.fromarray(picture).save(path)
+    thumb, method = decode_thumbnail(path, size=100)
+    assert method == 'full'
+    assert thumb.shape == (75, 100, 3)
+
+
+def test_cache_hit_and_invalidation(tmp_path, picture):
+    path = str(tmp_path / 'photo.jpg')
+    Image.fromarray(picture).save(path)
+    cache = ThumbnailCache(directory=str(tmp_path / 'cache'))
+
+    first = cache.get(path)
+    key = cache.key(path)
+    assert os.path.exists(cache.path_for(key))
+    second = cache.get(path)
+    assert second.shape == first.shape
+    assert cache.stats['hits'] == 1 and cache.stats['misses'] == 1
+    assert cache.hit_rate() == 0.5
+
+    # A modified file gets a new thumbnail
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert cache.key(path) != key
+    cache.get(path)
+    assert cache.stats['misses'] == 2
+    assert cache.report().startswith('3 thumbnails, 33% from cache')
+
+
+def test_damaged_cache_entry(tmp_path, picture):
+    path = str(tmp_path / 'photo.jpg')
+    Image.fromarray(picture).save(path)
+    cache = ThumbnailCache(directory=str(tmp_path / 'cache'))
+    cache.get(path)
+    with open(cache.path_for(cache.key(path)), 'wb') as f:
+        f.write(b'not a jpeg')
+    assert cache.get(path).shape == (120, 160, 3)
+    assert cache.stats['misses'] == 2
@@ -0,0 +1,106 @@
+"""Viewport-restricted evaluation"""
+import cv2
+import numpy as np
+import pytest
+
+from algorithms import capabilities, numba_backend
+from edit.edit_graph import EditGraph
+from edit.viewport import ViewportRenderer, region_plan, tiles_for
+from edit.working_format import WORKING_FORMATS, convert_image
+from effects import EFFECTS
+
+
+@pytest.fixture
+def image():
+    # Odd sizes leave pixels over after OpenCV's vector loops
+    small = np.random.default_rng(8).integers(0, 256, (30, 40, 3), dtype=np.uint8)
+    return cv2.resize(small, (701, 533), interpolation=cv2.INTER_CUBIC)
+
+
+@pytest.fixture(params=['preferred', 'fallback'])
+def backends(request, monkeypatch):
+    """Effects on their first available backends, or all on their last one"""
+    if request.param == 'fallback':
+        monkeypatch.setattr(numba_backend, 'ENABLED', False)
+        monkeypatch.setattr(capabilities, 'SELECTED', {
+            f"{effect.__class__.__name__}:{np.dtype(dtype).name}": effect.backends(np.dtype(dtype))[-1]
+            for effect in EFFECTS.values() for dtype in WORKING_FORMATS.values()})
+    return request.param
+
+
+def _graph(image, adjustments=None, effects=()):
+    graph = EditGraph()
+    graph.set_source(image)
+    for name, value in (adjustments or {}).items():
+        graph.update_params(graph.adjustment(name).id, value=value)
+    for name, params in effects:
+        graph.add_effect(name, params)
+    return graph
+
+
+@pytest.mark.parametrize('adjustments, effects', [
+    ({'brightness': 20, 'contrast': 35}, ()),
+    ({'saturation': 30, 'sharpness': 40, 'blur': 9}, ()),
+    ({'blur': 121}, ()),
+    ({'blur': 301}, ()),
+    ({'blur': 600}, ()),
+    ({'saturation': -20}, [('pixelate', {'block_size': 13}), ('vignette', {})]),
+    ({}, [('emboss', {}), ('posterize', {'levels': 4}), ('sepia', {})]),
+    ({'contrast': 20}, [('halftone', {'cell_size': 7}), ('dither', {'pattern': 6})]),
+    ({'blur': 15}, [('sepia', {})]),
+    ({'blur': 61}, [('oilpaint', {'radius': 3})]),
+])
+@pytest.mark.parametrize('working_format', list(WORKING_FORMATS))
+def test_tiles_match_full_render(image, adjustments, effects, working_format, backends):
+    graph = _graph(convert_image(image, WORKING_FORMATS[working_format]), adjustments, effects)
+    plan = region_plan(graph)
+    assert plan is not None
+    frame = ViewportRenderer(plan, tile_size=128).finish()
+    assert np.array_equal(frame, graph.render())
+
+
+def test_whole_frame_nodes(image):
+    # Not tileable
+    assert region_plan(_graph(image, effects=[('cartoon', {})])) is None
+    # Limited to a selection
+    graph = _graph(image)
+    graph.add_effect('negative', region={'selection': {'kind': 'rect', 'x': 10, 'y': 10,
+                                                       'width': 50, 'height': 50}})
+    assert region_plan(graph) is None
+    # Nothing to render
+    assert region_plan(_graph(image)) is None
+
+
+def test_resumes_from_cache(image):
+    graph = _graph(image, {'brightness': 10}, [('posterize', {'levels': 3})])
+    graph.render()
+    node = graph.add_effect('negative')
+    plan = region_plan(graph)
+    assert plan.base is graph.effect_nodes()[0].output
+    assert [n.id for n in plan.nodes] == [node.id]
+
+
+def test_view_first(image):
+    graph = _graph(image, effects=[('emboss', {})])
+    previous = graph.source.copy()
+    renderer = ViewportRenderer(region_plan(graph), previous=previous, tile_size=128)
+    rendered = renderer.render_view((300, 200, 360, 260), prefetch=0)
+    assert rendered == [(256, 128, 384, 256), (256, 256, 384, 384)]
+    assert not renderer.complete()
+    # Tiles not rendered yet still show the previous image
+    assert np.array_equal(renderer.frame[:128, :128], previous[:128, :128])
+    # Background tiles start next to the view
+    assert renderer.next_tile((300, 200, 360, 260)) in [(256, 0, 384, 128), (128, 128, 256, 256),
+                                                        (384, 128, 512, 256), (128, 256, 256, 384),
+                                                        (384, 256, 512, 384), (256, 384, 384, 512)]
+    assert renderer.render_view((300, 200, 360, 260), prefetch=0) == []
+    assert np.array_equal(renderer.finish(), graph.render())
+    assert renderer.complete() and renderer.next_tile((0, 0, 10, 10)) is None
+
+
+def test_tiles_cover_frame():
+    tiles = tiles_for((701, 533), 128)
+    coverage = np.zeros((533, 701), dtype=np.int32)
+    for x0, y0, x1, y1 in tiles:
+        coverage[y0:y1, x0:x1] += 1
+    assert np.all(coverage == 1)
@@ -0,0 +1,158 @@
+"""Watch-folder processing"""
+import json
+import os
+from concurrent.futures import Future
+
+import numpy as np
+import pytest
+
+from utils.image_loader import load_image, save_image
+from utils.watch_folder import WatchFolder
+
+RECIPE = {'version': 1, 'adjustments': {}, 'effects': [{'name': 'negative', 'params': {}}]}
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class PendingPool:
+    """Executor whose tasks stay queued until they are run by hand"""
+
+    def __init__(self):
+        self.tasks = []
+
+    @property
+    def submitted(self):
+        return [args[0] for _, args, _ in self.tasks]
+
+    def submit(self, func, *args):
+        future = Future()
+        self.tasks.append((func, args, future))
+        return future
+
+    def run(self, index):
+        func, args, future = self.tasks[index]
+        future.set_result(func(*args))
+
+
+@pytest.fixture
+def inbox(tmp_path):
+    directory = tmp_path / 'in'
+    directory.mkdir()
+    return directory
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def drop(directory, name, mtime, value=0):
+    path = directory / name
+    save_image(str(path), np.full((6, 8, 3), value, dtype=np.uint8))
+    os.utime(path, (mtime, mtime))
+    return str(path)
+
+
+def watcher(inbox, tmp_path, clock, **kwargs):
+    return WatchFolder([str(inbox)], str(tmp_path / 'out'), RECIPE, settle_time=2.0,
+                       clock=clock, **kwargs)
+
+
+def test_files_wait_until_settled(inbox, tmp_path, clock):
+    watch = watcher(inbox, tmp_path, clock)
+    path = drop(inbox, 'a.png', 1000.0)
+    # Not seen before, then not untouched for settle_time yet
+    assert watch.scan() == []
+    clock.now = 1001.0
+    assert watch.scan() == []
+    # Still being written: the size changed since the last scan
+    clock.now = 1005.0
+    with open(path, 'ab') as f:
+        f.write(b'more')
+    os.utime(path, (1000.0, 1000.0))
+    assert watch.scan() == []
+    assert watch.scan() == [(path, (os.path.getsize(path), 1000.0))]
+
+
+def test_ready_files_oldest_first(inbox, tmp_path, clock):
+    watch = watcher(inbox, tmp_path, clock)
+    newer = drop(inbox, 'b.png', 990.0)
+    older = drop(inbox, 'a.png', 980.0)
+    (inbox / 'notes.txt').write_text('not an image')
+    drop(inbox, '.hidden.png', 980.0)
+    watch.scan()
+    assert [path for path, _ in watch.scan()] == [older, newer]
+
+
+def test_processed_files_are_skipped_after_restart(inbox, tmp_path, clock):
+    watch = watcher(inbox, tmp_path, clock)
+    path = drop(inbox, 'a.png', 900.0, value=10)
+    watch.scan()
+    [(ready, signature)] = watch.scan()
+    watch.process(ready, signature, clock())
+
+    output = tmp_path / 'out' / 'a.png'
+    assert np.array_equal(load_image(str(output)), np.full((6, 8, 3), 245, dtype=np.uint8))
+    with open(watch.state_file, encoding='utf-8') as f:
+        assert json.load(f)[path]['output'] == str(output)
+
+    restarted = watcher(inbox, tmp_path, clock)
+    restarted.scan()
+    assert restarted.scan() == []
+    # A file replaced under the same name is processed again
+    drop(inbox, 'a.png', 950.0, value=20)
+    restarted.scan()
+    assert [p for p, _ in restarted.scan()] == [path]
+
+
+def test_sources_sharing_an_output(inbox, tmp_path, clock):
+    watch = watcher(inbox, tmp_path, clock, output_format='png')
+    png = drop(inbox, 'a.png', 900.0)
+    jpg = drop(inbox, 'a.jpg', 900.0)
+    output = str(tmp_path / 'out' / 'a.png')
+    assert watch.claim_output(png) == output
+    assert watch.claim_output(png) == output
+    assert watch.claim_output(jpg) is None
+
+    watch.process(jpg, (os.path.getsize(jpg), 900.0), clock())
+    assert watch.metrics['failed'] == 1
+    # Failed files are not retried until they change
+    watch.scan()
+    assert [p for p, _ in watch.scan()] == [png]
+
+
+def test_directories_sharing_a_name(tmp_path, clock):
+    first, second = tmp_path / 'a' / 'shots', tmp_path / 'b' / 'shots'
+    first.mkdir(parents=True)
+    second.mkdir(parents=True)
+    watch = WatchFolder([str(first), str(second)], str(tmp_path / 'out'), RECIPE, clock=clock)
+    outputs = {watch.claim_output(str(first / 'x.png')), watch.claim_output(str(second / 'x.png'))}
+    assert outputs == {str(tmp_path / 'out' / 'shots' / 'x.png'),
+                       str(tmp_path / 'out' / 'shots_2' / 'x.png')}
+
+
+def test_backpressure(inbox, tmp_path, clock):
+    watch = watcher(inbox, tmp_path, clock, workers=1, max_pending=2)
+    paths = [drop(inbox, f"{i}.png", 900.0 + i) for i in range(5)]
+    pool = PendingPool()
+    watch.submit_ready(pool)  # First sighting: nothing is ready yet
+    watch.submit_ready(pool)
+    assert pool.submitted == paths[:2]
+    assert watch.backlog == 3
+
+    # Nothing is taken while the pool is full
+    watch.submit_ready(pool)
+    assert pool.submitted == paths[:2]
+    assert watch.backlog == 3
+
+    pool.run(0)
+    watch.submit_ready(pool)
+    assert pool.submitted == paths[:3]
+    assert watch.backlog == 2
+    assert watch.metrics['processed'] == 1
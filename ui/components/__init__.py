@@ -6,3 +6,5 @@ from ui.components.toolbar import EditorToolbar
 from ui.components.controls_sidebar import ControlsSidebar
 from ui.components.effects_panel import EffectsPanel
 from ui.components.effect_manager import EffectManager
+from ui.components.edit_stack_panel import EditStackPanel
+from ui.components.export_dialog import ExportDialog
@@ -0,0 +1,92 @@
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QFormLayout, QDialogButtonBox,
+                             QSpinBox, QDoubleSpinBox, QComboBox)
+
+from effects import get_effect
+
+
+class AnimationDialog(QDialog):
+    """Pick an effect parameter to sweep and the frame settings of an animation"""
+
+    def __init__(self, effect_nodes, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Export Animation")
+        # (position in the recipe's effect list, node) of effects with parameters
+        self.effects = [(i, node) for i, node in enumerate(effect_nodes)
+                        if get_effect(node.name) and get_effect(node.name).params]
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+        form = QFormLayout()
+
+        self.effect_combo = QComboBox()
+        for _, node in self.effects:
+            self.effect_combo.addItem(node.label)
+        self.effect_combo.currentIndexChanged.connect(self.update_params)
+        form.addRow("Effect", self.effect_combo)
+
+        self.param_combo = QComboBox()
+        self.param_combo.currentIndexChanged.connect(self.update_range)
+        form.addRow("Parameter", self.param_combo)
+
+        self.start_spin = QDoubleSpinBox()
+        self.end_spin = QDoubleSpinBox()
+        form.addRow("From", self.start_spin)
+        form.addRow("To", self.end_spin)
+
+        self.frames_spin = QSpinBox()
+        self.frames_spin.setRange(2, 600)
+        self.frames_spin.setValue(24)
+        form.addRow("Frames", self.frames_spin)
+
+        self.fps_spin = QSpinBox()
+        self.fps_spin.setRange(1, 60)
+        self.fps_spin.setValue(12)
+        form.addRow("Frames per Second", self.fps_spin)
+
+        layout.addLayout(form)
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok |
+                                   QDialogButtonBox.StandardButton.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+        self.update_params()
+
+    def current_effect(self):
+        index = self.effect_combo.currentIndex()
+        return self.effects[index] if 0 <= index < len(self.effects) else (None, None)
+
+    def update_params(self):
+        _, node = self.current_effect()
+        self.param_combo.clear()
+        if node is None:
+            return
+        for name, spec in get_effect(node.name).params.items():
+            self.param_combo.addItem(spec.get('label', name), name)
+
+    def update_range(self):
+        _, node = self.current_effect()
+        param = self.param_combo.currentData()
+        if node is None or param is None:
+            return
+        spec = get_effect(node.name).params[param]
+        step = spec.get('step', 1)
+        for spin in (self.start_spin, self.end_spin):
+            spin.setDecimals(0 if float(step).is_integer() else 2)
+            spin.setSingleStep(step)
+            spin.setRange(spec['min'], spec['max'])
+        self.start_spin.setValue(node.params.get(param, spec['default']))
+        self.end_spin.setValue(spec['max'])
+
+    def get_settings(self):
+        """Sweep description and frame settings, or None without an effect"""
+        position, _ = self.current_effect()
+        if position is None:
+            return None
+        sweep = {
+            'effect': position,
+            'param': self.param_combo.currentData(),
+            'start': self.start_spin.value(),
+            'end': self.end_spin.value()
+        }
+        return {'sweeps': [sweep], 'frames': self.frames_spin.value(), 'fps': self.fps_spin.value()}
@@ -0,0 +1,118 @@
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, QDialogButtonBox,
+                             QSpinBox, QDoubleSpinBox, QComboBox, QLabel, QScrollArea,
+                             QPushButton, QFileDialog)
+from PyQt6.QtGui import QImage, QPixmap
+
+from effects import get_effect
+from utils.contact_sheet import DEFAULT_CELL_SIZE, MAX_AXIS_VALUES, axis_values
+from utils.image_loader import save_image
+
+
+class AxisControls:
+    """Parameter, range and count of one contact sheet axis"""
+
+    def __init__(self, effect_name, form, title, optional=False):
+        self.effect = get_effect(effect_name)
+        self.effect_name = effect_name
+        self.param_combo = QComboBox()
+        if optional:
+            self.param_combo.addItem("(none)", None)
+        for name, spec in self.effect.params.items():
+            self.param_combo.addItem(spec.get('label', name), name)
+        self.start_spin = QDoubleSpinBox()
+        self.end_spin = QDoubleSpinBox()
+        self.count_spin = QSpinBox()
+        self.count_spin.setRange(1, MAX_AXIS_VALUES)
+        self.count_spin.setValue(4)
+        self.param_combo.currentIndexChanged.connect(self.update_range)
+
+        form.addRow(title, self.param_combo)
+        form.addRow("  From", self.start_spin)
+        form.addRow("  To", self.end_spin)
+        form.addRow("  Steps", self.count_spin)
+        self.update_range()
+
+    def update_range(self):
+        param = self.param_combo.currentData()
+        for widget in (self.start_spin, self.end_spin, self.count_spin):
+            widget.setEnabled(param is not None)
+        if param is None:
+            return
+        spec = self.effect.params[param]
+        step = spec.get('step', 1)
+        for spin in (self.start_spin, self.end_spin):
+            spin.setDecimals(0 if float(step).is_integer() else 2)
+            spin.setSingleStep(step)
+            spin.setRange(spec['min'], spec['max'])
+        self.start_spin.setValue(spec['min'])
+        self.end_spin.setValue(spec['max'])
+
+    def axis(self):
+        """(param, values), or None when no parameter is chosen"""
+        param = self.param_combo.currentData()
+        if param is None:
+            return None
+        return param, axis_values(self.effect_name, param, self.start_spin.value(),
+                                  self.end_spin.value(), self.count_spin.value())
+
+
+class ContactSheetDialog(QDialog):
+    """Choose up to two parameters of an effect to render as a grid"""
+
+    def __init__(self, effect_name, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"{get_effect(effect_name).name} Contact Sheet")
+        layout = QVBoxLayout(self)
+        form = QFormLayout()
+        self.x_axis = AxisControls(effect_name, form, "Columns")
+        self.y_axis = AxisControls(effect_name, form, "Rows", optional=True)
+        self.cell_spin = QSpinBox()
+        self.cell_spin.setRange(64, 1024)
+        self.cell_spin.setValue(DEFAULT_CELL_SIZE)
+        form.addRow("Cell Size", self.cell_spin)
+        layout.addLayout(form)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok |
+                                   QDialogButtonBox.StandardButton.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+    def get_settings(self):
+        return {'x_axis': self.x_axis.axis(), 'y_axis': self.y_axis.axis(),
+                'cell_size': self.cell_spin.value()}
+
+
+class ContactSheetViewer(QDialog):
+    """Shows a rendered contact sheet and lets it be saved"""
+
+    def __init__(self, sheet, title, parent=None):
+        super().__init__(parent)
+        self.sheet = sheet
+        self.setWindowTitle(title)
+        layout = QVBoxLayout(self)
+
+        h, w = sheet.shape[:2]
+        qt_image = QImage(sheet.data, w, h, sheet.strides[0], QImage.Format.Format_RGB888)
+        label = QLabel()
+        label.setPixmap(QPixmap.fromImage(qt_image.copy()))
+        scroll = QScrollArea()
+        scroll.setWidget(label)
+        layout.addWidget(scroll)
+
+        button_row = QHBoxLayout()
+        button_row.addStretch()
+        save_button = QPushButton("Save...")
+        save_button.clicked.connect(self.save)
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.close)
+        button_row.addWidget(save_button)
+        button_row.addWidget(close_button)
+        layout.addLayout(button_row)
+        self.resize(min(w + 40, 1400), min(h + 80, 900))
+
+    def save(self):
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save Contact Sheet", "contact_sheet.png",
+                                                   "PNG (*.png);;JPEG (*.jpg *.jpeg)")
+        if file_path:
+            save_image(file_path, self.sheet)
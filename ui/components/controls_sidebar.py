@@ -6,6 +6,7 @@ from PyQt6.QtCore import Qt
 from ui.components.image_view import create_image_label
 # Import effects panel
 from ui.components.effects_panel import EffectsPanel
+from ui.components.edit_stack_panel import EditStackPanel
 
 class ControlsSidebar(QWidget):
     def __init__(self, main_window):
@@ -42,6 +43,13 @@ class ControlsSidebar(QWidget):
         # Add separator after effects panel
         self.add_separator()
         
+        # Edit stack listing the applied effects
+        stack_label = QLabel("EDIT STACK")
+        stack_label.setFont(QFont("Consolas", 9, QFont.Weight.Bold))
+        self.edit_group_layout.addWidget(stack_label)
+        self.edit_stack_panel = EditStackPanel(self.main_window)
+        self.edit_group_layout.addWidget(self.edit_stack_panel)
+        
         # Add action buttons at the bottom
         self.add_action_buttons()
         
@@ -61,7 +69,7 @@ class ControlsSidebar(QWidget):
         self.contrast_slider = self.create_slider("CONTRAST", -100, 100, 0)
         self.saturation_slider = self.create_slider("SATURATION", -100, 100, 0)
         self.sharpness_slider = self.create_slider("SHARPNESS", 0, 100, 0)
-        self.blur_slider = self.create_slider("BLUR", 0, 30, 0)
+        self.blur_slider = self.create_slider("BLUR", 0, 600, 0)
         for slider in [self.brightness_slider, self.contrast_slider,
                        self.saturation_slider, self.sharpness_slider, self.blur_slider]:
             self.edit_group_layout.addLayout(slider[0])  # slider[0] is layout
@@ -82,6 +90,8 @@ class ControlsSidebar(QWidget):
         slider.setValue(default_val)
         slider.valueChanged.connect(lambda v: value_label.setText(str(v)))
         slider.valueChanged.connect(self.main_window.apply_edits)
+        slider.sliderPressed.connect(self.main_window.begin_slider_drag)
+        slider.sliderReleased.connect(self.main_window.end_slider_drag)
         layout.addWidget(slider)
         return (layout, slider)
     
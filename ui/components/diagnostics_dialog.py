@@ -0,0 +1,49 @@
+from PyQt6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QPlainTextEdit, QPushButton
+from PyQt6.QtGui import QFont, QGuiApplication
+
+from algorithms import capabilities
+from edit import buffer_pool, memory_budget
+from edit.working_format import WORKING_FORMATS
+from effects import get_backends
+
+
+def diagnostics_text(working_format='uint8'):
+    """Capabilities, effect backends and fallbacks, memory and buffer statistics"""
+    return '\n\n'.join([
+        capabilities.report(get_backends(WORKING_FORMATS[working_format])),
+        "Memory:\n" + memory_budget.report(),
+        "Buffers: " + buffer_pool.report()
+    ])
+
+
+class DiagnosticsDialog(QDialog):
+    """Shows which backends effects use and how often they fell back"""
+
+    def __init__(self, working_format='uint8', parent=None):
+        super().__init__(parent)
+        self.working_format = working_format
+        self.setWindowTitle("Diagnostics")
+        layout = QVBoxLayout(self)
+
+        self.text = QPlainTextEdit()
+        self.text.setReadOnly(True)
+        self.text.setFont(QFont("monospace"))
+        layout.addWidget(self.text)
+
+        button_row = QHBoxLayout()
+        button_row.addStretch()
+        copy_button = QPushButton("Copy")
+        copy_button.clicked.connect(lambda: QGuiApplication.clipboard().setText(self.text.toPlainText()))
+        refresh_button = QPushButton("Refresh")
+        refresh_button.clicked.connect(self.refresh)
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.close)
+        button_row.addWidget(copy_button)
+        button_row.addWidget(refresh_button)
+        button_row.addWidget(close_button)
+        layout.addLayout(button_row)
+        self.resize(640, 560)
+        self.refresh()
+
+    def refresh(self):
+        self.text.setPlainText(diagnostics_text(self.working_format))
@@ -0,0 +1,103 @@
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
+                             QListWidget, QListWidgetItem, QPushButton)
+from PyQt6.QtCore import Qt
+
+
+def format_bytes(num_bytes):
+    """Format a byte count for display"""
+    if num_bytes >= 1024 * 1024:
+        return f"{num_bytes / (1024 * 1024):.1f} MB"
+    if num_bytes >= 1024:
+        return f"{num_bytes / 1024:.1f} KB"
+    return f"{num_bytes} B"
+
+
+class EditStackPanel(QWidget):
+    """List of the nodes in the edit graph with per-node cache usage"""
+
+    def __init__(self, main_window):
+        super().__init__()
+        self.main_window = main_window
+        self._updating = False
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setSpacing(6)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.node_list = QListWidget()
+        self.node_list.setFixedHeight(140)
+        self.node_list.itemChanged.connect(self.on_item_changed)
+        self.node_list.itemDoubleClicked.connect(self.on_item_double_clicked)
+        layout.addWidget(self.node_list)
+
+        buttons = QHBoxLayout()
+        buttons.setSpacing(4)
+        up_btn = QPushButton("Up")
+        up_btn.clicked.connect(lambda: self.move_selected(-1))
+        down_btn = QPushButton("Down")
+        down_btn.clicked.connect(lambda: self.move_selected(1))
+        update_btn = QPushButton("Update")
+        update_btn.setToolTip("Apply the current effect sliders to the selected node")
+        update_btn.clicked.connect(self.update_selected)
+        remove_btn = QPushButton("Remove")
+        remove_btn.clicked.connect(self.remove_selected)
+        for btn in (up_btn, down_btn, update_btn, remove_btn):
+            buttons.addWidget(btn)
+        layout.addLayout(buttons)
+
+        self.cache_label = QLabel("Cache: 0 B")
+        layout.addWidget(self.cache_label)
+
+    def refresh(self):
+        """Rebuild the list from the main window's edit graph"""
+        graph = self.main_window.edit_graph
+        selected_id = self.selected_node_id()
+
+        self._updating = True
+        self.node_list.clear()
+        for node in graph.effect_nodes():
+            item = QListWidgetItem(f"{node.label}  [{format_bytes(node.cache_bytes)}]")
+            item.setData(Qt.ItemDataRole.UserRole, node.id)
+            item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+            item.setCheckState(Qt.CheckState.Checked if node.enabled else Qt.CheckState.Unchecked)
+            self.node_list.addItem(item)
+            if node.id == selected_id:
+                self.node_list.setCurrentItem(item)
+        self._updating = False
+
+        self.cache_label.setText(
+            f"Cache: {format_bytes(graph.cache_bytes)} / {format_bytes(graph.cache_budget)}"
+        )
+
+    def selected_node_id(self):
+        item = self.node_list.currentItem()
+        if item is None:
+            return None
+        return item.data(Qt.ItemDataRole.UserRole)
+
+    def on_item_changed(self, item):
+        if self._updating:
+            return
+        node_id = item.data(Qt.ItemDataRole.UserRole)
+        enabled = item.checkState() == Qt.CheckState.Checked
+        self.main_window.set_node_enabled(node_id, enabled)
+
+    def on_item_double_clicked(self, item):
+        self.main_window.load_node_params(item.data(Qt.ItemDataRole.UserRole))
+
+    def move_selected(self, offset):
+        node_id = self.selected_node_id()
+        if node_id is not None:
+            self.main_window.move_node(node_id, offset)
+
+    def update_selected(self):
+        node_id = self.selected_node_id()
+        if node_id is not None:
+            self.main_window.update_node_params(node_id)
+
+    def remove_selected(self):
+        node_id = self.selected_node_id()
+        if node_id is not None:
+            self.main_window.remove_node(node_id)
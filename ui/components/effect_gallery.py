@@ -0,0 +1,132 @@
+import os
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+from PyQt6.QtWidgets import QWidget, QGridLayout, QToolButton, QScrollArea, QVBoxLayout
+from PyQt6.QtGui import QImage, QPixmap, QIcon
+from PyQt6.QtCore import Qt, QSize, QTimer, QThreadPool
+
+from effects import get_effect, get_effect_names
+from edit.working_format import to_display
+from ui.workers import run_in_background
+
+# Longest side of the shared gallery thumbnail
+THUMBNAIL_SIZE = 128
+# Maximum number of rendered tiles kept in the cache
+MAX_CACHED_TILES = 256
+
+
+def make_thumbnail(image, size=THUMBNAIL_SIZE):
+    """Downscale an image so its longest side is at most size pixels"""
+    h, w = image.shape[:2]
+    scale = size / max(h, w)
+    if scale >= 1.0:
+        return image.copy()
+    return cv2.resize(image, (max(1, int(w * scale)), max(1, int(h * scale))),
+                      interpolation=cv2.INTER_AREA)
+
+
+def render_tile(effect_name, thumbnail, params):
+    """Worker task: apply an effect to the shared thumbnail"""
+    effect = get_effect(effect_name)
+    return np.ascontiguousarray(effect.apply(thumbnail, **params))
+
+
+def to_pixmap(image):
+    h, w = image.shape[:2]
+    qt_image = QImage(image.data, w, h, image.strides[0], QImage.Format.Format_RGB888)
+    return QPixmap.fromImage(qt_image.copy())
+
+
+class EffectGallery(QWidget):
+    """Grid of effect previews rendered in parallel from a shared thumbnail"""
+
+    def __init__(self, main_window):
+        super().__init__()
+        self.main_window = main_window
+        self.thumbnail = None
+        self.thumbnail_version = None
+        self.cache = OrderedDict()  # (version, effect, params) -> QPixmap
+        self.pending = {}  # key -> Worker still rendering it
+        self.tiles = {}
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(max(2, os.cpu_count() or 2))
+
+        # Coalesce bursts of refresh requests (slider drags, repeated renders)
+        self.refresh_timer = QTimer()
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        scroll = QScrollArea()
+        scroll.setWidgetResizable(True)
+        grid_widget = QWidget()
+        grid = QGridLayout(grid_widget)
+        grid.setSpacing(6)
+
+        for i, effect_name in enumerate(get_effect_names()):
+            effect = get_effect(effect_name)
+            tile = QToolButton()
+            tile.setText(effect.name)
+            tile.setToolTip(f"Apply {effect.name}")
+            tile.setToolButtonStyle(Qt.ToolButtonStyle.ToolButtonTextUnderIcon)
+            tile.setIconSize(QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+            tile.clicked.connect(lambda checked=False, name=effect_name: self.main_window.apply_effect(name))
+            grid.addWidget(tile, i // 2, i % 2)
+            self.tiles[effect_name] = tile
+
+        scroll.setWidget(grid_widget)
+        layout.addWidget(scroll)
+
+    def schedule_refresh(self, delay=50):
+        self.refresh_timer.start(delay)
+
+    def tile_key(self, effect_name):
+        params = self.main_window.controls_sidebar.effects_panel.get_params(effect_name)
+        return (self.thumbnail_version, effect_name, tuple(sorted(params.items()))), params
+
+    def refresh(self):
+        """Render every tile that is not cached for the current image and params"""
+        if not self.isVisible() or self.main_window.edited_image is None:
+            return
+
+        version = self.main_window.image_version
+        if version != self.thumbnail_version:
+            self.thumbnail = to_display(make_thumbnail(self.main_window.edited_image))
+            self.thumbnail_version = version
+
+        for effect_name, tile in self.tiles.items():
+            key, params = self.tile_key(effect_name)
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                tile.setIcon(QIcon(self.cache[key]))
+                continue
+            if key in self.pending:
+                continue
+            # Keep the worker (and its signals) alive until it reports back
+            self.pending[key] = run_in_background(
+                render_tile, effect_name, self.thumbnail, params,
+                on_finished=lambda result, key=key: self.on_tile_rendered(key, result),
+                on_error=lambda error, key=key: self.pending.pop(key, None),
+                pool=self.pool)
+
+    def on_tile_rendered(self, key, image):
+        self.pending.pop(key, None)
+        pixmap = to_pixmap(image)
+        self.cache[key] = pixmap
+        while len(self.cache) > MAX_CACHED_TILES:
+            self.cache.popitem(last=False)
+
+        # Tiles fill in as they complete; results for an outdated image or
+        # outdated params are only cached
+        version, effect_name, _ = key
+        if version == self.thumbnail_version and self.tile_key(effect_name)[0] == key:
+            self.tiles[effect_name].setIcon(QIcon(pixmap))
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.schedule_refresh(0)
@@ -29,10 +29,10 @@ class EffectsPanel(QWidget):
         
         # Updated categories with all effects properly organized
         effect_categories = {
-            "Basic": ["grayscale", "negative", "posterize"],
+            "Basic": ["grayscale", "negative", "posterize", "palette", "dither"],
             "Color": ["sepia", "warm", "cool"],
             "Artistic": ["cartoon", "watercolor", "oilpaint", "emboss"],
-            "Stylistic": ["vignette", "edge", "pixelate", "glitch"],
+            "Stylistic": ["vignette", "edge", "pixelate", "halftone", "glitch"],
             "Advanced": ["hdr"]
         }
         
@@ -131,6 +131,15 @@ class EffectsPanel(QWidget):
             )
             effect_layout.addWidget(apply_button)
             
+            if effect.has_params:
+                # Grid of parameter combinations to compare settings
+                sheet_button = QPushButton("Contact Sheet...")
+                sheet_button.clicked.connect(
+                    lambda checked=False, effect_name=effect_name:
+                    self.main_window.show_contact_sheet(effect_name)
+                )
+                effect_layout.addWidget(sheet_button)
+            
             # Spacer at the bottom
             effect_layout.addStretch()
             
@@ -158,6 +167,45 @@ class EffectsPanel(QWidget):
         else:
             return lambda v: slider.param_label.setText(f"{slider.param_name}: {int(v/100)}")
     
+    def select_effect(self, effect_name):
+        """Show the parameter controls for the given effect"""
+        effect = get_effect(effect_name)
+        if effect is None:
+            return
+        index = self.effects_dropdown.findText(effect.name)
+        if index >= 0:
+            self.effects_dropdown.setCurrentIndex(index)
+    
+    def get_params(self, effect_name):
+        """Read the current parameter values of an effect from its sliders"""
+        effect = get_effect(effect_name)
+        params = {}
+        if effect and effect.has_params:
+            for param_name, param_data in effect.params.items():
+                slider_key = effect_name + '_' + param_name
+                if slider_key in self.effect_sliders:
+                    slider_value = self.effect_sliders[slider_key].value() / 100
+                    
+                    # Handle parameters based on their step value
+                    if param_data.get('step', 1) >= 1:
+                        # Integer parameter (like levels, blur)
+                        params[param_name] = int(round(slider_value))
+                    else:
+                        # Floating point parameter (like intensity)
+                        params[param_name] = slider_value
+        return params
+    
+    def set_params(self, effect_name, params):
+        """Move the sliders of an effect to the given parameter values"""
+        effect = get_effect(effect_name)
+        if effect is None or not effect.has_params:
+            return
+        for param_name, param_data in effect.params.items():
+            slider = self.effect_sliders.get(effect_name + '_' + param_name)
+            if slider is None or param_name not in params:
+                continue
+            slider.setValue(int(round(params[param_name] * 100)))
+    
     def on_effect_dropdown_changed(self, index):
         """Handle effect dropdown selection with category separators"""
         # Check if this index is in our mapping
@@ -0,0 +1,80 @@
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QFormLayout, QDialogButtonBox,
+                             QSpinBox, QCheckBox, QComboBox, QLabel)
+
+from utils.image_loader import DEFAULT_EXPORT_OPTIONS
+
+
+class ExportDialog(QDialog):
+    """Encoder options for the chosen export format"""
+
+    def __init__(self, file_format, options=None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Export Options")
+        self.file_format = file_format
+        self.options = dict(DEFAULT_EXPORT_OPTIONS)
+        self.options.update(options or {})
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+        form = QFormLayout()
+
+        if self.file_format == 'JPEG':
+            self.jpeg_quality = QSpinBox()
+            self.jpeg_quality.setRange(1, 100)
+            self.jpeg_quality.setValue(self.options['jpeg_quality'])
+            form.addRow("Quality", self.jpeg_quality)
+
+            self.jpeg_progressive = QCheckBox()
+            self.jpeg_progressive.setChecked(self.options['jpeg_progressive'])
+            form.addRow("Progressive", self.jpeg_progressive)
+
+            self.jpeg_optimize = QCheckBox()
+            self.jpeg_optimize.setChecked(self.options['jpeg_optimize'])
+            form.addRow("Optimize Huffman Tables", self.jpeg_optimize)
+
+            self.jpeg_subsampling = QComboBox()
+            self.jpeg_subsampling.addItems(['4:4:4', '4:2:2', '4:2:0'])
+            self.jpeg_subsampling.setCurrentText(self.options['jpeg_subsampling'])
+            form.addRow("Chroma Subsampling", self.jpeg_subsampling)
+
+        elif self.file_format == 'PNG':
+            self.png_compression = QSpinBox()
+            self.png_compression.setRange(0, 9)
+            self.png_compression.setValue(self.options['png_compression'])
+            form.addRow("Compression Level", self.png_compression)
+
+        elif self.file_format == 'WEBP':
+            self.webp_lossless = QCheckBox()
+            self.webp_lossless.setChecked(self.options['webp_lossless'])
+            form.addRow("Lossless", self.webp_lossless)
+
+            self.webp_quality = QSpinBox()
+            self.webp_quality.setRange(0, 100)
+            self.webp_quality.setValue(self.options['webp_quality'])
+            form.addRow("Quality", self.webp_quality)
+
+        else:
+            form.addRow(QLabel("No options for this format"))
+
+        layout.addLayout(form)
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok |
+                                   QDialogButtonBox.StandardButton.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+    def get_options(self):
+        """Export options with the values chosen in the dialog"""
+        options = dict(self.options)
+        if self.file_format == 'JPEG':
+            options['jpeg_quality'] = self.jpeg_quality.value()
+            options['jpeg_progressive'] = self.jpeg_progressive.isChecked()
+            options['jpeg_optimize'] = self.jpeg_optimize.isChecked()
+            options['jpeg_subsampling'] = self.jpeg_subsampling.currentText()
+        elif self.file_format == 'PNG':
+            options['png_compression'] = self.png_compression.value()
+        elif self.file_format == 'WEBP':
+            options['webp_lossless'] = self.webp_lossless.isChecked()
+            options['webp_quality'] = self.webp_quality.value()
+        return options
@@ -0,0 +1,143 @@
+import os
+
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QListWidget, QListWidgetItem,
+                             QListView, QPushButton, QLabel, QFileDialog)
+from PyQt6.QtGui import QIcon, QPixmap, QColor
+from PyQt6.QtCore import Qt, QSize, QTimer, QThreadPool
+
+from ui.components.effect_gallery import to_pixmap
+from ui.workers import run_in_background
+from utils.thumbnails import THUMBNAIL_SIZE, ThumbnailCache, list_images
+
+# Thumbnails requested beyond the visible area, in viewport widths
+PREFETCH = 1.0
+
+
+class FolderBrowser(QWidget):
+    """Filmstrip of the images in a folder; thumbnails load as they scroll into view"""
+
+    def __init__(self, main_window):
+        super().__init__()
+        self.main_window = main_window
+        self.folder = None
+        self.cache = ThumbnailCache()
+        self.items = {}    # path -> QListWidgetItem
+        self.loaded = set()
+        self.pending = {}  # path -> Worker still decoding it
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(max(2, os.cpu_count() or 2))
+
+        placeholder = QPixmap(THUMBNAIL_SIZE, THUMBNAIL_SIZE)
+        placeholder.fill(QColor(40, 40, 40))
+        self.placeholder = QIcon(placeholder)
+
+        # Coalesce scroll and resize events into one visibility check
+        self.load_timer = QTimer()
+        self.load_timer.setSingleShot(True)
+        self.load_timer.timeout.connect(self.load_visible)
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        header = QHBoxLayout()
+        self.folder_label = QLabel("No folder")
+        open_button = QPushButton("Open Folder...")
+        open_button.clicked.connect(self.choose_folder)
+        self.stats_label = QLabel("")
+        header.addWidget(self.folder_label, 1)
+        header.addWidget(self.stats_label)
+        header.addWidget(open_button)
+        layout.addLayout(header)
+
+        self.list = QListWidget()
+        self.list.setViewMode(QListView.ViewMode.IconMode)
+        self.list.setFlow(QListView.Flow.LeftToRight)
+        self.list.setWrapping(False)
+        self.list.setMovement(QListView.Movement.Static)
+        self.list.setUniformItemSizes(True)
+        self.list.setIconSize(QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        self.list.setMinimumHeight(THUMBNAIL_SIZE + 50)
+        self.list.itemActivated.connect(self.open_item)
+        self.list.horizontalScrollBar().valueChanged.connect(lambda _: self.schedule_load())
+        self.list.verticalScrollBar().valueChanged.connect(lambda _: self.schedule_load())
+        layout.addWidget(self.list)
+
+    def choose_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Open Folder", self.folder or "")
+        if folder:
+            self.set_folder(folder)
+
+    def set_folder(self, folder):
+        """List the images of a folder; thumbnails are decoded on demand"""
+        for worker in self.pending.values():
+            self.pool.tryTake(worker)
+        self.pending.clear()
+        self.loaded.clear()
+        self.items.clear()
+        self.list.clear()
+        self.folder = folder
+
+        paths = list_images(folder)
+        self.folder_label.setText(f"{folder} ({len(paths)} images)")
+        for path in paths:
+            item = QListWidgetItem(self.placeholder, os.path.basename(path))
+            item.setData(Qt.ItemDataRole.UserRole, path)
+            item.setToolTip(path)
+            item.setSizeHint(QSize(THUMBNAIL_SIZE + 16, THUMBNAIL_SIZE + 36))
+            self.list.addItem(item)
+            self.items[path] = item
+        self.schedule_load(0)
+
+    def schedule_load(self, delay=50):
+        self.load_timer.start(delay)
+
+    def visible_paths(self):
+        """Paths of the items in or near the visible part of the list"""
+        area = self.list.viewport().rect()
+        margin_x = int(area.width() * PREFETCH)
+        margin_y = int(area.height() * PREFETCH)
+        area = area.adjusted(-margin_x, -margin_y, margin_x, margin_y)
+        return [path for path, item in self.items.items()
+                if self.list.visualItemRect(item).intersects(area)]
+
+    def load_visible(self):
+        """Request thumbnails of visible items and drop queued ones that scrolled away"""
+        if not self.isVisible():
+            return
+        visible = set(self.visible_paths())
+        for path in [path for path in self.pending if path not in visible]:
+            # Only requests that have not started can be withdrawn
+            if self.pool.tryTake(self.pending[path]):
+                del self.pending[path]
+        for path in visible:
+            if path in self.loaded or path in self.pending:
+                continue
+            self.pending[path] = run_in_background(
+                self.cache.get, path,
+                on_finished=lambda thumb, path=path: self.on_thumbnail(path, thumb),
+                on_error=lambda error, path=path: self.pending.pop(path, None),
+                pool=self.pool)
+
+    def on_thumbnail(self, path, thumb):
+        self.pending.pop(path, None)
+        item = self.items.get(path)
+        if item is None:
+            return  # From a folder that is no longer shown
+        self.loaded.add(path)
+        item.setIcon(QIcon(to_pixmap(thumb)))
+        self.stats_label.setText(
+            f"{self.cache.hit_rate() * 100:.0f}% cached, {self.cache.generation_rate():.0f} thumbs/s")
+        self.stats_label.setToolTip(self.cache.report())
+
+    def open_item(self, item):
+        self.main_window.load_file(item.data(Qt.ItemDataRole.UserRole))
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.schedule_load()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.schedule_load(0)
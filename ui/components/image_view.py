@@ -1,23 +1,36 @@
 from PyQt6.QtWidgets import QScrollArea, QLabel, QSizePolicy
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QCursor
 
+SELECTION_TOOLS = ('rect', 'ellipse', 'lasso')
+
 class ImageScrollArea(QScrollArea):
+    # Emitted while drawing a selection: tool, viewport points, finished
+    selection_changed = pyqtSignal(str, list, bool)
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWidgetResizable(True)
         self.hand_mode = False
         self.last_pos = None
+        self.selection_tool = None
+        self.selection_points = []
         
     def mousePressEvent(self, event):
         if self.hand_mode and event.button() == Qt.MouseButton.LeftButton:
             self.setCursor(QCursor(Qt.CursorShape.ClosedHandCursor))
             self.last_pos = event.position().toPoint()
+        elif self.selection_tool and event.button() == Qt.MouseButton.LeftButton:
+            self.selection_points = [event.position().toPoint()]
+            self.selection_changed.emit(self.selection_tool, self.selection_points, False)
         super().mousePressEvent(event)
             
     def mouseReleaseEvent(self, event):
         if self.hand_mode:
             self.setCursor(QCursor(Qt.CursorShape.OpenHandCursor))
+        elif self.selection_tool and self.selection_points:
+            self.selection_changed.emit(self.selection_tool, self.selection_points, True)
+            self.selection_points = []
         super().mouseReleaseEvent(event)
     
     def mouseMoveEvent(self, event):
@@ -26,6 +39,14 @@ class ImageScrollArea(QScrollArea):
             self.horizontalScrollBar().setValue(self.horizontalScrollBar().value() - delta.x())
             self.verticalScrollBar().setValue(self.verticalScrollBar().value() - delta.y())
             self.last_pos = event.position().toPoint()
+        elif self.selection_tool and self.selection_points:
+            point = event.position().toPoint()
+            if self.selection_tool == 'lasso':
+                self.selection_points.append(point)
+            else:
+                # Rectangle and ellipse only need the drag start and end
+                self.selection_points = [self.selection_points[0], point]
+            self.selection_changed.emit(self.selection_tool, self.selection_points, False)
         super().mouseMoveEvent(event)
     
     def setHandMode(self, enabled):
@@ -38,6 +59,14 @@ class ImageScrollArea(QScrollArea):
             self.setCursor(QCursor(Qt.CursorShape.ArrowCursor))
             self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
             self.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
+    
+    def setSelectionTool(self, tool):
+        self.selection_tool = tool if tool in SELECTION_TOOLS else None
+        self.selection_points = []
+        if self.selection_tool:
+            self.setCursor(QCursor(Qt.CursorShape.CrossCursor))
+        elif not self.hand_mode:
+            self.setCursor(QCursor(Qt.CursorShape.ArrowCursor))
 
 def create_image_label():
     label = QLabel("No Image Loaded")
@@ -45,3 +74,13 @@ def create_image_label():
     label.setAlignment(Qt.AlignmentFlag.AlignCenter)
     label.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
     return label
+
+def label_to_image_point(label, point, zoom_factor):
+    """Convert a point in label coordinates to image pixel coordinates"""
+    pixmap = label.pixmap()
+    if pixmap is None or pixmap.isNull():
+        return None
+    # The pixmap is centered inside the label
+    offset_x = (label.width() - pixmap.width()) / 2
+    offset_y = (label.height() - pixmap.height()) / 2
+    return ((point.x() - offset_x) / zoom_factor, (point.y() - offset_y) / zoom_factor)
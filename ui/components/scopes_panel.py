@@ -0,0 +1,142 @@
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QSizePolicy
+from PyQt6.QtGui import QPainter, QColor, QPainterPath, QPen
+from PyQt6.QtCore import Qt, QTimer, QThreadPool
+
+from ui.components.effect_gallery import to_pixmap
+from ui.workers import run_in_background
+from utils.scopes import BINS, ScopeAnalyzer
+
+HISTOGRAM_COLORS = {
+    'red': QColor(230, 70, 70),
+    'green': QColor(70, 200, 90),
+    'blue': QColor(80, 130, 240),
+}
+
+
+class HistogramView(QWidget):
+    """Luma histogram filled, RGB histograms as lines"""
+
+    def __init__(self):
+        super().__init__()
+        self.scopes = None
+        self.setMinimumHeight(120)
+        self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
+
+    def set_scopes(self, scopes):
+        self.scopes = scopes
+        self.update()
+
+    def _path(self, counts, peak, closed):
+        w, h = self.width(), self.height()
+        path = QPainterPath()
+        path.moveTo(0, h)
+        for value in range(BINS):
+            path.lineTo(value * w / (BINS - 1), h - min(1.0, counts[value] / peak) * h)
+        if closed:
+            path.lineTo(w, h)
+            path.closeSubpath()
+        return path
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor(25, 25, 25))
+        if self.scopes is None:
+            return
+        # Scaled to the largest bin outside the extremes, which clipping piles up
+        peak = max(max(self.scopes[name][1:-1].max() for name in ('red', 'green', 'blue', 'luma')), 1)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.fillPath(self._path(self.scopes['luma'], peak, True), QColor(200, 200, 200, 90))
+        for name, color in HISTOGRAM_COLORS.items():
+            painter.setPen(QPen(color, 1))
+            painter.drawPath(self._path(self.scopes[name], peak, False))
+
+
+class ScopesPanel(QWidget):
+    """Histogram and waveform of the displayed image, computed on a worker thread"""
+
+    def __init__(self, main_window):
+        super().__init__()
+        self.main_window = main_window
+        self.analyzer = ScopeAnalyzer()
+        # One worker, so jobs finish in order and the analyzer is never shared
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(1)
+        self.pending = None
+        self.running = False
+        self.job = None  # The Worker computing the scopes
+
+        # Updates are limited to the display's refresh rate
+        self.update_timer = QTimer()
+        self.update_timer.setSingleShot(True)
+        self.update_timer.timeout.connect(self.dispatch)
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(4, 4, 4, 4)
+        layout.addWidget(QLabel("Histogram"))
+        self.histogram = HistogramView()
+        layout.addWidget(self.histogram)
+        layout.addWidget(QLabel("Waveform"))
+        self.waveform = QLabel()
+        self.waveform.setMinimumSize(200, 120)
+        self.waveform.setSizePolicy(QSizePolicy.Policy.Ignored, QSizePolicy.Policy.Ignored)
+        self.waveform.setStyleSheet("background-color: #191919;")
+        layout.addWidget(self.waveform, 1)
+        self.stats_label = QLabel("")
+        layout.addWidget(self.stats_label)
+
+    def refresh_interval(self):
+        """Milliseconds between updates: one frame of the screen showing the panel"""
+        screen = self.screen()
+        rate = screen.refreshRate() if screen is not None else 60
+        return max(1, int(1000 / (rate or 60)))
+
+    def request(self, graph, image):
+        """Update the scopes for an image just displayed, rendered by graph"""
+        if not self.isVisible() or image is None:
+            return
+        # Sampled now: preview buffers are reused by the next render
+        job = self.analyzer.prepare(graph, image)
+        if job['pixels'] is None and self.pending is not None and self.pending['key'] == job['key']:
+            # The replaced job carried the base this one is remapped from
+            job['pixels'] = self.pending['pixels']
+        self.pending = job
+        if not self.running and not self.update_timer.isActive():
+            self.update_timer.start(self.refresh_interval())
+
+    def dispatch(self):
+        if self.pending is None or self.running:
+            return
+        job, self.pending = self.pending, None
+        self.running = True
+        # Kept until its callback runs; otherwise its signals may be collected first
+        self.job = run_in_background(self.analyzer.compute, job,
+                                     on_finished=self.on_scopes, on_error=self.on_error, pool=self.pool)
+
+    def on_scopes(self, scopes):
+        self.running = False
+        self.job = None
+        if scopes is not None:
+            self.histogram.set_scopes(scopes)
+            self.waveform.setPixmap(to_pixmap(scopes['waveform_image']).scaled(
+                self.waveform.size(), Qt.AspectRatioMode.IgnoreAspectRatio,
+                Qt.TransformationMode.SmoothTransformation))
+            self.stats_label.setText(self.analyzer.report())
+        else:
+            self.analyzer.sampled_key = None  # Sample the base again with the next update
+        if self.pending is not None:
+            self.update_timer.start(self.refresh_interval())
+
+    def on_error(self, error):
+        self.running = False
+        self.job = None
+        self.analyzer.sampled_key = None
+        print(f"Error computing scopes: {error}")
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        # Scopes are not computed while hidden, so catch up with the current image
+        window = self.main_window
+        if window.edited_image is not None:
+            self.request(window.edit_graph, window.edited_image)
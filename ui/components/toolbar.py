@@ -1,4 +1,4 @@
-from PyQt6.QtWidgets import QFrame, QHBoxLayout, QPushButton
+from PyQt6.QtWidgets import QFrame, QHBoxLayout, QPushButton, QSpinBox
 from PyQt6.QtGui import QFont
 from PyQt6.QtCore import Qt
 
@@ -63,6 +63,31 @@ class EditorToolbar(QFrame):
         self.hand_tool_btn.setCheckable(True)
         self.hand_tool_btn.clicked.connect(lambda checked: self.main_window.toggle_hand_tool(checked))
         
+        separator3 = QFrame()
+        separator3.setFrameShape(QFrame.Shape.VLine)
+        separator3.setFrameShadow(QFrame.Shadow.Sunken)
+        separator3.setFixedWidth(1)
+        separator3.setStyleSheet("background-color: #303030;")
+        
+        # Selection tools limit effects to a region of the image
+        self.selection_buttons = {}
+        for tool, text, tooltip in (("rect", "▭", "Rectangle Selection"),
+                                    ("ellipse", "◯", "Ellipse Selection"),
+                                    ("lasso", "✎", "Lasso Selection")):
+            btn = IconButton(text, tooltip)
+            btn.setCheckable(True)
+            btn.clicked.connect(lambda checked, tool=tool: self.main_window.toggle_selection_tool(tool, checked))
+            self.selection_buttons[tool] = btn
+        
+        clear_selection_btn = IconButton("✕", "Clear Selection")
+        clear_selection_btn.clicked.connect(self.main_window.clear_selection)
+        
+        self.feather_spin = QSpinBox()
+        self.feather_spin.setRange(0, 100)
+        self.feather_spin.setSuffix(" px")
+        self.feather_spin.setToolTip("Selection Feather")
+        self.feather_spin.setFixedHeight(40)
+        
         toolbar_layout.addWidget(self.undo_btn)
         toolbar_layout.addWidget(self.redo_btn)
         toolbar_layout.addWidget(separator1)
@@ -72,6 +97,11 @@ class EditorToolbar(QFrame):
         toolbar_layout.addWidget(zoom_fit_btn)
         toolbar_layout.addWidget(separator2)
         toolbar_layout.addWidget(self.hand_tool_btn)
+        toolbar_layout.addWidget(separator3)
+        for btn in self.selection_buttons.values():
+            toolbar_layout.addWidget(btn)
+        toolbar_layout.addWidget(clear_selection_btn)
+        toolbar_layout.addWidget(self.feather_spin)
         toolbar_layout.addStretch()
         
     def set_undo_enabled(self, enabled):
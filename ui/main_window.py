@@ -1,21 +1,44 @@
 from PyQt6.QtWidgets import (QMainWindow, QLabel, QSlider, QVBoxLayout, 
                            QHBoxLayout, QWidget, QPushButton, QFileDialog, 
                            QGroupBox, QScrollArea, QSizePolicy, QFrame,
-                           QSpacerItem, QGridLayout, QComboBox, QStackedWidget)
-from PyQt6.QtGui import QPixmap, QImage, QAction, QCursor, QIcon, QFont
-from PyQt6.QtCore import Qt, QTimer, QPoint, QSize
+                           QSpacerItem, QGridLayout, QComboBox, QStackedWidget,
+                           QDialog, QProgressBar, QInputDialog, QDockWidget,
+                           QMessageBox)
+from PyQt6.QtGui import QPixmap, QImage, QAction, QActionGroup, QCursor, QIcon, QFont, QPainter, QPen, QColor, QPolygonF
+from PyQt6.QtCore import Qt, QTimer, QPoint, QPointF, QSize, QThreadPool
 import cv2
 import numpy as np
 import copy
+import os
+import time
 
 from ui.styles import get_dark_style
-from utils.image_loader import load_image, save_image
+from utils.image_loader import load_image, save_image, PILLOW_FORMATS, DEFAULT_EXPORT_OPTIONS
+from utils.exporter import export_batch
+from utils.animation import export_animation, format_stats
+from utils.contact_sheet import render_contact_sheet
+from utils.autosave import AUTOSAVE_INTERVAL_MS, SessionAutosave, discard_session, find_sessions, load_session
 from edit.image_filters import ImageFilters
+from edit.edit_graph import EditGraph
+from edit.recipe import recipe_from_graph, save_recipe, apply_recipe, without_regions
+from edit.project import PROJECT_EXTENSION, load_project, read_manifest, read_preview, save_project
+from edit.render_scheduler import RenderScheduler
+from edit.viewport import MIN_PIXELS, VIEWPORT_ZOOM, ViewportRenderer, region_plan
+from edit.working_format import WORKING_FORMATS, to_display
 from effects import get_effect, get_effect_names, apply_effect
-from ui.components.image_view import ImageScrollArea, create_image_label
+from edit.selection import RectSelection, EllipseSelection, LassoSelection
+from ui.components.image_view import ImageScrollArea, create_image_label, label_to_image_point
 from ui.components.toolbar import EditorToolbar
 from ui.components.controls_sidebar import ControlsSidebar
 from ui.components.effect_manager import EffectManager
+from ui.components.export_dialog import ExportDialog
+from ui.components.animation_dialog import AnimationDialog
+from ui.components.contact_sheet_dialog import ContactSheetDialog, ContactSheetViewer
+from ui.components.effect_gallery import EffectGallery
+from ui.components.folder_browser import FolderBrowser
+from ui.components.scopes_panel import ScopesPanel
+from ui.components.diagnostics_dialog import DiagnosticsDialog
+from ui.workers import run_in_background
 
 class ImageEditorWindow(QMainWindow):
     def __init__(self):
@@ -23,16 +46,56 @@ class ImageEditorWindow(QMainWindow):
         self.image_filters = ImageFilters()
         self.original_image = None
         self.edited_image = None
+        self.current_file = None
+        # Dtype images are processed in: uint8, uint16 or float32
+        self.working_format = 'uint8'
+        # Incremented whenever edited_image changes; keys preview caches
+        self.image_version = 0
         self.zoom_factor = 1.0
+        
+        # Non-destructive edit state: adjustments followed by applied effects
+        self.edit_graph = EditGraph()
+        
+        # Active selection (in image coordinates) that limits applied effects
+        self.selection = None
+        self.display_pixmap = None
+        
+        # Export settings and running background exports
+        self.export_options = dict(DEFAULT_EXPORT_OPTIONS)
+        self.active_exports = []
+        
+        # Picks preview resolution and debounce interval while dragging sliders
+        self.render_scheduler = RenderScheduler(target_fps=30)
+        
+        # Tile renderer of the current edit while zoomed in (None when the
+        # edited image is up to date); remaining tiles render on one worker
+        self.viewport = None
+        self.viewport_job = None
+        self.viewport_history = None  # History entry waiting for the viewport's frame
+        self.viewport_pool = QThreadPool()
+        self.viewport_pool.setMaxThreadCount(1)
+        self.project_job = None  # Worker loading and rendering an opened project
+        
         self.edit_timer = QTimer()
         self.edit_timer.setSingleShot(True)
         self.edit_timer.timeout.connect(self.delayed_edit)
+        self.history_timer = QTimer()
+        self.history_timer.setSingleShot(True)
+        self.history_timer.timeout.connect(self.add_to_history)
         
         # History for undo/redo
         self.history = []
         self.current_position = -1
         self.max_history = 20
         
+        # Periodic background save of the history for crash recovery
+        self.autosave = SessionAutosave()
+        self.autosave_running = False
+        self.autosave_job = None  # Worker of the running autosave, kept so its signals survive
+        self.autosave_timer = QTimer()
+        self.autosave_timer.timeout.connect(self.autosave_session)
+        self.autosave_timer.start(AUTOSAVE_INTERVAL_MS)
+        
         # Create effect manager
         self.effect_manager = EffectManager()
         
@@ -57,6 +120,9 @@ class ImageEditorWindow(QMainWindow):
         self.image_label = create_image_label()  # from image_view module
         self.scroll_area = ImageScrollArea()
         self.scroll_area.setWidget(self.image_container)
+        self.scroll_area.selection_changed.connect(self.on_selection_changed)
+        self.scroll_area.horizontalScrollBar().valueChanged.connect(lambda _: self.on_view_moved())
+        self.scroll_area.verticalScrollBar().valueChanged.connect(lambda _: self.on_view_moved())
         self.image_container_layout.addWidget(self.image_label)
         
         # Toolbar from new module
@@ -77,6 +143,46 @@ class ImageEditorWindow(QMainWindow):
         central_widget.setLayout(main_layout)
         self.setCentralWidget(central_widget)
         
+        # Effect preview gallery, docked on the left
+        self.effect_gallery = EffectGallery(main_window=self)
+        self.gallery_dock = QDockWidget("EFFECT GALLERY", self)
+        self.gallery_dock.setWidget(self.effect_gallery)
+        self.gallery_dock.setMinimumWidth(300)
+        self.addDockWidget(Qt.DockWidgetArea.LeftDockWidgetArea, self.gallery_dock)
+        self.gallery_dock.hide()
+        self.view_menu.addAction(self.gallery_dock.toggleViewAction())
+        for slider in self.controls_sidebar.effect_sliders.values():
+            slider.valueChanged.connect(lambda _: self.effect_gallery.schedule_refresh(150))
+        
+        # Filmstrip of the images in a folder, docked at the bottom
+        self.folder_browser = FolderBrowser(main_window=self)
+        self.browser_dock = QDockWidget("FOLDER BROWSER", self)
+        self.browser_dock.setWidget(self.folder_browser)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.browser_dock)
+        self.browser_dock.hide()
+        self.view_menu.addAction(self.browser_dock.toggleViewAction())
+        
+        # Histogram and waveform, docked on the right
+        self.scopes_panel = ScopesPanel(main_window=self)
+        self.scopes_dock = QDockWidget("SCOPES", self)
+        self.scopes_dock.setWidget(self.scopes_panel)
+        self.scopes_dock.setMinimumWidth(280)
+        self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.scopes_dock)
+        self.scopes_dock.hide()
+        self.view_menu.addAction(self.scopes_dock.toggleViewAction())
+        
+        # Backends, fallbacks and memory statistics
+        diagnostics_action = QAction('Diagnostics...', self)
+        diagnostics_action.triggered.connect(
+            lambda: DiagnosticsDialog(self.working_format, self).show())
+        self.view_menu.addAction(diagnostics_action)
+        
+        # Progress indicator for background exports
+        self.export_progress = QProgressBar()
+        self.export_progress.setFixedWidth(160)
+        self.export_progress.hide()
+        self.statusBar().addPermanentWidget(self.export_progress)
+        
     def createMenuBar(self):
         menubar = self.menuBar()
         
@@ -89,12 +195,43 @@ class ImageEditorWindow(QMainWindow):
         open_action.triggered.connect(self.open_image)
         file_menu.addAction(open_action)
         
+        # Browse a folder of images in the filmstrip
+        open_folder_action = QAction('Open Folder...', self)
+        open_folder_action.setShortcut('Ctrl+Shift+O')
+        open_folder_action.triggered.connect(self.open_folder)
+        file_menu.addAction(open_folder_action)
+        
+        # Reopen a saved edit
+        open_project_action = QAction('Open Project...', self)
+        open_project_action.triggered.connect(self.open_project)
+        file_menu.addAction(open_project_action)
+        
         # Save action
         save_action = QAction('Save', self)
         save_action.setShortcut('Ctrl+S')
         save_action.triggered.connect(self.save_image)
         file_menu.addAction(save_action)
         
+        # Batch export action
+        batch_export_action = QAction('Batch Export...', self)
+        batch_export_action.triggered.connect(self.batch_export)
+        file_menu.addAction(batch_export_action)
+        
+        # Animated parameter sweep export
+        animation_action = QAction('Export Animation...', self)
+        animation_action.triggered.connect(self.export_animation)
+        file_menu.addAction(animation_action)
+        
+        # Save recipe action
+        save_recipe_action = QAction('Save Recipe...', self)
+        save_recipe_action.triggered.connect(self.save_recipe)
+        file_menu.addAction(save_recipe_action)
+        
+        # Save the original and the edit as a project
+        save_project_action = QAction('Save Project...', self)
+        save_project_action.triggered.connect(self.save_project)
+        file_menu.addAction(save_project_action)
+        
         # Exit action
         exit_action = QAction('Exit', self)
         exit_action.setShortcut('Ctrl+Q')
@@ -115,33 +252,318 @@ class ImageEditorWindow(QMainWindow):
         redo_action.setShortcut('Ctrl+Y')
         redo_action.triggered.connect(self.redo)
         edit_menu.addAction(redo_action)
+        
+        # Working format submenu
+        format_menu = edit_menu.addMenu('Working Format')
+        format_group = QActionGroup(self)
+        self.format_actions = {}
+        for format_name, label in (('uint8', '8-bit'), ('uint16', '16-bit'), ('float32', '32-bit Float')):
+            action = QAction(label, self, checkable=True)
+            action.setChecked(format_name == self.working_format)
+            action.triggered.connect(lambda checked, f=format_name: self.set_working_format(f))
+            format_group.addAction(action)
+            self.format_actions[format_name] = action
+            format_menu.addAction(action)
+        
+        # View menu, filled in once the panels exist
+        self.view_menu = menubar.addMenu('View')
     
     def open_image(self):
         file_path, _ = QFileDialog.getOpenFileName(self, "Open Image", "", 
-                                                 "Image Files (*.png *.jpg *.jpeg *.bmp)")
+                                                 "Image Files (*.png *.jpg *.jpeg *.bmp *.tif *.tiff *.webp)")
         if file_path:
-            self.original_image = load_image(file_path)
-            self.edited_image = self.original_image.copy()
-            self.display_image(self.edited_image)
-            self.reset_sliders()
-            self.zoom_to_fit()  # Automatically zoom to fit when opening a new image
-            
-            # Clear history when opening a new image
-            self.clear_history()
-            # Add initial state to history
-            self.add_to_history()
+            self.load_file(file_path)
+    
+    def open_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Open Folder")
+        if folder:
+            self.folder_browser.set_folder(folder)
+            self.browser_dock.show()
+    
+    def load_file(self, file_path):
+        """Load an image file in the current working format and start a new edit"""
+        self.current_file = file_path
+        self.original_image = load_image(file_path, self.working_format)
+        self.selection = None
+        self.edit_graph.set_source(self.original_image)
+        self.reset_sliders()
+        self.render_graph()
+        self.zoom_to_fit()  # Automatically zoom to fit when opening a new image
+        
+        # Clear history when opening a new image
+        self.clear_history()
+        # Add initial state to history
+        self.add_to_history()
     
     def save_image(self):
+        self.materialize()
         if self.edited_image is not None:
             file_path, _ = QFileDialog.getSaveFileName(self, "Save Image", "", 
-                                                     "PNG (*.png);;JPEG (*.jpg *.jpeg);;BMP (*.bmp)")
+                                                     "PNG (*.png);;JPEG (*.jpg *.jpeg);;WebP (*.webp);;TIFF (*.tif *.tiff);;BMP (*.bmp)")
             if file_path:
-                save_image(file_path, self.edited_image)
+                options = self.ask_export_options(os.path.splitext(file_path)[1])
+                if options is None:
+                    return
+                # Graph outputs are never modified in place, so the encoder
+                # can read the current image while editing continues
+                self.start_export(f"Saving {os.path.basename(file_path)}...",
+                                  save_image, file_path, self.edited_image, options,
+                                  on_finished=lambda _: self.statusBar().showMessage(
+                                      f"Saved {file_path}", 3000))
+    
+    def ask_export_options(self, extension):
+        """Ask for encoder options; returns None if the user cancels"""
+        file_format = PILLOW_FORMATS.get(extension.lower())
+        if file_format is None:
+            return dict(self.export_options)
+        dialog = ExportDialog(file_format, self.export_options, self)
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return None
+        self.export_options = dialog.get_options()
+        return self.export_options
+    
+    def batch_export(self):
+        """Apply the current edits to many files and encode them in parallel"""
+        if self.original_image is None:
+            return
+        input_paths, _ = QFileDialog.getOpenFileNames(self, "Select Images", "",
+                                                      "Image Files (*.png *.jpg *.jpeg *.bmp *.webp)")
+        if not input_paths:
+            return
+        output_dir = QFileDialog.getExistingDirectory(self, "Output Folder")
+        if not output_dir:
+            return
+        extension, ok = QInputDialog.getItem(self, "Batch Export", "Format:",
+                                             ['png', 'jpg', 'webp', 'bmp'], 0, False)
+        if not ok:
+            return
+        options = self.ask_export_options('.' + extension)
+        if options is None:
+            return
+        
+        recipe, removed = without_regions(recipe_from_graph(self.edit_graph))
+        if removed:
+            # Selections are in this image's pixel coordinates
+            answer = QMessageBox.warning(
+                self, "Batch Export",
+                f"{removed} effect(s) limited to a selection will be skipped "
+                "for the other images.",
+                QMessageBox.StandardButton.Ok | QMessageBox.StandardButton.Cancel)
+            if answer != QMessageBox.StandardButton.Ok:
+                return
+        
+        def on_finished(result):
+            failed = len(result['failures'])
+            renamed = f", {len(result['renamed'])} renamed to avoid duplicate names" if result['renamed'] else ''
+            self.statusBar().showMessage(
+                f"Exported {len(input_paths) - failed} of {len(input_paths)} images "
+                f"in {result['seconds']:.1f}s{renamed}", 5000)
+        
+        self.start_export(f"Exporting {len(input_paths)} images...",
+                          export_batch, input_paths, output_dir,
+                          lambda image: apply_recipe(image, recipe),
+                          extension=extension, options=options,
+                          on_finished=on_finished, with_progress=True)
+    
+    def export_animation(self):
+        """Sweep an effect parameter over frames and save a GIF, APNG or WebP"""
+        effect_nodes = self.edit_graph.effect_nodes()
+        if self.original_image is None or not effect_nodes:
+            self.statusBar().showMessage("Apply an effect with parameters to animate it", 3000)
+            return
+        dialog = AnimationDialog(effect_nodes, self)
+        if dialog.exec() != QDialog.DialogCode.Accepted or dialog.get_settings() is None:
+            return
+        settings = dialog.get_settings()
+        file_path, _ = QFileDialog.getSaveFileName(self, "Export Animation", "",
+                                                   "GIF (*.gif);;Animated PNG (*.png);;WebP (*.webp)")
+        if not file_path:
+            return
+        options = self.ask_export_options(os.path.splitext(file_path)[1])
+        if options is None:
+            return
+        
+        self.start_export(f"Rendering {settings['frames']} frames...",
+                          export_animation, file_path, self.original_image,
+                          recipe_from_graph(self.edit_graph), settings['sweeps'],
+                          frames=settings['frames'], fps=settings['fps'], options=options,
+                          on_finished=lambda stats: self.statusBar().showMessage(
+                              f"Saved {os.path.basename(file_path)}: {format_stats(stats)}", 8000),
+                          with_progress=True)
+    
+    def show_contact_sheet(self, effect_name):
+        """Render a grid of parameter values of an effect on the current image"""
+        self.materialize()
+        if self.edited_image is None:
+            return
+        dialog = ContactSheetDialog(effect_name, self)
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return
+        settings = dialog.get_settings()
+        base_params = self.controls_sidebar.effects_panel.get_params(effect_name)
+        
+        def on_finished(result):
+            sheet, stats = result
+            self.statusBar().showMessage(
+                f"Rendered {stats['cells']} cells in {stats['seconds']:.1f}s", 5000)
+            viewer = ContactSheetViewer(sheet, f"{get_effect(effect_name).name} Contact Sheet", self)
+            viewer.show()
+        
+        # The sheet starts from the current edit, like applying the effect would
+        self.start_export("Rendering contact sheet...", render_contact_sheet,
+                          self.edited_image, effect_name, settings['x_axis'], settings['y_axis'],
+                          base_params=base_params, cell_size=settings['cell_size'],
+                          on_finished=on_finished)
+    
+    def start_export(self, message, func, *args, on_finished=None, with_progress=False, **kwargs):
+        """Run an export in the background with a progress indicator"""
+        self.statusBar().showMessage(message)
+        # A busy indicator unless the task reports its progress
+        self.export_progress.setRange(0, 0)
+        self.export_progress.show()
+        
+        def finished(result):
+            self.active_exports.remove(worker)
+            if not self.active_exports:
+                self.export_progress.hide()
+            if on_finished is not None:
+                on_finished(result)
+        
+        def failed(error):
+            self.active_exports.remove(worker)
+            if not self.active_exports:
+                self.export_progress.hide()
+            self.statusBar().showMessage(f"Export failed: {error}", 5000)
+        
+        def progress(done, total):
+            self.export_progress.setRange(0, total)
+            self.export_progress.setValue(done)
+        
+        worker = run_in_background(func, *args, on_finished=finished, on_error=failed,
+                                   on_progress=progress if with_progress else None, **kwargs)
+        self.active_exports.append(worker)
+    
+    def set_working_format(self, working_format):
+        """Switch the processing dtype; the current file is reloaded at the new depth"""
+        if working_format not in WORKING_FORMATS or working_format == self.working_format:
+            return
+        self.working_format = working_format
+        if self.current_file is not None:
+            # Reload the original at the new depth but keep the edit chain
+            self.original_image = load_image(self.current_file, self.working_format)
+            self.edit_graph.replace_source(self.original_image)
+            self.render_graph()
+            self.add_to_history()
+        self.statusBar().showMessage(f"Working format: {working_format}", 3000)
+    
+    def save_recipe(self):
+        """Save the current adjustments and effects as a reusable recipe"""
+        if self.original_image is None:
+            return
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save Recipe", "", "Recipe (*.json)")
+        if file_path:
+            save_recipe(file_path, recipe_from_graph(self.edit_graph))
+            self.statusBar().showMessage(f"Recipe saved to {file_path}", 3000)
     
-    def display_image(self, image):
+    def save_project(self):
+        """Save the original image reference and the edit so it can be reopened"""
+        self.materialize()
+        if self.edited_image is None:
+            return
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save Project", "",
+                                                   f"Dither Girl Project (*{PROJECT_EXTENSION})")
+        if not file_path:
+            return
+        if not file_path.lower().endswith(PROJECT_EXTENSION):
+            file_path += PROJECT_EXTENSION
+        choices = ["Reference the original file", "Embed the original",
+                   "Embed the original and the rendered result"]
+        if self.current_file is None:
+            choices = choices[1:]
+        choice, ok = QInputDialog.getItem(self, "Save Project", "Original image:", choices, 0, False)
+        if not ok:
+            return
+        # The graph is copied so editing can go on while the project is written
+        graph = EditGraph(cache_budget=0)
+        graph.set_source(self.original_image, adjustments=False)
+        graph.restore(self.edit_graph.snapshot())
+        self.start_export(f"Saving {os.path.basename(file_path)}...", save_project, file_path, graph,
+                          self.edited_image, source_path=self.current_file,
+                          working_format=self.working_format,
+                          embed_original=choice != choices[0] or self.current_file is None,
+                          store_render=choice == choices[-1],
+                          on_finished=lambda _: self.statusBar().showMessage(
+                              f"Project saved to {file_path}", 3000))
+    
+    def open_project(self):
+        """Show a project's preview at once and render it in the background"""
+        file_path, _ = QFileDialog.getOpenFileName(self, "Open Project", "",
+                                                   f"Dither Girl Project (*{PROJECT_EXTENSION})")
+        if not file_path:
+            return
+        try:
+            manifest = read_manifest(file_path)
+            preview = read_preview(file_path)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "Open Project", str(e))
+            return
+        
+        # No edits until the full resolution image is ready
+        self.original_image = None
+        self.edited_image = None
+        width, height = manifest['size']
+        self.zoom_to_fit((width, height))
+        self.display_image(preview, scale=preview.shape[1] / width)
+        self.statusBar().showMessage(f"Opening {os.path.basename(file_path)}...")
+        
+        def render(path):
+            project = load_project(path)
+            graph = project.graph()
+            return project, graph.snapshot(), graph.render()
+        
+        def failed(error):
+            self.project_job = None
+            self.statusBar().showMessage(f"Could not open project: {error}", 5000)
+            QMessageBox.warning(self, "Open Project", error)
+        
+        self.project_job = run_in_background(render, file_path, on_finished=self.show_project,
+                                             on_error=failed)
+    
+    def show_project(self, result):
+        """Continue editing a project loaded and rendered by open_project"""
+        self.project_job = None
+        project, snapshot, image = result
+        self.working_format = project.working_format
+        if project.working_format in self.format_actions:
+            self.format_actions[project.working_format].setChecked(True)
+        self.current_file = project.source_path
+        self.original_image = project.original
+        self.selection = None
+        self.edit_graph.set_source(self.original_image)
+        # The rendered result seeds the graph, so nothing is evaluated again
+        self.edit_graph.restore(snapshot, output=image)
+        
+        sliders = self.controls_sidebar.get_slider_values()
+        sliders.update(project.recipe.get('adjustments', {}))
+        for name in sliders:
+            getattr(self.controls_sidebar, f"{name}_slider")[1].blockSignals(True)
+        self.controls_sidebar.restore_slider_values(sliders)
+        for name in sliders:
+            getattr(self.controls_sidebar, f"{name}_slider")[1].blockSignals(False)
+        
+        self.render_graph()
+        self.zoom_to_fit()
+        self.clear_history()
+        self.add_to_history()
+        self.statusBar().showMessage(f"Opened {os.path.basename(project.file_path)}", 3000)
+    
+    def display_image(self, image, scale=1.0):
+        """Display an image; scale is its resolution relative to the original"""
         if image is None:
             return
-            
+        
+        # High bit depth images are reduced to 8 bits only for display
+        image = to_display(image)
         h, w, ch = image.shape
         bytes_per_line = ch * w
         qt_image = QImage(image.data, w, h, bytes_per_line, QImage.Format.Format_RGB888)
@@ -149,63 +571,221 @@ class ImageEditorWindow(QMainWindow):
         # Create a pixmap from the image
         pixmap = QPixmap.fromImage(qt_image)
         
-        # Apply zoom factor
-        if self.zoom_factor != 1.0:
-            new_width = int(pixmap.width() * self.zoom_factor)
-            new_height = int(pixmap.height() * self.zoom_factor)
+        # Apply zoom factor (previews are enlarged to the original's display size)
+        zoom = self.zoom_factor / scale
+        if zoom != 1.0:
+            new_width = int(pixmap.width() * zoom)
+            new_height = int(pixmap.height() * zoom)
             pixmap = pixmap.scaled(new_width, new_height, Qt.AspectRatioMode.KeepAspectRatio, 
                                  Qt.TransformationMode.SmoothTransformation)
         
-        # Set the pixmap to the label
-        self.image_label.setPixmap(pixmap)
+        # Set the pixmap to the label, with the selection outline on top
+        self.display_pixmap = pixmap
+        self.update_selection_overlay()
         self.image_label.adjustSize()
         
         # Update the status bar with image info and zoom level
-        self.statusBar().showMessage(f"Image Size: {w}x{h} | Zoom: {int(self.zoom_factor * 100)}%")
+        self.statusBar().showMessage(
+            f"Image Size: {int(round(w / scale))}x{int(round(h / scale))} | Zoom: {int(self.zoom_factor * 100)}%")
     
     def apply_edits(self):
         if self.original_image is not None:
-            # Start a timer to delay processing for smoother UI
-            self.edit_timer.start(100)
+            # While dragging, a pending render already picks up the latest
+            # slider values, so intermediate values are coalesced into it
+            h, w = self.original_image.shape[:2]
+            interval = self.render_scheduler.request(w * h)
+            if interval is not None:
+                self.edit_timer.start(interval)
+    
+    def begin_slider_drag(self):
+        self.render_scheduler.begin_drag()
+        # Previews show the whole frame; the tiles of an edit still waiting
+        # for its history entry are completed first
+        if self.viewport_history is not None:
+            self.materialize()
+        self.viewport = None
+        # Previews change the graph without updating edited_image, so a
+        # pending history entry would pair the wrong image and snapshot
+        self.history_timer.stop()
+    
+    def end_slider_drag(self):
+        """Refine the preview to full quality once the drag ends"""
+        self.render_scheduler.end_drag()
+        if self.original_image is not None:
+            self.edit_timer.start(self.render_scheduler.refine())
     
     def delayed_edit(self):
+        preview = self.render_scheduler.start_render()
         if self.original_image is None:
             return
         
-        # Get slider values
-        brightness = self.controls_sidebar.brightness_slider.value()
-        contrast = self.controls_sidebar.contrast_slider.value()
-        saturation = self.controls_sidebar.saturation_slider.value()
-        sharpness = self.controls_sidebar.sharpness_slider.value()
-        blur_amount = self.controls_sidebar.blur_slider.value()
-        
-        # Start with original image
-        self.edited_image = self.original_image.copy()
-        
-        # Apply filters
-        if brightness != 0:
-            self.edited_image = self.image_filters.adjust_brightness(self.edited_image, brightness)
+        # Update the adjustment nodes from the slider values; only nodes whose
+        # value changed (and everything after them) are re-evaluated
+        for name, value in self.controls_sidebar.get_slider_values().items():
+            node = self.edit_graph.adjustment(name)
+            if node is not None:
+                self.edit_graph.update_params(node.id, value=value)
         
-        if contrast != 0:
-            self.edited_image = self.image_filters.adjust_contrast(self.edited_image, contrast)
-        
-        if saturation != 0:
-            self.edited_image = self.image_filters.adjust_saturation(self.edited_image, saturation)
-        
-        if sharpness > 0:
-            self.edited_image = self.image_filters.adjust_sharpness(self.edited_image, sharpness)
-        
-        if blur_amount > 0:
-            self.edited_image = self.image_filters.apply_blur(self.edited_image, blur_amount)
+        if preview:
+            self.render_preview()
+            return
         
-        # Display the edited image
-        self.display_image(self.edited_image)
+        self.render_graph()
         
         # Add to history after a delay to avoid adding too many states while dragging sliders
-        QTimer.singleShot(500, self.add_to_history)
+        self.history_timer.start(500)
+    
+    def render_preview(self):
+        """Render a reduced resolution preview sized to the frame budget"""
+        h, w = self.original_image.shape[:2]
+        scale = self.render_scheduler.choose_scale(w * h)
+        start = time.perf_counter()
+        proxy = self.edit_graph.proxy(scale)
+        preview = proxy.render()
+        self.render_scheduler.record(time.perf_counter() - start, preview.shape[0] * preview.shape[1])
+        self.display_image(preview, scale=scale)
+        self.scopes_panel.request(proxy, preview)
+        self.statusBar().showMessage(
+            f"Preview {int(scale * 100)}% | {self.render_scheduler.achieved_fps:.0f} fps "
+            f"| render {self.render_scheduler.last_latency * 1000:.0f} ms")
+    
+    def render_graph(self):
+        """Evaluate the edit graph and display the result"""
+        if self.start_viewport_render():
+            return
+        start = time.perf_counter()
+        self.edited_image = self.edit_graph.render()
+        self.render_scheduler.record(time.perf_counter() - start,
+                                     self.edited_image.shape[0] * self.edited_image.shape[1])
+        self.image_version += 1
+        self.display_image(self.edited_image)
+        self.scopes_panel.request(self.edit_graph, self.edited_image)
+        self.controls_sidebar.edit_stack_panel.refresh()
+        self.effect_gallery.schedule_refresh()
+    
+    def start_viewport_render(self):
+        """
+        When zoomed in on a large image, render the visible tiles of the edit
+        now and the others in the background. False when the whole frame
+        has to be rendered instead.
+        """
+        previous = self.edited_image
+        if self.viewport is not None:
+            previous = self.viewport.frame
+            if self.viewport_history is not None:
+                # Complete the previous edit so its history entry is not lost
+                self.finish_viewport()
+        self.viewport = None
+        if self.zoom_factor < VIEWPORT_ZOOM or self.edited_image is None:
+            return False
+        h, w = self.original_image.shape[:2]
+        if w * h < MIN_PIXELS:
+            return False
+        plan = region_plan(self.edit_graph)
+        if plan is None or self.edited_image.shape[:2] != (h, w):
+            return False
+        self.viewport = ViewportRenderer(plan, previous=previous)
+        self.render_view()
+        self.controls_sidebar.edit_stack_panel.refresh()
+        self.fill_viewport()
+        return True
+    
+    def visible_box(self):
+        """The part of the image in view, (x0, y0, x1, y1) in image pixels"""
+        viewport = self.scroll_area.viewport()
+        corners = []
+        for point in (QPoint(0, 0), QPoint(viewport.width(), viewport.height())):
+            label_point = self.image_label.mapFrom(viewport, point)
+            corners.append(label_to_image_point(self.image_label, label_point, self.zoom_factor))
+        h, w = self.original_image.shape[:2]
+        if None in corners:
+            return 0, 0, w, h
+        (x0, y0), (x1, y1) = corners
+        return (max(0, int(x0)), max(0, int(y0)), min(w, int(x1) + 1), min(h, int(y1) + 1))
+    
+    def render_view(self):
+        """Render the tiles in and around the view that are not done yet"""
+        tiles = self.viewport.render_view(self.visible_box())
+        if tiles:
+            self.patch_display(tiles)
+            self.statusBar().showMessage(f"Viewport: {self.viewport.report()}")
+    
+    def patch_display(self, tiles):
+        """Draw rendered tiles of the viewport frame over the displayed image"""
+        frame = self.viewport.frame
+        zoom = self.zoom_factor
+        h, w = frame.shape[:2]
+        if self.display_pixmap is None or self.display_pixmap.width() != int(w * zoom):
+            self.display_image(frame)
+            return
+        # Painting a pixmap the label shares would copy all of it first
+        self.image_label.clear()
+        painter = QPainter(self.display_pixmap)
+        for x0, y0, x1, y1 in tiles:
+            tile = np.ascontiguousarray(to_display(frame[y0:y1, x0:x1]))
+            qt_image = QImage(tile.data, x1 - x0, y1 - y0, tile.strides[0], QImage.Format.Format_RGB888)
+            target_w = int(round(x1 * zoom)) - int(round(x0 * zoom))
+            target_h = int(round(y1 * zoom)) - int(round(y0 * zoom))
+            pixmap = QPixmap.fromImage(qt_image).scaled(
+                target_w, target_h, Qt.AspectRatioMode.IgnoreAspectRatio,
+                Qt.TransformationMode.SmoothTransformation)
+            painter.drawPixmap(int(round(x0 * zoom)), int(round(y0 * zoom)), pixmap)
+        painter.end()
+        self.update_selection_overlay()
+    
+    def fill_viewport(self):
+        """Render the next tile nearest to the view on the viewport worker"""
+        if self.viewport is None or self.viewport_job is not None:
+            return
+        viewport = self.viewport
+        tile = viewport.next_tile(self.visible_box())
+        if tile is None:
+            self.finish_viewport()
+            return
+        self.viewport_job = run_in_background(
+            viewport.render_background, tile,
+            on_finished=lambda tile: self.on_viewport_tile(viewport, tile),
+            on_error=lambda error: self.on_viewport_tile(None, None),
+            pool=self.viewport_pool)
+    
+    def on_viewport_tile(self, viewport, tile):
+        self.viewport_job = None
+        if viewport is not None and viewport is self.viewport:
+            self.patch_display([tile])
+        self.fill_viewport()
+    
+    def on_view_moved(self):
+        if self.viewport is not None:
+            self.render_view()
+    
+    def finish_viewport(self):
+        """Make the assembled frame of the viewport renderer the edited image"""
+        viewport, self.viewport = self.viewport, None
+        rendered_now = not viewport.complete()
+        frame = viewport.finish()
+        state, self.viewport_history = self.viewport_history, None
+        if state is not None:
+            state['image'] = frame.copy()
+            self.push_history(state)
+        if viewport.plan.snapshot != self.edit_graph.snapshot():
+            return  # The edit has moved on; the frame only completes its history entry
+        # The graph's final node outputs the frame, as after a full render
+        self.edit_graph.restore(viewport.plan.snapshot, output=frame)
+        self.edited_image = frame
+        self.image_version += 1
+        if rendered_now:
+            self.display_image(frame)
+        self.scopes_panel.request(self.edit_graph, frame)
+        self.effect_gallery.schedule_refresh()
+    
+    def materialize(self):
+        """Render the rest of the full-resolution frame if tiles are still missing"""
+        if self.viewport is not None:
+            self.finish_viewport()
     
     def apply_effect_with_feedback(self, effect_func, effect_name):
         """Apply an effect with status bar feedback"""
+        self.materialize()
         if self.edited_image is not None:
             self.statusBar().showMessage(f"Applying {effect_name} effect...")
             self.edited_image = effect_func(self.edited_image)
@@ -221,30 +801,20 @@ class ImageEditorWindow(QMainWindow):
         self.statusBar().showMessage(f"Applying {effect_name} effect...")
         
         try:
-            effect = get_effect(effect_name)
-            params = {}
-            
             # Get parameters from sliders if the effect has any
-            if effect and effect.has_params:
-                for param_name, param_data in effect.params.items():
-                    slider_key = effect_name + '_' + param_name
-                    if slider_key in self.controls_sidebar.effect_sliders:
-                        slider_value = self.controls_sidebar.effect_sliders[slider_key].value() / 100
-                        
-                        # Handle parameters based on their step value
-                        if param_data.get('step', 1) >= 1:
-                            # Integer parameter (like levels, blur)
-                            params[param_name] = int(slider_value * 100)
-                        else:
-                            # Floating point parameter (like intensity)
-                            params[param_name] = slider_value
-                            
-                        # Debug message
-                        print(f"Effect: {effect_name}, Param: {param_name}, Value: {params[param_name]}")
+            params = self.controls_sidebar.effects_panel.get_params(effect_name)
             
-            # Use the effect manager to apply the effect
-            self.edited_image = self.effect_manager.apply_effect(effect_name, self.edited_image, params)
-            self.display_image(self.edited_image)
+            # Limit the effect to the active selection, if any
+            region = None
+            if self.selection is not None:
+                region = {
+                    'selection': self.selection.to_dict(),
+                    'feather': self.toolbar.feather_spin.value()
+                }
+            
+            # Append the effect to the edit graph; earlier nodes stay cached
+            self.edit_graph.add_effect(effect_name, params, region=region)
+            self.render_graph()
             self.add_to_history()
             self.statusBar().showMessage(f"{effect_name.capitalize()} effect applied", 3000)
             
@@ -253,11 +823,48 @@ class ImageEditorWindow(QMainWindow):
             traceback.print_exc()  # Print detailed error information
             self.statusBar().showMessage(f"Error applying {effect_name} effect: {str(e)}", 5000)
     
+    def set_node_enabled(self, node_id, enabled):
+        """Enable or disable an effect node in the edit graph"""
+        self.edit_graph.set_enabled(node_id, enabled)
+        self.render_graph()
+        self.add_to_history()
+    
+    def move_node(self, node_id, offset):
+        """Move an effect node up or down within the applied effects"""
+        effect_ids = [node.id for node in self.edit_graph.effect_nodes()]
+        position = effect_ids.index(node_id) + offset
+        if position < 0 or position >= len(effect_ids):
+            return
+        self.edit_graph.move_node(node_id, self.edit_graph.index_of(effect_ids[position]))
+        self.render_graph()
+        self.add_to_history()
+    
+    def remove_node(self, node_id):
+        """Delete an effect node from the edit graph"""
+        self.edit_graph.remove_node(node_id)
+        self.render_graph()
+        self.add_to_history()
+    
+    def load_node_params(self, node_id):
+        """Show an effect node's parameters in the effect sliders"""
+        node = self.edit_graph.find(node_id)
+        effects_panel = self.controls_sidebar.effects_panel
+        effects_panel.select_effect(node.name)
+        effects_panel.set_params(node.name, node.params)
+    
+    def update_node_params(self, node_id):
+        """Replace an effect node's parameters with the current slider values"""
+        node = self.edit_graph.find(node_id)
+        params = self.controls_sidebar.effects_panel.get_params(node.name)
+        if self.edit_graph.update_params(node_id, **params):
+            self.render_graph()
+            self.add_to_history()
+    
     def reset_edits(self):
         if self.original_image is not None:
-            self.edited_image = self.original_image.copy()
-            self.display_image(self.edited_image)
+            self.edit_graph.set_source(self.original_image)
             self.reset_sliders()
+            self.render_graph()
             self.add_to_history()
     
     def reset_sliders(self):
@@ -279,12 +886,15 @@ class ImageEditorWindow(QMainWindow):
         self.zoom_factor = 1.0
         self.update_zoom()
     
-    def zoom_to_fit(self):
-        if self.edited_image is None:
-            return
+    def zoom_to_fit(self, size=None):
+        """Zoom so the image (or an image of size (width, height)) fits the view"""
+        if size is None:
+            if self.edited_image is None:
+                return
+            size = self.edited_image.shape[1], self.edited_image.shape[0]
             
         # Calculate zoom factor to fit the scroll area
-        img_h, img_w = self.edited_image.shape[:2]
+        img_w, img_h = size
         view_w = self.scroll_area.width() - 30  # Account for scrollbars
         view_h = self.scroll_area.height() - 30
         
@@ -299,14 +909,97 @@ class ImageEditorWindow(QMainWindow):
     def update_zoom(self):
         # Clamp zoom factor to reasonable limits
         self.zoom_factor = max(0.1, min(10.0, self.zoom_factor))
+        if self.zoom_factor < VIEWPORT_ZOOM:
+            self.materialize()
         
         # Redisplay image with new zoom
-        if self.edited_image is not None:
+        if self.viewport is not None:
+            self.display_image(self.viewport.frame)
+            self.render_view()
+        elif self.edited_image is not None:
             self.display_image(self.edited_image)
     
-    def toggle_hand_tool(self):
+    def toggle_hand_tool(self, checked=None):
         is_checked = self.toolbar.hand_tool_btn.isChecked()
-        self.scroll_area.setHandMode(is_checked)
+        self.set_tool('hand' if is_checked else None)
+    
+    def toggle_selection_tool(self, tool, checked):
+        self.set_tool(tool if checked else None)
+    
+    def set_tool(self, tool):
+        """Activate the hand tool, a selection tool, or no tool"""
+        self.toolbar.hand_tool_btn.setChecked(tool == 'hand')
+        for name, btn in self.toolbar.selection_buttons.items():
+            btn.setChecked(tool == name)
+        self.scroll_area.setHandMode(tool == 'hand')
+        self.scroll_area.setSelectionTool(tool)
+    
+    def on_selection_changed(self, tool, points, finished):
+        """Update the selection from points drawn in the image view"""
+        if self.edited_image is None:
+            return
+        
+        # Map viewport points to image pixel coordinates
+        viewport = self.scroll_area.viewport()
+        image_points = []
+        for point in points:
+            label_point = self.image_label.mapFrom(viewport, point)
+            image_point = label_to_image_point(self.image_label, label_point, self.zoom_factor)
+            if image_point is not None:
+                image_points.append(image_point)
+        if not image_points:
+            return
+        
+        if tool == 'lasso':
+            selection = LassoSelection(image_points)
+        else:
+            (x0, y0), (x1, y1) = image_points[0], image_points[-1]
+            selection_class = EllipseSelection if tool == 'ellipse' else RectSelection
+            selection = selection_class(min(x0, x1), min(y0, y1), abs(x1 - x0), abs(y1 - y0))
+        
+        # Discard selections that cover no pixels
+        h, w = self.edited_image.shape[:2]
+        if finished and selection.bounding_box(w, h) is None:
+            selection = None
+        self.selection = selection
+        self.update_selection_overlay()
+        
+        if finished and selection is not None:
+            x0, y0, x1, y1 = selection.bounding_box(w, h)
+            self.statusBar().showMessage(f"Selection: {x1 - x0}x{y1 - y0} at ({x0}, {y0})", 3000)
+    
+    def clear_selection(self):
+        self.selection = None
+        self.update_selection_overlay()
+    
+    def update_selection_overlay(self):
+        """Draw the selection outline over the displayed image"""
+        if self.display_pixmap is None:
+            return
+        if self.selection is None:
+            self.image_label.setPixmap(self.display_pixmap)
+            return
+        
+        pixmap = self.display_pixmap.copy()
+        painter = QPainter(pixmap)
+        pen = QPen(QColor('#bb86fc'))
+        pen.setStyle(Qt.PenStyle.DashLine)
+        pen.setWidth(2)
+        painter.setPen(pen)
+        
+        zoom = self.zoom_factor
+        if isinstance(self.selection, LassoSelection):
+            polygon = QPolygonF([QPointF(x * zoom, y * zoom) for x, y in self.selection.points])
+            painter.drawPolygon(polygon)
+        else:
+            x, y = self.selection.x * zoom, self.selection.y * zoom
+            w, h = self.selection.width * zoom, self.selection.height * zoom
+            if isinstance(self.selection, EllipseSelection):
+                painter.drawEllipse(QPointF(x + w / 2, y + h / 2), w / 2, h / 2)
+            else:
+                painter.drawRect(int(x), int(y), int(w), int(h))
+        painter.end()
+        self.image_label.setPixmap(pixmap)
     
     def clear_history(self):
         """Clear the edit history"""
@@ -316,22 +1009,32 @@ class ImageEditorWindow(QMainWindow):
     
     def add_to_history(self):
         """Add current state to history"""
+        self.history_timer.stop()
+        if self.viewport is not None:
+            # Added with the image once the viewport renderer has the whole frame
+            self.viewport_history = self.history_state()
+            return
         if self.edited_image is None:
             return
-        
-        # If we're not at the end of history, remove all future states
-        if self.current_position < len(self.history) - 1:
-            self.history = self.history[:self.current_position + 1]
-        
-        # Make a deep copy of the current state
-        state = {
-            'image': self.edited_image.copy(),
+        state = self.history_state()
+        state['image'] = self.edited_image.copy()
+        self.push_history(state)
+    
+    def history_state(self):
+        """The current edit and slider values, without the image"""
+        return {
+            'graph': self.edit_graph.snapshot(),
             'brightness': self.controls_sidebar.brightness_slider[1].value(),
             'contrast': self.controls_sidebar.contrast_slider[1].value(),
             'saturation': self.controls_sidebar.saturation_slider[1].value(),
             'sharpness': self.controls_sidebar.sharpness_slider[1].value(),
             'blur': self.controls_sidebar.blur_slider[1].value()
         }
+    
+    def push_history(self, state):
+        # If we're not at the end of history, remove all future states
+        if self.current_position < len(self.history) - 1:
+            self.history = self.history[:self.current_position + 1]
         
         # Add to history
         self.history.append(state)
@@ -351,6 +1054,7 @@ class ImageEditorWindow(QMainWindow):
     
     def undo(self):
         """Go back one step in history"""
+        self.materialize()
         if self.current_position > 0:
             self.current_position -= 1
             self.restore_state(self.history[self.current_position])
@@ -358,6 +1062,7 @@ class ImageEditorWindow(QMainWindow):
     
     def redo(self):
         """Go forward one step in history"""
+        self.materialize()
         if self.current_position < len(self.history) - 1:
             self.current_position += 1
             self.restore_state(self.history[self.current_position])
@@ -365,31 +1070,88 @@ class ImageEditorWindow(QMainWindow):
     
     def restore_state(self, state):
         """Restore a state from history"""
-        self.edited_image = state['image'].copy()
+        # Restore the edit graph; the saved image seeds the final output so
+        # nothing has to be re-rendered
+        self.edit_graph.restore(state['graph'], output=state['image'].copy())
+        
+        sliders = [self.controls_sidebar.brightness_slider[1],
+                   self.controls_sidebar.contrast_slider[1],
+                   self.controls_sidebar.saturation_slider[1],
+                   self.controls_sidebar.sharpness_slider[1],
+                   self.controls_sidebar.blur_slider[1]]
         
         # Block signals to prevent triggering edits while updating sliders
-        self.controls_sidebar.brightness_slider.blockSignals(True)
-        self.controls_sidebar.contrast_slider.blockSignals(True)
-        self.controls_sidebar.saturation_slider.blockSignals(True)
-        self.controls_sidebar.sharpness_slider.blockSignals(True)
-        self.controls_sidebar.blur_slider.blockSignals(True)
+        for slider in sliders:
+            slider.blockSignals(True)
         
         # Restore slider values
-        self.controls_sidebar.brightness_slider.setValue(state['brightness'])
-        self.controls_sidebar.contrast_slider.setValue(state['contrast'])
-        self.controls_sidebar.saturation_slider.setValue(state['saturation'])
-        self.controls_sidebar.sharpness_slider.setValue(state['sharpness'])
-        self.controls_sidebar.blur_slider.setValue(state['blur'])
+        self.controls_sidebar.restore_slider_values(state)
         
         # Unblock signals
-        self.controls_sidebar.brightness_slider.blockSignals(False)
-        self.controls_sidebar.contrast_slider.blockSignals(False)
-        self.controls_sidebar.saturation_slider.blockSignals(False)
-        self.controls_sidebar.sharpness_slider.blockSignals(False)
-        self.controls_sidebar.blur_slider.blockSignals(False)
+        for slider in sliders:
+            slider.blockSignals(False)
         
         # Display the restored image
-        self.display_image(self.edited_image)
+        self.render_graph()
+    
+    def autosave_session(self):
+        """Save the history changes since the last autosave on a worker thread"""
+        if self.original_image is None or self.autosave_running or not self.history:
+            return
+        capture = self.autosave.capture(self.original_image, self.history, self.current_position,
+                                        self.current_file, self.working_format)
+        self.autosave_running = True
+        
+        def finished(_):
+            self.autosave_running = False
+            self.autosave_job = None
+        
+        self.autosave_job = run_in_background(self.autosave.save, capture,
+                                              on_finished=finished, on_error=finished)
+    
+    def offer_recovery(self):
+        """Offer to restore the newest session that did not exit cleanly"""
+        sessions = find_sessions(exclude=self.autosave.session_id)
+        if not sessions:
+            return
+        session = load_session(sessions[0])
+        if session is None:
+            discard_session(sessions[0])
+            return
+        name = os.path.basename(session.file_path) if session.file_path else "an image"
+        answer = QMessageBox.question(
+            self, "Recover Session",
+            f"Dither Girl did not shut down properly while editing {name}.\n"
+            f"Restore its {len(session.history)} history steps?")
+        if answer == QMessageBox.StandardButton.Yes:
+            self.restore_session(session)
+        else:
+            discard_session(sessions[0])
+    
+    def restore_session(self, session):
+        """Continue a recovered session where it stopped"""
+        self.working_format = session.working_format
+        if session.working_format in self.format_actions:
+            self.format_actions[session.working_format].setChecked(True)
+        self.current_file = session.file_path
+        # Blocks are mapped read-only; the original is read once into memory
+        self.original_image = session.original = np.array(session.original)
+        self.selection = None
+        self.edit_graph.set_source(self.original_image)
+        self.history = session.history
+        self.current_position = session.position
+        # The saved image of the current step is shown without re-rendering
+        self.restore_state(self.history[self.current_position])
+        self.update_history_buttons()
+        self.zoom_to_fit()
+        self.autosave.adopt(session)
+        self.statusBar().showMessage(f"Restored {len(self.history)} history steps", 3000)
+    
+    def closeEvent(self, event):
+        # A clean exit leaves nothing to recover
+        self.autosave_timer.stop()
+        self.autosave.discard()
+        super().closeEvent(event)
     
     def on_effect_dropdown_changed(self, index):
         """Handle effect dropdown selection with category separators"""
@@ -0,0 +1,47 @@
+"""Background task helpers for running work off the GUI thread"""
+import traceback
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+class WorkerSignals(QObject):
+    """Signals emitted by a Worker; delivered on the GUI thread"""
+    finished = pyqtSignal(object)
+    error = pyqtSignal(str)
+    progress = pyqtSignal(int, int)
+
+
+class Worker(QRunnable):
+    """Run a function on the global thread pool and report the result"""
+
+    def __init__(self, func, *args, with_progress=False, **kwargs):
+        super().__init__()
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+        if with_progress:
+            self.kwargs['progress'] = self.signals.progress.emit
+
+    def run(self):
+        try:
+            result = self.func(*self.args, **self.kwargs)
+        except Exception as e:
+            traceback.print_exc()
+            self.signals.error.emit(str(e))
+        else:
+            self.signals.finished.emit(result)
+
+
+def run_in_background(func, *args, on_finished=None, on_error=None, on_progress=None,
+                      pool=None, **kwargs):
+    """Start func on a thread pool (the global one by default) and connect the callbacks"""
+    worker = Worker(func, *args, with_progress=on_progress is not None, **kwargs)
+    if on_finished is not None:
+        worker.signals.finished.connect(on_finished)
+    if on_error is not None:
+        worker.signals.error.connect(on_error)
+    if on_progress is not None:
+        worker.signals.progress.connect(on_progress)
+    (pool or QThreadPool.globalInstance()).start(worker)
+    return worker
@@ -0,0 +1,289 @@
+"""
+Animated export of parameter sweeps.
+One or more effect parameters of a recipe are swept linearly over N frames.
+Frames are rendered concurrently on a worker pool and handed to the encoder
+in order as soon as they are ready, so only a small window of frames is in
+memory at a time:
+
+- GIF: written block by block with one shared palette, computed up front
+  from a few key frames (median cut refined by k-means)
+- APNG: every frame is PNG-compressed by OpenCV and its image data is
+  copied into fdAT chunks
+- WebP: Pillow's animation encoder pulls frames from a lazy frame sequence
+"""
+import copy
+import os
+import struct
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from PIL import GifImagePlugin, Image
+
+from algorithms.palette import kmeans_palette, palette_indices, sample_pixels
+from edit.recipe import apply_recipe, validate_recipe
+from edit.working_format import convert_image
+from effects import get_effect
+from utils.image_loader import DEFAULT_EXPORT_OPTIONS
+
+ANIMATION_FORMATS = {
+    '.gif': 'GIF',
+    '.png': 'APNG',
+    '.apng': 'APNG',
+    '.webp': 'WEBP'
+}
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+# Sweeps
+
+def is_integer_param(effect_name, param):
+    """Whether an effect parameter only takes whole numbers"""
+    effect = get_effect(effect_name)
+    spec = effect.params.get(param, {}) if effect else {}
+    return all(float(spec.get(key, 0)).is_integer() for key in ('default', 'step', 'min'))
+
+
+def sweep_value(start, end, index, count, integer=False):
+    """Value of a linear sweep from start to end at frame index of count"""
+    t = index / (count - 1) if count > 1 else 0.0
+    value = start + (end - start) * t
+    return int(round(value)) if integer else value
+
+
+def sweep_recipe(recipe, sweeps, index, count):
+    """
+    The recipe for one frame. Each sweep is a dict with 'effect' (position
+    in the recipe's effect list), 'param', 'start' and 'end'.
+    """
+    frame = copy.deepcopy(recipe)
+    for sweep in sweeps:
+        entry = frame['effects'][sweep['effect']]
+        integer = is_integer_param(entry['name'], sweep['param'])
+        entry.setdefault('params', {})[sweep['param']] = sweep_value(
+            sweep['start'], sweep['end'], index, count, integer)
+    return frame
+
+
+def render_frame(image, recipe):
+    """Render one frame as 8-bit RGB"""
+    return convert_image(apply_recipe(image, recipe), np.uint8)
+
+
+def render_frames(image, recipes, workers=None, rendered=None, stats=None):
+    """
+    Yield the frames of a list of recipes in order. At most two frames per
+    worker are rendered ahead of the consumer; frames already in rendered
+    (index -> frame) are not rendered again.
+    """
+    workers = max(1, workers or os.cpu_count() or 1)
+    rendered = dict(rendered or {})
+
+    def task(recipe):
+        start = time.perf_counter()
+        frame = render_frame(image, recipe)
+        return frame, time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+        next_submit = 0
+        for index in range(len(recipes)):
+            # Keep the window of frames in flight full
+            while next_submit < len(recipes) and len(pending) < workers * 2:
+                if next_submit not in rendered:
+                    pending[next_submit] = pool.submit(task, recipes[next_submit])
+                next_submit += 1
+            if index in rendered:
+                yield rendered.pop(index)
+                continue
+            frame, seconds = pending.pop(index).result()
+            if stats is not None:
+                stats['rendered'] += 1
+                stats['render_seconds'] += seconds
+            yield frame
+
+
+# Encoders. Each takes an iterator of uint8 RGB frames.
+
+def shared_palette(frames, colors=256):
+    """One palette for a whole GIF, from a pixel sample of some frames"""
+    per_frame = max(1, 65536 // len(frames))
+    pixels = np.concatenate([sample_pixels(frame, per_frame) for frame in frames])
+    return kmeans_palette(pixels, colors, space='rgb', iterations=4)
+
+
+def write_gif(fp, frames, palette, duration, loop=0):
+    """Stream frames to a GIF with a single global palette"""
+    palette_bytes = palette.astype(np.uint8).tobytes()
+    first = True
+    for frame in frames:
+        indexed = Image.fromarray(palette_indices(frame, palette, space='rgb'), 'P')
+        indexed.putpalette(palette_bytes)
+        if first:
+            header, _ = GifImagePlugin.getheader(indexed, info={'loop': loop, 'duration': duration})
+            for chunk in header:
+                fp.write(chunk)
+            first = False
+        # Graphic control extension, image descriptor and LZW data
+        for chunk in GifImagePlugin.getdata(indexed, duration=duration, disposal=1):
+            fp.write(chunk)
+    fp.write(b';')
+
+
+def _png_chunks(data):
+    """(type, payload) of every chunk of an encoded PNG"""
+    position = len(PNG_SIGNATURE)
+    while position < len(data):
+        length, kind = struct.unpack('>I4s', data[position:position + 8])
+        yield kind, data[position + 8:position + 8 + length]
+        position += 12 + length
+
+
+def _write_chunk(fp, kind, payload):
+    fp.write(struct.pack('>I', len(payload)))
+    fp.write(kind)
+    fp.write(payload)
+    fp.write(struct.pack('>I', zlib.crc32(kind + payload) & 0xffffffff))
+
+
+def write_apng(fp, frames, count, duration, loop=0, compression=6):
+    """Stream frames to an animated PNG"""
+    sequence = 0
+    for index, frame in enumerate(frames):
+        ok, encoded = cv2.imencode('.png', cv2.cvtColor(frame, cv2.COLOR_RGB2BGR),
+                                   [cv2.IMWRITE_PNG_COMPRESSION, compression])
+        if not ok:
+            raise IOError("Could not encode animation frame")
+        chunks = list(_png_chunks(encoded.tobytes()))
+        if index == 0:
+            fp.write(PNG_SIGNATURE)
+            _write_chunk(fp, b'IHDR', dict(chunks)[b'IHDR'])
+            _write_chunk(fp, b'acTL', struct.pack('>II', count, loop))
+        height, width = frame.shape[:2]
+        # Frame control: size, offset, delay in ms, no disposal, no blending
+        _write_chunk(fp, b'fcTL', struct.pack('>IIIIIHHBB', sequence, width, height, 0, 0,
+                                              int(duration), 1000, 0, 0))
+        sequence += 1
+        for kind, payload in chunks:
+            if kind != b'IDAT':
+                continue
+            if index == 0:
+                _write_chunk(fp, b'IDAT', payload)
+            else:
+                _write_chunk(fp, b'fdAT', struct.pack('>I', sequence) + payload)
+                sequence += 1
+    _write_chunk(fp, b'IEND', b'')
+
+
+class _FrameSequence(Image.Image):
+    """Multi-frame image whose frames come from an iterator, one at a time"""
+
+    def __init__(self, frames, count):
+        super().__init__()
+        self._frames = iter(frames)
+        self.n_frames = count
+        self.is_animated = count > 1
+        self._index = -1
+        self.seek(0)
+
+    def seek(self, index):
+        if index <= self._index:
+            # Pillow seeks back to the first frame when it is done
+            return
+        while self._index < index:
+            frame = Image.fromarray(next(self._frames))
+            self._index += 1
+        # Same way Pillow's multi-frame readers swap in a decoded frame
+        self.im = frame.im
+        self._size = frame.size
+        if isinstance(getattr(Image.Image, 'mode', None), property):
+            self._mode = frame.mode
+        else:
+            self.mode = frame.mode
+
+    def tell(self):
+        return self._index
+
+
+def write_webp(fp, frames, count, duration, loop=0, quality=90, lossless=False):
+    """Encode frames to an animated WebP, pulling each frame when it is needed"""
+    sequence = _FrameSequence(frames, count)
+    sequence.save(fp, format='WEBP', save_all=True, duration=int(duration), loop=loop,
+                  quality=quality, lossless=lossless, method=4)
+
+
+# Export
+
+def export_animation(file_path, image, recipe, sweeps, frames=24, fps=12, loop=0,
+                     workers=None, colors=256, options=None, progress=None):
+    """
+    Render a parameter sweep and encode it as GIF, APNG or WebP by file
+    extension. Returns render and encode statistics.
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    file_format = ANIMATION_FORMATS.get(ext)
+    if file_format is None:
+        raise ValueError(f"Unsupported animation format: {ext}")
+    validate_recipe(recipe)
+    for sweep in sweeps:
+        if not 0 <= sweep['effect'] < len(recipe.get('effects', [])):
+            raise ValueError(f"Sweep refers to missing effect {sweep['effect']}")
+    count = max(1, int(frames))
+    duration = 1000.0 / max(0.1, fps)
+    opts = dict(DEFAULT_EXPORT_OPTIONS)
+    opts.update(options or {})
+    recipes = [sweep_recipe(recipe, sweeps, index, count) for index in range(count)]
+    stats = {'frames': count, 'rendered': 0, 'render_seconds': 0.0, 'encode_seconds': 0.0,
+             'palette_seconds': 0.0, 'seconds': 0.0}
+    start = time.perf_counter()
+
+    rendered = {}
+    if file_format == 'GIF':
+        # The palette has to be known before the first frame is written
+        keys = sorted({0, count // 2, count - 1})
+        palette_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, workers or os.cpu_count() or 1)) as pool:
+            rendered = dict(zip(keys, pool.map(lambda i: render_frame(image, recipes[i]), keys)))
+        palette = shared_palette(list(rendered.values()), colors)
+        stats['palette_seconds'] = time.perf_counter() - palette_start
+
+    def timed(frames_iter):
+        # Time spent in the encoder, excluding the wait for the next frame
+        for index, frame in enumerate(frames_iter):
+            encode_start = time.perf_counter()
+            yield frame
+            stats['encode_seconds'] += time.perf_counter() - encode_start
+            if progress is not None:
+                progress(index + 1, count)
+
+    frames_iter = timed(render_frames(image, recipes, workers, rendered, stats))
+    tmp_path = f"{file_path}.partial"
+    try:
+        with open(tmp_path, 'wb') as fp:
+            if file_format == 'GIF':
+                write_gif(fp, frames_iter, palette, duration, loop)
+            elif file_format == 'APNG':
+                write_apng(fp, frames_iter, count, duration, loop, int(opts['png_compression']))
+            else:
+                write_webp(fp, frames_iter, count, duration, loop,
+                           int(opts['webp_quality']), bool(opts['webp_lossless']))
+        os.replace(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    stats['seconds'] = time.perf_counter() - start
+    return stats
+
+
+def format_stats(stats):
+    """Human readable render and encode throughput"""
+    frames = stats['frames']
+    render = stats['rendered'] / stats['render_seconds'] if stats['render_seconds'] else 0.0
+    encode = frames / stats['encode_seconds'] if stats['encode_seconds'] else 0.0
+    return (f"{frames} frames in {stats['seconds']:.1f}s "
+            f"({frames / max(stats['seconds'], 1e-9):.1f} fps overall; "
+            f"render {render:.1f} fps per worker, encode {encode:.1f} fps)")
@@ -0,0 +1,38 @@
+"""
+Per-user application directories.
+platformdirs is used when it is installed; otherwise everything lives under
+~/.dither_girl. DITHER_GIRL_HOME overrides both.
+"""
+import os
+
+try:
+    import platformdirs
+except ImportError:
+    platformdirs = None
+
+APP_NAME = 'dither-girl'
+
+
+def _base(kind):
+    override = os.environ.get('DITHER_GIRL_HOME')
+    if override:
+        return os.path.join(override, kind)
+    if platformdirs is not None:
+        if kind == 'cache':
+            return platformdirs.user_cache_dir(APP_NAME)
+        return platformdirs.user_data_dir(APP_NAME)
+    return os.path.join(os.path.expanduser('~'), '.dither_girl', kind)
+
+
+def data_dir(*parts):
+    """User data directory (created on demand), e.g. data_dir('palettes')"""
+    path = os.path.join(_base('data'), *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def cache_dir(*parts):
+    """User cache directory (created on demand); safe to delete"""
+    path = os.path.join(_base('cache'), *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -0,0 +1,304 @@
+"""
+Session autosave and crash recovery.
+Each editor session keeps a recovery directory under the app data directory.
+A save writes every image it has not written before (the original and the
+image of each history entry) as a .npy block, then a small JSON manifest
+describing the history: file, working format, position, and for every
+entry its graph snapshot, slider values and image block. Blocks never
+change once written, so a save only costs the entries added since the last
+one. Files are written to a temporary name and renamed into place; the
+previous manifests are kept as manifest.1.json, manifest.2.json, ... and
+blocks are deleted once no kept manifest refers to them.
+
+A clean exit removes the session's directory, so a directory left behind
+means the editor did not shut down. Recovering loads the manifest and maps
+the blocks: the current image is shown as saved, without re-running any
+effect.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+import weakref
+
+import numpy as np
+
+from utils.app_dirs import data_dir
+
+RECOVERY_VERSION = 1
+
+MANIFEST = 'manifest.json'
+
+# Manifests kept, including the current one
+MANIFEST_GENERATIONS = 3
+
+# How often the editor saves its session
+AUTOSAVE_INTERVAL_MS = 30 * 1000
+
+
+def recovery_root():
+    return data_dir('recovery')
+
+
+def _write_atomic(path, write):
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _manifest_path(directory, generation=0):
+    if generation == 0:
+        return os.path.join(directory, MANIFEST)
+    return os.path.join(directory, f"manifest.{generation}.json")
+
+
+def _referenced_blocks(manifest):
+    blocks = {entry['block'] for entry in manifest.get('history', [])}
+    if manifest.get('original'):
+        blocks.add(manifest['original'])
+    return blocks
+
+
+class SessionAutosave:
+    """Incrementally saves one editor session to its recovery directory"""
+
+    def __init__(self, root=None, session_id=None):
+        self.root = root or recovery_root()
+        self.session_id = session_id or f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self.directory = os.path.join(self.root, self.session_id)
+        self._names = {}    # id(array) -> (weakref to array, block name)
+        self._written = set()
+        self._last_manifest = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self.stats = {'saves': 0, 'skipped': 0, 'blocks': 0, 'bytes': 0, 'seconds': 0.0}
+
+    def block_name(self, array):
+        """Name of the block holding an array; new arrays get a new name"""
+        entry = self._names.get(id(array))
+        if entry is not None and entry[0]() is array:
+            return entry[1]
+        name = uuid.uuid4().hex[:16]
+        self.register(array, name)
+        return name
+
+    def register(self, array, name, written=False):
+        """Remember the block of an array, e.g. one loaded from a recovered session"""
+        key = id(array)
+        # Forget the name when the array goes away, so its id can be reused
+        self._names[key] = (weakref.ref(array, lambda _: self._names.pop(key, None)), name)
+        if written:
+            self._written.add(name)
+
+    def capture(self, original, history, position, file_path=None, working_format='uint8'):
+        """
+        Describe the session for save(); cheap enough for the GUI thread.
+        history is the editor's list of states: an 'image', a 'graph'
+        snapshot and the slider values.
+        """
+        blocks = {}
+        entries = []
+        for state in history:
+            name = self.block_name(state['image'])
+            blocks[name] = state['image']
+            entry = {key: value for key, value in state.items() if key != 'image'}
+            entry['block'] = name
+            entries.append(entry)
+        original_name = None
+        if original is not None:
+            original_name = self.block_name(original)
+            blocks[original_name] = original
+        manifest = {
+            'version': RECOVERY_VERSION,
+            'file': file_path,
+            'working_format': working_format,
+            'original': original_name,
+            'position': position,
+            'history': entries
+        }
+        return manifest, blocks
+
+    def save(self, capture):
+        """Write the blocks and manifest of a capture; safe to run on a worker thread"""
+        manifest, blocks = capture
+        with self._lock:
+            if self._closed:
+                return False
+            if manifest == self._last_manifest:
+                self.stats['skipped'] += 1
+                return False
+            start = time.perf_counter()
+            os.makedirs(self.directory, exist_ok=True)
+            for name, array in blocks.items():
+                if name in self._written:
+                    continue
+                _write_atomic(os.path.join(self.directory, f"{name}.npy"),
+                              lambda f, array=array: np.save(f, np.ascontiguousarray(array)))
+                self._written.add(name)
+                self.stats['blocks'] += 1
+                self.stats['bytes'] += array.nbytes
+
+            self._rotate()
+            data = dict(manifest, saved_at=time.time(), pid=os.getpid())
+            _write_atomic(_manifest_path(self.directory),
+                          lambda f: f.write(json.dumps(data, indent=1).encode('utf-8')))
+            self._last_manifest = manifest
+            self._collect()
+            self.stats['saves'] += 1
+            self.stats['seconds'] += time.perf_counter() - start
+            return True
+
+    def _rotate(self):
+        for generation in range(MANIFEST_GENERATIONS - 1, 0, -1):
+            older = _manifest_path(self.directory, generation - 1)
+            if os.path.exists(older):
+                os.replace(older, _manifest_path(self.directory, generation))
+
+    def _collect(self):
+        """Delete blocks no kept manifest refers to"""
+        keep = set()
+        for generation in range(MANIFEST_GENERATIONS):
+            manifest = read_manifest(_manifest_path(self.directory, generation))
+            if manifest is not None:
+                keep |= _referenced_blocks(manifest)
+        for file_name in os.listdir(self.directory):
+            name, extension = os.path.splitext(file_name)
+            if extension == '.npy' and name not in keep:
+                try:
+                    os.remove(os.path.join(self.directory, file_name))
+                except OSError as e:
+                    print(f"Could not remove old autosave block: {e}")
+                self._written.discard(name)
+
+    def adopt(self, session):
+        """
+        Continue a recovered session in this session's directory, so its
+        blocks are not written again. session comes from load_session().
+        """
+        with self._lock:
+            if os.path.exists(self.directory):
+                return
+            try:
+                os.replace(session.directory, self.directory)
+            except OSError as e:
+                print(f"Could not reuse recovered session: {e}")
+                return
+            for name, array in session.arrays():
+                self.register(array, name, written=True)
+
+    def discard(self):
+        """Remove the recovery data after a clean exit; later saves are ignored"""
+        with self._lock:
+            self._closed = True
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def report(self):
+        saves = self.stats['saves']
+        return (f"{saves} autosaves ({self.stats['skipped']} unchanged skipped), "
+                f"{self.stats['blocks']} blocks, {self.stats['bytes'] / (1024 * 1024):.1f} MB, "
+                f"{self.stats['seconds'] / saves * 1000 if saves else 0:.0f} ms per save")
+
+
+def read_manifest(path):
+    try:
+        with open(path, 'rb') as f:
+            manifest = json.loads(f.read().decode('utf-8'))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get('version') != RECOVERY_VERSION:
+        return None
+    return manifest
+
+
+class RecoveredSession:
+    """History of a session that did not shut down, loaded from its recovery directory"""
+
+    def __init__(self, directory, manifest, original, history):
+        self.directory = directory
+        self.manifest = manifest
+        self.original = original
+        self.history = history
+        self.position = min(manifest.get('position', len(history) - 1), len(history) - 1)
+        self.file_path = manifest.get('file')
+        self.working_format = manifest.get('working_format', 'uint8')
+
+    def arrays(self):
+        """(block name, array) of every loaded image"""
+        pairs = [(entry['block'], state['image'])
+                 for entry, state in zip(self.manifest['history'], self.history)]
+        if self.original is not None:
+            pairs.append((self.manifest['original'], self.original))
+        return pairs
+
+
+def _load_block(directory, name):
+    # Mapped, so only the images actually shown are read from disk
+    return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r')
+
+
+def load_session(directory):
+    """
+    Load the newest intact manifest of a recovery directory with all its
+    blocks, or None when nothing can be recovered.
+    """
+    for generation in range(MANIFEST_GENERATIONS):
+        manifest = read_manifest(_manifest_path(directory, generation))
+        if manifest is None or not manifest.get('history'):
+            continue
+        try:
+            original = (_load_block(directory, manifest['original'])
+                        if manifest.get('original') else None)
+            history = []
+            for entry in manifest['history']:
+                state = {key: value for key, value in entry.items() if key != 'block'}
+                state['image'] = _load_block(directory, entry['block'])
+                history.append(state)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Skipping damaged autosave in {directory}: {e}")
+            continue
+        return RecoveredSession(directory, manifest, original, history)
+    return None
+
+
+def discard_session(directory):
+    """Delete the recovery data of a session that will not be restored"""
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+def _process_alive(pid):
+    if not pid or pid == os.getpid() or os.name != 'posix':
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # Exists but belongs to someone else
+    return True
+
+
+def find_sessions(root=None, exclude=None):
+    """Recovery directories left by sessions that did not exit cleanly, newest first"""
+    root = root or recovery_root()
+    sessions = []
+    try:
+        entries = list(os.scandir(root))
+    except OSError:
+        return []
+    for entry in entries:
+        if not entry.is_dir() or entry.name == exclude:
+            continue
+        manifest = read_manifest(_manifest_path(entry.path))
+        if manifest is None or _process_alive(manifest.get('pid')):
+            # Nothing saved yet, or still in use by another editor window
+            continue
+        sessions.append((manifest.get('saved_at', 0), entry.path))
+    return [path for _, path in sorted(sessions, reverse=True)]
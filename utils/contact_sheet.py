@@ -0,0 +1,149 @@
+"""
+Parameter-grid contact sheets.
+Renders an effect for every combination of up to two parameters on a
+downscaled copy of the image and lays the cells out in one labeled sheet.
+Every cell starts from the same downscaled array, so planes that do not
+depend on the swept parameters (grayscale, median blurs, bilateral
+filters, ...) are computed once through the image context and shared by
+the whole grid. Cells render concurrently on a thread pool.
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from edit.edit_graph import EditNode, scale_node_dict
+from edit.image_context import CONTEXT_STATS
+from edit.image_filters import ImageFilters
+from edit.working_format import convert_image
+from effects import get_effect
+from utils.animation import is_integer_param, sweep_value
+
+DEFAULT_CELL_SIZE = 256
+MAX_AXIS_VALUES = 12
+
+# Sheet layout, in pixels
+GAP = 4
+HEADER_HEIGHT = 26
+LABEL_WIDTH = 110
+BACKGROUND = (24, 24, 24)
+TEXT_COLOR = (230, 230, 230)
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+
+def axis_values(effect_name, param, start, end, count):
+    """count evenly spaced values of a parameter; integer parameters are deduplicated"""
+    count = max(1, min(MAX_AXIS_VALUES, int(count)))
+    integer = is_integer_param(effect_name, param)
+    values = [sweep_value(start, end, i, count, integer) for i in range(count)]
+    return list(dict.fromkeys(values)) if integer else values
+
+
+def parse_axis(effect_name, spec):
+    """
+    Parse 'param=start:end:count' or 'param=v1,v2,...' into (param, values),
+    as used by the headless entry point.
+    """
+    if '=' not in spec:
+        raise ValueError(f"Axis must look like param=start:end:count or param=a,b,c: {spec}")
+    param, values = spec.split('=', 1)
+    effect = get_effect(effect_name)
+    if effect is None:
+        raise ValueError(f"Unknown effect: {effect_name}")
+    if param not in effect.params:
+        raise ValueError(f"{effect_name} has no parameter {param}; "
+                         f"choose from {', '.join(effect.params)}")
+    if ':' in values:
+        start, end, count = values.split(':')
+        return param, axis_values(effect_name, param, float(start), float(end), int(count))
+    integer = is_integer_param(effect_name, param)
+    return param, [int(float(v)) if integer else float(v) for v in values.split(',')]
+
+
+def format_value(param, value):
+    return f"{param}={value:g}" if isinstance(value, (int, float)) else f"{param}={value}"
+
+
+def _put_text(sheet, text, x, y, width):
+    """Draw text left aligned at (x, baseline y), shrunk to fit width"""
+    scale = 0.45
+    text_width = cv2.getTextSize(text, FONT, scale, 1)[0][0]
+    if text_width > width:
+        scale *= width / text_width
+    cv2.putText(sheet, text, (x, y), FONT, scale, TEXT_COLOR, 1, cv2.LINE_AA)
+
+
+def render_contact_sheet(image, effect_name, x_axis, y_axis=None, base_params=None,
+                         cell_size=DEFAULT_CELL_SIZE, workers=None):
+    """
+    Render effect_name over a grid of parameter values. x_axis and y_axis
+    are (param, values) pairs; y_axis may be None for a single row. Pixel
+    sized parameters are scaled to the cell's resolution, so each cell
+    previews the full-size result. Returns the 8-bit sheet and statistics.
+    """
+    if get_effect(effect_name) is None:
+        raise ValueError(f"Unknown effect: {effect_name}")
+    start = time.perf_counter()
+    reused = CONTEXT_STATS['reused']
+
+    # One downscaled source shared by every cell
+    h, w = image.shape[:2]
+    scale = min(1.0, cell_size / max(h, w))
+    if scale < 1.0:
+        source = cv2.resize(image, (max(1, int(w * scale)), max(1, int(h * scale))),
+                            interpolation=cv2.INTER_AREA)
+    else:
+        source = image
+    cell_h, cell_w = source.shape[:2]
+
+    x_param, x_values = x_axis
+    y_param, y_values = y_axis if y_axis is not None else (None, [None])
+    filters = ImageFilters()
+
+    def render(x_value, y_value):
+        params = dict(base_params or {})
+        params[x_param] = x_value
+        if y_param is not None:
+            params[y_param] = y_value
+        data = scale_node_dict({'kind': 'effect', 'name': effect_name, 'params': params}, scale)
+        node = EditNode('effect', effect_name, data['params'])
+        return convert_image(node.process(source, filters), np.uint8)
+
+    left = LABEL_WIDTH if y_param is not None else 0
+    top = HEADER_HEIGHT * 2
+    sheet_h = top + len(y_values) * (cell_h + GAP) + GAP
+    sheet_w = left + len(x_values) * (cell_w + GAP) + GAP
+    sheet = np.empty((sheet_h, sheet_w, 3), dtype=np.uint8)
+    sheet[:] = BACKGROUND
+
+    cells = [(row, col, x_value, y_value)
+             for row, y_value in enumerate(y_values)
+             for col, x_value in enumerate(x_values)]
+    with ThreadPoolExecutor(max_workers=max(1, workers or os.cpu_count() or 1)) as pool:
+        results = pool.map(lambda cell: render(cell[2], cell[3]), cells)
+        # Cells are copied into the sheet as they finish, in order
+        for (row, col, _, _), result in zip(cells, results):
+            y0 = top + GAP + row * (cell_h + GAP)
+            x0 = left + GAP + col * (cell_w + GAP)
+            sheet[y0:y0 + cell_h, x0:x0 + cell_w] = result
+
+    # Labels
+    effect = get_effect(effect_name)
+    title = f"{effect.name}: {x_param}" + (f" x {y_param}" if y_param is not None else "")
+    _put_text(sheet, title, GAP, HEADER_HEIGHT - 8, sheet_w - 2 * GAP)
+    for col, x_value in enumerate(x_values):
+        x0 = left + GAP + col * (cell_w + GAP)
+        _put_text(sheet, format_value(x_param, x_value), x0, top - 8, cell_w)
+    if y_param is not None:
+        for row, y_value in enumerate(y_values):
+            y0 = top + GAP + row * (cell_h + GAP)
+            _put_text(sheet, format_value(y_param, y_value), GAP, y0 + cell_h // 2, LABEL_WIDTH - 2 * GAP)
+
+    stats = {
+        'cells': len(cells),
+        'seconds': time.perf_counter() - start,
+        'planes_reused': CONTEXT_STATS['reused'] - reused
+    }
+    return sheet, stats
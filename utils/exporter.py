@@ -0,0 +1,68 @@
+"""
+Parallel image export.
+Encoders release the GIL while compressing, so several files can be
+encoded at once on a thread pool.
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from utils.image_loader import load_image, save_image
+
+
+def default_workers():
+    return max(1, min(8, (os.cpu_count() or 2)))
+
+
+def output_paths(input_paths, output_dir, extension=None):
+    """
+    Output file for each input, keeping its base name. Names are claimed in
+    order, so inputs sharing a stem (a.png and a.jpg saved as PNG) get a
+    numbered suffix instead of overwriting each other.
+    """
+    claimed = set()
+    outputs = []
+    for path in input_paths:
+        root, ext = os.path.splitext(os.path.basename(path))
+        out_ext = '.' + extension.lstrip('.') if extension else ext
+        name, number = root + out_ext, 1
+        while name.lower() in claimed:
+            number += 1
+            name = f"{root}-{number}{out_ext}"
+        claimed.add(name.lower())
+        outputs.append(os.path.join(output_dir, name))
+    return outputs
+
+
+def export_batch(input_paths, output_dir, process, extension=None, options=None,
+                 workers=None, progress=None):
+    """
+    Load, process and encode many files in parallel.
+
+    process maps an RGB image to the image to save. Output files keep their
+    base name and use the given extension (or the input's); see
+    output_paths for inputs sharing a name. Returns a dict with the
+    failures, the inputs saved under another name and the elapsed time.
+    """
+    input_paths = list(input_paths)
+    os.makedirs(output_dir, exist_ok=True)
+    outputs = output_paths(input_paths, output_dir, extension)
+
+    def run(path, output_path):
+        save_image(output_path, process(load_image(path)), options)
+        return output_path
+
+    renamed = [(path, output) for path, output in zip(input_paths, outputs)
+               if os.path.splitext(os.path.basename(path))[0] !=
+               os.path.splitext(os.path.basename(output))[0]]
+    failures = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers or default_workers()) as pool:
+        futures = {pool.submit(run, path, output): path for path, output in zip(input_paths, outputs)}
+        for done, future in enumerate(as_completed(futures), 1):
+            error = future.exception()
+            if error is not None:
+                failures.append((futures[future], error))
+            if progress is not None:
+                progress(done, len(input_paths))
+    return {'failures': failures, 'renamed': renamed, 'seconds': time.perf_counter() - start}
@@ -1,12 +1,126 @@
+import io
+import os
 import cv2
 import numpy as np
+from PIL import Image
 
-def load_image(file_path):
-    """Load an image from file and convert to RGB"""
-    image = cv2.imread(file_path)
-    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+from edit.working_format import WORKING_FORMATS, convert_image
 
-def save_image(file_path, image):
-    """Save an image to a file with proper color conversion"""
+# Encoder settings used when no options are given
+DEFAULT_EXPORT_OPTIONS = {
+    'jpeg_quality': 95,
+    'jpeg_progressive': False,
+    'jpeg_subsampling': '4:2:0',
+    'jpeg_optimize': True,
+    'png_compression': 6,
+    'webp_lossless': False,
+    'webp_quality': 90
+}
+
+# Formats encoded with Pillow, which accepts RGB data directly
+PILLOW_FORMATS = {
+    '.jpg': 'JPEG',
+    '.jpeg': 'JPEG',
+    '.png': 'PNG',
+    '.webp': 'WEBP'
+}
+
+# Formats that can store 16 bits per channel
+HIGH_BIT_DEPTH_FORMATS = ('.png', '.tif', '.tiff')
+
+def load_image(file_path, working_format='uint8'):
+    """Load an image from file as RGB in the given working format"""
+    # Keep 16-bit data; unlike IMREAD_UNCHANGED this still applies EXIF orientation
+    image = cv2.imread(file_path, cv2.IMREAD_ANYDEPTH | cv2.IMREAD_ANYCOLOR)
+    if image is None:
+        raise IOError(f"Could not read image {file_path}")
+    return _to_working_format(image, working_format)
+
+def decode_image(data, working_format='uint8'):
+    """Decode an encoded image held in memory, like load_image"""
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    image = cv2.imdecode(buffer, cv2.IMREAD_ANYDEPTH | cv2.IMREAD_ANYCOLOR)
+    if image is None:
+        raise IOError("Could not decode image data")
+    return _to_working_format(image, working_format)
+
+def _to_working_format(image, working_format):
+    """BGR(A) or grayscale OpenCV image -> RGB in a working format"""
+    if image.ndim == 2:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+    elif image.shape[2] == 4:
+        image = cv2.cvtColor(image, cv2.COLOR_BGRA2RGB)
+    else:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    
+    if image.dtype not in (np.uint8, np.uint16):
+        # Floating point files are expected in the 0-1 range
+        image = np.clip(image, 0, 1).astype(np.float32)
+    return convert_image(image, WORKING_FORMATS[working_format])
+
+def encoder_params(file_format, options=None):
+    """Pillow save() arguments for a format and export options"""
+    opts = dict(DEFAULT_EXPORT_OPTIONS)
+    opts.update(options or {})
+    if file_format == 'JPEG':
+        return {
+            'quality': int(opts['jpeg_quality']),
+            'progressive': bool(opts['jpeg_progressive']),
+            'subsampling': opts['jpeg_subsampling'],
+            'optimize': bool(opts['jpeg_optimize'])
+        }
+    if file_format == 'PNG':
+        return {'compress_level': int(opts['png_compression'])}
+    if file_format == 'WEBP':
+        return {
+            'lossless': bool(opts['webp_lossless']),
+            'quality': int(opts['webp_quality']),
+            'method': 4
+        }
+    return {}
+
+def save_image(file_path, image, options=None):
+    """Save an image to a file with the given encoder options"""
+    ext = os.path.splitext(file_path)[1].lower()
+    _encode(image, ext, options, file_path)
+
+def encode_image(image, ext, options=None):
+    """Encode an image in memory in the format of a file extension, e.g. '.png'"""
+    return _encode(image, ext.lower(), options, None)
+
+def _encode(image, ext, options, file_path):
+    """Write image to file_path, or return its encoded bytes when it is None"""
+    target = file_path or f"memory{ext}"
+    
+    if image.dtype != np.uint8:
+        if ext in HIGH_BIT_DEPTH_FORMATS:
+            # 16-bit output goes through OpenCV; Pillow cannot write 16-bit RGB
+            opts = dict(DEFAULT_EXPORT_OPTIONS)
+            opts.update(options or {})
+            params = []
+            if ext == '.png':
+                params = [cv2.IMWRITE_PNG_COMPRESSION, int(opts['png_compression'])]
+            save_img = cv2.cvtColor(convert_image(image, np.uint16), cv2.COLOR_RGB2BGR)
+            return _write_cv2(target, file_path, ext, save_img, params)
+        image = convert_image(image, np.uint8)
+    
+    file_format = PILLOW_FORMATS.get(ext)
+    if file_format is not None:
+        # Pillow takes RGB as-is, so no BGR copy of the frame is needed
+        output = file_path if file_path else io.BytesIO()
+        Image.fromarray(np.ascontiguousarray(image)).save(
+            output, format=file_format, **encoder_params(file_format, options)
+        )
+        return None if file_path else output.getvalue()
     save_img = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-    cv2.imwrite(file_path, save_img)
+    return _write_cv2(target, file_path, ext, save_img, [])
+
+def _write_cv2(target, file_path, ext, image, params):
+    if file_path:
+        if not cv2.imwrite(file_path, image, params):
+            raise IOError(f"Could not write image to {target}")
+        return None
+    ok, data = cv2.imencode(ext, image, params)
+    if not ok:
+        raise IOError(f"Could not encode image as {ext}")
+    return data.tobytes()
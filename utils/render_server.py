@@ -0,0 +1,398 @@
+"""
+Headless render server.
+Runs the effect pipeline behind a small HTTP API on localhost (or a Unix
+socket) so other local tools can use it without the GUI:
+
+    POST /render    JSON {"image": <base64> | "path": <file>, "recipe": {...}
+                    | "effects": [{"name": ..., "params": {...}}, ...],
+                    "format": "png", "options": {...}, "timeout": seconds}
+                    or a raw encoded image as the body with the recipe (or
+                    effects) and format in the query string. Returns the
+                    encoded result.
+    GET  /metrics   Queue depth, latency percentiles and throughput as JSON
+    GET  /health    "ok"
+
+Renders run on a bounded process pool. Requests beyond the pool's capacity
+plus a short queue are refused with 503 instead of piling up, and every
+request has a timeout.
+"""
+import base64
+import http.client
+import json
+import multiprocessing
+import os
+import socket
+import socketserver
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from edit.recipe import apply_recipe, validate_recipe
+from utils.image_loader import decode_image, encode_image, load_image
+
+CONTENT_TYPES = {
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.webp': 'image/webp',
+    '.bmp': 'image/bmp',
+    '.tif': 'image/tiff',
+    '.tiff': 'image/tiff'
+}
+
+DEFAULT_PORT = 8765
+DEFAULT_TIMEOUT = 60.0
+MAX_UPLOAD_BYTES = 200 * 1024 * 1024
+# Latencies kept for percentiles and the throughput window
+LATENCY_SAMPLES = 1000
+THROUGHPUT_WINDOW = 60.0
+
+
+class RequestError(Exception):
+    """A request the server refuses, with the HTTP status to answer"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def render_job(source, recipe, ext, options, working_format='uint8'):
+    """
+    Worker task: decode (bytes) or load (path) an image, apply a recipe and
+    return the encoded result.
+    """
+    if isinstance(source, bytes):
+        image = decode_image(source, working_format)
+    else:
+        image = load_image(source, working_format)
+    return encode_image(apply_recipe(image, recipe), ext, options)
+
+
+def _init_worker():
+    # Workers compile or load the optional Numba kernels in the background
+    from algorithms import numba_backend
+    numba_backend.start_warmup()
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class RenderServer:
+    """Serve the effect pipeline over HTTP with a bounded worker pool"""
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT, socket_path=None, workers=2,
+                 queue_size=None, timeout=DEFAULT_TIMEOUT, max_upload=MAX_UPLOAD_BYTES,
+                 allowed_roots=(), executor=None):
+        self.workers = max(1, workers)
+        # Requests accepted at once: one per worker plus a short queue
+        self.max_pending = self.workers + (self.workers if queue_size is None else max(0, queue_size))
+        self.timeout = timeout
+        self.max_upload = max_upload
+        # File path inputs are only read below these directories
+        self.allowed_roots = [os.path.realpath(root) for root in allowed_roots]
+        # A pool passed in belongs to the caller: the server neither shuts it
+        # down nor replaces it when its workers crash
+        self._own_executor = executor is None
+        self.executor = executor or self._new_executor()
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.metrics = {'accepted': 0, 'completed': 0, 'failed': 0, 'rejected': 0,
+                        'timeouts': 0, 'pending': 0}
+        self._finished = deque(maxlen=LATENCY_SAMPLES)  # (finish time, latency)
+
+        handler = type('Handler', (RenderRequestHandler,), {'render_server': self})
+        if socket_path:
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+            self.httpd = UnixHTTPServer(socket_path, handler)
+        else:
+            self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.socket_path = socket_path
+        self._thread = None
+
+    def _new_executor(self):
+        # Spawned workers do not inherit the server's threads or locks
+        return ProcessPoolExecutor(max_workers=self.workers,
+                                   mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_init_worker)
+
+    @property
+    def address(self):
+        """(host, port) of the server, or the socket path"""
+        return self.socket_path or self.httpd.server_address[:2]
+
+    # Lifecycle
+
+    def start(self):
+        """Serve on a background thread"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='render-server',
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        print(f"Render server listening on {self.address}")
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self.close()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.close()
+
+    def close(self):
+        self.httpd.server_close()
+        if self._own_executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.socket_path and os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    # Rendering
+
+    def render(self, source, recipe, ext, options=None, timeout=None):
+        """Run one render on the pool; raises RequestError when refused or too slow"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.metrics['rejected'] += 1
+            raise RequestError(503, "Server busy, retry later")
+
+        start = time.perf_counter()
+        with self._lock:
+            self.metrics['accepted'] += 1
+            self.metrics['pending'] += 1
+        try:
+            future = self.executor.submit(render_job, source, recipe, ext, options)
+        except BrokenProcessPool:
+            restarted = self._restart_executor()
+            self._release()
+            raise RequestError(500, "Worker pool crashed" + ("; restarted" if restarted else ""))
+        # The slot is held until the job really ends, even after a timeout,
+        # so a stuck render keeps counting against the limit
+        future.add_done_callback(lambda _: self._release())
+
+        timeout = min(self.timeout, timeout) if timeout else self.timeout
+        try:
+            data = future.result(timeout=timeout)
+        except TimeoutError:
+            future.cancel()
+            with self._lock:
+                self.metrics['timeouts'] += 1
+            raise RequestError(504, f"Render timed out after {timeout:g}s")
+        except BrokenProcessPool:
+            restarted = self._restart_executor()
+            with self._lock:
+                self.metrics['failed'] += 1
+            raise RequestError(500, "Worker crashed during render" + ("; pool restarted" if restarted else ""))
+        except Exception as e:
+            with self._lock:
+                self.metrics['failed'] += 1
+            raise RequestError(422, f"Render failed: {e}")
+
+        with self._lock:
+            self.metrics['completed'] += 1
+            self._finished.append((time.time(), time.perf_counter() - start))
+        return data
+
+    def _release(self):
+        with self._lock:
+            self.metrics['pending'] -= 1
+        self._slots.release()
+
+    def _restart_executor(self):
+        """
+        Replace a broken pool with a new one. False for a pool passed in,
+        which stays broken until its owner replaces server.executor.
+        """
+        if not self._own_executor:
+            return False
+        with self._lock:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = self._new_executor()
+        return True
+
+    def report(self):
+        """Current metrics as a JSON-serializable dict"""
+        now = time.time()
+        with self._lock:
+            metrics = dict(self.metrics)
+            finished = list(self._finished)
+        latencies = sorted(latency for _, latency in finished)
+        recent = sum(1 for finished_at, _ in finished if now - finished_at <= THROUGHPUT_WINDOW)
+        window = min(THROUGHPUT_WINDOW, max(now - self.started, 1e-6))
+        metrics.update({
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+            'running': min(metrics['pending'], self.workers),
+            'queue_depth': max(0, metrics['pending'] - self.workers),
+            'latency_ms': {name: None if value is None else round(value * 1000, 1)
+                           for name, value in (('p50', percentile(latencies, 0.5)),
+                                               ('p90', percentile(latencies, 0.9)),
+                                               ('p99', percentile(latencies, 0.99)))},
+            'throughput_per_s': round(recent / window, 3),
+            'uptime_s': round(now - self.started, 1)
+        })
+        return metrics
+
+    # Request parsing
+
+    def parse_request(self, query, content_type, body):
+        """(source, recipe, ext, options, timeout) of a /render request"""
+        params = {key: values[-1] for key, values in parse_qs(query).items()}
+        if content_type.split(';')[0].strip() == 'application/json':
+            try:
+                request = json.loads(body or b'{}')
+            except ValueError as e:
+                raise RequestError(400, f"Invalid JSON: {e}")
+            if not isinstance(request, dict):
+                raise RequestError(400, "Request must be a JSON object")
+            if 'image' in request:
+                try:
+                    source = base64.b64decode(request['image'], validate=True)
+                except (TypeError, ValueError):
+                    raise RequestError(400, "image must be base64 encoded")
+            elif 'path' in request:
+                source = self.check_path(request['path'])
+            else:
+                raise RequestError(400, "Request needs an image or a path")
+        else:
+            # Raw image upload; everything else comes from the query string
+            if not body:
+                raise RequestError(400, "Empty request body")
+            source = body
+            request = {}
+            for key in ('recipe', 'effects', 'options'):
+                if key in params:
+                    try:
+                        request[key] = json.loads(params[key])
+                    except ValueError as e:
+                        raise RequestError(400, f"Invalid {key}: {e}")
+            for key in ('format', 'timeout'):
+                if key in params:
+                    request[key] = params[key]
+
+        recipe = request.get('recipe')
+        if recipe is None:
+            recipe = {'effects': request.get('effects', [])}
+        try:
+            validate_recipe(recipe)
+        except ValueError as e:
+            raise RequestError(400, str(e))
+
+        file_format = request.get('format') or 'png'
+        if not isinstance(file_format, str):
+            raise RequestError(400, "format must be a string")
+        ext = '.' + file_format.lower().lstrip('.')
+        if ext not in CONTENT_TYPES:
+            raise RequestError(400, f"Unsupported format: {ext}")
+        options = request.get('options')
+        if options is not None and not isinstance(options, dict):
+            raise RequestError(400, "options must be a JSON object")
+        timeout = request.get('timeout')
+        if timeout:
+            try:
+                timeout = float(timeout)
+            except (TypeError, ValueError):
+                raise RequestError(400, "timeout must be a number")
+            if not timeout > 0:
+                raise RequestError(400, "timeout must be positive")
+        return source, recipe, ext, options, timeout or None
+
+    def check_path(self, path):
+        """Resolve a file path input, refusing anything outside the allowed roots"""
+        real = os.path.realpath(str(path))
+        if not any(os.path.commonpath([real, root]) == root for root in self.allowed_roots):
+            raise RequestError(403, "Path inputs are not allowed outside the served directories")
+        if not os.path.isfile(real):
+            raise RequestError(404, f"No such file: {path}")
+        return real
+
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    """HTTP front end of a RenderServer"""
+
+    render_server = None
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == '/metrics':
+            self.send_json(200, self.render_server.report())
+        elif path == '/health':
+            self.send_body(200, b'ok', 'text/plain')
+        else:
+            self.send_json(404, {'error': f"Not found: {path}"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != '/render':
+            self.send_json(404, {'error': f"Not found: {url.path}"})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            if length > self.render_server.max_upload:
+                # The body is not read, so the connection cannot be reused
+                self.close_connection = True
+                raise RequestError(413, "Request body too large")
+            body = self.rfile.read(length)
+            source, recipe, ext, options, timeout = self.render_server.parse_request(
+                url.query, self.headers.get('Content-Type', ''), body)
+            data = self.render_server.render(source, recipe, ext, options, timeout)
+        except RequestError as e:
+            self.send_json(e.status, {'error': str(e)})
+            return
+        self.send_body(200, data, CONTENT_TYPES[ext])
+
+    def send_json(self, status, data):
+        self.send_body(status, json.dumps(data).encode('utf-8'), 'application/json')
+
+    def send_body(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if status == 503:
+            self.send_header('Retry-After', '1')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        pass
+
+
+class UnixHTTPServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer listening on a Unix domain socket"""
+
+    address_family = socket.AF_UNIX
+
+    def server_bind(self):
+        socketserver.TCPServer.server_bind(self)
+        self.server_name = 'localhost'
+        self.server_port = 0
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """http.client connection to a server on a Unix domain socket"""
+
+    def __init__(self, socket_path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
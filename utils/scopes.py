@@ -0,0 +1,197 @@
+"""
+Histograms and waveform of the edited image.
+Scopes are computed from a strided sample of at most SAMPLE_PIXELS pixels
+of the displayed image (usually the drag preview), reduced to 8-bit bins.
+Taking the sample is the only part done on the GUI thread; counting runs on
+a worker.
+
+Brightness and contrast map every channel value through the same curve, so
+while the edit ends in those adjustments the scopes are not computed from
+pixels at all: the scopes of the image entering them are computed once and
+their bins are moved through a 256-entry lookup table of the adjustments.
+Where channels clip differently the luma histogram and waveform moved this
+way are approximate.
+"""
+import math
+import time
+
+import cv2
+import numpy as np
+
+from edit.image_context import context_for
+from edit.image_filters import contrast_factor
+from edit.working_format import convert_image, max_value
+
+BINS = 256
+
+# Most pixels scopes are computed from
+SAMPLE_PIXELS = 256 * 256
+
+# Weights of cv2's RGB to gray conversion, used for luma
+LUMA_WEIGHTS = np.array([0.299, 0.587, 0.114])
+
+# Adjustments that map each channel value through one curve
+POINTWISE = ('brightness', 'contrast')
+
+
+def sample(image, max_pixels=SAMPLE_PIXELS):
+    """Contiguous 8-bit copy of every n-th pixel in both directions"""
+    h, w = image.shape[:2]
+    step = max(1, math.ceil(math.sqrt(h * w / max_pixels)))
+    return np.ascontiguousarray(convert_image(image[::step, ::step, :3], np.uint8))
+
+
+def compute_scopes(pixels):
+    """Red, green, blue and luma histograms and the luma waveform of 8-bit RGB pixels"""
+    scopes = {}
+    for channel, name in enumerate(('red', 'green', 'blue')):
+        scopes[name] = np.bincount(pixels[:, :, channel].ravel(), minlength=BINS).astype(np.float64)
+    luma = cv2.cvtColor(pixels, cv2.COLOR_RGB2GRAY)
+    scopes['luma'] = np.bincount(luma.ravel(), minlength=BINS).astype(np.float64)
+    # One luma histogram per column: waveform[value, column]
+    columns = luma.shape[1]
+    index = luma.astype(np.int32) * columns + np.arange(columns, dtype=np.int32)
+    scopes['waveform'] = np.bincount(index.ravel(), minlength=BINS * columns).reshape(
+        BINS, columns).astype(np.float64)
+    return scopes
+
+
+def pointwise_steps(graph):
+    """
+    When the active nodes of a graph end in brightness/contrast adjustments,
+    returns (base image, base key, steps): the image entering them, a key
+    identifying it and the (gain, offset) per channel of each adjustment in
+    0-1 units. Otherwise None.
+    """
+    active = [node for node in graph.nodes if node.is_active()]
+    tail = []
+    while (active and active[-1].kind == 'adjustment' and active[-1].name in POINTWISE
+           and active[-1].region is None):
+        tail.insert(0, active.pop())
+    if not tail:
+        return None
+    base = active[-1].output if active else graph.source
+    if base is None:
+        return None
+    # Preview buffers are reused, so the base is identified by the chain
+    # producing it rather than by the array
+    key = (id(graph.source), graph.source.shape, tuple(repr(node.to_dict()) for node in active))
+
+    if any(node.output is None for node in tail[:-1]):
+        return None  # Restored without intermediate results
+
+    steps = []
+    image = base
+    for node in tail:
+        value = node.params.get('value', 0)
+        if node.name == 'brightness':
+            steps.append((np.ones(3), np.full(3, value / 100)))
+        else:
+            factor = contrast_factor(value)
+            # The mean of each adjustment's input, computed while rendering
+            mean = context_for(image).get('mean') / max_value(image.dtype)
+            steps.append((np.full(3, factor), mean * (1 - factor)))
+        image = node.output
+    return base, key, steps
+
+
+def step_lut(steps, channel=None):
+    """Bin each bin moves to through steps, for one channel or for luma"""
+    values = np.arange(BINS) / (BINS - 1)
+    for gain, offset in steps:
+        if channel is None:
+            gain, offset = LUMA_WEIGHTS @ gain, LUMA_WEIGHTS @ offset
+        else:
+            gain, offset = gain[channel], offset[channel]
+        values = np.clip(values * gain + offset, 0, 1)
+    return np.rint(values * (BINS - 1)).astype(np.intp)
+
+
+def remap_scopes(scopes, steps):
+    """Scopes of an image after pointwise steps, from the scopes before them"""
+    remapped = {}
+    for channel, name in enumerate(('red', 'green', 'blue')):
+        remapped[name] = np.bincount(step_lut(steps, channel), weights=scopes[name], minlength=BINS)
+    lut = step_lut(steps)
+    remapped['luma'] = np.bincount(lut, weights=scopes['luma'], minlength=BINS)
+    waveform = np.zeros_like(scopes['waveform'])
+    np.add.at(waveform, lut, scopes['waveform'])
+    remapped['waveform'] = waveform
+    return remapped
+
+
+def waveform_image(waveform):
+    """Waveform as an RGB uint8 image, bright values at the top"""
+    # Logarithmic, so sparse traces stay visible next to dense ones
+    levels = np.log1p(waveform[::-1].astype(np.float32))
+    peak = levels.max()
+    if peak > 0:
+        levels *= 255 / peak
+    gray = levels.astype(np.uint8)
+    image = np.empty(gray.shape + (3,), dtype=np.uint8)
+    image[:, :, 0] = gray >> 2
+    image[:, :, 1] = gray
+    image[:, :, 2] = gray >> 2
+    return image
+
+
+class ScopeAnalyzer:
+    """Prepares scope jobs on the GUI thread and computes them on a worker"""
+
+    def __init__(self, max_pixels=SAMPLE_PIXELS):
+        self.max_pixels = max_pixels
+        self.base_key = None
+        self.base_scopes = None
+        self.sampled_key = None  # Base of the newest prepared job
+        self._source = None      # Keeps the id in sampled_key from being reused
+        self.stats = {'full': 0, 'remapped': 0, 'prepare_seconds': 0.0, 'compute_seconds': 0.0}
+
+    def prepare(self, graph, image):
+        """
+        Capture what the worker needs: the steps when only pointwise
+        adjustments changed (no pixels at all), a sample of their input when
+        it changed, or a sample of the image.
+        """
+        start = time.perf_counter()
+        job = {'key': None, 'steps': None, 'pixels': None}
+        tail = pointwise_steps(graph) if graph is not None else None
+        if tail is not None:
+            base, key, steps = tail
+            job['key'], job['steps'] = key, steps
+            if key != self.sampled_key:
+                job['pixels'] = sample(base, self.max_pixels)
+                self.sampled_key = key
+                self._source = graph.source
+        else:
+            self.sampled_key = None
+            job['pixels'] = sample(image, self.max_pixels)
+        self.stats['prepare_seconds'] += time.perf_counter() - start
+        return job
+
+    def compute(self, job):
+        """Scopes of a prepared job, with the waveform as an image (None if it is stale)"""
+        start = time.perf_counter()
+        if job['steps'] is not None:
+            if job['pixels'] is not None:
+                self.base_scopes = compute_scopes(job['pixels'])
+                self.base_key = job['key']
+                self.stats['full'] += 1
+            elif job['key'] != self.base_key:
+                return None  # Prepared against a base that has been replaced since
+            else:
+                self.stats['remapped'] += 1
+            scopes = remap_scopes(self.base_scopes, job['steps'])
+        else:
+            scopes = compute_scopes(job['pixels'])
+            self.stats['full'] += 1
+        scopes['waveform_image'] = waveform_image(scopes['waveform'])
+        self.stats['compute_seconds'] += time.perf_counter() - start
+        return scopes
+
+    def report(self):
+        jobs = self.stats['full'] + self.stats['remapped']
+        if not jobs:
+            return "No scopes computed"
+        return (f"{jobs} updates ({self.stats['remapped']} remapped): "
+                f"{self.stats['prepare_seconds'] / jobs * 1000:.2f} ms to prepare, "
+                f"{self.stats['compute_seconds'] / jobs * 1000:.2f} ms to compute")
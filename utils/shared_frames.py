@@ -0,0 +1,262 @@
+"""
+Zero-copy multiprocess execution.
+Frames handed to worker processes live in shared memory, so a task only
+pickles a small handle (segment name, shape, dtype) instead of the pixels.
+Workers attach to the input and output segments and run the effect or
+recipe straight into the output frame.
+
+Segments are created and unlinked by the parent process only. They are
+released when their SharedFrame is closed or garbage collected and when
+the executor shuts down; if the parent dies, the multiprocessing resource
+tracker unlinks whatever is left, and sweep_stale() removes segments of
+dead processes on the next start.
+"""
+import itertools
+import multiprocessing
+import os
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Segment names carry the creating process id so stale ones can be found
+SEGMENT_PREFIX = 'dither_girl_'
+SHM_DIR = '/dev/shm'
+
+_counter = itertools.count(1)
+
+
+def _attach(name):
+    """Open an existing segment without taking ownership of it"""
+    try:
+        # Python 3.13+: do not register the segment with the resource tracker
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedFrame:
+    """A numpy image backed by a shared memory segment"""
+
+    def __init__(self, shape, dtype, name=None):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        size = max(1, int(np.prod(self.shape)) * self.dtype.itemsize)
+        self.owner = name is None
+        if self.owner:
+            name = f"{SEGMENT_PREFIX}{os.getpid()}_{next(_counter)}"
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        else:
+            self._shm = _attach(name)
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self._shm.buf)
+        # Unlink the segment even if close() is never called
+        self._finalizer = weakref.finalize(self, SharedFrame._release, self._shm, self.owner)
+
+    @classmethod
+    def from_array(cls, image):
+        """Copy an image into a new shared frame"""
+        frame = cls(image.shape, image.dtype)
+        frame.array[...] = image
+        return frame
+
+    @classmethod
+    def attach(cls, handle):
+        """Open a frame created by another process from its handle"""
+        name, shape, dtype = handle
+        return cls(shape, dtype, name=name)
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    @property
+    def handle(self):
+        """Picklable (name, shape, dtype) description of the frame"""
+        return self.name, self.shape, self.dtype.str
+
+    @property
+    def closed(self):
+        return not self._finalizer.alive
+
+    def close(self):
+        """Release the frame; the owner also unlinks the segment"""
+        # Views of the buffer must be gone before the mapping can be closed
+        self.array = None
+        self._finalizer()
+
+    @staticmethod
+    def _release(shm, owner):
+        try:
+            shm.close()
+        except BufferError:
+            # A view of the frame is still alive; the mapping goes with it
+            pass
+        if owner:
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _run_shared(task, source_handle, target_handle):
+    """Worker task: render from one shared frame into another"""
+    from edit.edit_graph import EditNode
+    from edit.image_filters import ImageFilters
+    from edit.recipe import apply_recipe
+    from edit.working_format import convert_image
+
+    source = SharedFrame.attach(source_handle)
+    target = SharedFrame.attach(target_handle)
+    try:
+        kind, name, params = task
+        if kind == 'recipe':
+            result = apply_recipe(source.array, params)
+        else:
+            # An effect node converts to the effect's dtype and back
+            result = EditNode('effect', name, params).process(source.array, ImageFilters())
+        if result.shape != target.shape:
+            raise ValueError(f"{name} changed the frame shape from {target.shape} to {result.shape}")
+        target.array[...] = convert_image(result, target.dtype)
+        del result
+    finally:
+        source.close()
+        target.close()
+
+
+def _init_worker():
+    from algorithms import numba_backend
+    numba_backend.start_warmup()
+
+
+def sweep_stale():
+    """Unlink segments left behind by processes that no longer exist"""
+    if not os.path.isdir(SHM_DIR):
+        return 0
+    removed = 0
+    for entry in os.listdir(SHM_DIR):
+        if not entry.startswith(SEGMENT_PREFIX):
+            continue
+        try:
+            pid = int(entry[len(SEGMENT_PREFIX):].split('_')[0])
+        except ValueError:
+            continue
+        if _process_alive(pid):
+            continue
+        try:
+            os.unlink(os.path.join(SHM_DIR, entry))
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SharedMemoryExecutor:
+    """Process pool that exchanges frames through shared memory"""
+
+    def __init__(self, workers=None):
+        sweep_stale()
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        # Spawned workers share the parent's resource tracker
+        self.pool = ProcessPoolExecutor(max_workers=self.workers,
+                                        mp_context=multiprocessing.get_context('spawn'),
+                                        initializer=_init_worker)
+        self._frames = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def frame(self, shape, dtype=np.uint8):
+        """Allocate a shared frame, e.g. to decode an image straight into it"""
+        frame = SharedFrame(shape, dtype)
+        with self._lock:
+            self._frames.add(frame)
+        return frame
+
+    def share(self, image):
+        """A shared frame holding image (copied once unless it already is one)"""
+        if isinstance(image, SharedFrame):
+            return image
+        frame = self.frame(image.shape, image.dtype)
+        frame.array[...] = image
+        return frame
+
+    def submit_effect(self, effect_name, image, **params):
+        """Future of a SharedFrame with the effect applied to image"""
+        return self._submit(('effect', effect_name, params), image)
+
+    def submit_recipe(self, recipe, image):
+        """Future of a SharedFrame with a recipe applied to image"""
+        return self._submit(('recipe', None, recipe), image)
+
+    def map_effect(self, effect_name, images, **params):
+        """Apply an effect to many images in parallel; yields SharedFrames in order"""
+        futures = [self.submit_effect(effect_name, image, **params) for image in images]
+        for future in futures:
+            yield future.result()
+
+    def _submit(self, task, image):
+        source = self.share(image)
+        target = self.frame(source.shape, source.dtype)
+        future = self.pool.submit(_run_shared, task, source.handle, target.handle)
+        return _FrameFuture(future, target, source if source is not image else None)
+
+    def close(self):
+        """Shut the pool down and release every frame it allocated"""
+        self.pool.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            frames = list(self._frames)
+        for frame in frames:
+            frame.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _FrameFuture:
+    """Future resolving to the output frame; input copies are freed when done"""
+
+    def __init__(self, future, target, temporary):
+        self._future = future
+        self._target = target
+        self._temporary = temporary
+        self._released = threading.Event()
+        future.add_done_callback(self._done)
+
+    def _done(self, future):
+        if self._temporary is not None:
+            self._temporary.close()
+        if future.cancelled() or future.exception() is not None:
+            self._target.close()
+        self._released.set()
+
+    def done(self):
+        return self._released.is_set()
+
+    def result(self, timeout=None):
+        try:
+            # Raises the worker's exception (or BrokenProcessPool after a crash)
+            self._future.result(timeout)
+        finally:
+            # Callbacks run after waiters wake up; wait for the frames to be freed
+            if self._future.done():
+                self._released.wait()
+        return self._target
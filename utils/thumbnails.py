@@ -0,0 +1,186 @@
+"""
+Thumbnails for browsing folders of images.
+A thumbnail is decoded as cheaply as the file allows: the preview JPEG most
+cameras embed in the EXIF data when it is large enough, otherwise Pillow's
+JPEG draft mode, which lets the decoder scale by 1/2, 1/4 or 1/8 while
+decoding; other formats are decoded in full and reduced. Thumbnails are
+stored in the cache directory under a key of the file's path, size and
+modification time, so an edited file gets a new thumbnail and unchanged
+files are never decoded again.
+"""
+import hashlib
+import io
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+from PIL import ExifTags, Image, ImageOps
+
+from utils.app_dirs import cache_dir
+from utils.image_loader import load_image
+from utils.watch_folder import IMAGE_EXTENSIONS
+
+THUMBNAIL_SIZE = 160
+
+# Embedded previews smaller than this share of the thumbnail size are ignored
+MIN_EXIF_SCALE = 0.75
+
+CACHE_QUALITY = 85
+
+JPEG_EXTENSIONS = ('.jpg', '.jpeg')
+
+EXIF_ORIENTATION = 0x0112
+EXIF_THUMBNAIL_OFFSET = 0x0201
+EXIF_THUMBNAIL_LENGTH = 0x0202
+
+
+def list_images(folder):
+    """Image files directly inside a folder, sorted by name"""
+    try:
+        entries = os.scandir(folder)
+    except OSError:
+        return []
+    with entries:
+        paths = [entry.path for entry in entries
+                 if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS)]
+    return sorted(paths, key=lambda path: os.path.basename(path).lower())
+
+
+def fit_size(width, height, size):
+    """Dimensions of width x height scaled so the longest side is at most size"""
+    scale = min(1.0, size / max(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def _exif_thumbnail(image, size):
+    """The embedded EXIF preview, oriented like the image, if it is big enough"""
+    raw = image.info.get('exif')
+    if not raw:
+        return None
+    exif = image.getexif()
+    thumb_info = exif.get_ifd(ExifTags.IFD.IFD1)
+    offset = thumb_info.get(EXIF_THUMBNAIL_OFFSET)
+    length = thumb_info.get(EXIF_THUMBNAIL_LENGTH)
+    if not offset or not length:
+        return None
+    # Offsets are relative to the TIFF header after the 'Exif\0\0' marker
+    tiff = raw[6:] if raw.startswith(b'Exif\x00\x00') else raw
+    try:
+        thumb = Image.open(io.BytesIO(tiff[offset:offset + length]))
+        thumb.load()
+    except (OSError, ValueError, SyntaxError):
+        return None
+    if max(thumb.size) < size * MIN_EXIF_SCALE:
+        return None
+    # Cropped or letterboxed previews do not match the image
+    if abs(thumb.width / thumb.height - image.width / image.height) > 0.02:
+        return None
+    orientation = exif.get(EXIF_ORIENTATION, 1)
+    if orientation != 1:
+        # The preview is stored unrotated, like the main image
+        thumb.getexif()[EXIF_ORIENTATION] = orientation
+        thumb = ImageOps.exif_transpose(thumb)
+    return thumb
+
+
+def decode_thumbnail(file_path, size=THUMBNAIL_SIZE):
+    """
+    Decode a file to an RGB uint8 thumbnail with its longest side at most
+    size. Returns the thumbnail and how it was made: 'exif', 'draft' or 'full'.
+    """
+    try:
+        with Image.open(file_path) as image:
+            if file_path.lower().endswith(JPEG_EXTENSIONS):
+                thumb = _exif_thumbnail(image, size)
+                method = 'exif'
+                if thumb is None:
+                    # The decoder scales by a power of two, to at least size
+                    image.draft('RGB', (size, size))
+                    thumb = ImageOps.exif_transpose(image)
+                    method = 'draft'
+            elif image.mode in ('RGB', 'RGBA', 'L', 'P', 'LA'):
+                thumb = ImageOps.exif_transpose(image)
+                method = 'full'
+            else:
+                # 16-bit and float images go through the regular loader
+                thumb = None
+            if thumb is not None:
+                thumb = thumb.convert('RGB')
+                thumb.thumbnail((size, size), Image.Resampling.LANCZOS, reducing_gap=2.0)
+                return np.asarray(thumb), method
+    except (OSError, ValueError, SyntaxError):
+        pass
+    image = load_image(file_path, 'uint8')
+    width, height = fit_size(image.shape[1], image.shape[0], size)
+    return cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA), 'full'
+
+
+class ThumbnailCache:
+    """On-disk cache of folder browser thumbnails"""
+
+    def __init__(self, directory=None, size=THUMBNAIL_SIZE):
+        self.directory = directory or cache_dir('thumbnails')
+        self.size = size
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'exif': 0, 'draft': 0, 'full': 0,
+                      'generate_seconds': 0.0, 'load_seconds': 0.0}
+
+    def key(self, file_path):
+        """Cache key of a file: its path, size and modification time"""
+        stat = os.stat(file_path)
+        text = f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}|{self.size}"
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def path_for(self, key):
+        # Two-level layout keeps directories small for large libraries
+        return os.path.join(self.directory, key[:2], f"{key}.jpg")
+
+    def get(self, file_path):
+        """RGB uint8 thumbnail of a file, from the cache or freshly decoded"""
+        start = time.perf_counter()
+        cached = self.path_for(self.key(file_path))
+        if os.path.exists(cached):
+            try:
+                with Image.open(cached) as image:
+                    thumb = np.asarray(image.convert('RGB'))
+                with self._lock:
+                    self.stats['hits'] += 1
+                    self.stats['load_seconds'] += time.perf_counter() - start
+                return thumb
+            except (OSError, ValueError, SyntaxError):
+                pass  # Damaged cache entry: make it again
+
+        thumb, method = decode_thumbnail(file_path, self.size)
+        self._store(cached, thumb)
+        with self._lock:
+            self.stats['misses'] += 1
+            self.stats[method] += 1
+            self.stats['generate_seconds'] += time.perf_counter() - start
+        return thumb
+
+    def _store(self, cached, thumb):
+        try:
+            os.makedirs(os.path.dirname(cached), exist_ok=True)
+            tmp_path = f"{cached}.{threading.get_ident()}.tmp"
+            Image.fromarray(thumb).save(tmp_path, 'JPEG', quality=CACHE_QUALITY)
+            os.replace(tmp_path, cached)
+        except OSError as e:
+            print(f"Could not cache thumbnail: {e}")
+
+    def hit_rate(self):
+        lookups = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / lookups if lookups else 0.0
+
+    def generation_rate(self):
+        """Thumbnails generated per second of decoding"""
+        seconds = self.stats['generate_seconds']
+        return self.stats['misses'] / seconds if seconds else 0.0
+
+    def report(self):
+        """One-line summary of cache use and generation speed"""
+        return (f"{self.stats['hits'] + self.stats['misses']} thumbnails, "
+                f"{self.hit_rate() * 100:.0f}% from cache; generated "
+                f"{self.generation_rate():.1f}/s (exif {self.stats['exif']}, "
+                f"draft {self.stats['draft']}, full {self.stats['full']})")
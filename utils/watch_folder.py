@@ -0,0 +1,210 @@
+"""
+Headless watch-folder processing.
+New images dropped into the watched directories are processed with a saved
+recipe on a bounded worker pool and written atomically to the output
+directory. A small state file records processed files so restarts skip
+work that is already done.
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from edit.recipe import apply_recipe
+from utils.image_loader import load_image, save_image
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.webp')
+
+
+def atomic_write_json(file_path, data):
+    """Write JSON to a temporary file and move it into place"""
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, file_path)
+
+
+def atomic_save_image(file_path, image):
+    """Save an image under a temporary name and move it into place"""
+    directory, name = os.path.split(file_path)
+    root, ext = os.path.splitext(name)
+    # Keep the extension so the encoder is chosen from the final format
+    tmp_path = os.path.join(directory, f".{root}.partial{ext}")
+    save_image(tmp_path, image)
+    os.replace(tmp_path, file_path)
+
+
+class WatchFolder:
+    """Watch directories and process new images with a recipe"""
+
+    def __init__(self, directories, output_dir, recipe, workers=2, max_pending=8,
+                 poll_interval=1.0, settle_time=2.0, state_file=None,
+                 output_format=None, report_interval=10.0, clock=time.time):
+        self.directories = [os.path.abspath(d) for d in directories]
+        self.output_dir = os.path.abspath(output_dir)
+        self.recipe = recipe
+        self.workers = max(1, workers)
+        self.max_pending = max(self.workers, max_pending)
+        self.poll_interval = poll_interval
+        self.settle_time = settle_time
+        self.output_format = output_format
+        self.report_interval = report_interval
+        self.clock = clock  # Wall clock, compared with file modification times
+        self.state_file = state_file or os.path.join(self.output_dir, '.dither_girl_state.json')
+
+        self.state = self._load_state()
+        # Each watched directory writes to its own subdirectory when there are
+        # several, so equal file names in different folders cannot collide
+        self._subdirs = {}
+        if len(self.directories) > 1:
+            for i, directory in enumerate(self.directories):
+                name = os.path.basename(directory) or 'root'
+                if name in self._subdirs.values():
+                    name = f"{name}_{i + 1}"
+                self._subdirs[directory] = name
+        # output path -> source path, to refuse two sources writing one file
+        self._outputs = {entry['output']: path for path, entry in self.state.items()
+                         if 'output' in entry}
+        self._observed = {}   # path -> (size, mtime) seen on the previous scan
+        self._in_flight = {}  # path -> future
+        self.backlog = 0      # Ready files waiting for a free worker slot
+        self._failed = {}     # path -> signature that failed; retried once it changes
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.metrics = {'processed': 0, 'failed': 0, 'latencies': []}
+
+    def _load_state(self):
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def output_path(self, path):
+        root, ext = os.path.splitext(os.path.basename(path))
+        if self.output_format:
+            ext = '.' + self.output_format.lstrip('.')
+        subdir = self._subdirs.get(os.path.dirname(path), '')
+        return os.path.join(self.output_dir, subdir, root + ext)
+    
+    def claim_output(self, path):
+        """Reserve the output file for path; None if another source owns it"""
+        output = self.output_path(path)
+        with self._lock:
+            owner = self._outputs.setdefault(output, path)
+        return output if owner == path else None
+
+    def is_done(self, path, size, mtime):
+        entry = self.state.get(path)
+        return entry is not None and entry['size'] == size and entry['mtime'] == mtime
+
+    def scan(self):
+        """Return files that are new and have stopped changing"""
+        ready = []
+        now = self.clock()
+        seen = {}
+        for directory in self.directories:
+            try:
+                entries = list(os.scandir(directory))
+            except OSError as e:
+                print(f"Cannot scan {directory}: {e}")
+                continue
+            for entry in entries:
+                if not entry.is_file() or entry.name.startswith('.'):
+                    continue
+                if not entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                stat = entry.stat()
+                path = entry.path
+                signature = (stat.st_size, stat.st_mtime)
+                seen[path] = signature
+                if path in self._in_flight or self.is_done(path, *signature):
+                    continue
+                if self._failed.get(path) == signature:
+                    continue
+                # Debounce: the file must be unchanged since the last scan and
+                # untouched for settle_time before it is considered complete
+                if self._observed.get(path) == signature and now - stat.st_mtime >= self.settle_time:
+                    ready.append((stat.st_mtime, path, signature))
+        self._observed = seen
+        # Oldest files first
+        return [(path, signature) for _, path, signature in sorted(ready)]
+
+    def process(self, path, signature, queued_at):
+        """Worker task: apply the recipe to one file"""
+        try:
+            output = self.claim_output(path)
+            if output is None:
+                # e.g. a.png and a.jpg both converted with --format
+                raise ValueError(f"output {self.output_path(path)} is already used "
+                                 f"for {self._outputs[self.output_path(path)]}")
+            image = load_image(path)
+            if image is None:
+                raise ValueError("could not decode image")
+            result = apply_recipe(image, self.recipe)
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+            atomic_save_image(output, result)
+        except Exception as e:
+            print(f"Failed to process {path}: {e}")
+            with self._lock:
+                self.metrics['failed'] += 1
+                self._failed[path] = signature
+            return
+
+        latency = self.clock() - queued_at
+        with self._lock:
+            self.metrics['processed'] += 1
+            self.metrics['latencies'].append(latency)
+            del self.metrics['latencies'][:-1000]
+            self.state[path] = {'size': signature[0], 'mtime': signature[1], 'output': output}
+            atomic_write_json(self.state_file, self.state)
+
+    @property
+    def queue_depth(self):
+        return sum(1 for future in self._in_flight.values() if not future.done())
+
+    def report(self):
+        """Print queue depth, throughput and latency"""
+        with self._lock:
+            latencies = sorted(self.metrics['latencies'])
+            processed = self.metrics['processed']
+            failed = self.metrics['failed']
+        if latencies:
+            mean = sum(latencies) / len(latencies)
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            timing = f"latency avg {mean:.2f}s p95 {p95:.2f}s"
+        else:
+            timing = "latency n/a"
+        print(f"[watch] queue {self.queue_depth} (+{self.backlog} waiting) | processed {processed} | failed {failed} | {timing}")
+
+    def stop(self):
+        self._stop.set()
+
+    def submit_ready(self, pool):
+        """Hand ready files to the pool, keeping at most max_pending in flight"""
+        # Forget finished tasks
+        self._in_flight = {p: f for p, f in self._in_flight.items() if not f.done()}
+
+        ready = self.scan()
+        self.backlog = 0
+        for i, (path, signature) in enumerate(ready):
+            # Backpressure: leave the rest for a later scan
+            if len(self._in_flight) >= self.max_pending:
+                self.backlog = len(ready) - i
+                break
+            self._in_flight[path] = pool.submit(self.process, path, signature, self.clock())
+
+    def run(self):
+        """Poll the watched directories until stopped"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        print(f"Watching {', '.join(self.directories)} -> {self.output_dir}")
+        last_report = time.time()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while not self._stop.is_set():
+                self.submit_ready(pool)
+                if time.time() - last_report >= self.report_interval:
+                    self.report()
+                    last_report = time.time()
+                self._stop.wait(self.poll_interval)
+        self.report()